@@ -1,6 +1,8 @@
 import os
 import sys
 import re
+import threading
+import time
 from datetime import datetime, timedelta
 
 # Agregar el directorio raíz al path de Python
@@ -9,16 +11,57 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 # Importaciones absolutas
+from base_datos.cached_client import TTLCache
 from base_datos.firebase_client import FirebaseClient
 from autenticacion.seguridad import SecurityManager
+from .session_tokens import SessionTokenSigner
 from .sessionmanager import SessionManager
 
+# Segundos que se reutiliza el perfil del dueño leído de la base
+OWNER_PROFILE_TTL_SECONDS = 300.0
+
+# Vigencia de cada token de sesión; pasada la mitad se renueva en el almacén
+SESSION_TOKEN_TTL_SECONDS = 900.0
+
+
 class Autenticacion:
-    def __init__(self, firebase_client: FirebaseClient = None):
+    """Registro, login y sesiones de los dueños de tienda.
+
+    La sesión vive en el almacén (`session_manager`) y vence tras 24 h sin
+    uso. El `session_id` que reciben la CLI y la UI es un token firmado
+    (`session_tokens`) de vida corta con el usuario, el rol y la tienda:
+
+    - Mientras el token es reciente, `verificar_sesion` solo comprueba la
+      firma. Si el almacén es compartido entre procesos (SQLite) lo consulta
+      además, así un logout en otro proceso se nota al momento.
+    - Pasada la mitad de su vida (o ya vencido), la sesión se verifica y
+      extiende en el almacén y se firma un token nuevo, que se devuelve en
+      `session_id`: quien llama debe quedarse con él.
+
+    El perfil del dueño solo se lee cuando se pide (`get_datos_sesion`) y
+    queda en caché.
+    """
+
+    def __init__(self, firebase_client: FirebaseClient = None, session_backend=None,
+                 token_signer: SessionTokenSigner = None,
+                 token_ttl: float = SESSION_TOKEN_TTL_SECONDS):
         # Permitir inyección del cliente Firebase para pruebas o inicialización controlada
         self.firebase_client = firebase_client or FirebaseClient()
         self.security_manager = SecurityManager()
-        self.session_manager = SessionManager()
+        # La CLI y la ventana (otro hilo) comparten las sesiones; vencen tras
+        # 24 h sin uso y un hilo las elimina a medida que vencen.
+        # session_backend: almacén de sesiones (por defecto en memoria; un
+        # SQLiteSessionBackend las comparte con otros procesos del equipo)
+        self.session_manager = SessionManager(session_backend, sliding=True).start_reaper()
+        # token_signer: claves de firma (por defecto una clave aleatoria de
+        # este proceso; SessionTokenSigner.from_key_file las comparte)
+        self.tokens = token_signer or SessionTokenSigner.generate()
+        self.token_ttl = token_ttl
+        self._profiles = TTLCache(ttl=OWNER_PROFILE_TTL_SECONDS)
+        # Sesiones cerradas en este proceso mientras sus tokens siguen
+        # recientes (no pasan por el almacén): {sid: vencimiento}
+        self._revoked = {}
+        self._revoked_lock = threading.Lock()
 
     def registrar_cuenta(self, email, password, nombre):
         """
@@ -54,10 +97,7 @@ class Autenticacion:
                 return owner_result
 
             # Crear sesión
-            session = self.session_manager.crear_sesion(
-                user_id=result["user_id"],
-                rol="owner"
-            )
+            session = self._emitir_sesion(result["user_id"], owner_data)
             
             if session["success"]:
                 return {
@@ -89,10 +129,7 @@ class Autenticacion:
                 return {"success": False, "error": "Esta cuenta no es de dueño de tienda"}
 
             # Crear sesión
-            session = self.session_manager.crear_sesion(
-                user_id=result["user_id"],
-                rol="owner"
-            )
+            session = self._emitir_sesion(result["user_id"], owner_data["datos"])
 
             if session["success"]:
                 return {
@@ -104,6 +141,22 @@ class Autenticacion:
         
             return {"success": False, "error": "Error al crear la sesión"}
 
+    def _emitir_sesion(self, user_id, datos_usuario, rol="owner", tienda_id=None):
+        """Registra la sesión y emite su token firmado.
+
+        El perfil recién leído queda en caché para `get_datos_sesion`.
+        """
+        session = self.session_manager.crear_sesion(user_id=user_id, rol=rol, tienda_id=tienda_id)
+        if not session["success"]:
+            return session
+        exp = min(time.time() + self.token_ttl, session["expiry_time"].timestamp())
+        claims = {"sid": session["session_id"], "uid": user_id, "rol": rol, "exp": int(exp)}
+        if tienda_id:
+            claims["sto"] = tienda_id
+        self._profiles.set((str(user_id),), datos_usuario)
+        return {"success": True, "session_id": self.tokens.sign(claims),
+                "expiry_time": session["expiry_time"]}
+
     def logout(self, session_id):
             """
             Cierra la sesión del usuario
@@ -113,32 +166,73 @@ class Autenticacion:
             if not verify["success"]:
                 return {"success": False, "error": "Sesión inválida"}
 
+            with self._revoked_lock:
+                now = time.time()
+                for sid in [sid for sid, exp in self._revoked.items() if exp < now]:
+                    del self._revoked[sid]
+                # Después, los tokens que queden pasan por el almacén al renovarse
+                self._revoked[verify["sid"]] = now + self.token_ttl
+            self._profiles.invalidate((str(verify["user_id"]),))
+
             # Cerrar la sesión
-            return self.session_manager.cerrar_sesion(session_id)
+            return self.session_manager.cerrar_sesion(verify["sid"])
 
     def verificar_sesion(self, session_id):
             """
-            Verifica si una sesión es válida y retorna los datos del usuario
+            Verifica si una sesión es válida y retorna sus datos
+
+            Si el token se renovó, el `session_id` del resultado es el nuevo.
             """
-            # Verificar la sesión
-            result = self.session_manager.verificar_sesion(session_id)
-            if not result["success"]:
-                return result
-        
-            # Obtener datos actualizados del dueño
-            owner_data = self.firebase_client.get_owner_data(result["user_id"])
-            if not owner_data["success"]:
-                return {"success": False, "error": "No se encontró la cuenta"}
+            now = time.time()
+            # Un token vencido se acepta para renovarlo si la sesión sigue en el almacén
+            claims, error = self.tokens.verify(session_id, now, leeway=self.session_manager.ttl)
+            if error:
+                return {"success": False, "error": error}
+            if claims["sid"] in self._revoked:
+                return {"success": False, "error": "Sesión cerrada"}
+            if claims["exp"] - now < self.token_ttl / 2:
+                # El almacén decide y, con vencimiento deslizante, extiende la sesión
+                result = self.session_manager.verificar_sesion(claims["sid"])
+                if not result["success"]:
+                    return result
+                claims = {**claims, "exp": int(now + self.token_ttl)}
+                session_id = self.tokens.sign(claims)
+            elif self.session_manager.backend.shared:
+                if not self.session_manager.get_sesion(claims["sid"])["success"]:
+                    return {"success": False, "error": "Sesión cerrada"}
 
             return {
                 "success": True,
-                "user_id": result["user_id"],
+                "user_id": claims["uid"],
+                "rol": claims["rol"],
+                "tienda_id": claims.get("sto"),
                 "session_id": session_id,
-                "datos_usuario": owner_data["datos"]
+                "sid": claims["sid"],
+                "exp": claims["exp"]
             }
 
+    def get_perfil(self, user_id):
+        """
+        Perfil del dueño (en caché unos minutos tras leerlo de la base)
+        """
+        found, datos = self._profiles.get((str(user_id),))
+        if found:
+            return {"success": True, "datos": datos}
+        version = self._profiles.version((str(user_id),))
+        owner_data = self.firebase_client.get_owner_data(user_id)
+        if owner_data["success"]:
+            self._profiles.set((str(user_id),), owner_data["datos"], version)
+        return owner_data
+
     def get_datos_sesion(self, session_id):
         """
-        Obtiene los datos completos de la sesión actual
+        Obtiene los datos completos de la sesión actual, con el perfil del dueño
         """
-        return self.verificar_sesion(session_id)
+        result = self.verificar_sesion(session_id)
+        if not result["success"]:
+            return result
+
+        owner_data = self.get_perfil(result["user_id"])
+        if not owner_data["success"]:
+            return {"success": False, "error": "No se encontró la cuenta"}
+        return {**result, "datos_usuario": owner_data["datos"]}
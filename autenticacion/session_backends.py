@@ -0,0 +1,250 @@
+"""Almacenes de sesiones para `SessionManager`.
+
+- `MemorySessionBackend`: en memoria del proceso, repartida en fragmentos con
+  lock propio y con los vencimientos en un montículo.
+- `SQLiteSessionBackend`: en un archivo SQLite (modo WAL) que pueden abrir a
+  la vez varios procesos del mismo equipo (la UI, la consola, un proceso de
+  tareas), así que una sesión creada en uno vale en los demás y sobrevive a
+  un reinicio. Verificar es una lectura por clave primaria, sin red.
+
+Cada operación es atómica: crear, verificar (y extender) y cerrar una
+sesión no pueden intercalarse con otra operación sobre la misma sesión.
+Los vencimientos son segundos desde epoch (`time.time()`), comparables entre
+procesos.
+"""
+import abc
+import heapq
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+
+# Fragmentos del diccionario de sesiones en memoria (cada uno con su lock)
+SESSION_SHARDS = 16
+
+DEFAULT_SESSION_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'configuracion', 'sessions.db'
+)
+
+# Espera máxima por el lock de escritura de otro proceso
+SQLITE_BUSY_TIMEOUT_SECONDS = 5.0
+
+SessionRecord = namedtuple('SessionRecord', 'user_id rol tienda_id expires')
+
+
+class SessionBackend(abc.ABC):
+    """Interfaz de los almacenes de sesiones."""
+
+    # True si otros procesos ven (y cierran) las mismas sesiones
+    shared = False
+
+    @abc.abstractmethod
+    def create(self, session_id: str, record: SessionRecord):
+        """Guarda una sesión nueva."""
+
+    @abc.abstractmethod
+    def verify(self, session_id: str, now: float, extend_to: float = None):
+        """Busca una sesión vigente y, si se indica, extiende su vencimiento.
+
+        Una sesión vencida se elimina en la misma operación.
+
+        Returns:
+            Tupla (SessionRecord o None, True si se encontró vencida)
+        """
+
+    @abc.abstractmethod
+    def get(self, session_id: str):
+        """SessionRecord de la sesión (vigente o no), o None."""
+
+    @abc.abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """Elimina una sesión. Retorna False si no existía."""
+
+    @abc.abstractmethod
+    def purge_expired(self, now: float) -> int:
+        """Elimina las sesiones vencidas y retorna cuántas eran."""
+
+    def next_expiry(self):
+        """Vencimiento más próximo (para programar la limpieza), o None."""
+        return None
+
+    @abc.abstractmethod
+    def __len__(self):
+        """Sesiones guardadas (vigentes o vencidas sin purgar)."""
+
+    def close(self):
+        pass
+
+
+class _Shard:
+    __slots__ = ('lock', 'sessions')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = {}
+
+
+class MemorySessionBackend(SessionBackend):
+    """Sesiones en memoria del proceso.
+
+    El montículo tiene una entrada por sesión. Extender una sesión no lo
+    toca: cuando su entrada antigua llega a la cima se reprograma con el
+    vencimiento nuevo. Las sesiones cerradas dejan su entrada, que se
+    descarta al llegar a la cima.
+    """
+
+    def __init__(self, shards: int = SESSION_SHARDS):
+        self._shards = [_Shard() for _ in range(shards)]
+        self._heap = []
+        self._heap_lock = threading.Lock()
+
+    def _shard(self, session_id) -> _Shard:
+        return self._shards[hash(session_id) % len(self._shards)]
+
+    def create(self, session_id, record):
+        shard = self._shard(session_id)
+        with shard.lock:
+            shard.sessions[session_id] = record
+        with self._heap_lock:
+            heapq.heappush(self._heap, (record.expires, session_id))
+
+    def verify(self, session_id, now, extend_to=None):
+        shard = self._shard(session_id)
+        with shard.lock:
+            record = shard.sessions.get(session_id)
+            if record is None:
+                return None, False
+            if now > record.expires:
+                del shard.sessions[session_id]
+                return None, True
+            if extend_to is not None and extend_to > record.expires:
+                record = shard.sessions[session_id] = record._replace(expires=extend_to)
+        return record, False
+
+    def get(self, session_id):
+        shard = self._shard(session_id)
+        with shard.lock:
+            return shard.sessions.get(session_id)
+
+    def delete(self, session_id):
+        shard = self._shard(session_id)
+        with shard.lock:
+            return shard.sessions.pop(session_id, None) is not None
+
+    def purge_expired(self, now):
+        removed = 0
+        while True:
+            with self._heap_lock:
+                if not self._heap or self._heap[0][0] >= now:
+                    return removed
+                _, session_id = heapq.heappop(self._heap)
+            shard = self._shard(session_id)
+            with shard.lock:
+                record = shard.sessions.get(session_id)
+                if record is None:
+                    continue
+                if record.expires < now:
+                    del shard.sessions[session_id]
+                    removed += 1
+                    continue
+            # Extendida desde que se programó: se reprograma
+            with self._heap_lock:
+                heapq.heappush(self._heap, (record.expires, session_id))
+
+    def next_expiry(self):
+        with self._heap_lock:
+            return self._heap[0][0] if self._heap else None
+
+    def __len__(self):
+        return sum(len(shard.sessions) for shard in self._shards)
+
+
+SESSIONS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    rol TEXT,
+    tienda_id TEXT,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires);
+"""
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """Sesiones en un archivo SQLite compartido entre procesos.
+
+    Como `LocalDatabase`, usa una conexión por instancia protegida por un
+    lock; entre procesos, SQLite serializa las escrituras y las lecturas no
+    esperan (WAL). La limpieza usa el índice por vencimiento.
+    """
+
+    def __init__(self, path: str = DEFAULT_SESSION_DB_PATH):
+        """Abre (o crea) el archivo de sesiones.
+
+        Args:
+            path: Ruta del archivo SQLite, o ':memory:' (solo este proceso)
+        """
+        self.path = path
+        self.shared = path != ':memory:'
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False,
+                                     timeout=SQLITE_BUSY_TIMEOUT_SECONDS)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SESSIONS_SCHEMA)
+        self._conn.commit()
+
+    def create(self, session_id, record):
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO sessions (id, user_id, rol, tienda_id, expires) VALUES (?, ?, ?, ?, ?)",
+                    (session_id, *record))
+
+    def verify(self, session_id, now, extend_to=None):
+        with self._lock:
+            with self._conn:
+                if extend_to is not None:
+                    # El UPDATE toma el lock de escritura: la lectura que
+                    # sigue ve la sesión tal como quedó
+                    self._conn.execute(
+                        "UPDATE sessions SET expires = MAX(expires, ?) WHERE id = ? AND expires >= ?",
+                        (extend_to, session_id, now))
+                row = self._conn.execute(
+                    "SELECT user_id, rol, tienda_id, expires FROM sessions WHERE id = ? AND expires >= ?",
+                    (session_id, now)).fetchone()
+                if row is not None:
+                    return SessionRecord(*row), False
+                expired = self._conn.execute(
+                    "DELETE FROM sessions WHERE id = ? AND expires < ?", (session_id, now)).rowcount
+                return None, expired > 0
+
+    def get(self, session_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT user_id, rol, tienda_id, expires FROM sessions WHERE id = ?",
+                (session_id,)).fetchone()
+        return SessionRecord(*row) if row is not None else None
+
+    def delete(self, session_id):
+        with self._lock:
+            with self._conn:
+                return self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount > 0
+
+    def purge_expired(self, now):
+        with self._lock:
+            with self._conn:
+                return self._conn.execute("DELETE FROM sessions WHERE expires < ?", (now,)).rowcount
+
+    def next_expiry(self):
+        with self._lock:
+            return self._conn.execute("SELECT MIN(expires) FROM sessions").fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,178 @@
+"""Tokens de sesión firmados con HMAC, verificables sin consultar nada.
+
+Un token lleva los datos de la sesión y su firma:
+
+    v1.<kid>.<datos en base64url>.<firma HMAC-SHA256 en base64url>
+
+Los datos son un JSON compacto con `sid` (ID de la sesión), `uid`
+(usuario), `rol`, `sto` (tienda, opcional) y `exp` (vencimiento, segundos
+desde epoch). Verificar un token solo calcula un HMAC y compara: no lee la
+base ni el almacén de sesiones, tarda microsegundos.
+
+`kid` identifica la clave con la que se firmó. Al rotar (`rotate`) se firma
+con una clave nueva y las anteriores se conservan para verificar los tokens
+ya emitidos hasta que se descartan. Con `from_key_file` las claves se
+guardan en un archivo (configuracion/session_keys.json) que comparten los
+procesos del equipo; si llega un token con una clave desconocida se relee el
+archivo por si otro proceso rotó.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+
+SESSION_TOKEN_VERSION = 'v1'
+
+DEFAULT_SESSION_KEYS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'configuracion', 'session_keys.json'
+)
+
+# Claves que se conservan al rotar (la activa y las anteriores)
+SESSION_KEYS_KEPT = 2
+
+# Intervalo mínimo entre relecturas del archivo de claves
+KEY_RELOAD_SECONDS = 5.0
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _new_kid() -> str:
+    return secrets.token_hex(4)
+
+
+class SessionTokenSigner:
+    """Firma y verifica tokens de sesión con un conjunto de claves rotables."""
+
+    def __init__(self, keys: dict, active_kid: str, path: str = None, clock=time.time):
+        """Crea el firmador.
+
+        Args:
+            keys: {kid: clave en bytes}, de la más antigua a la más nueva
+            active_kid: Clave con la que se firman los tokens nuevos
+            path: Archivo de claves (se reescribe al rotar); None = solo en memoria
+        """
+        if active_kid not in keys:
+            raise ValueError("La clave activa no está entre las claves")
+        self._keys = dict(keys)
+        self.active_kid = active_kid
+        self.path = path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_reload = clock()
+
+    @classmethod
+    def generate(cls):
+        """Firmador con una clave aleatoria, solo en memoria de este proceso."""
+        kid = _new_kid()
+        return cls({kid: secrets.token_bytes(32)}, kid)
+
+    @classmethod
+    def from_key_file(cls, path: str = DEFAULT_SESSION_KEYS_PATH):
+        """Carga las claves del archivo; si no existe lo crea con una clave nueva."""
+        keys, active = cls._read_keys(path)
+        if keys is None:
+            kid = _new_kid()
+            keys, active = {kid: secrets.token_bytes(32)}, kid
+            cls._write_keys(path, keys, active)
+        return cls(keys, active, path=path)
+
+    @staticmethod
+    def _read_keys(path):
+        if not os.path.exists(path):
+            return None, None
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return {kid: _b64decode(key) for kid, key in data['keys'].items()}, data['active']
+
+    @staticmethod
+    def _write_keys(path, keys, active):
+        tmp_path = path + '.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'active': active, 'keys': {kid: _b64encode(key) for kid, key in keys.items()}}, f)
+        os.replace(tmp_path, path)
+
+    # === Rotación ===
+    def rotate(self, keep: int = SESSION_KEYS_KEPT) -> str:
+        """Firma en adelante con una clave nueva y descarta las más antiguas.
+
+        Args:
+            keep: Claves que se conservan, incluida la nueva; los tokens
+                firmados con una clave descartada dejan de ser válidos
+
+        Returns:
+            kid de la clave nueva
+        """
+        kid = _new_kid()
+        with self._lock:
+            self._keys[kid] = secrets.token_bytes(32)
+            for old in list(self._keys)[:-keep]:
+                del self._keys[old]
+            self.active_kid = kid
+            if self.path:
+                self._write_keys(self.path, self._keys, kid)
+        return kid
+
+    def _key(self, kid):
+        key = self._keys.get(kid)
+        if key is None and self.path and self._clock() - self._last_reload >= KEY_RELOAD_SECONDS:
+            # Otro proceso pudo rotar: se relee el archivo (como mucho cada pocos segundos)
+            with self._lock:
+                self._last_reload = self._clock()
+                keys, active = self._read_keys(self.path)
+                if keys:
+                    self._keys, self.active_kid = keys, active
+            key = self._keys.get(kid)
+        return key
+
+    # === Tokens ===
+    def sign(self, claims: dict) -> str:
+        """Token firmado con la clave activa para los datos indicados."""
+        with self._lock:
+            kid, key = self.active_kid, self._keys[self.active_kid]
+        payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+        signing_input = f'{SESSION_TOKEN_VERSION}.{kid}.{payload}'
+        signature = hmac.new(key, signing_input.encode('ascii'), hashlib.sha256).digest()
+        return f'{signing_input}.{_b64encode(signature)}'
+
+    def verify(self, token: str, now: float = None, leeway: float = 0):
+        """Comprueba la firma y el vencimiento de un token.
+
+        Args:
+            leeway: Segundos que se acepta un token ya vencido (para
+                renovarlo si su sesión sigue vigente)
+
+        Returns:
+            Tupla (datos, None) si es válido, o (None, mensaje de error)
+        """
+        try:
+            version, kid, payload, signature = token.split('.')
+        except (AttributeError, ValueError):
+            return None, "Sesión no encontrada"
+        if version != SESSION_TOKEN_VERSION:
+            return None, "Sesión no encontrada"
+        key = self._key(kid)
+        if key is None:
+            return None, "Sesión inválida"
+        try:
+            expected = hmac.new(key, f'{version}.{kid}.{payload}'.encode('ascii'), hashlib.sha256).digest()
+            valid = hmac.compare_digest(expected, _b64decode(signature))
+            claims = json.loads(_b64decode(payload)) if valid else None
+        except (binascii.Error, ValueError):
+            return None, "Sesión inválida"
+        if not valid or not isinstance(claims, dict):
+            return None, "Sesión inválida"
+        if (now if now is not None else self._clock()) > claims.get('exp', 0) + leeway:
+            return None, "Sesión expirada"
+        return claims, None
@@ -1,50 +1,86 @@
+"""Sesiones de usuario, seguras entre hilos.
+
+La CLI y la ventana de Tk (otro hilo) comparten el mismo gestor. Dónde se
+guardan las sesiones lo decide el almacén (`session_backends`): por defecto
+en memoria, repartidas en fragmentos con lock propio y con los vencimientos
+en un montículo, de modo que limpiar las vencidas cuesta O(log n) por sesión
+eliminada en lugar de recorrerlas todas; con `SQLiteSessionBackend` varios
+procesos del mismo equipo comparten las sesiones. Un hilo en segundo plano
+(`start_reaper`) elimina las sesiones a medida que vencen.
+
+Con `sliding=True` cada verificación correcta extiende la sesión otras
+`ttl` horas (vence tras `ttl` de inactividad).
+"""
+import threading
+import time
 import uuid
 from datetime import datetime, timedelta
 
+from .session_backends import MemorySessionBackend, SessionRecord
+
+# Duración de una sesión
+SESSION_TTL = timedelta(hours=24)
+
+# Cada cuánto revisa el hilo de limpieza, como máximo
+REAPER_INTERVAL_SECONDS = 60.0
+
+
 class SessionManager:
-    def __init__(self):
-        self.sessions = {}  # En una aplicación real, esto estaría en una base de datos
+    def __init__(self, backend=None, ttl: timedelta = SESSION_TTL, sliding: bool = False,
+                 clock=time.time):
+        """Crea el gestor.
+
+        Args:
+            backend: Almacén de sesiones (por defecto MemorySessionBackend)
+            ttl: Duración de cada sesión
+            sliding: True para extender la sesión en cada verificación
+            clock: Reloj en segundos (epoch), inyectable en pruebas
+        """
+        self.backend = backend if backend is not None else MemorySessionBackend()
+        self.ttl = ttl.total_seconds() if isinstance(ttl, timedelta) else float(ttl)
+        self.sliding = sliding
+        self._clock = clock
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._reaper = None
+
+    def __len__(self):
+        return len(self.backend)
 
     def crear_sesion(self, user_id, rol, tienda_id=None):
         """
         Crea una nueva sesión para un usuario
         """
         session_id = str(uuid.uuid4())
-        expiry_time = datetime.now() + timedelta(hours=24)  # La sesión expira en 24 horas
-        
-        self.sessions[session_id] = {
-            "user_id": user_id,
-            "rol": rol,
-            "tienda_id": tienda_id,
-            "expiry_time": expiry_time
-        }
-        
+        expires = self._clock() + self.ttl
+        self.backend.create(session_id, SessionRecord(user_id, rol, tienda_id, expires))
+
         return {
             "success": True,
             "session_id": session_id,
-            "expiry_time": expiry_time
+            "expiry_time": datetime.fromtimestamp(expires)
         }
 
     def verificar_sesion(self, session_id):
         """
         Verifica si una sesión es válida y no ha expirado
         """
-        session = self.sessions.get(session_id)
-        if not session:
-            return {"success": False, "error": "Sesión no encontrada"}
-        
-        if datetime.now() > session["expiry_time"]:
-            self.cerrar_sesion(session_id)
+        now = self._clock()
+        record, expired = self.backend.verify(session_id, now,
+                                              now + self.ttl if self.sliding else None)
+        if expired:
             return {"success": False, "error": "Sesión expirada"}
-        
-        return {"success": True, "user_id": session["user_id"], "rol": session["rol"]}
+        if record is None:
+            return {"success": False, "error": "Sesión no encontrada"}
+
+        return {"success": True, "user_id": record.user_id, "rol": record.rol,
+                "tienda_id": record.tienda_id}
 
     def cerrar_sesion(self, session_id):
         """
         Cierra una sesión existente
         """
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        if self.backend.delete(session_id):
             return {"success": True, "message": "Sesión cerrada correctamente"}
         return {"success": False, "error": "Sesión no encontrada"}
 
@@ -52,20 +88,41 @@ class SessionManager:
         """
         Obtiene los detalles de una sesión
         """
-        session = self.sessions.get(session_id)
-        if session:
-            return {"success": True, "user_id": session["user_id"], "rol": session["rol"]}
+        record = self.backend.get(session_id)
+        if record:
+            return {"success": True, "user_id": record.user_id, "rol": record.rol,
+                    "tienda_id": record.tienda_id}
         return {"success": False, "error": "Sesión no encontrada"}
 
     def limpiar_sesiones_expiradas(self):
         """
-        Limpia todas las sesiones expiradas
+        Elimina las sesiones vencidas y retorna cuántas se eliminaron
         """
-        current_time = datetime.now()
-        expired_sessions = [
-            session_id for session_id, session in self.sessions.items()
-            if current_time > session["expiry_time"]
-        ]
-        
-        for session_id in expired_sessions:
-            del self.sessions[session_id]
+        return self.backend.purge_expired(self._clock())
+
+    # === Limpieza en segundo plano ===
+    def start_reaper(self, interval: float = REAPER_INTERVAL_SECONDS):
+        """Arranca el hilo que elimina las sesiones a medida que vencen."""
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._run_reaper, args=(interval,),
+                                            name="session-reaper", daemon=True)
+            self._reaper.start()
+        return self
+
+    def _run_reaper(self, interval):
+        while not self._closed.is_set():
+            self.limpiar_sesiones_expiradas()
+            next_expiry = self.backend.next_expiry()
+            wait = interval
+            if next_expiry is not None:
+                wait = min(interval, max(0.001, next_expiry - self._clock()))
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def close(self):
+        """Detiene el hilo de limpieza y cierra el almacén."""
+        self._closed.set()
+        self._wake.set()
+        if self._reaper is not None:
+            self._reaper.join(timeout=5)
+        self.backend.close()
@@ -0,0 +1,151 @@
+"""Fachada asíncrona (asyncio) con la misma interfaz que FirebaseClient."""
+import asyncio
+import functools
+import logging
+
+from .db_base import DatabaseBase
+from .models import Product, Store
+from .store_operations import STORES_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+try:
+    import firebase_admin
+    from firebase_admin import firestore_async
+except Exception:
+    firebase_admin = None
+    firestore_async = None
+
+
+class AsyncFirebaseClient(DatabaseBase):
+    """Versión `async` de FirebaseClient.
+
+    Las lecturas de la vista de tiendas (todas las tiendas del usuario, con
+    los lotes de `get_all` lanzados a la vez con asyncio.gather) y de la de
+    métricas (productos del top) van directo al cliente asíncrono de
+    Firestore cuando hay uno; cualquier otro método se ejecuta con el
+    cliente síncrono en un hilo (asyncio.to_thread), así que toda la
+    interfaz de FirebaseClient está disponible como corrutinas.
+
+    Las lecturas directas no pasan por CachedFirebaseClient ni por
+    JournaledFirebaseClient (no verían la caché ni las escrituras aún en el
+    diario): `for_client` solo usa el cliente asíncrono si el cliente
+    síncrono no está envuelto; si lo está, todo va por los envoltorios.
+    """
+
+    def __init__(self, client, async_db=None):
+        """Envuelve un cliente existente.
+
+        Args:
+            client: FirebaseClient (o cualquier objeto con la misma interfaz)
+            async_db: google.cloud.firestore.AsyncClient; None = todo en hilos
+        """
+        self._client = client
+        super().__init__(async_db)
+
+    @classmethod
+    def for_client(cls, client):
+        """Crea la fachada usando el AsyncClient si Firebase está inicializado.
+
+        Con un cliente envuelto (caché, diario) no se usa el AsyncClient:
+        las vistas leen a través de los envoltorios, en un hilo.
+        """
+        async_db = None
+        if getattr(client, 'wrapped', None) is not None:
+            return cls(client)
+        if firestore_async is not None:
+            try:
+                firebase_admin.get_app()
+                async_db = firestore_async.client()
+            except ValueError:
+                pass  # sin app de Firebase (modo local)
+            except Exception as e:
+                logger.warning("Cliente asíncrono de Firestore no disponible: %s", e)
+        return cls(client, async_db)
+
+    @property
+    def wrapped(self):
+        """Cliente síncrono."""
+        return self._client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(attr, *args, **kwargs)
+        return call
+
+    # === Lecturas con el cliente asíncrono ===
+    async def get_user_stores(self, user_id):
+        """Tiendas del usuario; los lotes de `get_all` se piden en paralelo."""
+        if self.db is None:
+            return await asyncio.to_thread(self._client.get_user_stores, user_id)
+        try:
+            if isinstance(user_id, dict):
+                user_id = user_id.get("user_id", "")
+            if not user_id:
+                return self._error_response("ID de usuario requerido")
+
+            user_doc = await self.users_ref.document(str(user_id)).get()
+            if not user_doc.exists:
+                return self._error_response("Usuario no encontrado")
+
+            owned = [str(store_id) for store_id in user_doc.to_dict().get('owned_stores', []) or []]
+            chunks = [owned[i:i + STORES_BATCH_SIZE] for i in range(0, len(owned), STORES_BATCH_SIZE)]
+
+            async def read_chunk(chunk):
+                refs = [self.stores_ref.document(store_id) for store_id in chunk]
+                return [snapshot async for snapshot in self.db.get_all(refs)]
+
+            found = {}
+            for snapshots in await asyncio.gather(*(read_chunk(chunk) for chunk in chunks)):
+                for snapshot in snapshots:
+                    if snapshot.exists:
+                        found[snapshot.id] = Store.from_doc(snapshot.id, snapshot.to_dict())
+            return self._success_response(stores=[found[s] for s in owned if s in found])
+        except Exception as e:
+            logger.exception("Error en get_user_stores (async): %s", e)
+            return self._error_response(str(e))
+
+    async def get_products_by_ids(self, store_id, product_ids):
+        """Solo los productos indicados, con una lectura `get_all`."""
+        if self.db is None:
+            return await asyncio.to_thread(self._client.get_products_by_ids, store_id, product_ids)
+        try:
+            if not store_id:
+                return self._error_response("ID de tienda requerido")
+            product_ids = [str(pid) for pid in product_ids]
+            products_col = self.stores_ref.document(str(store_id)).collection('products')
+            refs = [products_col.document(pid) for pid in product_ids]
+            found = {}
+            if refs:
+                async for snapshot in self.db.get_all(refs):
+                    if snapshot.exists:
+                        found[snapshot.id] = Product.from_doc(snapshot.id, snapshot.to_dict())
+            return self._success_response(products=[found[pid] for pid in product_ids if pid in found])
+        except Exception as e:
+            logger.exception("Error en get_products_by_ids (async): %s", e)
+            return self._error_response(str(e))
+
+    # === Operaciones compuestas ===
+    async def get_metrics_data(self, store_id, top_limit=5):
+        """Resumen de ventas con el nombre de cada producto del top.
+
+        Los agregados guardan el nombre del producto; solo se leen los
+        productos del top cuyas ventas no lo traían.
+        """
+        summary = await self.get_sales_summary(store_id, top_limit)
+        if not summary.get('success'):
+            return summary
+        top_products = summary.get('top_products', [])
+        missing = [p['product_id'] for p in top_products if p.get('product_name', 'N/A') == 'N/A']
+        if missing:
+            res = await self.get_products_by_ids(store_id, missing)
+            names = {p['id']: p.get('name', 'N/A') for p in res.get('products', [])} if res.get('success') else {}
+            for product in top_products:
+                if product['product_id'] in names:
+                    product['product_name'] = names[product['product_id']]
+        return summary
@@ -0,0 +1,79 @@
+"""Sesión HTTP compartida por las llamadas REST de autenticación.
+
+Login (signInWithPassword), renovación de ID tokens y descarga de las
+claves públicas usan una misma `requests.Session`: las conexiones quedan
+abiertas (keep-alive) y se reutilizan, así que solo la primera petición a
+cada host paga el handshake TCP y TLS. Los errores de conexión y las
+respuestas 429/5xx se reintentan con espera exponencial.
+
+`stats()` informa cuántas peticiones reutilizaron una conexión abierta.
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Hosts distintos con pool propio (identitytoolkit, securetoken, googleapis)
+AUTH_POOL_CONNECTIONS = 4
+
+# Conexiones abiertas por host (logins simultáneos en un cambio de turno)
+AUTH_POOL_MAXSIZE = 16
+
+# Reintentos ante errores de conexión o 429/5xx, con espera 0.3 s, 0.6 s, 1.2 s...
+AUTH_RETRY_TOTAL = 3
+AUTH_RETRY_BACKOFF = 0.3
+AUTH_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class AuthHttpSession:
+    """`requests.Session` con pool de conexiones, reintentos y estadísticas."""
+
+    def __init__(self, pool_connections: int = AUTH_POOL_CONNECTIONS,
+                 pool_maxsize: int = AUTH_POOL_MAXSIZE, retries: int = AUTH_RETRY_TOTAL,
+                 backoff_factor: float = AUTH_RETRY_BACKOFF):
+        # signInWithPassword y el refresh no tienen efectos secundarios: se
+        # pueden reintentar también los POST
+        retry = Retry(total=retries, backoff_factor=backoff_factor,
+                      status_forcelist=AUTH_RETRY_STATUSES,
+                      allowed_methods=frozenset(['GET', 'POST']),
+                      raise_on_status=False)
+        self._adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                    max_retries=retry)
+        self._session = requests.Session()
+        self._session.mount('https://', self._adapter)
+        self._session.mount('http://', self._adapter)
+
+    def get(self, url, **kwargs):
+        return self._session.get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._session.post(url, **kwargs)
+
+    def stats(self) -> dict:
+        """Peticiones, conexiones abiertas en total y peticiones que reutilizaron una."""
+        pools = self._adapter.poolmanager.pools
+        requests_count = connections = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                requests_count += pool.num_requests
+                connections += pool.num_connections
+        return {'requests': requests_count, 'connections': connections,
+                'reused': requests_count - connections}
+
+    def close(self):
+        self._session.close()
+
+
+_default_session = None
+_default_lock = threading.Lock()
+
+
+def default_auth_session() -> AuthHttpSession:
+    """Sesión compartida por todas las operaciones de autenticación del proceso."""
+    global _default_session
+    with _default_lock:
+        if _default_session is None:
+            _default_session = AuthHttpSession()
+        return _default_session
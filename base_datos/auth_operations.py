@@ -1,29 +1,62 @@
-"""Operaciones de autenticación."""
+"""Operaciones de autenticación.
+
+Al iniciar sesión con la API REST de Firebase Auth se guardan el ID token y
+el refresh token del usuario. El ID token se verifica localmente
+(`id_tokens`) y, mientras sea válido, `get_id_token` lo entrega sin red;
+cuando vence se renueva con el refresh token. Cada login comprueba la
+contraseña con signInWithPassword (por la sesión HTTP con keep-alive): un
+cambio de contraseña o una cuenta deshabilitada en Firebase se respetan en
+el siguiente login.
+"""
 import logging
+import threading
+import time
+
 import requests
 from datetime import datetime
+from .auth_http import default_auth_session
 from .db_base import DatabaseBase
+from .id_tokens import IdTokenVerifier, PublicKeyCache
 
 logger = logging.getLogger(__name__)
 
 # Firebase Auth REST API endpoint
 FIREBASE_AUTH_URL = "https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword"
+FIREBASE_REFRESH_URL = "https://securetoken.googleapis.com/v1/token"
+
+# Un ID token se renueva cuando le quedan menos de estos segundos
+ID_TOKEN_REFRESH_MARGIN_SECONDS = 300
 
 
 class AuthOperations(DatabaseBase):
     """Operaciones de autenticación y usuarios."""
 
-    def __init__(self, db=None, auth_module=None, api_key=None):
+    def __init__(self, db=None, auth_module=None, api_key=None, project_id=None,
+                 token_verifier: IdTokenVerifier = None, http=None,
+                 sign_in_url: str = FIREBASE_AUTH_URL, refresh_url: str = FIREBASE_REFRESH_URL):
         """Inicializa con BD y módulo de auth.
         
         Args:
             db: Cliente de Firestore
             auth_module: Módulo de autenticación Firebase
             api_key: API key de Firebase (opcional, para verificación de contraseñas)
+            project_id: Proyecto de Firebase; con él los ID tokens se verifican localmente
+            token_verifier: Verificador de ID tokens (por defecto uno para project_id)
+            http: Cliente HTTP con `get`/`post` (por defecto la sesión con pool
+                compartida, `auth_http.default_auth_session`)
         """
         super().__init__(db)
         self._auth = auth_module
         self._api_key = api_key
+        self._http = http or default_auth_session()
+        self.sign_in_url = sign_in_url
+        self.refresh_url = refresh_url
+        if token_verifier is None and project_id:
+            token_verifier = IdTokenVerifier(project_id, PublicKeyCache(http=self._http))
+        self._verifier = token_verifier
+        self._tokens_lock = threading.Lock()
+        # {user_id: {'id_token', 'refresh_token', 'expires_at'}}
+        self._tokens = {}
 
     def create_account(self, email, password):
         """Crea una cuenta de usuario."""
@@ -51,7 +84,11 @@ class AuthOperations(DatabaseBase):
             return self._error_response(error_msg)
 
     def verify_credentials(self, email, password):
-        """Verifica credenciales de usuario usando Firebase Auth REST API."""
+        """Verifica credenciales de usuario usando Firebase Auth REST API.
+
+        La contraseña siempre la comprueba Firebase; los tokens que devuelve
+        reemplazan a los guardados del usuario.
+        """
         try:
             if not self.users_ref:
                 return self._error_response("Firestore no inicializado")
@@ -63,8 +100,8 @@ class AuthOperations(DatabaseBase):
             
             # Verificar credenciales usando Firebase Auth REST API
             try:
-                response = requests.post(
-                    f"{FIREBASE_AUTH_URL}?key={self._api_key}",
+                response = self._http.post(
+                    f"{self.sign_in_url}?key={self._api_key}",
                     json={
                         "email": email,
                         "password": password,
@@ -76,14 +113,9 @@ class AuthOperations(DatabaseBase):
                 if response.status_code == 200:
                     data = response.json()
                     user_id = data.get('localId')
-                    # Verificar que el usuario existe en Firestore y está activo
-                    user_doc = self.users_ref.document(user_id).get()
-                    if user_doc.exists:
-                        user_data = user_doc.to_dict()
-                        if user_data.get('is_active', True):
-                            return self._success_response(user_id=user_id)
-                        return self._error_response("Usuario inactivo")
-                    return self._error_response("Usuario no encontrado en la base de datos")
+                    id_token = data.get('idToken')
+                    self._store_tokens(user_id, id_token, data.get('refreshToken'), data.get('expiresIn'))
+                    return self._active_user(user_id, id_token=id_token)
                 elif response.status_code == 400:
                     error_data = response.json()
                     error_msg = error_data.get('error', {}).get('message', 'Credenciales inválidas')
@@ -101,6 +133,84 @@ class AuthOperations(DatabaseBase):
             logger.exception("Error en verify_credentials: %s", e)
             return self._error_response("Error al verificar credenciales")
 
+    def _active_user(self, user_id, **extra):
+        """Verifica que el usuario existe en Firestore y está activo."""
+        user_doc = self.users_ref.document(user_id).get()
+        if user_doc.exists:
+            user_data = user_doc.to_dict()
+            if user_data.get('is_active', True):
+                return self._success_response(user_id=user_id, **extra)
+            return self._error_response("Usuario inactivo")
+        return self._error_response("Usuario no encontrado en la base de datos")
+
+    # === Tokens de Firebase Auth ===
+    def _store_tokens(self, user_id, id_token, refresh_token, expires_in):
+        """Guarda los tokens; con verificador, el vencimiento sale del propio token."""
+        if self._verifier is not None:
+            claims = self._verifier.verify(id_token)
+            if claims['sub'] != user_id:
+                raise ValueError("El ID token no corresponde al usuario")
+            expires_at = claims['exp']
+        else:
+            expires_at = time.time() + float(expires_in or 3600)
+        with self._tokens_lock:
+            self._tokens[user_id] = {'id_token': id_token, 'refresh_token': refresh_token,
+                                     'expires_at': expires_at}
+
+    def http_stats(self):
+        """Peticiones REST de autenticación y cuántas reutilizaron una conexión."""
+        stats = getattr(self._http, 'stats', None)
+        if stats is None:
+            return self._error_response("Cliente HTTP sin estadísticas")
+        return self._success_response(**stats())
+
+    def verify_id_token(self, id_token):
+        """Verifica un ID token localmente (firma con claves en caché, sin red)."""
+        if self._verifier is None:
+            return self._error_response("Verificación de ID tokens no configurada")
+        try:
+            claims = self._verifier.verify(id_token)
+            return self._success_response(user_id=claims['sub'], claims=claims)
+        except ValueError as e:
+            return self._error_response(str(e))
+        except Exception as e:
+            logger.exception("Error en verify_id_token: %s", e)
+            return self._error_response(str(e))
+
+    def get_id_token(self, user_id):
+        """ID token vigente del usuario; si está por vencer se renueva con el refresh token."""
+        with self._tokens_lock:
+            tokens = self._tokens.get(user_id)
+        if tokens is None:
+            return self._error_response("No hay sesión de Firebase Auth para el usuario")
+        if tokens['expires_at'] - ID_TOKEN_REFRESH_MARGIN_SECONDS > time.time():
+            return self._success_response(id_token=tokens['id_token'])
+        return self.refresh_id_token(user_id)
+
+    def refresh_id_token(self, user_id):
+        """Renueva el ID token del usuario con su refresh token."""
+        try:
+            with self._tokens_lock:
+                tokens = self._tokens.get(user_id)
+            if tokens is None or not tokens.get('refresh_token') or not self._api_key:
+                return self._error_response("No hay refresh token para el usuario")
+            response = self._http.post(
+                f"{self.refresh_url}?key={self._api_key}",
+                data={"grant_type": "refresh_token", "refresh_token": tokens['refresh_token']},
+                timeout=10
+            )
+            if response.status_code != 200:
+                # Refresh token revocado o vencido: hará falta la contraseña
+                with self._tokens_lock:
+                    self._tokens.pop(user_id, None)
+                return self._error_response("Sesión de Firebase Auth vencida")
+            data = response.json()
+            self._store_tokens(user_id, data['id_token'], data.get('refresh_token'), data.get('expires_in'))
+            return self._success_response(id_token=data['id_token'])
+        except Exception as e:
+            logger.exception("Error en refresh_id_token: %s", e)
+            return self._error_response(str(e))
+
     def _verify_credentials_fallback(self, email, password):
         """Método alternativo de verificación (solo para desarrollo sin API key)."""
         try:
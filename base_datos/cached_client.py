@@ -0,0 +1,245 @@
+"""Caché de lectura (LRU + TTL) delante de FirebaseClient."""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Segundos que vive cada entrada según la colección
+DEFAULT_TTLS = {
+    'stores': 300.0,
+    'owners': 300.0,
+    'staff': 60.0,
+    'products': 30.0,
+    'sales': 15.0,
+}
+
+
+class TTLCache:
+    """Caché LRU con expiración por entrada y contadores de aciertos/fallos.
+
+    Cada invalidación sube la versión de la tienda (primer elemento de la
+    clave); `set` con la versión leída antes de cargar descarta el valor si
+    hubo una invalidación mientras tanto, así una lectura lenta que empezó
+    antes de una escritura no deja en caché la respuesta vieja.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 30.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._versions = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Retorna (encontrado, valor). Las entradas vencidas cuentan como fallo."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._data[key]
+            self.misses += 1
+            return False, None
+
+    def version(self, key):
+        """Versión actual de la clave, para pasarla luego a `set`."""
+        with self._lock:
+            return self._epoch, self._versions.get(key[0], 0)
+
+    def set(self, key, value, version=None):
+        """Guarda el valor, salvo que la clave se haya invalidado desde `version`."""
+        with self._lock:
+            if version is not None and version != (self._epoch, self._versions.get(key[0], 0)):
+                return
+            self._data[key] = (self._clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._versions[key[0]] = self._versions.get(key[0], 0) + 1
+            self._data.pop(key, None)
+
+    def invalidate_store(self, store_id):
+        """Elimina todas las entradas cuya clave empieza por `store_id`."""
+        store_id = str(store_id)
+        with self._lock:
+            self._versions[store_id] = self._versions.get(store_id, 0) + 1
+            for key in [k for k in self._data if k[0] == store_id]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._versions.clear()
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data)}
+
+
+def _copy_response(res: dict):
+    """Copia la respuesta para que los llamadores no modifiquen la caché."""
+    copied = {}
+    for key, value in res.items():
+        if isinstance(value, list):
+            value = [dict(item) if isinstance(item, dict) else item for item in value]
+        copied[key] = value
+    return copied
+
+
+class CachedFirebaseClient:
+    """Decorador de FirebaseClient que cachea lecturas frecuentes.
+
+    Las claves son (store_id, tipo) -o (user_id, tipo) para las tiendas de un
+    usuario- y cada mutador invalida las entradas de su colección. Solo se
+    cachean respuestas exitosas. Los métodos no cacheados se delegan tal cual.
+    """
+
+    def __init__(self, client, ttls: dict = None, maxsize: int = 256, clock=time.monotonic):
+        """Envuelve un cliente existente.
+
+        Args:
+            client: FirebaseClient (o cualquier objeto con la misma interfaz)
+            ttls: Segundos por colección; se combinan con DEFAULT_TTLS
+            maxsize: Entradas máximas por colección
+        """
+        self._client = client
+        ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._caches = {
+            name: TTLCache(maxsize=maxsize, ttl=ttl, clock=clock) for name, ttl in ttls.items()
+        }
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    @property
+    def wrapped(self):
+        """Cliente sin caché."""
+        return self._client
+
+    def _cached(self, cache_name: str, key, loader):
+        cache = self._caches[cache_name]
+        found, value = cache.get(key)
+        if found:
+            return _copy_response(value)
+        version = cache.version(key)
+        res = loader()
+        if isinstance(res, dict) and res.get('success'):
+            cache.set(key, res, version)
+            return _copy_response(res)
+        return res
+
+    def cache_stats(self):
+        """Aciertos, fallos y tamaño por colección, para ajustar los TTL."""
+        return {name: cache.stats() for name, cache in self._caches.items()}
+
+    def clear_cache(self):
+        for cache in self._caches.values():
+            cache.clear()
+
+    # === Lecturas cacheadas ===
+    def get_user_stores(self, user_id):
+        key = (str(user_id.get('user_id') if isinstance(user_id, dict) else user_id), 'user_stores')
+        return self._cached('stores', key, lambda: self._client.get_user_stores(user_id))
+
+    def verify_owner(self, user_id, store_id):
+        return self._cached('owners', (str(store_id), 'owner', str(user_id)),
+                            lambda: self._client.verify_owner(user_id, store_id))
+
+    def get_store_staff(self, store_id):
+        return self._cached('staff', (str(store_id), 'staff'),
+                            lambda: self._client.get_store_staff(store_id))
+
+    def get_store_products(self, store_id):
+        return self._cached('products', (str(store_id), 'products'),
+                            lambda: self._client.get_store_products(store_id))
+
+    def get_store_sales(self, store_id, limit=100):
+        return self._cached('sales', (str(store_id), 'sales', limit),
+                            lambda: self._client.get_store_sales(store_id, limit))
+
+    # === Mutadores con invalidación ===
+    def create_store(self, store_info, owner_id):
+        res = self._client.create_store(store_info, owner_id)
+        owner_key = str(owner_id.get('user_id') if isinstance(owner_id, dict) else owner_id)
+        self._caches['stores'].invalidate((owner_key, 'user_stores'))
+        return res
+
+    def add_store_staff(self, store_id, staff_data):
+        res = self._client.add_store_staff(store_id, staff_data)
+        self._caches['staff'].invalidate_store(store_id)
+        return res
+
+    def update_store_staff(self, store_id, staff_id, updates: dict):
+        res = self._client.update_store_staff(store_id, staff_id, updates)
+        self._caches['staff'].invalidate_store(store_id)
+        return res
+
+    def delete_store_staff(self, store_id, staff_id):
+        res = self._client.delete_store_staff(store_id, staff_id)
+        self._caches['staff'].invalidate_store(store_id)
+        return res
+
+    def create_product(self, store_id, product_data: dict, product_id=None):
+        res = self._client.create_product(store_id, product_data, product_id)
+        self._caches['products'].invalidate_store(store_id)
+        return res
+
+    def import_products(self, store_id, rows, progress=None):
+        res = self._client.import_products(store_id, rows, progress)
+        self._caches['products'].invalidate_store(store_id)
+        return res
+
+    def write_products(self, writes):
+        res = self._client.write_products(writes)
+        for store_id in {args['store_id'] for _, args in writes}:
+            self._caches['products'].invalidate_store(store_id)
+        return res
+
+    def update_product(self, store_id, product_id, updates: dict):
+        res = self._client.update_product(store_id, product_id, updates)
+        self._caches['products'].invalidate_store(store_id)
+        return res
+
+    def delete_product(self, store_id, product_id):
+        res = self._client.delete_product(store_id, product_id)
+        self._caches['products'].invalidate_store(store_id)
+        return res
+
+    def record_sale(self, store_id, sale_data: dict):
+        res = self._client.record_sale(store_id, sale_data)
+        self._caches['sales'].invalidate_store(store_id)
+        return res
+
+    def record_sale_with_stock(self, store_id, sale_data: dict):
+        res = self._client.record_sale_with_stock(store_id, sale_data)
+        self._caches['sales'].invalidate_store(store_id)
+        self._caches['products'].invalidate_store(store_id)
+        return res
+
+    def record_basket(self, store_id, items: list, staff_id=None, notes: str = '', receipt_id=None):
+        res = self._client.record_basket(store_id, items, staff_id, notes, receipt_id)
+        self._caches['sales'].invalidate_store(store_id)
+        self._caches['products'].invalidate_store(store_id)
+        return res
+
+    def delete_sale(self, sale_id, store_id=None):
+        res = self._client.delete_sale(sale_id, store_id)
+        if store_id:
+            self._caches['sales'].invalidate_store(store_id)
+        else:
+            # Sin la tienda se descartan todas las ventas cacheadas
+            self._caches['sales'].clear()
+        return res
@@ -0,0 +1,138 @@
+"""Importación y exportación del catálogo de productos en CSV o JSON Lines.
+
+Los archivos se leen y escriben en streaming (una fila a la vez), así que un
+catálogo de decenas de miles de productos no se carga entero en memoria:
+
+- CSV: una fila de cabecera con las columnas de CATALOG_FIELDS (`id` es
+  opcional; sin él cada fila crea un producto nuevo).
+- JSON Lines: un objeto por línea con las mismas claves.
+
+La escritura en la base la hace `import_products` del cliente o del servicio
+(tandas de 500 con commits en paralelo); aquí solo se convierten los archivos.
+"""
+import csv
+import json
+import os
+
+from .product_operations import IMPORT_BATCH_SIZE
+
+CATALOG_FIELDS = ('id', 'name', 'price', 'stock', 'description')
+CATALOG_FORMATS = ('csv', 'jsonl')
+
+
+def detect_format(path: str) -> str:
+    """Formato según la extensión ('.csv' o '.jsonl'/'.ndjson')."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return 'csv'
+    if ext in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    raise ValueError(f"Formato de catálogo no soportado: {ext or path}")
+
+
+def read_catalog(f, fmt: str, errors: list):
+    """Genera (nº de línea, fila) de un archivo abierto en modo texto.
+
+    Las líneas que no se pueden interpretar se anotan en `errors` como
+    {'line', 'error'} y se saltan.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(f)
+        for row in reader:
+            # Las celdas vacías cuentan como ausentes (stock vacío = sin control)
+            yield reader.line_num, {k: v for k, v in row.items() if k and v not in (None, '')}
+        return
+    for number, line in enumerate(f, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            errors.append({'line': number, 'error': f"JSON inválido: {e}"})
+            continue
+        if not isinstance(row, dict):
+            errors.append({'line': number, 'error': "Se esperaba un objeto JSON"})
+            continue
+        yield number, row
+
+
+def write_catalog(f, products, fmt: str) -> int:
+    """Escribe productos (dicts o modelos) en un archivo abierto en modo texto.
+
+    Returns:
+        Nº de productos escritos
+    """
+    count = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(f, fieldnames=CATALOG_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for product in products:
+            writer.writerow({field: product.get(field) for field in CATALOG_FIELDS})
+            count += 1
+        return count
+    for product in products:
+        f.write(json.dumps(dict(product), ensure_ascii=False, default=str) + '\n')
+        count += 1
+    return count
+
+
+def import_catalog(client, store_id, path: str, fmt: str = None, progress=None) -> dict:
+    """Importa un archivo de catálogo con `client.import_products`.
+
+    Args:
+        client: FirebaseClient o GestorTiendasService
+        progress: Función llamada con (importados, errores) tras cada tanda
+
+    Returns:
+        Respuesta de import_products; `errors` incluye también las líneas
+        ilegibles del archivo, ordenadas por línea
+    """
+    try:
+        fmt = fmt or detect_format(path)
+        parse_errors = []
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            res = client.import_products(store_id, read_catalog(f, fmt, parse_errors), progress)
+    except (OSError, ValueError) as e:
+        return {"success": False, "error": str(e)}
+    if res.get('success') and parse_errors:
+        res['errors'] = sorted(res.get('errors', []) + parse_errors, key=lambda e: e['line'])
+    return res
+
+
+def iter_catalog(client, store_id, page_size: int = IMPORT_BATCH_SIZE):
+    """Genera los productos de la tienda por páginas (orden por nombre).
+
+    Raises:
+        RuntimeError: Si falla la lectura de una página
+    """
+    cursor = None
+    while True:
+        page = client.get_products_page(store_id, page_size=page_size, cursor=cursor)
+        if not page.get('success'):
+            raise RuntimeError(page.get('error', 'Error leyendo productos'))
+        yield from page.get('products', [])
+        cursor = page.get('next_cursor')
+        if not cursor:
+            return
+
+
+def export_catalog(client, store_id, path: str, fmt: str = None) -> dict:
+    """Exporta el catálogo de la tienda a un archivo, página a página.
+
+    Se escribe en un archivo temporal que reemplaza al destino al terminar,
+    así que una exportación que falla a mitad no deja un catálogo truncado.
+
+    Returns:
+        Dict con exported (nº de productos)
+    """
+    tmp_path = path + '.tmp'
+    try:
+        fmt = fmt or detect_format(path)
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            exported = write_catalog(f, iter_catalog(client, store_id), fmt)
+        os.replace(tmp_path, path)
+        return {"success": True, "exported": exported}
+    except (OSError, ValueError, RuntimeError) as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return {"success": False, "error": str(e)}
@@ -4,6 +4,23 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+try:
+    from google.api_core import exceptions as gcp_exceptions
+except ImportError:
+    gcp_exceptions = None
+
+# Errores de Firestore que reintentar no arregla (permisos, datos inválidos, documento inexistente)
+PERMANENT_ERRORS = (
+    (gcp_exceptions.PermissionDenied, gcp_exceptions.NotFound,
+     gcp_exceptions.InvalidArgument, gcp_exceptions.AlreadyExists)
+    if gcp_exceptions is not None else ()
+)
+
+
+def is_permanent_error(e: Exception) -> bool:
+    """True si la excepción de la base no se arregla reintentando."""
+    return isinstance(e, PERMANENT_ERRORS)
+
 
 class DatabaseBase:
     """Clase base para todas las operaciones de BD."""
@@ -43,3 +60,13 @@ class DatabaseBase:
     def _error_response(self, error: str):
         """Crea respuesta de error."""
         return {"success": False, "error": error}
+
+    def _rejected_response(self, error: str):
+        """Error definitivo: la base rechazó la operación y reintentarla no cambia nada."""
+        return {"success": False, "error": error, "rejected": True}
+
+    def _exception_response(self, e: Exception):
+        """Respuesta de error para una excepción: rechazada si es definitiva."""
+        if is_permanent_error(e):
+            return self._rejected_response(str(e))
+        return self._error_response(str(e))
@@ -19,6 +19,16 @@ from .staff_operations import StaffOperations
 from .product_operations import ProductOperations
 from .sales_operations import SalesOperations
 from .metrics_operations import MetricsOperations
+from .local_db import LocalDatabase
+from .pagination import DEFAULT_PAGE_SIZE
+from .local_operations import (
+    LocalAuthOperations, LocalStoreOperations, LocalStaffOperations,
+    LocalProductOperations, LocalSalesOperations, LocalMetricsOperations,
+)
+
+DEFAULT_LOCAL_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'configuracion', 'storeflow.db'
+)
 
 
 class FirebaseClient:
@@ -35,43 +45,55 @@ class FirebaseClient:
         self._metrics = metrics_ops or MetricsOperations()
 
     @classmethod
-    def from_service_account(cls, service_account_path: str = None, api_key: str = None):
+    def from_service_account(cls, service_account_path: str = None, api_key: str = None,
+                             partitioned_sales: bool = False):
         """Inicializa Firebase y crea cliente con todas las operaciones.
         
         Args:
             service_account_path: Ruta al archivo serviceAccountKey.json
             api_key: API key de Firebase para autenticación (opcional)
-        """
-        if firebase_admin is None:
-            logger.error("firebase_admin no está disponible")
-            return cls()
+            partitioned_sales: Guardar las ventas por tienda y mes
+                (stores/{id}/sales_months/{yyyymm}/sales, ver `sales_partitions`)
 
+        Sin archivo de service account se usa el almacenamiento local. Si el
+        archivo existe, cualquier fallo al inicializar Firebase (credenciales
+        inválidas, firebase_admin sin instalar...) se propaga: caer al modo
+        local escondería el error y las ventas quedarían fuera de Firestore.
+
+        Raises:
+            ImportError: Si hay service account pero falta firebase_admin
+        """
         if not service_account_path:
             current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             service_account_path = os.path.join(current_dir, 'configuracion', 'serviceAccountKey.json')
 
+        if not os.path.exists(service_account_path):
+            logger.warning("No se encontró service account en %s; usando almacenamiento local",
+                           service_account_path)
+            return cls.from_local_db()
+
+        if firebase_admin is None:
+            raise ImportError("Hay service account pero firebase_admin no está disponible "
+                              "(pip install firebase-admin)")
+
         try:
-            api_key_from_file = None
-            if os.path.exists(service_account_path):
-                # Intentar obtener API key del archivo de configuración
-                try:
-                    import json
-                    with open(service_account_path, 'r') as f:
-                        service_data = json.load(f)
-                        # La API key no está en serviceAccountKey, se obtiene de Firebase Console
-                        # Por ahora usamos la pasada como parámetro o variable de entorno
-                        pass
-                except Exception:
-                    pass
+            project_id = None
+            # Intentar obtener API key del archivo de configuración
+            try:
+                import json
+                with open(service_account_path, 'r') as f:
+                    service_data = json.load(f)
+                    # La API key no está en serviceAccountKey, se obtiene de Firebase Console
+                    # Por ahora usamos la pasada como parámetro o variable de entorno.
+                    # El proyecto sirve para verificar localmente los ID tokens
+                    project_id = service_data.get('project_id')
+            except Exception:
+                pass
 
             # Intentar obtener API key de variable de entorno
             if not api_key:
                 api_key = os.environ.get('FIREBASE_API_KEY')
 
-            if not os.path.exists(service_account_path):
-                logger.warning("No se encontró service account en %s", service_account_path)
-                return cls()
-
             if not firebase_admin._apps:
                 cred = credentials.Certificate(service_account_path)
                 firebase_admin.initialize_app(cred)
@@ -80,17 +102,48 @@ class FirebaseClient:
             db = firestore.client()
             
             # Crear instancias de operaciones
-            auth_ops = AuthOperations(db=db, auth_module=auth, api_key=api_key)
+            auth_ops = AuthOperations(db=db, auth_module=auth, api_key=api_key, project_id=project_id)
             store_ops = StoreOperations(db=db)
             staff_ops = StaffOperations(db=db)
             product_ops = ProductOperations(db=db)
-            sales_ops = SalesOperations(db=db)
-            metrics_ops = MetricsOperations(db=db)
+            sales_ops = SalesOperations(db=db, partitioned=partitioned_sales)
+            metrics_ops = MetricsOperations(db=db, partitioned_sales=partitioned_sales)
             
             return cls(auth_ops, store_ops, staff_ops, product_ops, sales_ops, metrics_ops)
         except Exception as e:
-            logger.exception("Error inicializando Firebase: %s", e)
-            return cls()
+            logger.exception("Error inicializando Firebase con %s: %s", service_account_path, e)
+            raise
+
+    @classmethod
+    def from_local_db(cls, db_path: str = None):
+        """Crea un cliente respaldado por una base de datos SQLite local.
+
+        Sirve como almacenamiento offline cuando no hay credenciales de Firebase.
+
+        Args:
+            db_path: Ruta del archivo SQLite (por defecto configuracion/storeflow.db).
+                Usar ':memory:' para una base temporal.
+        """
+        local_db = LocalDatabase(db_path or DEFAULT_LOCAL_DB_PATH)
+        logger.info("Usando base de datos local: %s", local_db.path)
+        return cls(
+            LocalAuthOperations(local_db),
+            LocalStoreOperations(local_db),
+            LocalStaffOperations(local_db),
+            LocalProductOperations(local_db),
+            LocalSalesOperations(local_db),
+            LocalMetricsOperations(local_db),
+        )
+
+    @property
+    def firestore_db(self):
+        """Cliente de Firestore, o None con la base local (sin listeners)."""
+        return getattr(self._stores, 'db', None)
+
+    @property
+    def sales_partitioned(self) -> bool:
+        """True si las ventas se guardan en particiones por tienda y mes."""
+        return getattr(self._sales, 'partitioned', False)
 
     # === Delegación a módulos de autenticación ===
     def create_account(self, email, password):
@@ -105,6 +158,18 @@ class FirebaseClient:
     def get_owner_data(self, user_id):
         return self._auth.get_owner_data(user_id)
 
+    def verify_id_token(self, id_token):
+        return self._auth.verify_id_token(id_token)
+
+    def get_id_token(self, user_id):
+        return self._auth.get_id_token(user_id)
+
+    def refresh_id_token(self, user_id):
+        return self._auth.refresh_id_token(user_id)
+
+    def auth_http_stats(self):
+        return self._auth.http_stats()
+
     # === Delegación a módulos de tiendas ===
     def create_store(self, store_info, owner_id):
         return self._stores.create_store(store_info, owner_id)
@@ -129,12 +194,25 @@ class FirebaseClient:
         return self._staff.delete_store_staff(store_id, staff_id)
 
     # === Delegación a módulos de productos ===
-    def create_product(self, store_id, product_data: dict):
-        return self._products.create_product(store_id, product_data)
+    def create_product(self, store_id, product_data: dict, product_id=None):
+        return self._products.create_product(store_id, product_data, product_id)
+
+    def import_products(self, store_id, rows, progress=None):
+        return self._products.import_products(store_id, rows, progress)
+
+    def write_products(self, writes):
+        return self._products.write_products(writes)
 
     def get_store_products(self, store_id):
         return self._products.get_store_products(store_id)
 
+    def get_products_by_ids(self, store_id, product_ids):
+        return self._products.get_products_by_ids(store_id, product_ids)
+
+    def get_products_page(self, store_id, page_size=DEFAULT_PAGE_SIZE, cursor=None,
+                          name_prefix=None, descending=False):
+        return self._products.get_products_page(store_id, page_size, cursor, name_prefix, descending)
+
     def update_product(self, store_id, product_id, updates: dict):
         return self._products.update_product(store_id, product_id, updates)
 
@@ -145,14 +223,28 @@ class FirebaseClient:
     def record_sale(self, store_id, sale_data: dict):
         return self._sales.record_sale(store_id, sale_data)
 
+    def record_sale_with_stock(self, store_id, sale_data: dict):
+        return self._sales.record_sale_with_stock(store_id, sale_data)
+
+    def record_basket(self, store_id, items: list, staff_id=None, notes: str = '', receipt_id=None):
+        return self._sales.record_basket(store_id, items, staff_id, notes, receipt_id)
+
     def get_store_sales(self, store_id, limit=100):
         return self._sales.get_store_sales(store_id, limit)
 
+    def get_sales_page(self, store_id, page_size=DEFAULT_PAGE_SIZE, cursor=None,
+                       product_id=None, descending=True):
+        return self._sales.get_sales_page(store_id, page_size, cursor, product_id, descending)
+
+    def iter_sales_pages(self, store_id, page_size=DEFAULT_PAGE_SIZE, cursor=None,
+                         product_id=None, descending=True):
+        return self._sales.iter_sales_pages(store_id, page_size, cursor, product_id, descending)
+
     def get_sales_by_period(self, store_id, start_date, end_date):
         return self._sales.get_sales_by_period(store_id, start_date, end_date)
 
-    def delete_sale(self, sale_id):
-        return self._sales.delete_sale(sale_id)
+    def delete_sale(self, sale_id, store_id=None):
+        return self._sales.delete_sale(sale_id, store_id)
 
     # === Delegación a módulos de métricas ===
     def record_metric(self, store_id, metric_data: dict):
@@ -161,6 +253,12 @@ class FirebaseClient:
     def get_store_metrics(self, store_id, metric_type=None, limit=50):
         return self._metrics.get_store_metrics(store_id, metric_type, limit)
 
+    def get_metrics_page(self, store_id, metric_type=None, page_size=DEFAULT_PAGE_SIZE, cursor=None):
+        return self._metrics.get_metrics_page(store_id, metric_type, page_size, cursor)
+
+    def iter_metrics_pages(self, store_id, metric_type=None, page_size=DEFAULT_PAGE_SIZE, cursor=None):
+        return self._metrics.iter_metrics_pages(store_id, metric_type, page_size, cursor)
+
     def calculate_revenue(self, sales_list):
         return self._metrics.calculate_revenue(sales_list)
 
@@ -170,5 +268,20 @@ class FirebaseClient:
     def get_top_products(self, sales_list, limit=5):
         return self._metrics.get_top_products(sales_list, limit)
 
+    def summarize_sales(self, sales_list, limit=5):
+        return self._metrics.summarize_sales(sales_list, limit)
+
+    def get_sales_summary(self, store_id, top_limit=5):
+        return self._metrics.get_sales_summary(store_id, top_limit)
+
+    def aggregate_sales(self, store_id, start=None, end=None):
+        return self._metrics.aggregate_sales(store_id, start, end)
+
+    def get_daily_sales(self, store_id, start_day, end_day):
+        return self._metrics.get_daily_sales(store_id, start_day, end_day)
+
+    def rebuild_sales_rollups(self, store_id):
+        return self._metrics.rebuild_sales_rollups(store_id)
+
     def delete_metric(self, metric_id):
         return self._metrics.delete_metric(metric_id)
@@ -0,0 +1,115 @@
+"""Verificación local de ID tokens de Firebase Auth.
+
+Un ID token es un JWT RS256 firmado por Google. Las claves públicas (en
+certificados x509, por `kid`) se descargan de FIREBASE_CERTS_URL y se guardan
+el tiempo que indica su `Cache-Control: max-age`; mientras tanto verificar un
+token solo comprueba la firma y los datos, sin red. Google rota las claves:
+si llega un token con un `kid` desconocido se vuelven a descargar (como
+mucho una vez por KEYS_REFETCH_SECONDS).
+"""
+import logging
+import re
+import threading
+import time
+
+from .auth_http import default_auth_session
+
+try:
+    from google.auth import exceptions as google_auth_exceptions
+    from google.auth import jwt as google_jwt
+except ImportError:  # google-auth llega con firebase-admin
+    google_jwt = google_auth_exceptions = None
+
+logger = logging.getLogger(__name__)
+
+FIREBASE_CERTS_URL = ("https://www.googleapis.com/robot/v1/metadata/x509/"
+                      "securetoken@system.gserviceaccount.com")
+FIREBASE_ISSUER = "https://securetoken.google.com/{project_id}"
+
+# Vigencia de las claves si la respuesta no trae max-age
+DEFAULT_KEYS_MAX_AGE = 3600.0
+
+# Descargas mínimas entre claves desconocidas (evita una por token falso)
+KEYS_REFETCH_SECONDS = 60.0
+
+# Tolerancia de reloj al comprobar iat/exp
+CLOCK_SKEW_SECONDS = 60
+
+_MAX_AGE = re.compile(r'max-age=(\d+)')
+
+
+class PublicKeyCache:
+    """Certificados públicos {kid: PEM} descargados y renovados según su max-age."""
+
+    def __init__(self, url: str = FIREBASE_CERTS_URL, http=None,
+                 refetch_seconds: float = KEYS_REFETCH_SECONDS, clock=time.time):
+        """Crea la caché vacía (se llena con la primera verificación).
+
+        Args:
+            http: Cliente HTTP con `get` (por defecto la sesión con pool compartida)
+            refetch_seconds: Espera mínima entre descargas por un `kid` desconocido
+        """
+        self.url = url
+        self.refetch_seconds = refetch_seconds
+        self._http = http or default_auth_session()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._certs = {}
+        self._expires_at = 0.0
+        self._fetched_at = None
+        self.fetches = 0
+
+    def _fetch(self):
+        response = self._http.get(self.url, timeout=10)
+        response.raise_for_status()
+        match = _MAX_AGE.search(response.headers.get('Cache-Control', ''))
+        max_age = float(match.group(1)) if match else DEFAULT_KEYS_MAX_AGE
+        self._certs = response.json()
+        self._fetched_at = self._clock()
+        self._expires_at = self._fetched_at + max_age
+        self.fetches += 1
+
+    def certs(self, kid: str = None) -> dict:
+        """Certificados vigentes; se descargan si vencieron o si falta `kid`."""
+        with self._lock:
+            now = self._clock()
+            stale = now >= self._expires_at
+            unknown = kid is not None and kid not in self._certs and (
+                self._fetched_at is None or now - self._fetched_at >= self.refetch_seconds)
+            if stale or unknown:
+                self._fetch()
+            return self._certs
+
+
+class IdTokenVerifier:
+    """Verifica ID tokens de un proyecto de Firebase con las claves en caché."""
+
+    def __init__(self, project_id: str, keys: PublicKeyCache = None):
+        self.project_id = project_id
+        self.keys = keys or PublicKeyCache()
+
+    def verify(self, id_token: str) -> dict:
+        """Comprueba firma, audiencia, emisor y vigencia del token.
+
+        Returns:
+            Claims del token (`sub` es el user_id)
+
+        Raises:
+            ValueError: Si el token no es válido
+        """
+        if google_jwt is None:
+            raise ValueError("google-auth no disponible")
+        try:
+            header = google_jwt.decode_header(id_token)
+            if header.get('alg') != 'RS256':
+                raise ValueError("Algoritmo de firma inesperado")
+            certs = self.keys.certs(header.get('kid'))
+            claims = google_jwt.decode(id_token, certs=certs, audience=self.project_id,
+                                       clock_skew_in_seconds=CLOCK_SKEW_SECONDS)
+        except (google_auth_exceptions.GoogleAuthError, ValueError) as e:
+            raise ValueError(f"ID token inválido: {e}")
+        if claims.get('iss') != FIREBASE_ISSUER.format(project_id=self.project_id):
+            raise ValueError("ID token inválido: emisor incorrecto")
+        if not claims.get('sub'):
+            raise ValueError("ID token inválido: sin usuario")
+        return claims
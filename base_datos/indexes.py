@@ -0,0 +1,148 @@
+"""Índices compuestos de Firestore que necesitan las consultas de la app.
+
+El manifiesto `configuracion/firestore.indexes.json` declara los índices en
+el formato de la CLI de Firebase (`firebase deploy --only firestore:indexes`).
+Cada consulta paginada se identifica por su forma (`IndexShape`: colección,
+campos filtrados por igualdad, campo y sentido de orden):
+
+- Al arrancar, `verify_indexes` prueba cada índice del manifiesto con una
+  consulta de un documento y anota los que faltan.
+- Si una consulta falla por falta de índice su forma también se anota, y
+  durante INDEX_RECHECK_SECONDS las consultas con esa forma van directas al
+  orden en memoria sin repetir el RPC que falla.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    from google.api_core import exceptions as gcp_exceptions
+except ImportError:
+    gcp_exceptions = None
+
+MANIFEST_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'configuracion', 'firestore.indexes.json')
+
+# Tiempo que se recuerda un índice faltante antes de volver a probar la consulta
+# (los índices tardan unos minutos en construirse tras desplegarlos)
+INDEX_RECHECK_SECONDS = 600.0
+
+# Valor de los filtros en las consultas de prueba (no coincide con ningún documento)
+_PROBE_VALUE = '__index_probe__'
+
+
+def is_index_error(error: Exception) -> bool:
+    """Indica si la consulta falló por falta de un índice compuesto.
+
+    Firestore responde FAILED_PRECONDITION ("The query requires an index");
+    otros errores (p. ej. INVALID_ARGUMENT) son fallos de la consulta.
+    """
+    if gcp_exceptions:
+        return isinstance(error, gcp_exceptions.FailedPrecondition)
+    return 'requires an index' in str(error).lower()
+
+
+class IndexShape(namedtuple('IndexShape', 'collection filters order_field descending')):
+    """Forma de una consulta: colección, filtros de igualdad (ordenados) y orden."""
+
+    @classmethod
+    def of(cls, collection: str, filters, order_field: str, descending: bool = True):
+        return cls(collection, tuple(sorted(filters)), order_field, bool(descending))
+
+    def __str__(self):
+        direction = 'DESC' if self.descending else 'ASC'
+        return f"{self.collection}({', '.join(self.filters)}, {self.order_field} {direction})"
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> list:
+    """Formas de consulta cubiertas por los índices del manifiesto."""
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    shapes = []
+    for index in manifest.get('indexes', []):
+        fields = index['fields']
+        *filters, order = fields
+        shapes.append(IndexShape.of(index['collectionGroup'], [f['fieldPath'] for f in filters],
+                                    order['fieldPath'], order.get('order') == 'DESCENDING'))
+    return shapes
+
+
+class MissingIndexes:
+    """Formas de consulta cuyo índice falta, recordadas durante `recheck_seconds`."""
+
+    def __init__(self, recheck_seconds: float = INDEX_RECHECK_SECONDS, clock=time.monotonic):
+        self.recheck_seconds = recheck_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._missing = {}
+
+    def is_missing(self, shape) -> bool:
+        with self._lock:
+            since = self._missing.get(shape)
+            if since is None:
+                return False
+            if self._clock() - since >= self.recheck_seconds:
+                del self._missing[shape]
+                return False
+            return True
+
+    def mark_missing(self, shape):
+        with self._lock:
+            self._missing[shape] = self._clock()
+
+    def mark_present(self, shape):
+        with self._lock:
+            self._missing.pop(shape, None)
+
+    def shapes(self) -> list:
+        with self._lock:
+            return list(self._missing)
+
+
+# Registro compartido por todas las consultas del proceso
+MISSING_INDEXES = MissingIndexes()
+
+
+def verify_indexes(db, shapes=None, registry: MissingIndexes = MISSING_INDEXES) -> list:
+    """Comprueba que existan los índices del manifiesto.
+
+    Ejecuta cada forma como consulta de un documento con filtros que no
+    coinciden con nada: si falta el índice Firestore la rechaza al
+    planificarla. Los errores que no son de índice (red, permisos) se
+    registran y esa forma queda sin comprobar.
+
+    Returns:
+        Formas cuyo índice falta
+    """
+    if shapes is None:
+        try:
+            shapes = load_manifest()
+        except (OSError, ValueError) as e:
+            logger.warning("No se pudo leer el manifiesto de índices: %s", e)
+            return []
+    missing = []
+    for shape in shapes:
+        query = db.collection(shape.collection)
+        for field in shape.filters:
+            query = query.where(field, '==', _PROBE_VALUE)
+        direction = 'DESCENDING' if shape.descending else 'ASCENDING'
+        try:
+            list(query.order_by(shape.order_field, direction=direction).limit(1).stream())
+        except Exception as e:
+            if not is_index_error(e):
+                logger.warning("No se pudo comprobar el índice %s: %s", shape, e)
+                continue
+            registry.mark_missing(shape)
+            missing.append(shape)
+        else:
+            registry.mark_present(shape)
+    if missing:
+        logger.warning("Faltan índices compuestos de Firestore: %s. Despliega %s con "
+                       "'firebase deploy --only firestore:indexes'; mientras tanto esas consultas "
+                       "se ordenan en memoria", ', '.join(map(str, missing)), os.path.basename(MANIFEST_PATH))
+    return missing
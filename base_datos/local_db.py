@@ -0,0 +1,194 @@
+"""Base de datos local embebida (SQLite) para el modo offline."""
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+from collections.abc import Mapping
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Cada colección guarda el documento completo en `data` (JSON) y duplica en
+# columnas propias solo los campos por los que se filtra u ordena, para que
+# puedan indexarse.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT,
+    password_hash TEXT,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users(email);
+
+CREATE TABLE IF NOT EXISTS stores (
+    id TEXT PRIMARY KEY,
+    owner_id TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_stores_owner ON stores(owner_id);
+
+CREATE TABLE IF NOT EXISTS staff (
+    id TEXT PRIMARY KEY,
+    store_id TEXT NOT NULL,
+    user_id TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_staff_store ON staff(store_id);
+
+CREATE TABLE IF NOT EXISTS products (
+    id TEXT PRIMARY KEY,
+    store_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_products_store ON products(store_id);
+CREATE INDEX IF NOT EXISTS idx_products_store_name ON products(store_id, json_extract(data, '$.name'));
+
+CREATE TABLE IF NOT EXISTS sales (
+    id TEXT PRIMARY KEY,
+    store_id TEXT NOT NULL,
+    product_id TEXT,
+    timestamp TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sales_store_ts ON sales(store_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_sales_product ON sales(product_id);
+
+CREATE TABLE IF NOT EXISTS metrics (
+    id TEXT PRIMARY KEY,
+    store_id TEXT NOT NULL,
+    metric_type TEXT,
+    timestamp TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_metrics_store_ts ON metrics(store_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_metrics_store_type_ts ON metrics(store_id, metric_type, timestamp DESC);
+
+-- Agregados de ventas: kind = 'totals' | 'day' | 'product'
+CREATE TABLE IF NOT EXISTS rollups (
+    store_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    product_name TEXT,
+    revenue REAL NOT NULL DEFAULT 0,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    count INTEGER NOT NULL DEFAULT 0,
+    complete INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (store_id, kind, key)
+);
+CREATE INDEX IF NOT EXISTS idx_rollups_top ON rollups(store_id, kind, quantity DESC);
+"""
+
+
+def _encode_value(value):
+    """Serializa tipos no soportados por JSON (fechas y modelos)."""
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def _decode_object(obj):
+    """Restaura las fechas serializadas por `_encode_value`."""
+    if len(obj) == 1 and '$dt' in obj:
+        return datetime.fromisoformat(obj['$dt'])
+    return obj
+
+
+def to_sort_key(value):
+    """Convierte una fecha a texto ISO ordenable para las columnas indexadas."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class LocalDatabase:
+    """Conexión SQLite compartida por todas las operaciones locales.
+
+    La conexión se comparte entre el hilo de la UI y el del menú de consola,
+    por eso todas las sentencias pasan por un lock. El modo WAL permite que
+    otros procesos lean el archivo mientras se escribe.
+    """
+
+    def __init__(self, path: str = ':memory:'):
+        """Abre (o crea) la base de datos.
+
+        Args:
+            path: Ruta del archivo SQLite, o ':memory:' para una base temporal
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, cached_statements=256)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    @staticmethod
+    def new_id():
+        """Genera un ID de documento de 20 caracteres, como Firestore."""
+        return uuid.uuid4().hex[:20]
+
+    @staticmethod
+    def dumps(data: dict) -> str:
+        return json.dumps(data, default=_encode_value, ensure_ascii=False)
+
+    @staticmethod
+    def loads(raw: str) -> dict:
+        return json.loads(raw, object_hook=_decode_object)
+
+    def execute(self, sql: str, params=()):
+        """Ejecuta una escritura y confirma la transacción."""
+        with self._lock:
+            with self._conn:
+                return self._conn.execute(sql, params)
+
+    def query(self, sql: str, params=()):
+        """Ejecuta una lectura y devuelve todas las filas."""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql: str, params=()):
+        """Ejecuta una lectura y devuelve la primera fila (o None)."""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def transaction(self):
+        """Context manager para agrupar varias sentencias en una transacción.
+
+        Uso::
+
+            with local_db.transaction() as conn:
+                conn.execute(...)
+        """
+        return _Transaction(self)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class _Transaction:
+    """Toma el lock de la conexión y hace commit/rollback al salir."""
+
+    def __init__(self, local_db: LocalDatabase):
+        self._db = local_db
+
+    def __enter__(self):
+        self._db._lock.acquire()
+        self._db._conn.execute("BEGIN IMMEDIATE")
+        return self._db._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._db._conn.commit()
+            else:
+                self._db._conn.rollback()
+        finally:
+            self._db._lock.release()
+        return False
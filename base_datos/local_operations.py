@@ -0,0 +1,849 @@
+"""Operaciones sobre la base de datos local (SQLite).
+
+Cada clase hereda de su equivalente de Firestore para reutilizar las mismas
+validaciones y respuestas, y sustituye solo el acceso a datos.
+"""
+import hashlib
+import hmac
+import logging
+import os
+
+from .auth_operations import AuthOperations
+from .store_operations import StoreOperations
+from .staff_operations import StaffOperations
+from .product_operations import ProductOperations
+from .sales_operations import SalesOperations
+from .metrics_operations import MetricsOperations
+from .local_db import to_sort_key
+from .models import Product, Sale, StaffMember, Store
+from .rollups import build_summary, compute_deltas
+from .pagination import DEFAULT_PAGE_SIZE, PREFIX_END, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_HASH_ITERATIONS = 120_000
+
+
+def _hash_password(password: str, salt: bytes = None) -> str:
+    """Deriva un hash PBKDF2 con sal aleatoria ('salt$hash' en hex)."""
+    salt = salt or os.urandom(16)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, PASSWORD_HASH_ITERATIONS)
+    return f"{salt.hex()}${digest.hex()}"
+
+
+def _check_password(password: str, stored: str) -> bool:
+    try:
+        salt_hex, _ = stored.split('$', 1)
+    except (AttributeError, ValueError):
+        return False
+    return hmac.compare_digest(_hash_password(password, bytes.fromhex(salt_hex)), stored)
+
+
+ROLLUP_UPSERT_SQL = """
+INSERT INTO rollups (store_id, kind, key, product_name, revenue, quantity, count)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (store_id, kind, key) DO UPDATE SET
+    revenue = revenue + excluded.revenue,
+    quantity = quantity + excluded.quantity,
+    count = count + excluded.count,
+    product_name = COALESCE(NULLIF(excluded.product_name, ''), product_name)
+"""
+
+
+# Misma expresión que el índice idx_products_store_name
+PRODUCT_NAME_SQL = "json_extract(data, '$.name')"
+
+
+def _apply_rollups(conn, store_id, sales, sign: int = 1):
+    """Suma (o resta, con sign=-1) las ventas a los agregados de la tienda."""
+    deltas = compute_deltas(sales, sign)
+    store_id = str(store_id)
+    totals = deltas['totals']
+    rows = [(store_id, 'totals', '', None, totals['revenue'], 0, totals['count'])]
+    rows += [(store_id, 'day', day, None, v['revenue'], 0, v['count']) for day, v in deltas['days'].items()]
+    rows += [(store_id, 'product', pid, v['product_name'], v['revenue'], v['quantity'], v['count'])
+             for pid, v in deltas['products'].items()]
+    conn.executemany(ROLLUP_UPSERT_SQL, rows)
+
+
+class LocalOperationsMixin:
+    """Acceso común a la base local para todas las operaciones."""
+
+    def __init__(self, local_db):
+        """Inicializa con la base de datos local.
+
+        Args:
+            local_db: Instancia de LocalDatabase compartida
+        """
+        super().__init__()
+        self.local = local_db
+
+    def _row_to_doc(self, row, model=None):
+        """Convierte una fila en el documento que devolvería Firestore ({'id', **data}).
+
+        Args:
+            model: Clase de `models` a construir; sin ella, un dict
+        """
+        if model is not None:
+            return model.from_doc(row['id'], self.local.loads(row['data']))
+        return {'id': row['id'], **self.local.loads(row['data'])}
+
+    def _get_doc(self, table: str, doc_id):
+        row = self.local.query_one(f"SELECT id, data FROM {table} WHERE id = ?", (str(doc_id),))
+        return self.local.loads(row['data']) if row else None
+
+    def _merge_doc(self, conn, table: str, doc_id, updates: dict, store_id=None):
+        """Aplica `updates` sobre el documento (como `update` de Firestore).
+
+        Args:
+            store_id: Si se indica, el documento debe pertenecer a esa tienda
+                (en Firestore vive en la subcolección de la tienda)
+
+        Returns:
+            El documento actualizado, o None si no existe.
+        """
+        where, params = "id = ?", (str(doc_id),)
+        if store_id is not None:
+            where, params = "id = ? AND store_id = ?", (str(doc_id), str(store_id))
+        row = conn.execute(f"SELECT data FROM {table} WHERE {where}", params).fetchone()
+        if not row:
+            return None
+        data = self.local.loads(row['data'])
+        data.update(updates)
+        conn.execute(f"UPDATE {table} SET data = ? WHERE {where}", (self.local.dumps(data), *params))
+        return data
+
+    def _page(self, table: str, where: str, params: tuple, page_size: int, cursor: str = None,
+              order_column: str = 'timestamp', order_field: str = 'timestamp', descending: bool = True,
+              model=None):
+        """Página ordenada por (order_column, id) a partir del cursor.
+
+        Args:
+            order_column: Columna o expresión SQL por la que se ordena
+            order_field: Campo del documento con el mismo valor (para el cursor)
+
+        Returns:
+            Tupla (documentos, siguiente cursor o None)
+
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        op, direction = ('<', 'DESC') if descending else ('>', 'ASC')
+        if cursor:
+            value, after_id = decode_cursor(cursor)
+            where += f" AND ({order_column} {op} ? OR ({order_column} = ? AND id {op} ?))"
+            params += (to_sort_key(value), to_sort_key(value), after_id)
+        rows = self.local.query(
+            f"SELECT id, data FROM {table} WHERE {where} "
+            f"ORDER BY {order_column} {direction}, id {direction} LIMIT ?",
+            params + (int(page_size) + 1,)
+        )
+        items = [self._row_to_doc(row, model) for row in rows[:page_size]]
+        next_cursor = None
+        if len(rows) > page_size:
+            next_cursor = encode_cursor(items[-1].get(order_field), items[-1]['id'])
+        return items, next_cursor
+
+
+class LocalAuthOperations(LocalOperationsMixin, AuthOperations):
+    """Cuentas de usuario locales con contraseña hasheada."""
+
+    def create_account(self, email, password):
+        """Crea una cuenta de usuario."""
+        try:
+            if self.local.query_one("SELECT id FROM users WHERE email = ?", (email,)):
+                return self._error_response("El email ya está registrado")
+
+            user_id = self.local.new_id()
+            user_data = {
+                'email': email,
+                'created_at': self._get_timestamp(),
+                'rol': 'owner',
+                'is_active': True
+            }
+            self.local.execute(
+                "INSERT INTO users (id, email, password_hash, data) VALUES (?, ?, ?, ?)",
+                (user_id, email, _hash_password(password), self.local.dumps(user_data))
+            )
+            return self._success_response(user_id=user_id)
+        except Exception as e:
+            logger.exception("Error en create_account: %s", e)
+            return self._error_response(str(e))
+
+    def verify_credentials(self, email, password):
+        """Verifica credenciales contra el hash guardado."""
+        try:
+            row = self.local.query_one(
+                "SELECT id, password_hash, data FROM users WHERE email = ?", (email,)
+            )
+            if not row or not _check_password(password, row['password_hash']):
+                return self._error_response("Email o contraseña incorrectos")
+            if not self.local.loads(row['data']).get('is_active', True):
+                return self._error_response("Usuario inactivo")
+            return self._success_response(user_id=row['id'])
+        except Exception as e:
+            logger.exception("Error en verify_credentials: %s", e)
+            return self._error_response("Error al verificar credenciales")
+
+    def save_owner_data(self, user_id, owner_data):
+        """Guarda datos del propietario."""
+        try:
+            if not isinstance(user_id, str) or not user_id:
+                return self._error_response("ID de usuario inválido")
+            if not isinstance(owner_data, dict):
+                return self._error_response("Datos del propietario inválidos")
+
+            with self.local.transaction() as conn:
+                if self._merge_doc(conn, 'users', user_id, owner_data) is None:
+                    return self._error_response("Usuario no encontrado")
+            return self._success_response()
+        except Exception as e:
+            logger.exception("Error en save_owner_data: %s", e)
+            return self._error_response(str(e))
+
+    def get_owner_data(self, user_id):
+        """Obtiene datos del propietario."""
+        try:
+            if not isinstance(user_id, str) or not user_id:
+                return self._error_response("ID de usuario inválido")
+
+            datos = self._get_doc('users', user_id)
+            if datos is None:
+                return self._error_response("Usuario no encontrado")
+            return self._success_response(datos=datos)
+        except Exception as e:
+            logger.exception("Error en get_owner_data: %s", e)
+            return self._error_response(str(e))
+
+
+class LocalStoreOperations(LocalOperationsMixin, StoreOperations):
+    """Tiendas locales."""
+
+    def create_store(self, store_info, owner_id):
+        """Crea una tienda y la asocia a su propietario."""
+        try:
+            cleaned, error = self._validate_store_info(store_info, owner_id)
+            if error:
+                return self._error_response(error)
+
+            owner_id_str = str(owner_id.get('user_id') if isinstance(owner_id, dict) else owner_id)
+            if not owner_id_str:
+                return self._error_response("ID de propietario inválido")
+
+            store_id = self.local.new_id()
+            store_data = {
+                **cleaned,
+                'owner_id': owner_id_str,
+                'created_at': self._get_timestamp(),
+                'is_active': True,
+                'employees': []
+            }
+
+            with self.local.transaction() as conn:
+                conn.execute(
+                    "INSERT INTO stores (id, owner_id, data) VALUES (?, ?, ?)",
+                    (store_id, owner_id_str, self.local.dumps(store_data))
+                )
+                row = conn.execute("SELECT data FROM users WHERE id = ?", (owner_id_str,)).fetchone()
+                if row:
+                    owned = self.local.loads(row['data']).get('owned_stores', []) or []
+                    if store_id not in owned:
+                        self._merge_doc(conn, 'users', owner_id_str, {'owned_stores': owned + [store_id]})
+                else:
+                    user_data = {'owned_stores': [store_id], 'created_at': self._get_timestamp()}
+                    conn.execute(
+                        "INSERT INTO users (id, data) VALUES (?, ?)",
+                        (owner_id_str, self.local.dumps(user_data))
+                    )
+
+            return self._success_response(store_id=store_id)
+        except Exception as e:
+            logger.exception("Error en create_store: %s", e)
+            return self._error_response(str(e))
+
+    def get_user_stores(self, user_id):
+        """Obtiene tiendas del usuario en el orden de `owned_stores`."""
+        try:
+            if not user_id:
+                return self._error_response("ID de usuario requerido")
+
+            if isinstance(user_id, dict):
+                user_id = user_id.get("user_id", "")
+            else:
+                user_id = str(user_id)
+
+            if not user_id:
+                return self._error_response("ID de usuario inválido")
+
+            user_data = self._get_doc('users', user_id)
+            if user_data is None:
+                return self._error_response("Usuario no encontrado")
+
+            owned = [str(s) for s in user_data.get('owned_stores', []) or []]
+            if not owned:
+                return self._success_response(stores=[])
+
+            placeholders = ','.join('?' * len(owned))
+            rows = self.local.query(f"SELECT id, data FROM stores WHERE id IN ({placeholders})", owned)
+            by_id = {row['id']: self._row_to_doc(row, Store) for row in rows}
+            stores = [by_id[store_id] for store_id in owned if store_id in by_id]
+            return self._success_response(stores=stores)
+        except Exception as e:
+            logger.exception("Error en get_user_stores: %s", e)
+            return self._error_response(str(e))
+
+    def verify_owner(self, user_id, store_id):
+        """Verifica si el usuario es propietario de la tienda."""
+        try:
+            if not user_id or not store_id:
+                return self._error_response("ID de usuario y tienda requeridos")
+
+            row = self.local.query_one("SELECT owner_id FROM stores WHERE id = ?", (str(store_id),))
+            if not row:
+                return self._error_response("Tienda no encontrada")
+            return self._success_response(is_owner=str(user_id) == str(row['owner_id']))
+        except Exception as e:
+            logger.exception("Error en verify_owner: %s", e)
+            return self._error_response(str(e))
+
+
+class LocalStaffOperations(LocalOperationsMixin, StaffOperations):
+    """Empleados locales."""
+
+    def add_store_staff(self, store_id, staff_data):
+        """Agrega empleado a tienda."""
+        try:
+            if not isinstance(staff_data, dict):
+                return self._error_response("Datos de empleado inválidos")
+
+            if 'name' not in staff_data or 'role' not in staff_data:
+                return self._error_response("Nombre y rol son requeridos")
+
+            staff_id = self.local.new_id()
+            self.local.execute(
+                "INSERT INTO staff (id, store_id, user_id, data) VALUES (?, ?, ?, ?)",
+                (staff_id, str(store_id), staff_data.get('user_id'), self.local.dumps(staff_data))
+            )
+            return self._success_response(staff_id=staff_id)
+        except Exception as e:
+            logger.exception("Error en add_store_staff: %s", e)
+            return self._error_response(str(e))
+
+    def get_store_staff(self, store_id):
+        """Obtiene empleados de tienda."""
+        try:
+            rows = self.local.query("SELECT id, data FROM staff WHERE store_id = ?", (str(store_id),))
+            return self._success_response(staff=[self._row_to_doc(row, StaffMember) for row in rows])
+        except Exception as e:
+            logger.exception("Error en get_store_staff: %s", e)
+            return self._error_response(str(e))
+
+    def update_store_staff(self, store_id, staff_id, updates: dict):
+        """Actualiza empleado."""
+        try:
+            with self.local.transaction() as conn:
+                data = self._merge_doc(conn, 'staff', staff_id, updates, store_id=store_id)
+                if data is None:
+                    return self._error_response("Empleado no encontrado")
+                conn.execute("UPDATE staff SET user_id = ? WHERE id = ?", (data.get('user_id'), str(staff_id)))
+            return self._success_response()
+        except Exception as e:
+            logger.exception("Error en update_store_staff: %s", e)
+            return self._error_response(str(e))
+
+    def delete_store_staff(self, store_id, staff_id):
+        """Elimina empleado."""
+        try:
+            self.local.execute(
+                "DELETE FROM staff WHERE id = ? AND store_id = ?", (str(staff_id), str(store_id))
+            )
+            return self._success_response()
+        except Exception as e:
+            logger.exception("Error en delete_store_staff: %s", e)
+            return self._error_response(str(e))
+
+
+class LocalProductOperations(LocalOperationsMixin, ProductOperations):
+    """Productos locales."""
+
+    def create_product(self, store_id, product_data: dict, product_id=None):
+        """Crea producto (con `product_id` dado, repetirlo no lo duplica)."""
+        try:
+            error = self._validate_new_product(store_id, product_data)
+            if error:
+                return self._rejected_response(error)
+
+            product_id = str(product_id) if product_id else self.local.new_id()
+            self.local.execute(
+                "INSERT OR IGNORE INTO products (id, store_id, data) VALUES (?, ?, ?)",
+                (product_id, str(store_id), self.local.dumps(product_data))
+            )
+            return self._success_response(product_id=product_id)
+        except Exception as e:
+            logger.exception("Error en create_product: %s", e)
+            return self._error_response(str(e))
+
+    def import_products(self, store_id, rows, progress=None):
+        """Crea (o reemplaza, si traen `id`) muchos productos, una transacción por tanda."""
+        try:
+            if not store_id:
+                return self._error_response("ID de tienda requerido")
+
+            errors = []
+            imported = 0
+            for chunk in self._import_chunks(store_id, rows, errors):
+                with self.local.transaction() as conn:
+                    conn.executemany(
+                        "INSERT INTO products (id, store_id, data) VALUES (?, ?, ?) "
+                        "ON CONFLICT(id) DO UPDATE SET data = excluded.data "
+                        "WHERE products.store_id = excluded.store_id",
+                        [(product_id or self.local.new_id(), str(store_id), self.local.dumps(data))
+                         for _, product_id, data in chunk]
+                    )
+                imported += len(chunk)
+                if progress is not None:
+                    progress(imported, len(errors))
+            return self._success_response(imported=imported, errors=errors)
+        except Exception as e:
+            logger.exception("Error en import_products: %s", e)
+            return self._error_response(str(e))
+
+    def write_products(self, writes):
+        """Aplica varias altas, cambios y bajas de productos en una transacción."""
+        try:
+            with self.local.transaction() as conn:
+                for op, args in writes:
+                    store_id, product_id = str(args['store_id']), args.get('product_id')
+                    if op == 'create_product':
+                        conn.execute(
+                            "INSERT OR IGNORE INTO products (id, store_id, data) VALUES (?, ?, ?)",
+                            (str(product_id or self.local.new_id()), store_id,
+                             self.local.dumps(args['product_data']))
+                        )
+                    elif op == 'update_product':
+                        if self._merge_doc(conn, 'products', product_id, args['updates'],
+                                           store_id=store_id) is None:
+                            # Deshace el lote entero (como un WriteBatch de Firestore)
+                            raise LookupError("Producto no encontrado")
+                    elif op == 'delete_product':
+                        conn.execute("DELETE FROM products WHERE id = ? AND store_id = ?",
+                                     (str(product_id), store_id))
+                    else:
+                        raise ValueError(f"Operación no admitida en lote: {op}")
+            return self._success_response(written=len(writes))
+        except LookupError as e:
+            return self._rejected_response(str(e))
+        except Exception as e:
+            logger.exception("Error en write_products: %s", e)
+            return self._error_response(str(e))
+
+    def get_store_products(self, store_id):
+        """Obtiene productos de tienda."""
+        try:
+            if not store_id:
+                return self._error_response("ID de tienda requerido")
+
+            rows = self.local.query("SELECT id, data FROM products WHERE store_id = ?", (str(store_id),))
+            return self._success_response(products=[self._row_to_doc(row, Product) for row in rows])
+        except Exception as e:
+            logger.exception("Error en get_store_products: %s", e)
+            return self._error_response(str(e))
+
+    def get_products_by_ids(self, store_id, product_ids):
+        """Obtiene solo los productos indicados, en el orden de `product_ids`."""
+        try:
+            if not store_id:
+                return self._error_response("ID de tienda requerido")
+
+            product_ids = [str(pid) for pid in product_ids]
+            found = {}
+            if product_ids:
+                placeholders = ','.join('?' * len(product_ids))
+                rows = self.local.query(
+                    f"SELECT id, data FROM products WHERE store_id = ? AND id IN ({placeholders})",
+                    (str(store_id), *product_ids)
+                )
+                found = {row['id']: self._row_to_doc(row, Product) for row in rows}
+            return self._success_response(products=[found[pid] for pid in product_ids if pid in found])
+        except Exception as e:
+            logger.exception("Error en get_products_by_ids: %s", e)
+            return self._error_response(str(e))
+
+    def get_products_page(self, store_id, page_size=DEFAULT_PAGE_SIZE, cursor=None,
+                          name_prefix=None, descending=False):
+        """Obtiene una página de productos ordenados por nombre."""
+        try:
+            if not store_id:
+                return self._error_response("ID de tienda requerido")
+            where, params = "store_id = ?", (str(store_id),)
+            if name_prefix:
+                where += f" AND {PRODUCT_NAME_SQL} >= ? AND {PRODUCT_NAME_SQL} < ?"
+                params += (name_prefix, name_prefix + PREFIX_END)
+            products, next_cursor = self._page('products', where, params, int(page_size), cursor,
+                                               order_column=PRODUCT_NAME_SQL, order_field='name',
+                                               descending=descending, model=Product)
+            return self._success_response(products=products, next_cursor=next_cursor)
+        except ValueError as e:
+            return self._error_response(str(e))
+        except Exception as e:
+            logger.exception("Error en get_products_page: %s", e)
+            return self._error_response(str(e))
+
+    def update_product(self, store_id, product_id, updates: dict):
+        """Actualiza producto."""
+        try:
+            if not store_id or not product_id:
+                return self._error_response("ID de tienda y producto requeridos")
+
+            if not isinstance(updates, dict) or not updates:
+                return self._error_response("Datos de actualización inválidos")
+
+            error = self._validate_product_updates(updates)
+            if error:
+                return self._rejected_response(error)
+
+            with self.local.transaction() as conn:
+                if self._merge_doc(conn, 'products', product_id, updates, store_id=store_id) is None:
+                    return self._rejected_response("Producto no encontrado")
+            return self._success_response()
+        except Exception as e:
+            logger.exception("Error en update_product: %s", e)
+            return self._error_response(str(e))
+
+    def delete_product(self, store_id, product_id):
+        """Elimina producto."""
+        try:
+            if not store_id or not product_id:
+                return self._error_response("ID de tienda y producto requeridos")
+
+            self.local.execute(
+                "DELETE FROM products WHERE id = ? AND store_id = ?", (str(product_id), str(store_id))
+            )
+            return self._success_response()
+        except Exception as e:
+            logger.exception("Error en delete_product: %s", e)
+            return self._error_response(str(e))
+
+
+class LocalSalesOperations(LocalOperationsMixin, SalesOperations):
+    """Ventas locales, indexadas por (store_id, timestamp)."""
+
+    def record_sale(self, store_id, sale_data: dict):
+        """Registra una venta."""
+        try:
+            sale_record, error = self._build_sale_record(store_id, sale_data)
+            if error:
+                return self._error_response(error)
+
+            sale_id = self.local.new_id()
+            with self.local.transaction() as conn:
+                conn.execute(
+                    "INSERT INTO sales (id, store_id, product_id, timestamp, data) VALUES (?, ?, ?, ?, ?)",
+                    (sale_id, sale_record['store_id'], sale_record['product_id'],
+                     to_sort_key(sale_record['timestamp']), self.local.dumps(sale_record))
+                )
+                _apply_rollups(conn, store_id, [sale_record])
+            return self._success_response(sale_id=sale_id)
+        except Exception as e:
+            logger.exception("Error en record_sale: %s", e)
+            return self._error_response(str(e))
+
+    def record_sale_with_stock(self, store_id, sale_data: dict):
+        """Registra la venta y descuenta stock en una transacción SQLite."""
+        try:
+            sale_record, error = self._build_sale_record(store_id, sale_data)
+            if error:
+                return self._rejected_response(error)
+
+            sale_id = str(sale_data.get('sale_id') or self.local.new_id())
+            product_id = sale_record['product_id']
+            # BEGIN IMMEDIATE bloquea a otros escritores (también de otros procesos)
+            with self.local.transaction() as conn:
+                if conn.execute("SELECT 1 FROM sales WHERE id = ?", (sale_id,)).fetchone():
+                    return self._success_response(sale_id=sale_id, stock=None, duplicate=True)
+                row = conn.execute(
+                    "SELECT data FROM products WHERE id = ? AND store_id = ?",
+                    (product_id, sale_record['store_id'])
+                ).fetchone()
+                if not row:
+                    return self._rejected_response("Producto no encontrado")
+                product = self.local.loads(row['data'])
+                new_stock, error = self._stock_after_sale(product, sale_record['quantity'])
+                if error:
+                    return self._rejected_response(error)
+
+                conn.execute(
+                    "INSERT INTO sales (id, store_id, product_id, timestamp, data) VALUES (?, ?, ?, ?, ?)",
+                    (sale_id, sale_record['store_id'], product_id,
+                     to_sort_key(sale_record['timestamp']), self.local.dumps(sale_record))
+                )
+                _apply_rollups(conn, store_id, [sale_record])
+                if new_stock is not None:
+                    stock = new_stock if isinstance(product.get('stock'), (int, float)) else str(new_stock)
+                    self._merge_doc(conn, 'products', product_id, {'stock': stock}, store_id=store_id)
+            return self._success_response(sale_id=sale_id, stock=new_stock, sale=sale_record)
+        except Exception as e:
+            logger.exception("Error en record_sale_with_stock: %s", e)
+            return self._error_response(str(e))
+
+    def record_basket(self, store_id, items: list, staff_id=None, notes: str = '', receipt_id=None):
+        """Registra un ticket de varias líneas en una sola transacción SQLite."""
+        try:
+            receipt_id = str(receipt_id or self.local.new_id())
+            records, demand, error = self._build_basket_records(
+                store_id, receipt_id, items, {'staff_id': staff_id, 'notes': notes})
+            if error:
+                return self._rejected_response(error)
+
+            line_ids = [f"{receipt_id}-{r['line']}" for r in records]
+            total = sum(r['total'] for r in records)
+            with self.local.transaction() as conn:
+                if conn.execute("SELECT 1 FROM sales WHERE id = ?", (line_ids[0],)).fetchone():
+                    return self._success_response(sale_id=receipt_id, line_ids=line_ids,
+                                                  total=total, duplicate=True)
+                placeholders = ','.join('?' * len(demand))
+                rows = conn.execute(
+                    f"SELECT id, data FROM products WHERE store_id = ? AND id IN ({placeholders})",
+                    (str(store_id), *demand)
+                ).fetchall()
+                products = {row['id']: self.local.loads(row['data']) for row in rows}
+
+                stock_updates = {}
+                for pid, quantity in demand.items():
+                    product = products.get(pid)
+                    if product is None:
+                        return self._rejected_response(f"Producto no encontrado: {pid}")
+                    new_stock, error = self._stock_after_sale(product, quantity)
+                    if error:
+                        return self._rejected_response(f"{product.get('name', pid)}: {error}")
+                    if new_stock is not None:
+                        is_numeric = isinstance(product.get('stock'), (int, float))
+                        stock_updates[pid] = new_stock if is_numeric else str(new_stock)
+
+                conn.executemany(
+                    "INSERT INTO sales (id, store_id, product_id, timestamp, data) VALUES (?, ?, ?, ?, ?)",
+                    [(line_id, r['store_id'], r['product_id'], to_sort_key(r['timestamp']), self.local.dumps(r))
+                     for line_id, r in zip(line_ids, records)]
+                )
+                _apply_rollups(conn, store_id, records)
+                for pid, stock in stock_updates.items():
+                    self._merge_doc(conn, 'products', pid, {'stock': stock}, store_id=store_id)
+
+            return self._success_response(sale_id=receipt_id, line_ids=line_ids, sales=records, total=total)
+        except Exception as e:
+            logger.exception("Error en record_basket: %s", e)
+            return self._error_response(str(e))
+
+    def get_store_sales(self, store_id, limit=100):
+        """Obtiene ventas de una tienda, más recientes primero."""
+        try:
+            if not store_id:
+                return self._error_response("ID de tienda requerido")
+
+            rows = self.local.query(
+                "SELECT id, data FROM sales WHERE store_id = ? ORDER BY timestamp DESC LIMIT ?",
+                (str(store_id), int(limit))
+            )
+            return self._success_response(sales=[self._row_to_doc(row, Sale) for row in rows])
+        except Exception as e:
+            logger.exception("Error en get_store_sales: %s", e)
+            return self._error_response(str(e))
+
+    def get_sales_page(self, store_id, page_size=DEFAULT_PAGE_SIZE, cursor=None,
+                       product_id=None, descending=True):
+        """Obtiene una página de ventas ordenadas por fecha."""
+        try:
+            if not store_id:
+                return self._error_response("ID de tienda requerido")
+            where, params = "store_id = ?", (str(store_id),)
+            if product_id:
+                where, params = where + " AND product_id = ?", params + (str(product_id),)
+            sales, next_cursor = self._page('sales', where, params, int(page_size), cursor,
+                                            descending=descending, model=Sale)
+            return self._success_response(sales=sales, next_cursor=next_cursor)
+        except ValueError as e:
+            return self._error_response(str(e))
+        except Exception as e:
+            logger.exception("Error en get_sales_page: %s", e)
+            return self._error_response(str(e))
+
+    def get_sales_by_period(self, store_id, start_date, end_date):
+        """Obtiene ventas en un período."""
+        try:
+            rows = self.local.query(
+                "SELECT id, data FROM sales WHERE store_id = ? AND timestamp >= ? AND timestamp <= ?",
+                (str(store_id), to_sort_key(start_date), to_sort_key(end_date))
+            )
+            return self._success_response(sales=[self._row_to_doc(row, Sale) for row in rows])
+        except Exception as e:
+            logger.exception("Error en get_sales_by_period: %s", e)
+            return self._error_response(str(e))
+
+    def delete_sale(self, sale_id, store_id=None):
+        """Elimina una venta (solo de esa tienda si se indica `store_id`)."""
+        try:
+            where, params = "id = ?", (str(sale_id),)
+            if store_id:
+                where, params = "id = ? AND store_id = ?", (str(sale_id), str(store_id))
+            with self.local.transaction() as conn:
+                row = conn.execute(f"SELECT data FROM sales WHERE {where}", params).fetchone()
+                if row:
+                    sale = self.local.loads(row['data'])
+                    conn.execute(f"DELETE FROM sales WHERE {where}", params)
+                    _apply_rollups(conn, sale['store_id'], [sale], sign=-1)
+            return self._success_response()
+        except Exception as e:
+            logger.exception("Error en delete_sale: %s", e)
+            return self._error_response(str(e))
+
+
+class LocalMetricsOperations(LocalOperationsMixin, MetricsOperations):
+    """Métricas locales. Los cálculos sobre listas se heredan sin cambios."""
+
+    def record_metric(self, store_id, metric_data: dict):
+        """Registra una métrica."""
+        try:
+            metric_record, error = self._build_metric_record(store_id, metric_data)
+            if error:
+                return self._error_response(error)
+
+            metric_id = self.local.new_id()
+            self.local.execute(
+                "INSERT INTO metrics (id, store_id, metric_type, timestamp, data) VALUES (?, ?, ?, ?, ?)",
+                (metric_id, metric_record['store_id'], metric_record['metric_type'],
+                 to_sort_key(metric_record['timestamp']), self.local.dumps(metric_record))
+            )
+            return self._success_response(metric_id=metric_id)
+        except Exception as e:
+            logger.exception("Error en record_metric: %s", e)
+            return self._error_response(str(e))
+
+    def get_store_metrics(self, store_id, metric_type=None, limit=50):
+        """Obtiene métricas de una tienda, más recientes primero."""
+        try:
+            if not store_id:
+                return self._error_response("ID de tienda requerido")
+
+            if metric_type:
+                rows = self.local.query(
+                    "SELECT id, data FROM metrics WHERE store_id = ? AND metric_type = ? "
+                    "ORDER BY timestamp DESC LIMIT ?",
+                    (str(store_id), str(metric_type), int(limit))
+                )
+            else:
+                rows = self.local.query(
+                    "SELECT id, data FROM metrics WHERE store_id = ? ORDER BY timestamp DESC LIMIT ?",
+                    (str(store_id), int(limit))
+                )
+            return self._success_response(metrics=[self._row_to_doc(row) for row in rows])
+        except Exception as e:
+            logger.exception("Error en get_store_metrics: %s", e)
+            return self._error_response(str(e))
+
+    def get_metrics_page(self, store_id, metric_type=None, page_size=DEFAULT_PAGE_SIZE, cursor=None):
+        """Obtiene una página de métricas, más recientes primero."""
+        try:
+            if not store_id:
+                return self._error_response("ID de tienda requerido")
+            where, params = "store_id = ?", (str(store_id),)
+            if metric_type:
+                where, params = where + " AND metric_type = ?", params + (str(metric_type),)
+            metrics, next_cursor = self._page('metrics', where, params, int(page_size), cursor)
+            return self._success_response(metrics=metrics, next_cursor=next_cursor)
+        except ValueError as e:
+            return self._error_response(str(e))
+        except Exception as e:
+            logger.exception("Error en get_metrics_page: %s", e)
+            return self._error_response(str(e))
+
+    def aggregate_sales(self, store_id, start=None, end=None):
+        """Nº de ventas, ingresos y promedio de un período, agregados en SQLite."""
+        try:
+            if not store_id:
+                return self._error_response("ID de tienda requerido")
+
+            where, params = "store_id = ?", [str(store_id)]
+            if start is not None:
+                where += " AND timestamp >= ?"
+                params.append(to_sort_key(start))
+            if end is not None:
+                where += " AND timestamp <= ?"
+                params.append(to_sort_key(end))
+            row = self.local.query_one(
+                f"SELECT COUNT(*) AS count, TOTAL(json_extract(data, '$.total')) AS revenue "
+                f"FROM sales WHERE {where}", params
+            )
+            count, revenue = row['count'], row['revenue']
+            return self._success_response(
+                count=count, revenue=revenue, average=revenue / count if count > 0 else 0)
+        except Exception as e:
+            logger.exception("Error en aggregate_sales: %s", e)
+            return self._error_response(str(e))
+
+    def get_sales_summary(self, store_id, top_limit=5):
+        """Resumen de ventas desde la tabla de agregados."""
+        try:
+            if not store_id:
+                return self._error_response("ID de tienda requerido")
+
+            totals = self.local.query_one(
+                "SELECT revenue, count, complete FROM rollups WHERE store_id = ? AND kind = 'totals'",
+                (str(store_id),)
+            )
+            if not totals or not totals['complete']:
+                rebuilt = self.rebuild_sales_rollups(store_id)
+                if not rebuilt.get('success'):
+                    return rebuilt
+                totals = rebuilt['totals']
+
+            rows = self.local.query(
+                "SELECT key AS product_id, product_name, quantity, revenue FROM rollups "
+                "WHERE store_id = ? AND kind = 'product' AND quantity > 0 "
+                "ORDER BY quantity DESC LIMIT ?",
+                (str(store_id), int(top_limit))
+            )
+            summary = build_summary(
+                {'revenue': totals['revenue'], 'count': totals['count']}, [dict(row) for row in rows])
+            return self._success_response(**summary)
+        except Exception as e:
+            logger.exception("Error en get_sales_summary: %s", e)
+            return self._error_response(str(e))
+
+    def get_daily_sales(self, store_id, start_day: str, end_day: str):
+        """Ingresos y nº de ventas por día (claves 'YYYY-MM-DD', inclusivas)."""
+        try:
+            rows = self.local.query(
+                "SELECT key AS day, revenue, count FROM rollups "
+                "WHERE store_id = ? AND kind = 'day' AND key >= ? AND key <= ? ORDER BY key",
+                (str(store_id), str(start_day), str(end_day))
+            )
+            return self._success_response(days=[dict(row) for row in rows])
+        except Exception as e:
+            logger.exception("Error en get_daily_sales: %s", e)
+            return self._error_response(str(e))
+
+    def rebuild_sales_rollups(self, store_id):
+        """Recalcula los agregados de una tienda a partir de sus ventas."""
+        try:
+            with self.local.transaction() as conn:
+                rows = conn.execute("SELECT data FROM sales WHERE store_id = ?", (str(store_id),)).fetchall()
+                conn.execute("DELETE FROM rollups WHERE store_id = ?", (str(store_id),))
+                _apply_rollups(conn, store_id, [self.local.loads(row['data']) for row in rows])
+                conn.execute(
+                    "UPDATE rollups SET complete = 1 WHERE store_id = ? AND kind = 'totals'", (str(store_id),))
+                totals = conn.execute(
+                    "SELECT revenue, count FROM rollups WHERE store_id = ? AND kind = 'totals'", (str(store_id),)
+                ).fetchone()
+            return self._success_response(totals={'revenue': totals['revenue'], 'count': totals['count']})
+        except Exception as e:
+            logger.exception("Error en rebuild_sales_rollups: %s", e)
+            return self._error_response(str(e))
+
+    def delete_metric(self, metric_id):
+        """Elimina una métrica."""
+        try:
+            self.local.execute("DELETE FROM metrics WHERE id = ?", (str(metric_id),))
+            return self._success_response()
+        except Exception as e:
+            logger.exception("Error en delete_metric: %s", e)
+            return self._error_response(str(e))
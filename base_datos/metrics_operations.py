@@ -1,42 +1,99 @@
 """Operaciones de métricas."""
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from .db_base import DatabaseBase
+from .analytics import SalesColumns, summarize
+from .pagination import DEFAULT_PAGE_SIZE, firestore_page, iter_pages
+from .sales_partitions import period_partitions, store_partitions
+from .rollups import (
+    ROLLUPS_COLLECTION, PRODUCT_ROLLUPS_COLLECTION, TOTALS_DOC, build_summary, compute_deltas,
+    rollup_corrections,
+)
+
+# Escrituras por batch al reconstruir agregados (límite de Firestore: 500)
+ROLLUP_REBUILD_BATCH_SIZE = 400
+# Duración del lease que reserva la reconstrucción para un solo cliente
+ROLLUP_REBUILD_LEASE_SECONDS = 300
+# Intentos de tomar el lease si una venta modifica los totales a la vez
+ROLLUP_REBUILD_CLAIM_ATTEMPTS = 5
 
 logger = logging.getLogger(__name__)
 
+try:
+    from google.cloud import firestore as gc_firestore
+    from google.api_core import exceptions as gcp_exceptions
+except ImportError:
+    gc_firestore = None
+    gcp_exceptions = None
+
+# Errores de una base o SDK sin consultas de agregación (se calcula en el cliente)
+_AGGREGATION_UNSUPPORTED = (AttributeError, NotImplementedError)
+if gcp_exceptions is not None:
+    _AGGREGATION_UNSUPPORTED += (gcp_exceptions.MethodNotImplemented,)
+
+
+def sales_totals(totals) -> dict:
+    """Nº de ventas, ingresos y promedio a partir de los `total` de cada venta."""
+    count = 0
+    revenue = 0
+    for total in totals:
+        count += 1
+        revenue += total or 0
+    return {'count': count, 'revenue': revenue, 'average': revenue / count if count > 0 else 0}
+
 
 class MetricsOperations(DatabaseBase):
     """Operaciones de cálculo y almacenamiento de métricas."""
 
+    def __init__(self, db=None, partitioned_sales: bool = False):
+        """Inicializa con referencia a Firestore.
+
+        Args:
+            partitioned_sales: Las ventas están en stores/{id}/sales_months/{yyyymm}/sales
+                (ver `SalesOperations(partitioned=True)`)
+        """
+        super().__init__(db)
+        self.partitioned_sales = partitioned_sales
+
+    def _build_metric_record(self, store_id, metric_data: dict):
+        """Valida los datos de una métrica y construye el documento a guardar.
+
+        Returns:
+            Tupla (registro, error); `error` es None si los datos son válidos.
+        """
+        if not store_id:
+            return None, "ID de tienda requerido"
+        
+        if 'metric_type' not in metric_data:
+            return None, "Tipo de métrica requerido"
+        
+        if 'value' not in metric_data:
+            return None, "Valor de métrica requerido"
+        
+        try:
+            value = float(metric_data.get('value', 0))
+        except (ValueError, TypeError):
+            return None, "El valor debe ser un número válido"
+        
+        metric_record = {
+            'store_id': str(store_id),
+            'metric_type': str(metric_data.get('metric_type')),  # sales, revenue, inventory, etc
+            'value': value,
+            'description': str(metric_data.get('description', '')),
+            'period': str(metric_data.get('period', 'daily')),  # daily, weekly, monthly
+            'timestamp': self._get_timestamp()
+        }
+        return metric_record, None
+
     def record_metric(self, store_id, metric_data: dict):
         """Registra una métrica."""
         try:
             if not self.metrics_ref:
                 return self._error_response("Firestore no inicializado")
             
-            if not store_id:
-                return self._error_response("ID de tienda requerido")
-            
-            if 'metric_type' not in metric_data:
-                return self._error_response("Tipo de métrica requerido")
-            
-            if 'value' not in metric_data:
-                return self._error_response("Valor de métrica requerido")
-            
-            try:
-                value = float(metric_data.get('value', 0))
-            except (ValueError, TypeError):
-                return self._error_response("El valor debe ser un número válido")
-            
-            metric_record = {
-                'store_id': str(store_id),
-                'metric_type': str(metric_data.get('metric_type')),  # sales, revenue, inventory, etc
-                'value': value,
-                'description': str(metric_data.get('description', '')),
-                'period': str(metric_data.get('period', 'daily')),  # daily, weekly, monthly
-                'timestamp': self._get_timestamp()
-            }
+            metric_record, error = self._build_metric_record(store_id, metric_data)
+            if error:
+                return self._error_response(error)
 
             doc_ref = self.metrics_ref.document()
             doc_ref.set(metric_record)
@@ -47,110 +104,42 @@ class MetricsOperations(DatabaseBase):
             return self._error_response(str(e))
 
     def get_store_metrics(self, store_id, metric_type=None, limit=50):
-        """Obtiene métricas de una tienda."""
+        """Obtiene métricas de una tienda, más recientes primero."""
+        page = self.get_metrics_page(store_id, metric_type, page_size=limit)
+        if not page.get('success'):
+            return page
+        return self._success_response(metrics=page['metrics'])
+
+    def get_metrics_page(self, store_id, metric_type=None, page_size=DEFAULT_PAGE_SIZE, cursor=None):
+        """Obtiene una página de métricas, más recientes primero.
+
+        Returns:
+            Dict con metrics y next_cursor (None si no hay más páginas)
+        """
         try:
             if not self.metrics_ref:
                 return self._error_response("Firestore no inicializado")
-            
             if not store_id:
                 return self._error_response("ID de tienda requerido")
-            
-            # Importar excepción de Firestore para manejar errores de índice
-            try:
-                from google.api_core import exceptions as gcp_exceptions
-            except ImportError:
-                gcp_exceptions = None
-            
-            metrics = []
-            use_manual_sort = False
-            
-            try:
-                query = self.metrics_ref.where('store_id', '==', str(store_id))
-                
-                if metric_type:
-                    query = query.where('metric_type', '==', str(metric_type))
-                
-                # Intentar ordenar por timestamp
-                query = query.order_by('timestamp', direction='DESCENDING').limit(limit)
-                docs = query.stream()
-                
-                for doc in docs:
-                    data = doc.to_dict()
-                    data['id'] = doc.id
-                    metrics.append(data)
-            except Exception as e:
-                # Verificar si es error de índice faltante
-                error_msg = str(e)
-                is_index_error = False
-                
-                if gcp_exceptions:
-                    is_index_error = isinstance(e, (gcp_exceptions.FailedPrecondition, gcp_exceptions.InvalidArgument))
-                else:
-                    # Verificar por mensaje de error
-                    is_index_error = 'index' in error_msg.lower() or 'requires an index' in error_msg.lower()
-                
-                if is_index_error:
-                    logger.warning("Índice de Firestore no disponible para ordenamiento, obteniendo métricas sin ordenar")
-                    use_manual_sort = True
-                else:
-                    logger.warning("Error al obtener métricas ordenadas: %s", error_msg)
-                
-                # Obtener sin ordenar
-                try:
-                    query = self.metrics_ref.where('store_id', '==', str(store_id))
-                    if metric_type:
-                        query = query.where('metric_type', '==', str(metric_type))
-                    query = query.limit(limit * 2)  # Obtener más para ordenar manualmente
-                    docs = query.stream()
-                    
-                    for doc in docs:
-                        data = doc.to_dict()
-                        data['id'] = doc.id
-                        metrics.append(data)
-                except Exception as e2:
-                    logger.exception("Error al obtener métricas sin ordenar: %s", e2)
-                    return self._error_response(f"Error al obtener métricas: {str(e2)}")
-            
-            # Ordenar manualmente si fue necesario
-            if use_manual_sort and metrics:
-                try:
-                    def get_timestamp_key(metric):
-                        """Obtiene una clave ordenable del timestamp."""
-                        ts = metric.get('timestamp')
-                        if ts is None:
-                            return datetime.min
-                        # Si es un objeto datetime (Firestore o Python)
-                        if isinstance(ts, datetime):
-                            return ts
-                        # Si tiene método timestamp (objetos datetime-like)
-                        if hasattr(ts, 'timestamp'):
-                            try:
-                                return datetime.fromtimestamp(ts.timestamp())
-                            except:
-                                return datetime.min
-                        # Si es string ISO, intentar parsear básico
-                        if isinstance(ts, str):
-                            try:
-                                # Formato ISO básico: YYYY-MM-DDTHH:MM:SS
-                                return datetime.fromisoformat(ts.replace('Z', '+00:00'))
-                            except:
-                                return datetime.min
-                        return datetime.min
-                    
-                    # Ordenar por timestamp descendente (más recientes primero)
-                    metrics.sort(key=get_timestamp_key, reverse=True)
-                    # Limitar después de ordenar
-                    metrics = metrics[:limit]
-                except Exception as e:
-                    logger.warning("No se pudo ordenar métricas manualmente: %s", e)
-                    # Limitar sin ordenar
-                    metrics = metrics[:limit]
-            
-            return self._success_response(metrics=metrics)
+
+            query = self.metrics_ref.where('store_id', '==', str(store_id))
+            filters = ['store_id']
+            if metric_type:
+                query = query.where('metric_type', '==', str(metric_type))
+                filters.append('metric_type')
+            metrics, next_cursor = firestore_page(query, int(page_size), cursor,
+                                                  index=('metrics', filters))
+            return self._success_response(metrics=metrics, next_cursor=next_cursor)
+        except ValueError as e:
+            return self._error_response(str(e))
         except Exception as e:
-            logger.exception("Error en get_store_metrics: %s", e)
+            logger.exception("Error en get_metrics_page: %s", e)
             return self._error_response(str(e))
 
+    def iter_metrics_pages(self, store_id, metric_type=None, page_size=DEFAULT_PAGE_SIZE, cursor=None):
+        """Generador de páginas de métricas; cada una trae su `next_cursor`."""
+        return iter_pages(lambda c: self.get_metrics_page(store_id, metric_type, page_size, c), cursor)
+
     def calculate_revenue(self, sales_list):
         """Calcula ingresos totales desde lista de ventas."""
         try:
@@ -173,25 +162,243 @@ class MetricsOperations(DatabaseBase):
     def get_top_products(self, sales_list, limit=5):
         """Obtiene productos más vendidos."""
         try:
-            product_stats = {}
-            for sale in sales_list:
-                product_id = sale.get('product_id')
-                product_name = sale.get('product_name', 'N/A')
-                if product_id:
-                    if product_id not in product_stats:
-                        product_stats[product_id] = {'quantity': 0, 'revenue': 0, 'product_name': product_name}
-                    product_stats[product_id]['quantity'] += sale.get('quantity', 0)
-                    product_stats[product_id]['revenue'] += sale.get('total', 0)
-            
-            top = sorted(product_stats.items(), 
-                        key=lambda x: x[1]['quantity'], 
-                        reverse=True)[:limit]
-            
-            return self._success_response(top_products=[{'product_id': p[0], **p[1]} for p in top])
+            top = SalesColumns.from_sales(sales_list).top_products(limit)
+            return self._success_response(top_products=top)
         except Exception as e:
             logger.exception("Error en get_top_products: %s", e)
             return self._error_response(str(e))
 
+    def summarize_sales(self, sales_list, limit=5):
+        """Ingresos, cantidad, promedio y top productos en una sola pasada.
+
+        Equivale a llamar a calculate_revenue, calculate_sales_count y
+        get_top_products, pero recorre la lista una única vez.
+        """
+        try:
+            return self._success_response(**summarize(sales_list, limit))
+        except Exception as e:
+            logger.exception("Error en summarize_sales: %s", e)
+            return self._error_response(str(e))
+
+    def aggregate_sales(self, store_id, start=None, end=None):
+        """Nº de ventas, ingresos y promedio de un período sin descargar las ventas.
+
+        Usa una consulta de agregación de Firestore (`count()`, `sum('total')`
+        y `avg('total')`), que solo transfiere los tres resultados. Si la base
+        o el SDK no soportan agregaciones se suman en el cliente leyendo solo
+        el campo `total`. Con ventas particionadas se agrega cada mes del
+        período y se combinan los resultados.
+
+        Args:
+            start: Inicio del período (inclusivo), o None
+            end: Fin del período (inclusivo), o None
+
+        Returns:
+            Dict con count, revenue y average (como calculate_sales_count)
+        """
+        try:
+            if not self.sales_ref:
+                return self._error_response("Firestore no inicializado")
+            if not store_id:
+                return self._error_response("ID de tienda requerido")
+
+            if self.partitioned_sales:
+                queries = period_partitions(self.stores_ref.document(str(store_id)), start, end)
+            else:
+                queries = [self.sales_ref.where('store_id', '==', str(store_id))]
+            if start is not None:
+                queries = [query.where('timestamp', '>=', start) for query in queries]
+            if end is not None:
+                queries = [query.where('timestamp', '<=', end) for query in queries]
+            results = [self._aggregate_query(query) for query in queries]
+            if len(results) == 1:
+                return self._success_response(**results[0])
+            count = sum(r['count'] for r in results)
+            revenue = sum(r['revenue'] for r in results)
+            return self._success_response(
+                count=count, revenue=revenue, average=revenue / count if count > 0 else 0)
+        except Exception as e:
+            logger.exception("Error en aggregate_sales: %s", e)
+            return self._error_response(str(e))
+
+    def _aggregate_query(self, query) -> dict:
+        """count, revenue y average de una consulta de ventas."""
+        try:
+            aggregation = (query.count(alias='count')
+                           .sum('total', alias='revenue')
+                           .avg('total', alias='average'))
+            values = {result.alias: result.value for row in aggregation.get() for result in row}
+        except _AGGREGATION_UNSUPPORTED as e:
+            logger.info("Agregación no disponible (%s); se suma en el cliente", e)
+            docs = query.select(['total']).stream()
+            return sales_totals((doc.to_dict() or {}).get('total', 0) for doc in docs)
+        return {
+            'count': int(values.get('count') or 0),
+            'revenue': values.get('revenue') or 0,
+            'average': values.get('average') or 0,
+        }
+
+    def get_sales_summary(self, store_id, top_limit=5):
+        """Ingresos, nº de ventas, promedio y top productos desde los agregados.
+
+        Lee el documento de totales y los `top_limit` agregados de producto con
+        más unidades, en lugar de descargar las ventas. Si la tienda aún no
+        tiene agregados completos (historial anterior a ellos) se reconstruyen
+        una vez.
+        """
+        try:
+            if not self.stores_ref:
+                return self._error_response("Firestore no inicializado")
+            if not store_id:
+                return self._error_response("ID de tienda requerido")
+
+            store_doc = self.stores_ref.document(str(store_id))
+            totals_doc = store_doc.collection(ROLLUPS_COLLECTION).document(TOTALS_DOC).get()
+            totals = totals_doc.to_dict() if totals_doc.exists else {}
+            if not totals.get('complete'):
+                rebuilt = self.rebuild_sales_rollups(store_id)
+                if not rebuilt.get('success'):
+                    return rebuilt
+                totals = rebuilt['totals']
+
+            top_docs = (store_doc.collection(PRODUCT_ROLLUPS_COLLECTION)
+                        .where('quantity', '>', 0)
+                        .order_by('quantity', direction='DESCENDING')
+                        .limit(top_limit).stream())
+            top = [doc.to_dict() for doc in top_docs]
+            return self._success_response(**build_summary(totals, top))
+        except Exception as e:
+            logger.exception("Error en get_sales_summary: %s", e)
+            return self._error_response(str(e))
+
+    def get_daily_sales(self, store_id, start_day: str, end_day: str):
+        """Ingresos y nº de ventas por día (claves 'YYYY-MM-DD', inclusivas)."""
+        try:
+            if not self.stores_ref:
+                return self._error_response("Firestore no inicializado")
+            query = (self.stores_ref.document(str(store_id)).collection(ROLLUPS_COLLECTION)
+                     .where('day', '>=', str(start_day)).where('day', '<=', str(end_day))
+                     .order_by('day'))
+            days = [{'day': d.get('day'), 'revenue': d.get('revenue', 0), 'count': d.get('count', 0)}
+                    for d in (doc.to_dict() for doc in query.stream())]
+            return self._success_response(days=days)
+        except Exception as e:
+            logger.exception("Error en get_daily_sales: %s", e)
+            return self._error_response(str(e))
+
+    def rebuild_sales_rollups(self, store_id):
+        """Recalcula desde cero los agregados de una tienda a partir de sus ventas.
+
+        Solo hace falta una vez para historiales anteriores a los agregados;
+        después se mantienen con cada venta. Mientras se reconstruye se
+        pueden seguir registrando ventas:
+
+        1. Se toma un lease en el documento de totales con una escritura
+           condicionada; su hora de commit (T) es el punto de corte. Otro
+           cliente que encuentre el lease vigente no reconstruye.
+        2. Ventas y agregados se leen tal como estaban en T (read_time).
+        3. A cada agregado se le suma con Increment la diferencia entre el
+           valor recalculado y el leído, así se conservan los incrementos de
+           las ventas registradas después de T.
+        """
+        try:
+            if not self.stores_ref or not self.sales_ref or gc_firestore is None:
+                return self._error_response("Firestore no inicializado")
+
+            store_doc = self.stores_ref.document(str(store_id))
+            rollups = store_doc.collection(ROLLUPS_COLLECTION)
+            product_rollups = store_doc.collection(PRODUCT_ROLLUPS_COLLECTION)
+            totals_ref = rollups.document(TOTALS_DOC)
+
+            claim = self._claim_rollup_rebuild(totals_ref)
+            if not claim.get('success') or 'totals' in claim:
+                return claim
+            read_time = claim['read_time']
+
+            fields = ['total', 'quantity', 'product_id', 'product_name', 'timestamp']
+            if self.partitioned_sales:
+                queries = store_partitions(store_doc)
+            else:
+                queries = [self.sales_ref.where('store_id', '==', str(store_id))]
+            deltas = compute_deltas(doc.to_dict() for query in queries
+                                    for doc in query.select(fields).stream(read_time=read_time))
+
+            refs, current, targets = {}, {}, {}
+            for collection in (rollups, product_rollups):
+                for doc in collection.stream(read_time=read_time):
+                    refs[doc.reference.path] = doc.reference
+                    current[doc.reference.path] = doc.to_dict()
+            labels = {}
+            for day, values in deltas['days'].items():
+                ref = rollups.document(f'day-{day}')
+                refs[ref.path], targets[ref.path], labels[ref.path] = ref, values, {'day': day}
+            for product_id, values in deltas['products'].items():
+                ref = product_rollups.document(product_id)
+                refs[ref.path], targets[ref.path] = ref, values
+                labels[ref.path] = {'product_id': product_id}
+                if values['product_name']:
+                    labels[ref.path]['product_name'] = values['product_name']
+            targets[totals_ref.path] = deltas['totals']
+
+            corrections = rollup_corrections(current, targets)
+            totals_fix = corrections.pop(totals_ref.path, {})
+            writes = [
+                (refs[path], {**labels.get(path, {}),
+                              **{field: gc_firestore.Increment(delta) for field, delta in diff.items()}})
+                for path, diff in corrections.items()
+            ]
+            # Los totales van al final: marcan la reconstrucción como terminada
+            writes.append((totals_ref, {
+                **{field: gc_firestore.Increment(delta) for field, delta in totals_fix.items()},
+                'complete': True,
+                'rebuild_lease': gc_firestore.DELETE_FIELD,
+            }))
+
+            for start in range(0, len(writes), ROLLUP_REBUILD_BATCH_SIZE):
+                batch = self.db.batch()
+                for ref, data in writes[start:start + ROLLUP_REBUILD_BATCH_SIZE]:
+                    batch.set(ref, data, merge=True)
+                batch.commit()
+
+            totals = totals_ref.get().to_dict() or {}
+            totals.pop('rebuild_lease', None)
+            return self._success_response(totals=totals)
+        except Exception as e:
+            logger.exception("Error en rebuild_sales_rollups: %s", e)
+            return self._error_response(str(e))
+
+    def _claim_rollup_rebuild(self, totals_ref):
+        """Toma el lease de reconstrucción en el documento de totales.
+
+        Returns:
+            {'success', 'read_time'} con la hora de corte si se tomó el lease,
+            {'success', 'totals'} si otro cliente ya completó los agregados, o
+            un error si hay otra reconstrucción en curso
+        """
+        for _ in range(ROLLUP_REBUILD_CLAIM_ATTEMPTS):
+            snapshot = totals_ref.get()
+            data = snapshot.to_dict() if snapshot.exists else {}
+            if data.get('complete'):
+                data.pop('rebuild_lease', None)
+                return self._success_response(totals=data)
+            now = datetime.now(timezone.utc)
+            lease = data.get('rebuild_lease')
+            if lease and lease > now:
+                return self._error_response("Reconstrucción de agregados en curso; intente más tarde")
+
+            expires = now + timedelta(seconds=ROLLUP_REBUILD_LEASE_SECONDS)
+            try:
+                if snapshot.exists:
+                    # Falla si una venta u otro cliente modificó los totales desde la lectura
+                    option = self.db.write_option(last_update_time=snapshot.update_time)
+                    result = totals_ref.update({'rebuild_lease': expires}, option=option)
+                else:
+                    result = totals_ref.create({'revenue': 0.0, 'count': 0, 'rebuild_lease': expires})
+            except (gcp_exceptions.FailedPrecondition, gcp_exceptions.Conflict):
+                continue
+            return self._success_response(read_time=result.update_time)
+        return self._error_response("No se pudo reservar la reconstrucción de agregados")
+
     def delete_metric(self, metric_id):
         """Elimina una métrica."""
         try:
@@ -0,0 +1,139 @@
+"""Modelos compactos de los documentos: ventas, productos, empleados y tiendas.
+
+Los documentos se convierten una sola vez al leerlos de la base (Firestore o
+SQLite) con `from_doc`: los números guardados como texto (`price`, `stock`
+de productos antiguos) se parsean ahí y el resto del código los recibe ya
+como int/float. Cada modelo usa `__slots__` (sin `__dict__` por registro) y
+guarda los campos no previstos en `extra`.
+
+Los modelos son de solo lectura y se comportan como un Mapping, así que el
+código que los trata como dicts (`doc.get('name')`, `doc['id']`,
+`dict(doc)`) sigue funcionando. Para modificar uno se construye un dict
+nuevo (`{**doc, 'stock': 3}`).
+"""
+from collections.abc import Mapping
+
+
+def _parse_int(value):
+    """Entero si el valor lo representa; si no, el valor tal cual."""
+    if value is None or isinstance(value, int):
+        return value
+    try:
+        number = float(value)
+    except (ValueError, TypeError):
+        return value
+    return int(number) if number.is_integer() else number
+
+
+def _parse_float(value):
+    """Float si el valor lo representa; si no, el valor tal cual."""
+    if value is None or isinstance(value, float):
+        return value
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return value
+
+
+class Record(Mapping):
+    """Base de los modelos: campos en slots y vista de solo lectura como dict.
+
+    Subclases:
+        FIELDS: Campos con slot propio, en orden
+        PARSERS: Conversión de cada campo numérico al leerlo
+        DEFAULTS: Valor de los campos que siempre están presentes aunque
+            falten en el documento; los demás se omiten si valen None
+    """
+    __slots__ = ('id', 'extra')
+    FIELDS = ()
+    PARSERS = {}
+    DEFAULTS = {}
+
+    def __init__(self, id=None, **data):
+        object.__setattr__(self, 'id', None if id is None else str(id))
+        for name in self.FIELDS:
+            value = data.pop(name, None)
+            if value is None:
+                value = self.DEFAULTS.get(name)
+            elif name in self.PARSERS:
+                value = self.PARSERS[name](value)
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, 'extra', data or None)
+
+    @classmethod
+    def from_doc(cls, doc_id, data: dict):
+        """Construye el modelo desde el ID y los datos guardados."""
+        if isinstance(data, cls) and data.id == str(doc_id):
+            return data
+        data = dict(data or {})
+        data.pop('id', None)
+        return cls(doc_id, **data)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} es de solo lectura")
+
+    def __getitem__(self, key):
+        if key == 'id':
+            return self.id
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            if value is None and key not in self.DEFAULTS:
+                raise KeyError(key)
+            return value
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield 'id'
+        for name in self.FIELDS:
+            if name in self.DEFAULTS or getattr(self, name) is not None:
+                yield name
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> dict:
+        """Copia como dict ({'id', **campos})."""
+        return dict(self)
+
+    def __reduce__(self):
+        data = self.to_dict()
+        return (_rebuild, (type(self), data.pop('id'), data))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+def _rebuild(cls, doc_id, data):
+    return cls(doc_id, **data)
+
+
+class Product(Record):
+    """Producto de una tienda; `stock` None = sin control de stock."""
+    __slots__ = ('name', 'price', 'stock', 'description')
+    FIELDS = __slots__
+    PARSERS = {'price': _parse_float, 'stock': _parse_int}
+
+
+class Sale(Record):
+    """Venta (o línea de un ticket, con receipt_id y line)."""
+    __slots__ = ('store_id', 'product_id', 'product_name', 'quantity', 'unit_price', 'total',
+                 'staff_id', 'notes', 'timestamp', 'receipt_id', 'line')
+    FIELDS = __slots__
+    PARSERS = {'quantity': _parse_int, 'unit_price': _parse_float, 'total': _parse_float}
+    DEFAULTS = {'quantity': 0, 'unit_price': 0.0, 'total': 0.0}
+
+
+class StaffMember(Record):
+    """Empleado de una tienda, opcionalmente ligado a una cuenta (user_id)."""
+    __slots__ = ('name', 'role', 'user_id', 'email', 'permissions')
+    FIELDS = __slots__
+
+
+class Store(Record):
+    """Tienda."""
+    __slots__ = ('name', 'address', 'phone', 'owner_id', 'created_at', 'is_active')
+    FIELDS = __slots__
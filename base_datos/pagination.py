@@ -0,0 +1,146 @@
+"""Paginación por cursor para listados ordenados por fecha.
+
+Las páginas se piden de a `page_size` documentos ordenados por un campo
+(por defecto timestamp DESC) y el ID de documento, y continúan justo después
+del último documento entregado (`start_after`), sin offsets ni listas
+completas en memoria. El cursor es un token opaco que el llamador puede
+guardar para reanudar.
+"""
+import base64
+import binascii
+import logging
+
+from .indexes import MISSING_INDEXES, IndexShape, is_index_error
+from .local_db import LocalDatabase
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 500
+
+# Sin índice compuesto la página se ordena en memoria; más allá de estos
+# documentos la consulta falla pidiendo que se cree el índice
+FALLBACK_MAX_DOCS = 2000
+
+# Límite superior para filtrar por prefijo: prefijo <= valor < prefijo + PREFIX_END
+PREFIX_END = '\uf8ff'
+
+
+def encode_cursor(value, doc_id) -> str:
+    """Token que apunta justo después del documento (valor de orden, doc_id)."""
+    raw = LocalDatabase.dumps({'id': str(doc_id), 'v': value}).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(token: str):
+    """Retorna (valor de orden, doc_id) del token.
+
+    Raises:
+        ValueError: Si el token no es un cursor válido
+    """
+    try:
+        payload = LocalDatabase.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        return payload['v'], str(payload['id'])
+    except (binascii.Error, ValueError, KeyError, TypeError, AttributeError):
+        raise ValueError("Cursor inválido")
+
+
+def cursor_sort_key(value, doc_id):
+    """Clave de orden (valor, ID) como la de Firestore: sin el campo (None) va primero."""
+    return (value is not None, value if value is not None else 0, doc_id)
+
+
+def _sorted_page(query, page_size, position, order_field, descending):
+    """Página ordenada en memoria cuando falta el índice compuesto.
+
+    Lee todos los documentos de la consulta (solo filtros, que no requieren
+    índice compuesto), los ordena por (order_field, ID) y corta después del
+    cursor: el orden y los cursores son los mismos que con el índice, así
+    que una paginación puede pasar de un modo al otro sin saltar filas.
+
+    Raises:
+        RuntimeError: Si la consulta supera FALLBACK_MAX_DOCS documentos
+    """
+    docs = list(query.limit(FALLBACK_MAX_DOCS + 1).stream())
+    if len(docs) > FALLBACK_MAX_DOCS:
+        raise RuntimeError(f"La consulta requiere un índice compuesto sobre '{order_field}' "
+                           "(despliega configuracion/firestore.indexes.json con "
+                           "'firebase deploy --only firestore:indexes')")
+    keyed = [(cursor_sort_key(doc.to_dict().get(order_field), doc.id), doc) for doc in docs]
+    keyed.sort(key=lambda pair: pair[0], reverse=descending)
+    if position is not None:
+        after = cursor_sort_key(*position)
+        keyed = [pair for pair in keyed if (pair[0] < after if descending else pair[0] > after)]
+    return [doc for _, doc in keyed[:page_size + 1]]
+
+
+def firestore_page(query, page_size: int, cursor: str = None,
+                   order_field: str = 'timestamp', descending: bool = True, model=None,
+                   index: tuple = None):
+    """Lee una página de `query` (ya filtrada) ordenada por `order_field`.
+
+    Si falta el índice compuesto (filtros + campo de orden) la página se
+    ordena en memoria con el mismo orden (ver `_sorted_page`), nunca por otro
+    criterio; los cursores sirven igual en ambos modos.
+
+    Args:
+        model: Clase de `models` con la que construir cada documento; sin
+            ella se devuelven dicts
+        index: (colección, campos filtrados) de la consulta; si se indica, un
+            índice faltante se recuerda para esa forma (ver `indexes`) y las
+            páginas siguientes no repiten la consulta que falla
+
+    Returns:
+        Tupla (documentos con 'id', siguiente cursor o None)
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    position = decode_cursor(cursor) if cursor else None
+    direction = 'DESCENDING' if descending else 'ASCENDING'
+
+    shape = IndexShape.of(index[0], index[1], order_field, descending) if index else None
+    if shape is not None and MISSING_INDEXES.is_missing(shape):
+        docs = _sorted_page(query, page_size, position, order_field, descending)
+    else:
+        page = query.order_by(order_field, direction=direction).order_by('__name__', direction=direction)
+        if position is not None:
+            page = page.start_after({order_field: position[0], '__name__': position[1]})
+        try:
+            # Un documento extra indica si hay otra página
+            docs = list(page.limit(page_size + 1).stream())
+        except Exception as e:
+            if not is_index_error(e):
+                raise
+            logger.warning("Índice compuesto %s no disponible (%s), ordenando en memoria",
+                           shape or order_field, e)
+            if shape is not None:
+                MISSING_INDEXES.mark_missing(shape)
+            docs = _sorted_page(query, page_size, position, order_field, descending)
+
+    items = []
+    for doc in docs[:page_size]:
+        if model is not None:
+            items.append(model.from_doc(doc.id, doc.to_dict()))
+            continue
+        data = doc.to_dict()
+        data['id'] = doc.id
+        items.append(data)
+    next_cursor = None
+    if len(docs) > page_size:
+        last = items[-1]
+        next_cursor = encode_cursor(last.get(order_field), last['id'])
+    return items, next_cursor
+
+
+def iter_pages(fetch_page, cursor: str = None):
+    """Genera páginas pidiéndolas de a una con `fetch_page(cursor)`.
+
+    Cada página es la respuesta de fetch_page; la iteración termina tras la
+    última página o tras una respuesta de error (que también se entrega).
+    """
+    while True:
+        page = fetch_page(cursor)
+        yield page
+        cursor = page.get('next_cursor')
+        if not page.get('success') or not cursor:
+            return
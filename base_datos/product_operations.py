@@ -1,52 +1,252 @@
 """Operaciones de productos."""
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from .db_base import DatabaseBase
+from .models import Product
+from .pagination import DEFAULT_PAGE_SIZE, PREFIX_END, firestore_page
 
 logger = logging.getLogger(__name__)
 
+# Productos por commit en la importación masiva (límite de Firestore: 500)
+IMPORT_BATCH_SIZE = 500
+# Batches de importación en vuelo a la vez
+IMPORT_MAX_PARALLEL_BATCHES = 4
+
+try:
+    from google.api_core import exceptions as gcp_exceptions
+except ImportError:
+    gcp_exceptions = None
+
 
 class ProductOperations(DatabaseBase):
     """Operaciones CRUD de productos."""
 
-    def create_product(self, store_id, product_data: dict):
-        """Crea producto."""
+    def _validate_new_product(self, store_id, product_data):
+        """Valida y normaliza (in place) los datos de un producto nuevo.
+
+        Returns:
+            Mensaje de error, o None si los datos son válidos.
+        """
+        if not store_id:
+            return "ID de tienda requerido"
+
+        if not isinstance(product_data, dict):
+            return "Datos de producto inválidos"
+
+        required = ['name', 'price']
+        for key in required:
+            if key not in product_data:
+                return f"Falta {key}"
+
+        name = str(product_data['name']).strip()
+        if not name or len(name) < 2:
+            return "El nombre del producto debe tener al menos 2 caracteres"
+
         try:
-            if not store_id:
-                return self._error_response("ID de tienda requerido")
-            
-            if not isinstance(product_data, dict):
-                return self._error_response("Datos de producto inválidos")
-            
-            required = ['name', 'price']
-            for key in required:
-                if key not in product_data:
-                    return self._error_response(f"Falta {key}")
+            price = float(product_data['price'])
+            if price < 0:
+                return "El precio no puede ser negativo"
+        except (ValueError, TypeError):
+            return "El precio debe ser un número válido"
 
-            name = str(product_data['name']).strip()
-            if not name or len(name) < 2:
-                return self._error_response("El nombre del producto debe tener al menos 2 caracteres")
-            
+        error = self._normalize_stock(product_data)
+        if error:
+            return error
+
+        # Los números se guardan como números (los productos antiguos los
+        # tienen como texto; `Product` los convierte al leerlos)
+        product_data['price'] = price
+        product_data['name'] = name
+        return None
+
+    def _normalize_stock(self, data):
+        """Convierte (in place) el stock a entero; vacío = sin control de stock."""
+        if 'stock' not in data:
+            return None
+        stock = data['stock']
+        if stock is None or (isinstance(stock, str) and not stock.strip()):
+            data.pop('stock')
+            return None
+        try:
+            stock = float(stock)
+        except (ValueError, TypeError):
+            return "El stock debe ser un número entero"
+        if not stock.is_integer() or stock < 0:
+            return "El stock debe ser un número entero no negativo"
+        data['stock'] = int(stock)
+        return None
+
+    def _validate_product_updates(self, updates):
+        """Valida y normaliza (in place) una actualización de producto.
+
+        Returns:
+            Mensaje de error, o None si los datos son válidos.
+        """
+        # Validar price si está presente
+        if 'price' in updates:
             try:
-                price = float(product_data['price'])
+                price = float(updates['price'])
                 if price < 0:
-                    return self._error_response("El precio no puede ser negativo")
+                    return "El precio no puede ser negativo"
+                updates['price'] = price
             except (ValueError, TypeError):
-                return self._error_response("El precio debe ser un número válido")
+                return "El precio debe ser un número válido"
+
+        if 'stock' in updates:
+            error = self._normalize_stock(updates)
+            if error:
+                return error
+
+        # Validar name si está presente
+        if 'name' in updates:
+            name = str(updates['name']).strip()
+            if not name or len(name) < 2:
+                return "El nombre del producto debe tener al menos 2 caracteres"
+            updates['name'] = name
+        return None
+
+    def _import_chunks(self, store_id, rows, errors: list, batch_size: int = IMPORT_BATCH_SIZE):
+        """Valida las filas de una importación y las agrupa en tandas.
+
+        Args:
+            rows: Iterable de (nº de línea, dict); la columna `id` opcional es
+                el ID del producto (reimportar el mismo archivo no duplica)
+            errors: Lista donde se añade {'line', 'error'} por cada fila inválida
+
+        Yields:
+            Listas de (línea, ID o None, datos) de hasta `batch_size` productos
+        """
+        chunk = []
+        for line, row in rows:
+            data = {key: value for key, value in dict(row).items() if key != 'id'}
+            error = self._validate_new_product(store_id, data)
+            if error:
+                errors.append({'line': line, 'error': error})
+                continue
+            product_id = str(row.get('id') or '').strip() or None
+            chunk.append((line, product_id, data))
+            if len(chunk) >= batch_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def import_products(self, store_id, rows, progress=None):
+        """Crea (o reemplaza, si traen `id`) muchos productos con commits por tandas.
+
+        Las filas se leen en streaming y se validan con las mismas reglas que
+        `create_product`; cada tanda de IMPORT_BATCH_SIZE productos va en un
+        WriteBatch y hasta IMPORT_MAX_PARALLEL_BATCHES se confirman en
+        paralelo. Una fila inválida o una tanda fallida no detiene el resto.
+
+        Args:
+            rows: Iterable de (nº de línea, dict con name, price, stock, ...)
+            progress: Función llamada con (importados, errores) tras cada tanda
+                (desde los hilos de commit)
+
+        Returns:
+            Dict con imported y errors ([{'line', 'error'}], por línea)
+        """
+        try:
+            if not store_id:
+                return self._error_response("ID de tienda requerido")
+            if not self.stores_ref:
+                return self._error_response("Firestore no inicializado")
+
+            products_col = self.stores_ref.document(str(store_id)).collection('products')
+            errors = []
+            imported = [0]
+            lock = threading.Lock()
+            # Limita las tandas leídas pero sin confirmar (memoria acotada)
+            slots = threading.BoundedSemaphore(IMPORT_MAX_PARALLEL_BATCHES)
+
+            def commit(chunk):
+                try:
+                    batch = self.db.batch()
+                    for _, product_id, data in chunk:
+                        ref = products_col.document(product_id) if product_id else products_col.document()
+                        batch.set(ref, data)
+                    batch.commit()
+                    with lock:
+                        imported[0] += len(chunk)
+                except Exception as e:
+                    logger.warning("Error confirmando tanda de productos: %s", e)
+                    with lock:
+                        errors.extend({'line': line, 'error': str(e)} for line, _, _ in chunk)
+                finally:
+                    slots.release()
+                if progress is not None:
+                    progress(imported[0], len(errors))
+
+            with ThreadPoolExecutor(max_workers=IMPORT_MAX_PARALLEL_BATCHES,
+                                    thread_name_prefix="product-import") as pool:
+                for chunk in self._import_chunks(store_id, rows, errors):
+                    slots.acquire()
+                    pool.submit(commit, chunk)
+            errors.sort(key=lambda e: e['line'])
+            return self._success_response(imported=imported[0], errors=errors)
+        except Exception as e:
+            logger.exception("Error en import_products: %s", e)
+            return self._error_response(str(e))
+
+    def create_product(self, store_id, product_data: dict, product_id=None):
+        """Crea producto.
+
+        Args:
+            product_id: ID a usar (clave de idempotencia); por defecto uno nuevo
+        """
+        try:
+            error = self._validate_new_product(store_id, product_data)
+            if error:
+                return self._rejected_response(error)
 
             if not self.stores_ref:
                 return self._error_response("Firestore no inicializado")
 
             products_col = self.stores_ref.document(str(store_id)).collection('products')
-            doc_ref = products_col.document()
-            # Asegurar que price sea string para consistencia
-            product_data['price'] = str(price)
-            product_data['name'] = name
+            doc_ref = products_col.document(str(product_id)) if product_id else products_col.document()
             doc_ref.set(product_data)
             
             return self._success_response(product_id=doc_ref.id)
         except Exception as e:
             logger.exception("Error en create_product: %s", e)
-            return self._error_response(str(e))
+            return self._exception_response(e)
+
+    def write_products(self, writes):
+        """Aplica varias altas, cambios y bajas de productos en un solo WriteBatch.
+
+        El commit es atómico: si una escritura falla (p. ej. actualizar un
+        producto que ya no existe) no se aplica ninguna y quien llama puede
+        reintentarlas de una en una.
+
+        Args:
+            writes: Lista de (op, args): `op` es create_product, update_product
+                o delete_product y `args` los argumentos de ese método, ya
+                validados (como mucho IMPORT_BATCH_SIZE)
+        """
+        try:
+            if not self.stores_ref:
+                return self._error_response("Firestore no inicializado")
+
+            batch = self.db.batch()
+            for op, args in writes:
+                products_col = self.stores_ref.document(str(args['store_id'])).collection('products')
+                if op == 'create_product':
+                    product_id = args.get('product_id')
+                    ref = products_col.document(str(product_id)) if product_id else products_col.document()
+                    batch.set(ref, args['product_data'])
+                elif op == 'update_product':
+                    batch.update(products_col.document(str(args['product_id'])), args['updates'])
+                elif op == 'delete_product':
+                    batch.delete(products_col.document(str(args['product_id'])))
+                else:
+                    return self._error_response(f"Operación no admitida en lote: {op}")
+            batch.commit()
+            return self._success_response(written=len(writes))
+        except Exception as e:
+            logger.exception("Error en write_products: %s", e)
+            return self._exception_response(e)
 
     def get_store_products(self, store_id):
         """Obtiene productos de tienda."""
@@ -59,12 +259,68 @@ class ProductOperations(DatabaseBase):
             
             products_col = self.stores_ref.document(str(store_id)).collection('products')
             docs = products_col.stream()
-            products = [{'id': doc.id, **doc.to_dict()} for doc in docs]
+            products = [Product.from_doc(doc.id, doc.to_dict()) for doc in docs]
             return self._success_response(products=products)
         except Exception as e:
             logger.exception("Error en get_store_products: %s", e)
             return self._error_response(str(e))
 
+    def get_products_by_ids(self, store_id, product_ids):
+        """Obtiene solo los productos indicados (una lectura `get_all`).
+
+        Los IDs inexistentes se omiten; se conserva el orden de `product_ids`.
+        """
+        try:
+            if not store_id:
+                return self._error_response("ID de tienda requerido")
+
+            if not self.stores_ref:
+                return self._error_response("Firestore no inicializado")
+
+            product_ids = [str(pid) for pid in product_ids]
+            products_col = self.stores_ref.document(str(store_id)).collection('products')
+            found = {}
+            if product_ids:
+                refs = [products_col.document(pid) for pid in product_ids]
+                for snapshot in self.db.get_all(refs):
+                    if snapshot.exists:
+                        found[snapshot.id] = Product.from_doc(snapshot.id, snapshot.to_dict())
+            return self._success_response(products=[found[pid] for pid in product_ids if pid in found])
+        except Exception as e:
+            logger.exception("Error en get_products_by_ids: %s", e)
+            return self._error_response(str(e))
+
+    def get_products_page(self, store_id, page_size=DEFAULT_PAGE_SIZE, cursor=None,
+                          name_prefix=None, descending=False):
+        """Obtiene una página de productos ordenados por nombre.
+
+        Args:
+            cursor: Token `next_cursor` de la página anterior (None = primera)
+            name_prefix: Solo productos cuyo nombre empieza así (distingue mayúsculas)
+            descending: True = orden Z-A
+
+        Returns:
+            Dict con products y next_cursor (None si no hay más páginas)
+        """
+        try:
+            if not store_id:
+                return self._error_response("ID de tienda requerido")
+            if not self.stores_ref:
+                return self._error_response("Firestore no inicializado")
+
+            query = self.stores_ref.document(str(store_id)).collection('products')
+            if name_prefix:
+                query = query.where('name', '>=', name_prefix).where('name', '<', name_prefix + PREFIX_END)
+            products, next_cursor = firestore_page(query, int(page_size), cursor,
+                                                   order_field='name', descending=descending,
+                                                   model=Product)
+            return self._success_response(products=products, next_cursor=next_cursor)
+        except ValueError as e:
+            return self._error_response(str(e))
+        except Exception as e:
+            logger.exception("Error en get_products_page: %s", e)
+            return self._error_response(str(e))
+
     def update_product(self, store_id, product_id, updates: dict):
         """Actualiza producto."""
         try:
@@ -77,29 +333,18 @@ class ProductOperations(DatabaseBase):
             if not self.stores_ref:
                 return self._error_response("Firestore no inicializado")
             
-            # Validar price si está presente
-            if 'price' in updates:
-                try:
-                    price = float(updates['price'])
-                    if price < 0:
-                        return self._error_response("El precio no puede ser negativo")
-                    updates['price'] = str(price)
-                except (ValueError, TypeError):
-                    return self._error_response("El precio debe ser un número válido")
-            
-            # Validar name si está presente
-            if 'name' in updates:
-                name = str(updates['name']).strip()
-                if not name or len(name) < 2:
-                    return self._error_response("El nombre del producto debe tener al menos 2 caracteres")
-                updates['name'] = name
+            error = self._validate_product_updates(updates)
+            if error:
+                return self._rejected_response(error)
             
             products_col = self.stores_ref.document(str(store_id)).collection('products')
             products_col.document(str(product_id)).update(updates)
             return self._success_response()
         except Exception as e:
+            if gcp_exceptions and isinstance(e, gcp_exceptions.NotFound):
+                return self._rejected_response("Producto no encontrado")
             logger.exception("Error en update_product: %s", e)
-            return self._error_response(str(e))
+            return self._exception_response(e)
 
     def delete_product(self, store_id, product_id):
         """Elimina producto."""
@@ -115,4 +360,4 @@ class ProductOperations(DatabaseBase):
             return self._success_response()
         except Exception as e:
             logger.exception("Error en delete_product: %s", e)
-            return self._error_response(str(e))
+            return self._exception_response(e)
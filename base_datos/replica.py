@@ -0,0 +1,263 @@
+"""Réplica en memoria de los datos de la tienda activa.
+
+Guarda productos, empleados y las ventas más recientes de una tienda y
+avisa de cada alta, cambio o baja con un evento de delta:
+
+    {'store_id', 'collection', 'change': 'added'|'modified'|'removed', 'id', 'doc'}
+
+Con Firestore la réplica se alimenta con listeners `on_snapshot`: los
+cambios hechos por otro hilo, otra caja u otro proceso llegan solos y las
+vistas se dibujan sin volver a consultar. Las colecciones sin listener (todas
+con la base SQLite local; las ventas si están particionadas por mes) se
+cargan una vez con el cliente, en un hilo aparte (`load_async`), y el
+servicio les aplica cada escritura propia con `apply`/`merge` a partir del
+resultado de la escritura, sin volver a leerlas.
+
+Los documentos se guardan como modelos de `models` (de solo lectura), así
+que las lecturas los entregan sin copiarlos.
+"""
+import logging
+import threading
+
+from .models import Product, Sale, StaffMember
+from .pagination import cursor_sort_key, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+REPLICA_COLLECTIONS = ('products', 'staff', 'sales')
+REPLICA_MODELS = {'products': Product, 'staff': StaffMember, 'sales': Sale}
+
+# Ventas más recientes que se mantienen en la réplica
+REPLICA_SALES_LIMIT = 500
+
+_CHANGE_TYPES = {'ADDED': 'added', 'MODIFIED': 'modified', 'REMOVED': 'removed'}
+
+
+class StoreReplica:
+    """Copia local de productos, empleados y ventas recientes de una tienda."""
+
+    def __init__(self, store_id, on_change=None, sales_limit: int = REPLICA_SALES_LIMIT):
+        """Crea la réplica vacía.
+
+        Args:
+            on_change: Función llamada con cada evento de delta
+            sales_limit: Ventas más recientes que se replican
+        """
+        self.store_id = str(store_id)
+        self.sales_limit = sales_limit
+        self._on_change = on_change
+        self._lock = threading.RLock()
+        self._docs = {name: {} for name in REPLICA_COLLECTIONS}
+        self._ready = set()
+        self._watches = []
+        self._live = set()
+        self._loader = None
+
+    @property
+    def live(self) -> bool:
+        """True si la réplica recibe cambios por listeners de Firestore."""
+        return bool(self._watches)
+
+    def is_live(self, collection: str) -> bool:
+        """True si la colección recibe sus cambios por un listener."""
+        return collection in self._live
+
+    def is_ready(self, collection: str) -> bool:
+        return collection in self._ready
+
+    def sales_complete(self) -> bool:
+        """True si la réplica contiene todas las ventas de la tienda."""
+        with self._lock:
+            return len(self._docs['sales']) < self.sales_limit
+
+    # === Carga ===
+    def attach_firestore(self, db, collections=REPLICA_COLLECTIONS):
+        """Suscribe listeners `on_snapshot` a productos, empleados y ventas recientes.
+
+        Args:
+            collections: Colecciones a escuchar; las ventas particionadas por
+                mes no tienen una única consulta que escuchar y se cargan con
+                `load_from`
+        """
+        store_doc = db.collection('stores').document(self.store_id)
+        sources = {
+            'products': lambda: store_doc.collection('products'),
+            'staff': lambda: store_doc.collection('staff'),
+            'sales': lambda: (db.collection('sales').where('store_id', '==', self.store_id)
+                              .order_by('timestamp', direction='DESCENDING').limit(self.sales_limit)),
+        }
+        for collection in collections:
+            self._watches.append(sources[collection]().on_snapshot(self._snapshot_handler(collection)))
+            self._live.add(collection)
+
+    def _snapshot_handler(self, collection):
+        def on_snapshot(docs, changes, read_time):
+            # Se ejecuta en el hilo del listener de Firestore
+            for change in changes:
+                doc = change.document
+                kind = _CHANGE_TYPES.get(change.type.name)
+                if kind == 'removed':
+                    self.apply(collection, kind, doc.id)
+                elif kind:
+                    self.apply(collection, kind, doc.id, doc.to_dict())
+            self._ready.add(collection)
+        return on_snapshot
+
+    def load_from(self, client, collections=REPLICA_COLLECTIONS):
+        """Carga (o recarga) colecciones con las lecturas normales del cliente.
+
+        Emite un delta por cada documento que cambió respecto de la réplica.
+        """
+        readers = {
+            'products': lambda: (client.get_store_products(self.store_id), 'products'),
+            'staff': lambda: (client.get_store_staff(self.store_id), 'staff'),
+            'sales': lambda: (client.get_store_sales(self.store_id, self.sales_limit), 'sales'),
+        }
+        for collection in collections:
+            res, key = readers[collection]()
+            if isinstance(res, dict) and res.get('success'):
+                self.replace(collection, res.get(key, []))
+            else:
+                logger.warning("No se pudo replicar %s de %s: %s", collection, self.store_id,
+                               res.get('error') if isinstance(res, dict) else res)
+
+    def load_async(self, client, collections=REPLICA_COLLECTIONS):
+        """Como `load_from`, en un hilo aparte para no bloquear la UI.
+
+        Hasta que termina, `is_ready` es False y las lecturas van a la base.
+        """
+        self._ready.difference_update(collections)
+
+        def load():
+            try:
+                self.load_from(client, collections)
+            except Exception as e:
+                logger.warning("No se pudo replicar la tienda %s: %s", self.store_id, e)
+
+        self._loader = threading.Thread(target=load, name=f"replica-{self.store_id}", daemon=True)
+        self._loader.start()
+        return self._loader
+
+    def wait_loaded(self, timeout: float = None) -> bool:
+        """Espera a que termine `load_async`. Retorna False si sigue cargando."""
+        loader = self._loader
+        if loader is not None:
+            loader.join(timeout)
+            return not loader.is_alive()
+        return True
+
+    def close(self):
+        """Cancela los listeners."""
+        watches, self._watches = self._watches, []
+        self._live.clear()
+        for watch in watches:
+            try:
+                watch.unsubscribe()
+            except Exception as e:
+                logger.warning("Error cancelando listener: %s", e)
+
+    # === Cambios ===
+    def apply(self, collection: str, change: str, doc_id, doc: dict = None):
+        """Aplica un cambio de un documento y emite su delta."""
+        doc_id = str(doc_id)
+        if change != 'removed':
+            doc = REPLICA_MODELS[collection].from_doc(doc_id, doc)
+        evicted = None
+        with self._lock:
+            docs = self._docs[collection]
+            if change == 'removed':
+                if docs.pop(doc_id, None) is None:
+                    return
+            else:
+                docs[doc_id] = doc
+                if collection == 'sales' and len(docs) > self.sales_limit:
+                    # Solo se guardan las más recientes: sale la más antigua
+                    evicted = min(docs.values(), key=lambda d: cursor_sort_key(d.timestamp, d.id)).id
+                    docs.pop(evicted)
+                    if evicted == doc_id:
+                        return
+        self._emit(collection, change, doc_id, doc)
+        if evicted is not None:
+            self._emit(collection, 'removed', evicted, None)
+
+    def merge(self, collection: str, doc_id, updates: dict):
+        """Aplica una actualización parcial a un documento ya replicado."""
+        with self._lock:
+            current = self._docs[collection].get(str(doc_id))
+            doc = {**current, **updates} if current is not None else None
+        if doc is not None:
+            self.apply(collection, 'modified', doc_id, doc)
+
+    def replace(self, collection: str, new_docs):
+        """Sustituye la colección completa, emitiendo solo las diferencias."""
+        model = REPLICA_MODELS[collection]
+        new = {str(doc['id']): model.from_doc(doc['id'], doc) for doc in new_docs}
+        with self._lock:
+            old = self._docs[collection]
+            self._docs[collection] = new
+            self._ready.add(collection)
+        for doc_id in old.keys() - new.keys():
+            self._emit(collection, 'removed', doc_id, None)
+        for doc_id, doc in new.items():
+            if doc_id not in old:
+                self._emit(collection, 'added', doc_id, doc)
+            elif old[doc_id] != doc:
+                self._emit(collection, 'modified', doc_id, doc)
+
+    def _emit(self, collection, change, doc_id, doc):
+        if self._on_change is None:
+            return
+        try:
+            self._on_change({'store_id': self.store_id, 'collection': collection,
+                             'change': change, 'id': doc_id, 'doc': doc})
+        except Exception as e:
+            logger.warning("Error notificando cambio de la réplica: %s", e)
+
+    # === Lecturas ===
+    def get(self, collection: str, doc_id):
+        """Documento replicado, o None si no está."""
+        with self._lock:
+            return self._docs[collection].get(str(doc_id))
+
+    def list(self, collection: str):
+        """Documentos de la colección (ventas: más recientes primero)."""
+        with self._lock:
+            docs = list(self._docs[collection].values())
+        if collection == 'sales':
+            docs.sort(key=lambda d: cursor_sort_key(d.timestamp, d.id), reverse=True)
+        return docs
+
+    def page(self, collection: str, order_field: str, page_size: int, cursor: str = None,
+             descending: bool = True, predicate=None, complete: bool = True):
+        """Página ordenada por (order_field, id) con el mismo cursor que la base.
+
+        Args:
+            predicate: Filtro opcional sobre cada documento
+            complete: False si la réplica solo tiene los documentos más
+                recientes; entonces solo se responde si la página entera está
+                dentro de ella (orden descendente)
+
+        Returns:
+            Tupla (documentos, siguiente cursor), o None si la réplica no
+            alcanza para responder y hay que ir a la base de datos
+
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        if not complete and not descending:
+            return None
+        with self._lock:
+            docs = [doc for doc in self._docs[collection].values()
+                    if predicate is None or predicate(doc)]
+        keyed = sorted(((cursor_sort_key(getattr(d, order_field), d.id), d) for d in docs),
+                       key=lambda pair: pair[0], reverse=descending)
+        if cursor:
+            after = cursor_sort_key(*decode_cursor(cursor))
+            keyed = [pair for pair in keyed if (pair[0] < after if descending else pair[0] > after)]
+        if len(keyed) <= page_size and not complete:
+            return None
+        items = [doc for _, doc in keyed[:page_size]]
+        next_cursor = None
+        if len(keyed) > page_size:
+            next_cursor = encode_cursor(getattr(items[-1], order_field), items[-1].id)
+        return items, next_cursor
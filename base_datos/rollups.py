@@ -0,0 +1,138 @@
+"""Agregados incrementales de ventas (totales, por día y por producto).
+
+Cada venta suma sus importes a unos pocos documentos por tienda, de modo que
+las métricas se leen sin descargar el historial de ventas:
+
+- stores/{id}/rollups/totals: ingresos y número de ventas de todo el historial
+- stores/{id}/rollups/day-YYYY-MM-DD: lo mismo para un día
+- stores/{id}/product_rollups/{product_id}: unidades e ingresos por producto
+"""
+
+ROLLUPS_COLLECTION = 'rollups'
+PRODUCT_ROLLUPS_COLLECTION = 'product_rollups'
+TOTALS_DOC = 'totals'
+
+
+def day_key(timestamp) -> str:
+    """Clave de día (YYYY-MM-DD) de una venta."""
+    if timestamp is None:
+        return 'unknown'
+    if isinstance(timestamp, str):
+        return timestamp[:10]
+    return timestamp.strftime('%Y-%m-%d')
+
+
+def compute_deltas(sales, sign: int = 1) -> dict:
+    """Agrupa las ventas en los incrementos a aplicar a cada agregado.
+
+    Args:
+        sales: Documentos de venta (con total, quantity, product_id, timestamp)
+        sign: 1 al registrar ventas, -1 al eliminarlas
+    """
+    totals = {'revenue': 0.0, 'count': 0}
+    days = {}
+    products = {}
+    for sale in sales:
+        revenue = float(sale.get('total', 0) or 0) * sign
+        quantity = int(sale.get('quantity', 0) or 0) * sign
+        totals['revenue'] += revenue
+        totals['count'] += sign
+
+        day = days.setdefault(day_key(sale.get('timestamp')), {'revenue': 0.0, 'count': 0})
+        day['revenue'] += revenue
+        day['count'] += sign
+
+        product_id = sale.get('product_id')
+        if product_id:
+            product = products.setdefault(str(product_id), {
+                'quantity': 0, 'revenue': 0.0, 'count': 0,
+                'product_name': sale.get('product_name', '') or ''
+            })
+            product['quantity'] += quantity
+            product['revenue'] += revenue
+            product['count'] += sign
+            if not product['product_name'] and sale.get('product_name'):
+                product['product_name'] = sale['product_name']
+    return {'totals': totals, 'days': days, 'products': products}
+
+
+def firestore_rollup_writes(stores_ref, store_id, deltas: dict, increment):
+    """Genera (referencia, datos) para aplicar con `set(..., merge=True)`.
+
+    Args:
+        increment: Constructor de incrementos atómicos (firestore.Increment)
+    """
+    store_doc = stores_ref.document(str(store_id))
+    rollups = store_doc.collection(ROLLUPS_COLLECTION)
+    totals = deltas['totals']
+    yield rollups.document(TOTALS_DOC), {
+        'revenue': increment(totals['revenue']),
+        'count': increment(totals['count']),
+    }
+    for day, values in deltas['days'].items():
+        yield rollups.document(f'day-{day}'), {
+            'day': day,
+            'revenue': increment(values['revenue']),
+            'count': increment(values['count']),
+        }
+    product_rollups = store_doc.collection(PRODUCT_ROLLUPS_COLLECTION)
+    for product_id, values in deltas['products'].items():
+        data = {
+            'product_id': product_id,
+            'quantity': increment(values['quantity']),
+            'revenue': increment(values['revenue']),
+            'count': increment(values['count']),
+        }
+        if values['product_name']:
+            data['product_name'] = values['product_name']
+        yield product_rollups.document(product_id), data
+
+
+# Campos numéricos de los agregados (los que se incrementan)
+ROLLUP_COUNTERS = ('revenue', 'quantity', 'count')
+
+
+def rollup_corrections(current: dict, targets: dict) -> dict:
+    """Incrementos que llevan cada agregado de `current` a `targets`.
+
+    Args:
+        current: {clave: documento} con los agregados tal como están
+        targets: {clave: documento} recalculados desde las ventas
+
+    Returns:
+        {clave: {contador: diferencia}} solo con diferencias distintas de
+        cero; los agregados que ya no tienen ventas vuelven a cero
+    """
+    corrections = {}
+    for key in current.keys() | targets.keys():
+        have = current.get(key) or {}
+        want = targets.get(key) or {}
+        diff = {}
+        for field in ROLLUP_COUNTERS:
+            if field in have or field in want:
+                delta = (want.get(field, 0) or 0) - (have.get(field, 0) or 0)
+                if delta:
+                    diff[field] = delta
+        if diff:
+            corrections[key] = diff
+    return corrections
+
+
+def build_summary(totals: dict, top_products) -> dict:
+    """Arma el resumen con el mismo formato que calculate_* y get_top_products."""
+    revenue = totals.get('revenue', 0) or 0
+    count = totals.get('count', 0) or 0
+    return {
+        'revenue': revenue,
+        'count': count,
+        'average': revenue / count if count > 0 else 0,
+        'top_products': [
+            {
+                'product_id': p.get('product_id'),
+                'quantity': p.get('quantity', 0),
+                'revenue': p.get('revenue', 0),
+                'product_name': p.get('product_name', 'N/A') or 'N/A',
+            }
+            for p in top_products
+        ],
+    }
@@ -1,168 +1,479 @@
 """Operaciones de ventas."""
 import logging
+import threading
+import time
 from datetime import datetime
 from .db_base import DatabaseBase
+from .models import Sale
+from .rollups import compute_deltas, firestore_rollup_writes
+from .pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor, firestore_page, iter_pages
+from .sales_partitions import (
+    PARTITION_INDEX, partition_collection, partition_month, period_partitions, store_months,
+    store_partitions,
+)
 
 logger = logging.getLogger(__name__)
 
-# Importar excepción de Firestore para manejar errores de índice
 try:
-    from google.api_core import exceptions as gcp_exceptions
+    from google.cloud import firestore as gc_firestore
 except ImportError:
-    gcp_exceptions = None
+    gc_firestore = None
+
+# Intentos de la transacción de venta ante contención
+SALE_TRANSACTION_ATTEMPTS = 5
+
+# Líneas máximas por ticket. Cada línea, cada stock y cada agregado de producto
+# es una escritura, y Firestore admite 500 por commit.
+MAX_BASKET_LINES = 150
+
+# Vigencia de la lista de meses con ventas de cada tienda (particionadas):
+# los meses que abren otras cajas aparecen en las páginas tras este tiempo
+PARTITION_MONTHS_TTL_SECONDS = 60.0
+
+
+class SaleRejected(Exception):
+    """Aborta la transacción de venta con un mensaje para el usuario."""
 
 
 class SalesOperations(DatabaseBase):
     """Operaciones de gestión de ventas con persistencia."""
 
+    def __init__(self, db=None, partitioned: bool = False):
+        """Inicializa con referencia a Firestore.
+
+        Args:
+            db: Cliente de Firestore (firestore.client())
+            partitioned: Guardar las ventas en stores/{id}/sales_months/{yyyymm}/sales
+                (ver `sales_partitions`) en lugar de la colección `sales`
+        """
+        super().__init__(db)
+        self.partitioned = partitioned
+        self._months = {}  # store_id -> (vence, set de meses)
+        self._months_lock = threading.Lock()
+
+    def _sales_collection(self, store_id, timestamp):
+        """Colección donde se guarda una venta: su partición mensual o `sales`."""
+        if self.partitioned:
+            month = partition_month(timestamp)
+            with self._months_lock:
+                cached = self._months.get(str(store_id))
+                if cached is not None:
+                    cached[1].add(month)
+            return partition_collection(self.stores_ref.document(str(store_id)), month)
+        return self.sales_ref
+
+    def _store_months(self, store_id) -> list:
+        """Meses con ventas de la tienda, listados como mucho una vez por TTL.
+
+        Las ventas propias añaden su mes a la lista al escribirse, así que
+        el mes en curso aparece enseguida sin volver a listar.
+        """
+        store_id = str(store_id)
+        now = time.monotonic()
+        with self._months_lock:
+            cached = self._months.get(store_id)
+            if cached is not None and cached[0] > now:
+                return sorted(cached[1])
+        months = set(store_months(self.stores_ref.document(store_id)))
+        with self._months_lock:
+            self._months[store_id] = (now + PARTITION_MONTHS_TTL_SECONDS, months)
+        return sorted(months)
+
+    def _build_sale_record(self, store_id, sale_data: dict):
+        """Valida los datos de una venta y construye el documento a guardar.
+
+        `sale_data['timestamp']` (datetime) conserva la hora original de una
+        venta registrada sin conexión; si falta se usa la hora actual.
+
+        Returns:
+            Tupla (registro, error); `error` es None si los datos son válidos.
+        """
+        if not store_id:
+            return None, "ID de tienda requerido"
+        
+        required = ['product_id', 'quantity', 'unit_price']
+        for key in required:
+            if key not in sale_data:
+                return None, f"Falta {key}"
+
+        try:
+            quantity = int(sale_data['quantity'])
+            unit_price = float(sale_data['unit_price'])
+        except (ValueError, TypeError):
+            return None, "Cantidad y precio deben ser válidos"
+
+        if quantity <= 0 or unit_price < 0:
+            return None, "Cantidad y precio deben ser válidos"
+
+        sale_record = {
+            'store_id': str(store_id),
+            'product_id': str(sale_data['product_id']),
+            'product_name': str(sale_data.get('product_name', '')),
+            'quantity': quantity,
+            'unit_price': unit_price,
+            'total': quantity * unit_price,
+            'staff_id': sale_data.get('staff_id'),
+            'notes': sale_data.get('notes', ''),
+            'timestamp': (sale_data['timestamp'] if isinstance(sale_data.get('timestamp'), datetime)
+                          else self._get_timestamp())
+        }
+        return sale_record, None
+
     def record_sale(self, store_id, sale_data: dict):
         """Registra una venta."""
         try:
             if not self.sales_ref:
                 return self._error_response("Firestore no inicializado")
             
-            if not store_id:
-                return self._error_response("ID de tienda requerido")
-            
-            required = ['product_id', 'quantity', 'unit_price']
-            for key in required:
-                if key not in sale_data:
-                    return self._error_response(f"Falta {key}")
+            sale_record, error = self._build_sale_record(store_id, sale_data)
+            if error:
+                return self._error_response(error)
 
-            quantity = int(sale_data['quantity'])
-            unit_price = float(sale_data['unit_price'])
-            
-            if quantity <= 0 or unit_price < 0:
-                return self._error_response("Cantidad y precio deben ser válidos")
-
-            sale_record = {
-                'store_id': str(store_id),
-                'product_id': str(sale_data['product_id']),
-                'product_name': str(sale_data.get('product_name', '')),
-                'quantity': quantity,
-                'unit_price': unit_price,
-                'total': quantity * unit_price,
-                'staff_id': sale_data.get('staff_id'),
-                'notes': sale_data.get('notes', ''),
-                'timestamp': self._get_timestamp()
-            }
-
-            doc_ref = self.sales_ref.document()
-            doc_ref.set(sale_record)
+            doc_ref = self._sales_collection(store_id, sale_record['timestamp']).document()
+            batch = self.db.batch()
+            batch.set(doc_ref, sale_record)
+            self._write_rollups(batch, store_id, [sale_record])
+            batch.commit()
             
             return self._success_response(sale_id=doc_ref.id)
         except Exception as e:
             logger.exception("Error en record_sale: %s", e)
             return self._error_response(str(e))
 
+    def _write_rollups(self, writer, store_id, sales, sign: int = 1):
+        """Añade a `writer` (batch o transacción) los incrementos de los agregados."""
+        if gc_firestore is None:
+            return
+        deltas = compute_deltas(sales, sign)
+        for ref, data in firestore_rollup_writes(self.stores_ref, store_id, deltas, gc_firestore.Increment):
+            writer.set(ref, data, merge=True)
+
+    def _stock_after_sale(self, product: dict, quantity: int):
+        """Calcula el stock que queda tras vender `quantity` unidades.
+
+        Returns:
+            Tupla (nuevo_stock, error). `nuevo_stock` es None si el producto
+            no lleva control de stock (campo ausente o no numérico).
+        """
+        stock = product.get('stock')
+        if stock is None:
+            return None, None
+        try:
+            stock_int = int(stock)
+        except (ValueError, TypeError):
+            return None, None
+        if stock_int < quantity:
+            return None, f"Stock insuficiente. Disponible: {stock_int}"
+        return stock_int - quantity, None
+
+    def record_sale_with_stock(self, store_id, sale_data: dict):
+        """Registra una venta y descuenta stock en una única transacción.
+
+        Lee solo el documento del producto, comprueba el stock y escribe la
+        venta junto con el decremento. Firestore reintenta la transacción si
+        otro terminal modifica el producto a la vez, así no se sobrevende.
+
+        `sale_data['sale_id']` es una clave de idempotencia: si la venta ya
+        existe no se vuelve a registrar (respuesta con duplicate=True).
+
+        La respuesta incluye el documento guardado en `sale`.
+        """
+        try:
+            if not self.sales_ref or not self.stores_ref:
+                return self._error_response("Firestore no inicializado")
+            if gc_firestore is None:
+                return self._error_response("Transacciones de Firestore no disponibles")
+
+            sale_record, error = self._build_sale_record(store_id, sale_data)
+            if error:
+                return self._rejected_response(error)
+
+            product_ref = (self.stores_ref.document(str(store_id))
+                           .collection('products').document(sale_record['product_id']))
+            sale_id = sale_data.get('sale_id')
+            sales_col = self._sales_collection(store_id, sale_record['timestamp'])
+            sale_ref = sales_col.document(str(sale_id)) if sale_id else sales_col.document()
+            quantity = sale_record['quantity']
+            duplicate = []
+
+            @gc_firestore.transactional
+            def run(transaction):
+                if sale_id and sale_ref.get(transaction=transaction).exists:
+                    duplicate.append(True)
+                    return None
+                snapshot = product_ref.get(transaction=transaction)
+                if not snapshot.exists:
+                    raise SaleRejected("Producto no encontrado")
+                product = snapshot.to_dict()
+                new_stock, error = self._stock_after_sale(product, quantity)
+                if error:
+                    raise SaleRejected(error)
+                transaction.set(sale_ref, sale_record)
+                self._write_rollups(transaction, store_id, [sale_record])
+                if new_stock is not None:
+                    if isinstance(product.get('stock'), (int, float)):
+                        transaction.update(product_ref, {'stock': gc_firestore.Increment(-quantity)})
+                    else:
+                        # Stock guardado como texto: se mantiene el formato
+                        transaction.update(product_ref, {'stock': str(new_stock)})
+                return new_stock
+
+            new_stock = run(self.db.transaction(max_attempts=SALE_TRANSACTION_ATTEMPTS))
+            if duplicate:
+                return self._success_response(sale_id=sale_ref.id, stock=None, duplicate=True)
+            return self._success_response(sale_id=sale_ref.id, stock=new_stock, sale=sale_record)
+        except SaleRejected as e:
+            return self._rejected_response(str(e))
+        except Exception as e:
+            logger.exception("Error en record_sale_with_stock: %s", e)
+            return self._exception_response(e)
+
+    def _build_basket_records(self, store_id, receipt_id, items, extra: dict = None):
+        """Construye los documentos de las líneas de un ticket.
+
+        Cada línea es una venta normal (así la listan las vistas y métricas)
+        con `receipt_id` y `line` para agruparlas.
+
+        Returns:
+            Tupla (registros, cantidades_por_producto, error).
+        """
+        if not isinstance(items, (list, tuple)) or not items:
+            return None, None, "El ticket no tiene productos"
+        if len(items) > MAX_BASKET_LINES:
+            return None, None, f"El ticket admite como máximo {MAX_BASKET_LINES} líneas"
+
+        extra = extra or {}
+        records = []
+        demand = {}
+        timestamp = None
+        for line, item in enumerate(items, start=1):
+            record, error = self._build_sale_record(store_id, {**extra, **item})
+            if error:
+                return None, None, f"Línea {line}: {error}"
+            # Todas las líneas con la hora de la primera
+            timestamp = timestamp or record['timestamp']
+            record.update({'receipt_id': receipt_id, 'line': line, 'timestamp': timestamp})
+            records.append(record)
+            demand[record['product_id']] = demand.get(record['product_id'], 0) + record['quantity']
+        return records, demand, None
+
+    def record_basket(self, store_id, items: list, staff_id=None, notes: str = '', receipt_id=None):
+        """Registra un ticket de varias líneas con un solo commit.
+
+        Todas las líneas y los decrementos de stock se escriben en la misma
+        transacción (un único commit atómico, como un WriteBatch), tras leer
+        los productos implicados con una sola llamada `get_all`.
+
+        Args:
+            items: Lista de dicts con product_id, quantity, unit_price y
+                opcionalmente product_name
+            receipt_id: Clave de idempotencia; si el ticket ya existe no se
+                vuelve a registrar (respuesta con duplicate=True)
+
+        La respuesta incluye los documentos de las líneas en `sales`, en el
+        orden de `line_ids`.
+        """
+        try:
+            if not self.sales_ref or not self.stores_ref:
+                return self._error_response("Firestore no inicializado")
+            if gc_firestore is None:
+                return self._error_response("Transacciones de Firestore no disponibles")
+
+            check_duplicate = bool(receipt_id)
+            receipt_id = str(receipt_id) if receipt_id else self.sales_ref.document().id
+            records, demand, error = self._build_basket_records(
+                store_id, receipt_id, items, {'staff_id': staff_id, 'notes': notes})
+            if error:
+                return self._rejected_response(error)
+
+            products_col = self.stores_ref.document(str(store_id)).collection('products')
+            product_refs = {pid: products_col.document(pid) for pid in demand}
+            sales_col = self._sales_collection(store_id, records[0]['timestamp'])
+            line_refs = [sales_col.document(f"{receipt_id}-{r['line']}") for r in records]
+            duplicate = []
+
+            @gc_firestore.transactional
+            def run(transaction):
+                if check_duplicate and line_refs[0].get(transaction=transaction).exists:
+                    duplicate.append(True)
+                    return
+                snapshots = {snap.id: snap for snap in transaction.get_all(list(product_refs.values()))}
+                stock_updates = {}
+                for pid, quantity in demand.items():
+                    snapshot = snapshots.get(pid)
+                    if snapshot is None or not snapshot.exists:
+                        raise SaleRejected(f"Producto no encontrado: {pid}")
+                    product = snapshot.to_dict()
+                    new_stock, error = self._stock_after_sale(product, quantity)
+                    if error:
+                        raise SaleRejected(f"{product.get('name', pid)}: {error}")
+                    if new_stock is not None:
+                        if isinstance(product.get('stock'), (int, float)):
+                            stock_updates[pid] = gc_firestore.Increment(-quantity)
+                        else:
+                            stock_updates[pid] = str(new_stock)
+                for ref, record in zip(line_refs, records):
+                    transaction.set(ref, record)
+                self._write_rollups(transaction, store_id, records)
+                for pid, stock in stock_updates.items():
+                    transaction.update(product_refs[pid], {'stock': stock})
+
+            run(self.db.transaction(max_attempts=SALE_TRANSACTION_ATTEMPTS))
+            extra = {'duplicate': True} if duplicate else {}
+            return self._success_response(
+                sale_id=receipt_id,
+                line_ids=[ref.id for ref in line_refs],
+                sales=records,
+                total=sum(r['total'] for r in records),
+                **extra
+            )
+        except SaleRejected as e:
+            return self._rejected_response(str(e))
+        except Exception as e:
+            logger.exception("Error en record_basket: %s", e)
+            return self._exception_response(e)
+
     def get_store_sales(self, store_id, limit=100):
-        """Obtiene ventas de una tienda."""
+        """Obtiene ventas de una tienda, más recientes primero."""
+        page = self.get_sales_page(store_id, page_size=limit)
+        if not page.get('success'):
+            return page
+        return self._success_response(sales=page['sales'])
+
+    def get_sales_page(self, store_id, page_size=DEFAULT_PAGE_SIZE, cursor=None,
+                       product_id=None, descending=True):
+        """Obtiene una página de ventas ordenadas por fecha.
+
+        Args:
+            page_size: Ventas por página
+            cursor: Token `next_cursor` de la página anterior (None = primera)
+            product_id: Solo ventas de este producto
+            descending: True = más recientes primero
+
+        Returns:
+            Dict con sales y next_cursor (None si no hay más páginas)
+        """
         try:
             if not self.sales_ref:
                 return self._error_response("Firestore no inicializado")
-            
             if not store_id:
                 return self._error_response("ID de tienda requerido")
-            
-            # Intentar obtener con ordenamiento, si falla por falta de índice, obtener sin ordenar
-            sales = []
-            use_manual_sort = False
-            
-            try:
-                # Intentar consulta con ordenamiento
-                query = self.sales_ref.where('store_id', '==', str(store_id)).order_by('timestamp', direction='DESCENDING').limit(limit)
-                docs = query.stream()
-                for doc in docs:
-                    data = doc.to_dict()
-                    data['id'] = doc.id
-                    sales.append(data)
-            except Exception as e:
-                # Verificar si es error de índice faltante
-                error_msg = str(e)
-                is_index_error = False
-                
-                if gcp_exceptions:
-                    is_index_error = isinstance(e, (gcp_exceptions.FailedPrecondition, gcp_exceptions.InvalidArgument))
-                else:
-                    # Verificar por mensaje de error
-                    is_index_error = 'index' in error_msg.lower() or 'requires an index' in error_msg.lower()
-                
-                if is_index_error:
-                    logger.warning("Índice de Firestore no disponible para ordenamiento, obteniendo ventas sin ordenar")
-                    use_manual_sort = True
-                else:
-                    logger.warning("Error al obtener ventas ordenadas: %s", error_msg)
-                
-                # Obtener sin ordenar
-                try:
-                    query = self.sales_ref.where('store_id', '==', str(store_id)).limit(limit * 2)  # Obtener más para ordenar manualmente
-                    docs = query.stream()
-                    for doc in docs:
-                        data = doc.to_dict()
-                        data['id'] = doc.id
-                        sales.append(data)
-                except Exception as e2:
-                    logger.exception("Error al obtener ventas sin ordenar: %s", e2)
-                    return self._error_response(f"Error al obtener ventas: {str(e2)}")
-            
-            # Ordenar manualmente si fue necesario
-            if use_manual_sort and sales:
-                try:
-                    def get_timestamp_key(sale):
-                        """Obtiene una clave ordenable del timestamp."""
-                        ts = sale.get('timestamp')
-                        if ts is None:
-                            return datetime.min
-                        # Si es un objeto datetime (Firestore o Python)
-                        if isinstance(ts, datetime):
-                            return ts
-                        # Si tiene método timestamp (objetos datetime-like)
-                        if hasattr(ts, 'timestamp'):
-                            try:
-                                return datetime.fromtimestamp(ts.timestamp())
-                            except:
-                                return datetime.min
-                        # Si es string ISO, intentar parsear básico
-                        if isinstance(ts, str):
-                            try:
-                                # Formato ISO básico: YYYY-MM-DDTHH:MM:SS
-                                return datetime.fromisoformat(ts.replace('Z', '+00:00'))
-                            except:
-                                return datetime.min
-                        return datetime.min
-                    
-                    # Ordenar por timestamp descendente (más recientes primero)
-                    sales.sort(key=get_timestamp_key, reverse=True)
-                    # Limitar después de ordenar
-                    sales = sales[:limit]
-                except Exception as e:
-                    logger.warning("No se pudo ordenar ventas manualmente: %s", e)
-                    # Limitar sin ordenar
-                    sales = sales[:limit]
-            
-            return self._success_response(sales=sales)
+            if self.partitioned:
+                sales, next_cursor = self._partitioned_page(
+                    store_id, int(page_size), cursor, product_id, descending)
+                return self._success_response(sales=sales, next_cursor=next_cursor)
+
+            query = self.sales_ref.where('store_id', '==', str(store_id))
+            filters = ['store_id']
+            if product_id:
+                query = query.where('product_id', '==', str(product_id))
+                filters.append('product_id')
+            sales, next_cursor = firestore_page(query, int(page_size), cursor, descending=descending,
+                                                model=Sale, index=('sales', filters))
+            return self._success_response(sales=sales, next_cursor=next_cursor)
+        except ValueError as e:
+            return self._error_response(str(e))
         except Exception as e:
-            logger.exception("Error en get_store_sales: %s", e)
+            logger.exception("Error en get_sales_page: %s", e)
             return self._error_response(str(e))
 
+    def _partitioned_page(self, store_id, page_size, cursor, product_id, descending):
+        """Página de ventas recorriendo las particiones mensuales en orden.
+
+        Los meses no se solapan, así que el cursor solo se aplica a la
+        partición de su venta; las siguientes se leen desde el principio
+        hasta completar la página (más una venta para saber si hay otra).
+        """
+        position = decode_cursor(cursor) if cursor else None
+        cursor_month = partition_month(position[0]) if position and position[0] is not None else None
+        filters = ['product_id'] if product_id else []
+        items = []
+        store_doc = self.stores_ref.document(str(store_id))
+        for month in sorted(self._store_months(store_id), reverse=descending):
+            if cursor_month is not None and (month > cursor_month if descending else month < cursor_month):
+                continue
+            partition = partition_collection(store_doc, month)
+            query = partition.where('product_id', '==', str(product_id)) if product_id else partition
+            docs, _ = firestore_page(query, page_size + 1 - len(items),
+                                     cursor if month == cursor_month else None,
+                                     descending=descending, model=Sale, index=(PARTITION_INDEX, filters))
+            items.extend(docs)
+            if len(items) > page_size:
+                break
+        if len(items) <= page_size:
+            return items, None
+        items = items[:page_size]
+        return items, encode_cursor(items[-1].timestamp, items[-1].id)
+
+    def iter_sales_pages(self, store_id, page_size=DEFAULT_PAGE_SIZE, cursor=None,
+                         product_id=None, descending=True):
+        """Generador de páginas de ventas; cada una trae su `next_cursor` para reanudar."""
+        return iter_pages(
+            lambda c: self.get_sales_page(store_id, page_size, c, product_id, descending), cursor)
+
     def get_sales_by_period(self, store_id, start_date, end_date):
-        """Obtiene ventas en un período."""
+        """Obtiene ventas en un período.
+
+        Con ventas particionadas solo se consultan los meses del período.
+        """
         try:
-            query = self.sales_ref.where('store_id', '==', store_id)
-            query = query.where('timestamp', '>=', start_date)
-            query = query.where('timestamp', '<=', end_date)
-            docs = query.stream()
-            sales = [{'id': doc.id, **doc.to_dict()} for doc in docs]
+            if self.partitioned:
+                queries = [partition.where('timestamp', '>=', start_date).where('timestamp', '<=', end_date)
+                           for partition in period_partitions(
+                               self.stores_ref.document(str(store_id)), start_date, end_date)]
+            else:
+                query = self.sales_ref.where('store_id', '==', store_id)
+                query = query.where('timestamp', '>=', start_date)
+                queries = [query.where('timestamp', '<=', end_date)]
+            sales = [Sale.from_doc(doc.id, doc.to_dict()) for query in queries for doc in query.stream()]
             return self._success_response(sales=sales)
         except Exception as e:
             logger.exception("Error en get_sales_by_period: %s", e)
             return self._error_response(str(e))
 
-    def delete_sale(self, sale_id):
-        """Elimina una venta."""
+    def delete_sale(self, sale_id, store_id=None):
+        """Elimina una venta y descuenta su importe de los agregados.
+
+        Args:
+            store_id: Tienda de la venta; obligatorio con ventas particionadas
+                (se busca en sus particiones, de la más reciente a la más antigua)
+        """
         try:
-            self.sales_ref.document(sale_id).delete()
+            if self.partitioned:
+                if not store_id:
+                    return self._error_response("ID de tienda requerido")
+                sale_ref = self._find_partitioned_sale(store_id, sale_id)
+                if sale_ref is None:
+                    return self._success_response()
+            else:
+                sale_ref = self.sales_ref.document(sale_id)
+            if gc_firestore is None:
+                sale_ref.delete()
+                return self._success_response()
+
+            @gc_firestore.transactional
+            def run(transaction):
+                snapshot = sale_ref.get(transaction=transaction)
+                if not snapshot.exists:
+                    return
+                sale = snapshot.to_dict()
+                if store_id and str(sale.get('store_id')) != str(store_id):
+                    return
+                transaction.delete(sale_ref)
+                if sale.get('store_id'):
+                    self._write_rollups(transaction, sale['store_id'], [sale], sign=-1)
+
+            run(self.db.transaction(max_attempts=SALE_TRANSACTION_ATTEMPTS))
             return self._success_response()
         except Exception as e:
             logger.exception("Error en delete_sale: %s", e)
-            return self._error_response(str(e))
+            return self._exception_response(e)
+
+    def _find_partitioned_sale(self, store_id, sale_id):
+        """Referencia de la venta en las particiones de la tienda, o None."""
+        store_doc = self.stores_ref.document(str(store_id))
+        for partition in store_partitions(store_doc, months=self._store_months(store_id)):
+            ref = partition.document(str(sale_id))
+            if ref.get().exists:
+                return ref
+        return None
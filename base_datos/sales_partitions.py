@@ -0,0 +1,148 @@
+"""Ventas particionadas por tienda y mes: stores/{id}/sales_months/{yyyymm}/sales.
+
+Con este esquema (opcional, ver `SalesOperations(partitioned=True)`) las
+ventas de cada tienda se reparten en una subcolección por mes en lugar de
+compartir la colección `sales`: las escrituras con timestamps crecientes
+no se concentran en un único rango del índice y las consultas de un
+período solo leen los meses que lo cubren, sin filtrar por `store_id`.
+
+Todas las particiones tienen el mismo ID de colección (`sales`): Firestore
+define los índices compuestos por ID de colección, así que un solo índice
+(product_id, timestamp) declarado en configuracion/firestore.indexes.json
+sirve para todos los meses, presentes y futuros. Los meses de una tienda
+son los documentos de `sales_months` (no hace falta crearlos: se listan
+con `list_documents`, que incluye los que solo tienen subcolecciones).
+
+El mes se toma de la fecha en UTC, que es como Firestore guarda los
+timestamps (un datetime sin zona se guarda tal cual como UTC), así que la
+partición de una venta leída de vuelta coincide con la de su escritura.
+"""
+import logging
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+MONTHS_COLLECTION = 'sales_months'
+PARTITION_COLLECTION = 'sales'
+
+# Forma de índice de las consultas dentro de una partición (ver `indexes`):
+# colección `sales` sin filtro de tienda, la misma para todos los meses
+PARTITION_INDEX = PARTITION_COLLECTION
+
+# Ventas copiadas por batch en la migración (cada una es una escritura, más
+# otra si se borra el original; límite de Firestore: 500)
+MIGRATION_BATCH_SIZE = 200
+MIGRATION_MAX_WRITES = 500
+
+
+def partition_month(timestamp) -> str:
+    """Mes ('YYYYMM') de la partición de una venta."""
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    return timestamp.strftime('%Y%m')
+
+
+def partition_collection(store_doc, month: str):
+    """Subcolección de ventas de un mes ('YYYYMM') de la tienda."""
+    return store_doc.collection(MONTHS_COLLECTION).document(month).collection(PARTITION_COLLECTION)
+
+
+def partition_for(store_doc, timestamp):
+    """Subcolección donde se guarda una venta con esa fecha."""
+    return partition_collection(store_doc, partition_month(timestamp))
+
+
+def month_range(start, end) -> list:
+    """Meses ('YYYYMM') entre dos fechas, inclusive."""
+    first, last = partition_month(start), partition_month(end)
+    year, month = int(first[:4]), int(first[4:])
+    months = []
+    while f"{year:04d}{month:02d}" <= last:
+        months.append(f"{year:04d}{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def store_months(store_doc) -> list:
+    """Meses ('YYYYMM') con ventas de una tienda, del más antiguo al más reciente."""
+    return sorted(ref.id for ref in store_doc.collection(MONTHS_COLLECTION).list_documents())
+
+
+def store_partitions(store_doc, descending: bool = True, months=None) -> list:
+    """Particiones de ventas existentes de una tienda, por mes.
+
+    Args:
+        months: Meses ya conocidos (p. ej. de una caché); si falta se listan
+    """
+    months = sorted(store_months(store_doc) if months is None else months, reverse=descending)
+    return [partition_collection(store_doc, month) for month in months]
+
+
+def period_partitions(store_doc, start=None, end=None) -> list:
+    """Particiones que pueden contener ventas entre `start` y `end` (inclusive).
+
+    Con ambos límites se nombran los meses directamente; si falta alguno se
+    listan los meses existentes y se descartan los de fuera del rango.
+    """
+    if start is not None and end is not None:
+        return [partition_collection(store_doc, month) for month in month_range(start, end)]
+    first = partition_month(start) if start is not None else None
+    last = partition_month(end) if end is not None else None
+    return [partition_collection(store_doc, month) for month in store_months(store_doc)
+            if (first is None or month >= first) and (last is None or month <= last)]
+
+
+def migrate_to_partitions(db, store_id=None, delete: bool = False,
+                          batch_size: int = MIGRATION_BATCH_SIZE, progress=None) -> dict:
+    """Copia las ventas de la colección `sales` a las particiones por tienda y mes.
+
+    Recorre `sales` por ID de documento en tandas de `batch_size`; cada tanda
+    se escribe en un batch (copias y, con `delete`, el borrado de los
+    originales), así que interrumpirla y volver a lanzarla es seguro: las
+    copias conservan el ID y se sobrescriben. Los agregados no cambian.
+
+    Args:
+        store_id: Migrar solo esta tienda
+        delete: Borrar cada venta original en el mismo batch que su copia
+        batch_size: Ventas por tanda (con `delete` cada una son dos escrituras)
+        progress: Función llamada con (copiadas, omitidas) tras cada tanda
+
+    Returns:
+        Dict con copied y skipped (ventas sin tienda o sin fecha)
+
+    Raises:
+        ValueError: Si una tanda supera las MIGRATION_MAX_WRITES escrituras
+    """
+    if batch_size < 1 or batch_size * (2 if delete else 1) > MIGRATION_MAX_WRITES:
+        raise ValueError(f"Tamaño de tanda inválido: máximo {MIGRATION_MAX_WRITES // (2 if delete else 1)} "
+                         f"ventas{' con delete' if delete else ''}")
+    sales = db.collection('sales')
+    stores = db.collection('stores')
+    query = sales.where('store_id', '==', str(store_id)) if store_id else sales
+    copied = skipped = 0
+    last = None
+    while True:
+        page = query.order_by('__name__')
+        if last is not None:
+            page = page.start_after(last)
+        docs = list(page.limit(batch_size).stream())
+        if not docs:
+            break
+        batch = db.batch()
+        for doc in docs:
+            data = doc.to_dict()
+            if not data.get('store_id') or not data.get('timestamp'):
+                skipped += 1
+                continue
+            target = partition_for(stores.document(str(data['store_id'])), data['timestamp']).document(doc.id)
+            batch.set(target, data)
+            if delete:
+                batch.delete(doc.reference)
+            copied += 1
+        batch.commit()
+        last = docs[-1]
+        if progress is not None:
+            progress(copied, skipped)
+    return {'copied': copied, 'skipped': skipped}
@@ -1,6 +1,7 @@
 """Operaciones de empleados."""
 import logging
 from .db_base import DatabaseBase
+from .models import StaffMember
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +32,7 @@ class StaffOperations(DatabaseBase):
         try:
             staff_col = self.stores_ref.document(store_id).collection('staff')
             docs = staff_col.stream()
-            staff = [{'id': doc.id, **doc.to_dict()} for doc in docs]
+            staff = [StaffMember.from_doc(doc.id, doc.to_dict()) for doc in docs]
             return self._success_response(staff=staff)
         except Exception as e:
             logger.exception("Error en get_store_staff: %s", e)
@@ -2,36 +2,53 @@
 import logging
 from datetime import datetime
 from .db_base import DatabaseBase
+from .models import Store
 
 logger = logging.getLogger(__name__)
 
+# Documentos por llamada a get_all (una RPC por lote)
+STORES_BATCH_SIZE = 30
+
 
 class StoreOperations(DatabaseBase):
     """Operaciones CRUD de tiendas."""
 
+    def _validate_store_info(self, store_info, owner_id):
+        """Valida los datos de una tienda nueva.
+
+        Returns:
+            Tupla (datos_limpios, error); `error` es None si son válidos.
+        """
+        if not isinstance(store_info, dict):
+            return None, "Datos de tienda inválidos"
+        
+        if not owner_id:
+            return None, "ID de propietario requerido"
+        
+        required_keys = ['name', 'address']
+        for key in required_keys:
+            if key not in store_info:
+                return None, f"Falta {key}"
+
+        name = store_info['name'].strip()
+        address = store_info['address'].strip()
+        phone = store_info.get('phone', '').strip()
+
+        if not name or not address:
+            return None, "Nombre y dirección son requeridos"
+        
+        if len(name) < 2:
+            return None, "El nombre de la tienda debe tener al menos 2 caracteres"
+
+        return {'name': name, 'address': address, 'phone': phone}, None
+
     def create_store(self, store_info, owner_id):
         """Crea una tienda."""
         try:
-            if not isinstance(store_info, dict):
-                return self._error_response("Datos de tienda inválidos")
-            
-            if not owner_id:
-                return self._error_response("ID de propietario requerido")
-            
-            required_keys = ['name', 'address']
-            for key in required_keys:
-                if key not in store_info:
-                    return self._error_response(f"Falta {key}")
-
-            name = store_info['name'].strip()
-            address = store_info['address'].strip()
-            phone = store_info.get('phone', '').strip()
-
-            if not name or not address:
-                return self._error_response("Nombre y dirección son requeridos")
-            
-            if len(name) < 2:
-                return self._error_response("El nombre de la tienda debe tener al menos 2 caracteres")
+            cleaned, error = self._validate_store_info(store_info, owner_id)
+            if error:
+                return self._error_response(error)
+            name, address, phone = cleaned['name'], cleaned['address'], cleaned['phone']
 
             if not self.stores_ref:
                 return self._error_response("Firestore no inicializado")
@@ -99,21 +116,28 @@ class StoreOperations(DatabaseBase):
                 return self._error_response("Usuario no encontrado")
 
             user_data = user_doc.to_dict()
-            stores = []
-
-            if 'owned_stores' in user_data:
-                for store_id in user_data['owned_stores']:
-                    store_doc = self.stores_ref.document(store_id).get()
-                    if store_doc.exists:
-                        data = store_doc.to_dict()
-                        data['id'] = store_id
-                        stores.append(data)
+            owned = [str(store_id) for store_id in user_data.get('owned_stores', []) or []]
+            stores = self._get_stores_by_ids(owned)
 
             return self._success_response(stores=stores)
         except Exception as e:
             logger.exception("Error en get_user_stores: %s", e)
             return self._error_response(str(e))
 
+    def _get_stores_by_ids(self, store_ids):
+        """Lee varias tiendas con `get_all`, en lotes de STORES_BATCH_SIZE.
+
+        Conserva el orden de `store_ids` y omite los documentos inexistentes.
+        """
+        found = {}
+        for start in range(0, len(store_ids), STORES_BATCH_SIZE):
+            chunk = store_ids[start:start + STORES_BATCH_SIZE]
+            refs = [self.stores_ref.document(store_id) for store_id in chunk]
+            for snapshot in self.db.get_all(refs):
+                if snapshot.exists:
+                    found[snapshot.id] = Store.from_doc(snapshot.id, snapshot.to_dict())
+        return [found[store_id] for store_id in store_ids if store_id in found]
+
     def verify_owner(self, user_id, store_id):
         """Verifica si el usuario es propietario de la tienda."""
         try:
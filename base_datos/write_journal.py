@@ -0,0 +1,392 @@
+"""Cola de escrituras con diario en disco para trabajar sin conexión.
+
+`JournaledFirebaseClient` envuelve al cliente de Firestore: las ventas y
+los cambios de productos se validan, se anotan en un diario append-only
+(`WriteJournal`, una línea JSON por entrada, con fsync) y se confirman al
+instante. Un hilo en segundo plano las reenvía en orden a la base:
+
+- Cada entrada lleva una clave de idempotencia (el ID de la venta, del
+  ticket o del producto). Si se reenvía una entrada que ya se aplicó (p. ej.
+  se cortó la red antes de anotar que terminó) la base la reconoce y no la
+  repite, así que reenviar es seguro.
+- Un error de red o pasajero de Firestore deja la entrada pendiente y el
+  hilo reintenta con espera creciente; el orden se conserva.
+- Si la base rechaza la operación (respuesta con `rejected`, p. ej. stock
+  insuficiente porque otra caja vendió mientras tanto, o un error definitivo
+  de Firestore como PermissionDenied o NotFound) la entrada pasa a
+  conflictos: queda registrada para revisarla y la cola sigue avanzando.
+- Las altas, cambios y bajas de productos seguidas se reenvían juntas en un
+  WriteBatch (`write_products`, hasta WRITE_BATCH_SIZE); si el lote falla se
+  reenvían de una en una para aislar la que falla. Las ventas y tickets
+  llevan su propia transacción (leen el stock) y van de una en una.
+
+Las lecturas no ven las escrituras pendientes hasta que se sincronizan.
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from .db_base import is_permanent_error
+from .local_db import LocalDatabase
+from .product_operations import ProductOperations
+from .sales_operations import SalesOperations
+
+logger = logging.getLogger(__name__)
+
+# Entradas reenviadas por pasada del sincronizador
+JOURNAL_BATCH_SIZE = 500
+
+# Escrituras de productos por WriteBatch (límite de Firestore: 500)
+WRITE_BATCH_SIZE = 500
+
+# Operaciones que se pueden agrupar en un WriteBatch (no leen nada)
+BATCHABLE_OPS = ('create_product', 'update_product', 'delete_product')
+
+# Espera entre reintentos tras un fallo (se duplica hasta el máximo)
+SYNC_RETRY_SECONDS = 1.0
+SYNC_MAX_RETRY_SECONDS = 60.0
+
+# Sin pendientes, el diario se reescribe cuando supera este tamaño
+JOURNAL_COMPACT_BYTES = 1 << 20
+
+
+class WriteJournal:
+    """Diario append-only de escrituras pendientes.
+
+    Cada línea es una entrada nueva ({'key', 'op', 'args'}), una marca de
+    terminada ({'done': key}) o de conflicto ({'conflict': key, 'error'}).
+    Las entradas se escriben con fsync antes de confirmarlas; las marcas no
+    (si se pierden, la entrada se reenvía y la clave de idempotencia evita
+    aplicarla dos veces). Una última línea cortada por un apagón se ignora.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()
+        self._conflicts = OrderedDict()
+        self._load()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = LocalDatabase.loads(line)
+                except ValueError:
+                    logger.warning("Línea %d del diario %s ilegible; se ignora", number, self.path)
+                    continue
+                if 'done' in record:
+                    self._pending.pop(record['done'], None)
+                    self._conflicts.pop(record['done'], None)
+                elif 'conflict' in record:
+                    entry = self._pending.pop(record['conflict'], None)
+                    if entry is not None:
+                        self._conflicts[entry['key']] = {**entry, 'error': record.get('error')}
+                else:
+                    self._pending[record['key']] = record
+
+    def _write(self, record: dict, sync: bool):
+        self._file.write(LocalDatabase.dumps(record) + '\n')
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def append(self, key: str, op: str, args: dict) -> dict:
+        """Anota una escritura; al volver ya está en disco."""
+        entry = {'key': str(key), 'op': op, 'args': args}
+        with self._lock:
+            self._write(entry, sync=True)
+            self._pending[entry['key']] = entry
+        return entry
+
+    def pending(self, limit: int = None) -> list:
+        """Entradas pendientes, en el orden en que se anotaron."""
+        with self._lock:
+            entries = list(self._pending.values())
+        return entries[:limit] if limit else entries
+
+    def conflicts(self) -> list:
+        """Entradas rechazadas por la base, con su error."""
+        with self._lock:
+            return list(self._conflicts.values())
+
+    def complete(self, key: str):
+        """Marca una entrada como aplicada."""
+        with self._lock:
+            self._write({'done': key}, sync=False)
+            self._pending.pop(key, None)
+
+    def reject(self, key: str, error: str):
+        """Pasa una entrada a conflictos."""
+        with self._lock:
+            self._write({'conflict': key, 'error': error}, sync=True)
+            entry = self._pending.pop(key, None)
+            if entry is not None:
+                self._conflicts[key] = {**entry, 'error': error}
+
+    def dismiss_conflict(self, key: str):
+        """Descarta un conflicto ya revisado."""
+        with self._lock:
+            self._write({'done': key}, sync=False)
+            self._conflicts.pop(key, None)
+
+    def compact(self):
+        """Reescribe el diario solo con lo pendiente y los conflictos."""
+        with self._lock:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in self._pending.values():
+                    f.write(LocalDatabase.dumps(entry) + '\n')
+                for conflict in self._conflicts.values():
+                    entry = {k: v for k, v in conflict.items() if k != 'error'}
+                    f.write(LocalDatabase.dumps(entry) + '\n')
+                    f.write(LocalDatabase.dumps({'conflict': entry['key'], 'error': conflict['error']}) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(tmp_path, self.path)
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+    def size(self) -> int:
+        with self._lock:
+            return self._file.tell()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class JournaledFirebaseClient:
+    """Decorador de FirebaseClient que confirma ventas y productos sin esperar a la red.
+
+    Se anotan en el diario: record_sale_with_stock, record_basket,
+    create_product, update_product, delete_product y delete_sale. El resto
+    de métodos (lecturas, tiendas, empleados) se delegan tal cual.
+    """
+
+    def __init__(self, client, journal: WriteJournal, batch_size: int = JOURNAL_BATCH_SIZE,
+                 retry_seconds: float = SYNC_RETRY_SECONDS, on_conflict=None):
+        """Envuelve un cliente existente.
+
+        Args:
+            client: Cliente al que se reenvían las escrituras
+            on_conflict: Función llamada con cada entrada rechazada por la base
+        """
+        self._client = client
+        self.journal = journal
+        self.batch_size = batch_size
+        self.retry_seconds = retry_seconds
+        self._on_conflict = on_conflict
+        # Solo para validar y normalizar antes de anotar (no usan la base)
+        self._sales_rules = SalesOperations()
+        self._product_rules = ProductOperations()
+        self._sync_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._thread = None
+        self.last_error = None
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    @property
+    def wrapped(self):
+        """Cliente sin diario."""
+        return self._client
+
+    # === Mutadores anotados ===
+    def _enqueue(self, key, op, args, **response):
+        self.journal.append(key, op, args)
+        self._wake.set()
+        return {'success': True, 'queued': True, **response}
+
+    def record_sale_with_stock(self, store_id, sale_data: dict):
+        try:
+            record, error = self._sales_rules._build_sale_record(store_id, sale_data)
+        except Exception as e:
+            logger.exception("Error en record_sale_with_stock: %s", e)
+            return {'success': False, 'error': str(e)}
+        if error:
+            return {'success': False, 'error': error}
+        sale_id = sale_data.get('sale_id') or LocalDatabase.new_id()
+        sale_data = {**sale_data, 'sale_id': sale_id, 'timestamp': record['timestamp']}
+        return self._enqueue(sale_id, 'record_sale_with_stock',
+                             {'store_id': store_id, 'sale_data': sale_data},
+                             sale_id=sale_id, stock=None, sale=record)
+
+    def record_basket(self, store_id, items: list, staff_id=None, notes: str = '', receipt_id=None):
+        receipt_id = str(receipt_id or LocalDatabase.new_id())
+        try:
+            records, _, error = self._sales_rules._build_basket_records(
+                store_id, receipt_id, items, {'staff_id': staff_id, 'notes': notes})
+        except Exception as e:
+            logger.exception("Error en record_basket: %s", e)
+            return {'success': False, 'error': str(e)}
+        if error:
+            return {'success': False, 'error': error}
+        timestamp = records[0]['timestamp']
+        items = [{**item, 'timestamp': timestamp} for item in items]
+        return self._enqueue(receipt_id, 'record_basket',
+                             {'store_id': store_id, 'items': items, 'staff_id': staff_id,
+                              'notes': notes, 'receipt_id': receipt_id},
+                             sale_id=receipt_id,
+                             line_ids=[f"{receipt_id}-{r['line']}" for r in records],
+                             sales=records, total=sum(r['total'] for r in records))
+
+    def create_product(self, store_id, product_data: dict, product_id=None):
+        error = self._product_rules._validate_new_product(store_id, product_data)
+        if error:
+            return {'success': False, 'error': error}
+        product_id = str(product_id or LocalDatabase.new_id())
+        return self._enqueue(product_id, 'create_product',
+                             {'store_id': store_id, 'product_data': dict(product_data),
+                              'product_id': product_id},
+                             product_id=product_id)
+
+    def update_product(self, store_id, product_id, updates: dict):
+        if not store_id or not product_id:
+            return {'success': False, 'error': "ID de tienda y producto requeridos"}
+        if not isinstance(updates, dict) or not updates:
+            return {'success': False, 'error': "Datos de actualización inválidos"}
+        error = self._product_rules._validate_product_updates(updates)
+        if error:
+            return {'success': False, 'error': error}
+        return self._enqueue(LocalDatabase.new_id(), 'update_product',
+                             {'store_id': store_id, 'product_id': product_id, 'updates': dict(updates)})
+
+    def delete_product(self, store_id, product_id):
+        if not store_id or not product_id:
+            return {'success': False, 'error': "ID de tienda y producto requeridos"}
+        return self._enqueue(LocalDatabase.new_id(), 'delete_product',
+                             {'store_id': store_id, 'product_id': product_id})
+
+    def delete_sale(self, sale_id, store_id=None):
+        return self._enqueue(LocalDatabase.new_id(), 'delete_sale',
+                             {'sale_id': sale_id, 'store_id': store_id})
+
+    # === Sincronización ===
+    def sync_once(self) -> bool:
+        """Reenvía una tanda de entradas pendientes, en orden.
+
+        Returns:
+            False si una entrada falló por un error no definitivo (se
+            reintentará); True si la tanda se procesó entera
+        """
+        with self._sync_lock:
+            for group in self._groups(self.journal.pending(self.batch_size)):
+                if len(group) > 1 and self._replay_batch(group):
+                    continue
+                for entry in group:
+                    if not self._replay(entry):
+                        return False
+            self.last_error = None
+            if not self.journal.pending() and self.journal.size() > JOURNAL_COMPACT_BYTES:
+                self.journal.compact()
+            return True
+
+    @staticmethod
+    def _groups(entries):
+        """Agrupa las entradas seguidas de productos (sin repetir documento)."""
+        group, docs = [], set()
+        for entry in entries:
+            if entry['op'] in BATCHABLE_OPS:
+                args = entry['args']
+                doc = (str(args['store_id']), str(args.get('product_id') or entry['key']))
+                if doc in docs or len(group) >= WRITE_BATCH_SIZE:
+                    yield group
+                    group, docs = [], set()
+                group.append(entry)
+                docs.add(doc)
+                continue
+            if group:
+                yield group
+                group, docs = [], set()
+            yield [entry]
+        if group:
+            yield group
+
+    def _replay_batch(self, group) -> bool:
+        """Reenvía un grupo de productos en un WriteBatch. True si se aplicó."""
+        try:
+            res = self._client.write_products([(entry['op'], entry['args']) for entry in group])
+        except Exception as e:
+            logger.warning("Error reenviando un lote de %d productos: %s", len(group), e)
+            return False
+        if not res.get('success'):
+            return False
+        for entry in group:
+            self.journal.complete(entry['key'])
+        return True
+
+    def _replay(self, entry) -> bool:
+        """Reenvía una entrada. False si falló por un error pasajero."""
+        try:
+            res = getattr(self._client, entry['op'])(**entry['args'])
+        except Exception as e:
+            logger.warning("Error reenviando %s: %s", entry['op'], e)
+            res = {'success': False, 'error': str(e),
+                   'rejected': is_permanent_error(e) or isinstance(e, (TypeError, ValueError, KeyError))}
+        if res.get('success'):
+            self.journal.complete(entry['key'])
+        elif res.get('rejected'):
+            logger.warning("La base rechazó %s %s: %s", entry['op'], entry['key'], res.get('error'))
+            self.journal.reject(entry['key'], res.get('error'))
+            if self._on_conflict is not None:
+                self._on_conflict({**entry, 'error': res.get('error')})
+        else:
+            # Sin conexión u otro fallo pasajero: se conserva el orden
+            self.last_error = res.get('error')
+            return False
+        return True
+
+    def flush(self) -> bool:
+        """Sincroniza hasta vaciar la cola. Retorna False si quedan pendientes."""
+        while self.journal.pending():
+            if not self.sync_once():
+                return False
+        return True
+
+    def sync_status(self) -> dict:
+        """Pendientes, conflictos y último error de red, para mostrar en la UI."""
+        return {
+            'pending': len(self.journal.pending()),
+            'conflicts': self.journal.conflicts(),
+            'last_error': self.last_error,
+        }
+
+    def start(self):
+        """Arranca el hilo que vacía la cola en segundo plano."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="journal-sync", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        delay = self.retry_seconds
+        while not self._closed.is_set():
+            if self.journal.pending():
+                if self.sync_once():
+                    delay = self.retry_seconds
+                    if self.journal.pending():
+                        continue
+                else:
+                    self._wake.wait(delay)
+                    self._wake.clear()
+                    delay = min(delay * 2, SYNC_MAX_RETRY_SECONDS)
+                    continue
+            self._wake.wait()
+            self._wake.clear()
+
+    def close(self):
+        """Detiene el hilo; lo pendiente queda en el diario para la próxima vez."""
+        self._closed.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.journal.close()
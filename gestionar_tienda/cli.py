@@ -68,9 +68,11 @@ class GestorTiendasCLI(StoreCLIMixin, StaffCLIMixin, ProductCLIMixin):
             logger.info("10. Actualizar producto")
             logger.info("11. Eliminar producto")
             logger.info("12. Ver mis tiendas")
-            logger.info("13. Salir")
+            logger.info("13. Importar catálogo (CSV/JSONL)")
+            logger.info("14. Exportar catálogo")
+            logger.info("15. Salir")
 
-            opcion = input("\nSeleccione una opción (1-13): ")
+            opcion = input("\nSeleccione una opción (1-15): ")
 
             if opcion == "1":
                 self.crear_cuenta()
@@ -97,6 +99,10 @@ class GestorTiendasCLI(StoreCLIMixin, StaffCLIMixin, ProductCLIMixin):
             elif opcion == "12":
                 self.ver_mis_tiendas()
             elif opcion == "13":
+                self.importar_catalogo()
+            elif opcion == "14":
+                self.exportar_catalogo()
+            elif opcion == "15":
                 logger.info("Hasta luego")
                 break
             else:
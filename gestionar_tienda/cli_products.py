@@ -1,6 +1,8 @@
 """Métodos CLI relacionados con gestión de productos."""
 import logging
 
+from base_datos.catalog import export_catalog, import_catalog
+
 logger = logging.getLogger(__name__)
 
 
@@ -153,3 +155,41 @@ class ProductCLIMixin:
         else:
             logger.error("Error al eliminar producto: %s", res.get('error', 'Error desconocido'))
 
+    def importar_catalogo(self):
+        """Importa productos desde un archivo CSV o JSON Lines."""
+        if not self.service.current_user:
+            logger.warning("No hay usuario logueado. Inicie sesión primero.")
+            return
+
+        store_id = self._get_store_id()
+        if not store_id:
+            return
+
+        path = input("Archivo (.csv o .jsonl): ").strip()
+        res = import_catalog(self.service, store_id, path,
+                             progress=lambda done, failed: logger.info("  %s importados, %s con error", done, failed))
+        if not res.get('success'):
+            logger.error("Error al importar: %s", res.get('error', 'Error desconocido'))
+            return
+        logger.info("Importados %s productos", res['imported'])
+        for error in res['errors'][:20]:
+            logger.warning("Línea %s: %s", error['line'], error['error'])
+        if len(res['errors']) > 20:
+            logger.warning("... y %s errores más", len(res['errors']) - 20)
+
+    def exportar_catalogo(self):
+        """Exporta los productos de la tienda a CSV o JSON Lines."""
+        if not self.service.current_user:
+            logger.warning("No hay usuario logueado. Inicie sesión primero.")
+            return
+
+        store_id = self._get_store_id()
+        if not store_id:
+            return
+
+        path = input("Archivo de destino (.csv o .jsonl): ").strip()
+        res = export_catalog(self.service, store_id, path)
+        if res.get('success'):
+            logger.info("Exportados %s productos a %s", res['exported'], path)
+        else:
+            logger.error("Error al exportar: %s", res.get('error', 'Error desconocido'))
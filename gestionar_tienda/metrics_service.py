@@ -35,6 +35,31 @@ class MetricsServiceMixin:
         
         return self.firebase.get_store_metrics(store_id, metric_type, limit)
 
+    def get_sales_summary(self, store_id: str, top_limit: int = 5):
+        """Ingresos, nº de ventas, promedio y top productos de la tienda activa."""
+        if not self._current_store:
+            return {"success": False, "error": "No hay tienda activa. Seleccione la tienda antes de ver métricas."}
+        if str(store_id) != str(self._current_store):
+            return {"success": False, "error": "El ID de la tienda no coincide con la tienda activa."}
+
+        return self.firebase.get_sales_summary(store_id, top_limit)
+
+    async def get_metrics_overview(self, store_id: str, top_limit: int = 5):
+        """Resumen de ventas de la tienda activa con los nombres del top completos.
+
+        Returns:
+            Dict con summary (como get_sales_summary)
+        """
+        if not self._current_store:
+            return {"success": False, "error": "No hay tienda activa. Seleccione la tienda antes de ver métricas."}
+        if str(store_id) != str(self._current_store):
+            return {"success": False, "error": "El ID de la tienda no coincide con la tienda activa."}
+
+        summary = await self.async_firebase.get_metrics_data(store_id, top_limit)
+        if not summary.get('success'):
+            return summary
+        return {"success": True, "summary": summary}
+
     def update_metric(self, metric_id: str, updates: dict):
         if not self._current_user:
             return {"success": False, "error": "No hay usuario autenticado"}
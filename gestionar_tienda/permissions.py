@@ -1,4 +1,7 @@
 """Módulo de gestión de permisos."""
+import threading
+import time
+
 from base_datos.firebase_client import FirebaseClient
 
 # Mapeo de roles a permisos
@@ -39,3 +42,156 @@ def has_permission(firebase: FirebaseClient, user_id: str, store_id: str, action
     except Exception:
         return False
 
+
+def _compile_members(staff: dict) -> dict:
+    """Compila {staff_id: {'user_id', 'role'}} en {user_id: frozenset(permisos)}.
+
+    Si un usuario aparece varias veces gana la primera entrada, igual que en
+    `has_permission`.
+    """
+    members = {}
+    for entry in staff.values():
+        user_id = entry.get('user_id')
+        if user_id and str(user_id) not in members:
+            role = (entry.get('role') or '').lower()
+            members[str(user_id)] = frozenset(ROLE_PERMISSIONS.get(role, []))
+    return members
+
+
+class PermissionIndex:
+    """Índice en memoria de permisos por tienda, con expiración.
+
+    Evita leer el staff completo y el documento de la tienda en cada
+    comprobación: el staff se compila una vez por tienda en un mapa
+    user_id -> permisos y las comprobaciones de propietario se memorizan.
+    El servicio lo mantiene al día con los hooks `on_staff_*`.
+
+    Cada tienda tiene una versión que suben los hooks y `invalidate`; una
+    lectura que empezó antes de un cambio no guarda su resultado (igual que
+    `CachedFirebaseClient`), así un staff leído antes de una baja no vuelve
+    a dar permisos al empleado hasta que venza.
+    """
+
+    def __init__(self, firebase: FirebaseClient, ttl: float = 60.0, clock=time.monotonic):
+        self.firebase = firebase
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stores = {}   # store_id -> {'expires_at', 'staff', 'members'}
+        self._owners = {}   # (store_id, user_id) -> (expires_at, is_owner)
+        self._versions = {}  # store_id -> cambios desde que se creó el índice
+        self._epoch = 0
+
+    def _version(self, store_id):
+        """Versión actual de la tienda; llamar con el lock tomado."""
+        return self._epoch, self._versions.get(store_id, 0)
+
+    def _bump(self, store_id):
+        """Marca un cambio en la tienda; llamar con el lock tomado."""
+        self._versions[store_id] = self._versions.get(store_id, 0) + 1
+
+    def is_owner(self, user_id, store_id) -> bool:
+        """Comprueba (con memoria) si `user_id` es propietario de `store_id`."""
+        if not user_id or not store_id:
+            return False
+        key = (str(store_id), str(user_id))
+        now = self._clock()
+        with self._lock:
+            cached = self._owners.get(key)
+            version = self._version(key[0])
+        if cached and cached[0] > now:
+            return cached[1]
+
+        res = self.firebase.verify_owner(user_id, store_id)
+        if not res.get('success'):
+            return False
+        is_owner = bool(res.get('is_owner'))
+        with self._lock:
+            if self._version(key[0]) == version:
+                self._owners[key] = (now + self.ttl, is_owner)
+        return is_owner
+
+    def _store_entry(self, store_id, retry: bool = False):
+        store_id = str(store_id)
+        now = self._clock()
+        with self._lock:
+            entry = self._stores.get(store_id)
+            if entry and entry['expires_at'] > now:
+                return entry
+            version = self._version(store_id)
+
+        staff_res = self.firebase.get_store_staff(store_id)
+        if not staff_res.get('success'):
+            return None
+        staff = {}
+        for pos, s in enumerate(staff_res.get('staff', [])):
+            staff[str(s.get('id', pos))] = {'user_id': s.get('user_id'), 'role': s.get('role', '')}
+        entry = {'expires_at': now + self.ttl, 'staff': staff, 'members': _compile_members(staff)}
+        with self._lock:
+            changed = self._version(store_id) != version
+            if not changed:
+                self._stores[store_id] = entry
+        if changed:
+            # El staff cambió durante la lectura: se descarta y se lee otra vez
+            # (una sola; si vuelve a cambiar se usa sin guardarla)
+            return entry if retry else self._store_entry(store_id, retry=True)
+        return entry
+
+    def permissions_for(self, user_id, store_id) -> frozenset:
+        """Permisos de un empleado en la tienda (vacío si no pertenece)."""
+        entry = self._store_entry(store_id)
+        if entry is None:
+            return frozenset()
+        return entry['members'].get(str(user_id), frozenset())
+
+    def has_permission(self, user_id, store_id, action: str) -> bool:
+        """Misma regla que `has_permission`, resuelta desde el índice."""
+        try:
+            if not user_id:
+                return False
+            if self.is_owner(user_id, store_id):
+                return True
+            return action in self.permissions_for(user_id, store_id)
+        except Exception:
+            return False
+
+    # === Mantenimiento desde los mutadores de staff ===
+    def _apply_staff_change(self, store_id, change):
+        with self._lock:
+            self._bump(str(store_id))
+            entry = self._stores.get(str(store_id))
+            if entry is None:
+                return
+            change(entry['staff'])
+            entry['members'] = _compile_members(entry['staff'])
+
+    def on_staff_added(self, store_id, staff_id, staff_data: dict):
+        def change(staff):
+            staff[str(staff_id)] = {'user_id': staff_data.get('user_id'), 'role': staff_data.get('role', '')}
+        self._apply_staff_change(store_id, change)
+
+    def on_staff_updated(self, store_id, staff_id, updates: dict):
+        def change(staff):
+            entry = staff.setdefault(str(staff_id), {'user_id': None, 'role': ''})
+            for key in ('user_id', 'role'):
+                if key in updates:
+                    entry[key] = updates[key]
+        self._apply_staff_change(store_id, change)
+
+    def on_staff_removed(self, store_id, staff_id):
+        self._apply_staff_change(store_id, lambda staff: staff.pop(str(staff_id), None))
+
+    def invalidate(self, store_id=None):
+        """Descarta el índice de una tienda (o de todas)."""
+        with self._lock:
+            if store_id is None:
+                self._epoch += 1
+                self._versions.clear()
+                self._stores.clear()
+                self._owners.clear()
+                return
+            store_id = str(store_id)
+            self._bump(store_id)
+            self._stores.pop(store_id, None)
+            for key in [k for k in self._owners if k[0] == store_id]:
+                del self._owners[key]
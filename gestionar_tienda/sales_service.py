@@ -15,44 +15,24 @@ class SalesServiceMixin:
         if str(store_id) != str(self._current_store):
             return {"success": False, "error": "El ID de la tienda no coincide con la tienda activa."}
         
-        # Validar que el producto existe y tiene stock suficiente
-        product_id = sale_data.get('product_id')
-        quantity = sale_data.get('quantity', 0)
-        
-        if product_id:
-            products_res = self.firebase.get_store_products(store_id)
-            if products_res.get('success'):
-                products = products_res.get('products', [])
-                product = next((p for p in products if p.get('id') == product_id), None)
-                if not product:
-                    return {"success": False, "error": "Producto no encontrado"}
-                
-                # Verificar stock si está disponible
-                stock = product.get('stock')
-                if stock is not None:
-                    try:
-                        stock_int = int(stock)
-                        if stock_int < quantity:
-                            return {"success": False, "error": f"Stock insuficiente. Disponible: {stock_int}"}
-                    except (ValueError, TypeError):
-                        pass
-        
-        # Registrar la venta
-        result = self.firebase.record_sale(store_id, sale_data)
-        
-        # Si la venta fue exitosa y hay producto, actualizar stock
-        if result.get('success') and product_id and product:
-            try:
-                stock = product.get('stock')
-                if stock is not None:
-                    stock_int = int(stock)
-                    new_stock = stock_int - quantity
-                    if new_stock >= 0:
-                        self.firebase.update_product(store_id, product_id, {'stock': str(new_stock)})
-            except Exception as e:
-                logger.exception("Error actualizando stock después de venta: %s", e)
-        
-        return result
+        if not sale_data.get('product_id'):
+            return {"success": False, "error": "Falta product_id"}
+
+        # Lectura del producto, control de stock, venta y decremento en una sola transacción
+        result = self.firebase.record_sale_with_stock(store_id, sale_data)
+        return self._replica_sales_recorded(result)
+
+    def record_basket(self, store_id: str, items: list, staff_id: str = None, notes: str = ''):
+        """Registra un ticket con varias líneas de venta de una sola vez."""
+        if not self._current_store:
+            return {"success": False, "error": "No hay tienda activa. Seleccione la tienda antes de registrar ventas."}
+        if str(store_id) != str(self._current_store):
+            return {"success": False, "error": "El ID de la tienda no coincide con la tienda activa."}
+        if not items:
+            return {"success": False, "error": "El ticket no tiene productos"}
+
+        result = self.firebase.record_basket(store_id, items, staff_id, notes)
+        return self._replica_sales_recorded(result)
 
     def get_store_sales(self, store_id: str, limit: int = 100):
         """Obtiene las ventas de una tienda."""
@@ -60,15 +40,50 @@ class SalesServiceMixin:
             return {"success": False, "error": "No hay tienda activa. Seleccione la tienda antes de ver ventas."}
         if str(store_id) != str(self._current_store):
             return {"success": False, "error": "El ID de la tienda no coincide con la tienda activa."}
-        
+
+        replica = self._replica_for(store_id, 'sales')
+        if replica is not None and (limit <= replica.sales_limit or replica.sales_complete()):
+            return {"success": True, "sales": replica.list('sales')[:limit]}
         return self.firebase.get_store_sales(store_id, limit)
 
+    def get_sales_page(self, store_id: str, page_size: int = 100, cursor: str = None,
+                       product_id: str = None, descending: bool = True):
+        """Obtiene una página de ventas; `next_cursor` permite pedir la siguiente."""
+        if not self._current_store:
+            return {"success": False, "error": "No hay tienda activa. Seleccione la tienda antes de ver ventas."}
+        if str(store_id) != str(self._current_store):
+            return {"success": False, "error": "El ID de la tienda no coincide con la tienda activa."}
+
+        replica = self._replica_for(store_id, 'sales')
+        if replica is not None:
+            predicate = None
+            if product_id:
+                predicate = lambda s: str(s.product_id) == str(product_id)
+            try:
+                page = replica.page('sales', 'timestamp', int(page_size), cursor, descending,
+                                    predicate, complete=replica.sales_complete())
+            except ValueError as e:
+                return {"success": False, "error": str(e)}
+            if page is not None:
+                sales, next_cursor = page
+                return {"success": True, "sales": sales, "next_cursor": next_cursor}
+        return self.firebase.get_sales_page(store_id, page_size, cursor, product_id, descending)
+
+    def iter_sales_pages(self, store_id: str, page_size: int = 500, cursor: str = None,
+                         product_id: str = None, descending: bool = True):
+        """Recorre las ventas página a página (para exportar sin cargar todo)."""
+        if not self._current_store or str(store_id) != str(self._current_store):
+            return iter([self.get_sales_page(store_id, page_size, cursor)])
+
+        return self.firebase.iter_sales_pages(store_id, page_size, cursor, product_id, descending)
+
     def delete_sale(self, sale_id: str):
         """Elimina una venta."""
         if not self._current_user:
             return {"success": False, "error": "No hay usuario autenticado"}
         
-        return self.firebase.delete_sale(sale_id)
+        return self._replica_apply(self.firebase.delete_sale(sale_id, self._current_store),
+                                   'sales', 'removed', sale_id)
 
     def calculate_revenue(self, sales_list: list):
         """Calcula ingresos totales desde lista de ventas."""
@@ -82,3 +97,7 @@ class SalesServiceMixin:
         """Obtiene productos más vendidos."""
         return self.firebase.get_top_products(sales_list, limit)
 
+    def summarize_sales(self, sales_list: list, limit: int = 5):
+        """Ingresos, cantidad, promedio y top productos en una sola pasada."""
+        return self.firebase.summarize_sales(sales_list, limit)
+
@@ -1,7 +1,9 @@
 """Servicio puro que implementa la lógica de negocio sobre tiendas."""
 import logging
 from base_datos.firebase_client import FirebaseClient
-from .permissions import has_permission
+from base_datos.async_client import AsyncFirebaseClient
+from base_datos.replica import StoreReplica
+from .permissions import PermissionIndex
 from .sales_service import SalesServiceMixin
 from .metrics_service import MetricsServiceMixin
 
@@ -14,10 +16,16 @@ class GestorTiendasService(SalesServiceMixin, MetricsServiceMixin):
     """
     def __init__(self, firebase_client: FirebaseClient):
         self.firebase = firebase_client
+        # Misma interfaz en corrutinas, para el loop de asyncio de la UI
+        self.async_firebase = AsyncFirebaseClient.for_client(firebase_client)
+        self._permissions = PermissionIndex(firebase_client)
         self._current_user = None
         self._user_data = {}
         self._current_store = None
-        # listeners: functions that receive events {'type': 'user'|'store', 'value': ...}
+        # Copia en memoria de la tienda activa, alimentada por listeners
+        self._replica = None
+        # listeners: functions that receive events {'type': 'user'|'store'|'data', 'value': ...}
+        # 'data' lleva un delta de la réplica: {'store_id', 'collection', 'change', 'id', 'doc'}
         self._listeners = []
 
     # Listener management for UI synchronization
@@ -86,18 +94,118 @@ class GestorTiendasService(SalesServiceMixin, MetricsServiceMixin):
         """Establece la tienda activa. Pasa None para limpiar la selección."""
         if store_id is None:
             self._current_store = None
+            self._stop_replica()
             return
         # permitimos dicts con 'id' o strings
         if isinstance(store_id, dict):
             self._current_store = store_id.get('id') or store_id.get('store_id')
         else:
             self._current_store = str(store_id)
+        self._start_replica(self._current_store)
         # notify listeners about store change
         try:
             self._notify_listeners('store', self._current_store)
         except Exception:
             pass
 
+    def _start_replica(self, store_id):
+        """Replica la tienda activa: con Firestore por listeners, si no leyendo una vez.
+
+        La lectura inicial va en un hilo aparte; mientras tanto las consultas
+        se responden desde la base.
+        """
+        if self._replica is not None and self._replica.store_id == str(store_id):
+            return
+        self._stop_replica()
+        if not store_id:
+            return
+        replica = StoreReplica(store_id, on_change=lambda delta: self._notify_listeners('data', delta))
+        try:
+            db = getattr(self.firebase, 'firestore_db', None)
+            if db is None:
+                replica.load_async(self.firebase)
+            elif getattr(self.firebase, 'sales_partitioned', False):
+                replica.attach_firestore(db, ('products', 'staff'))
+                replica.load_async(self.firebase, ('sales',))
+            else:
+                replica.attach_firestore(db)
+        except Exception as e:
+            logger.warning("No se pudo replicar la tienda %s: %s", store_id, e)
+            replica.close()
+            return
+        self._replica = replica
+
+    def _stop_replica(self):
+        replica, self._replica = self._replica, None
+        if replica is not None:
+            replica.close()
+
+    def _replica_for(self, store_id, collection):
+        """Réplica de la tienda si ya tiene cargada la colección, si no None."""
+        replica = self._replica
+        if replica is not None and replica.store_id == str(store_id) and replica.is_ready(collection):
+            return replica
+        return None
+
+    def _replica_apply(self, result, collection, change, doc_id, data=None):
+        """Aplica a la réplica un cambio hecho aquí, sin releer la colección.
+
+        Las colecciones con listener reciben el cambio de Firestore.
+        """
+        replica = self._replica
+        if (replica is None or replica.is_live(collection) or not isinstance(result, dict)
+                or not result.get('success') or not doc_id):
+            return result
+        if change == 'added':
+            replica.apply(collection, 'added', doc_id, {**data, 'id': str(doc_id)})
+        elif change == 'modified':
+            replica.merge(collection, doc_id, data)
+        else:
+            replica.apply(collection, 'removed', doc_id)
+        return result
+
+    def _replica_sales_recorded(self, result):
+        """Añade a la réplica las ventas registradas aquí y descuenta su stock.
+
+        Usa los registros que devuelve la escritura (`sale`, o `sales` con
+        `line_ids` en un ticket).
+        """
+        replica = self._replica
+        if (replica is None or not isinstance(result, dict) or not result.get('success')
+                or result.get('duplicate')):
+            return result
+        if result.get('sales'):
+            lines = list(zip(result.get('line_ids', []), result['sales']))
+        elif result.get('sale'):
+            lines = [(result.get('sale_id'), result['sale'])]
+        else:
+            return result
+        if not replica.is_live('sales'):
+            for sale_id, sale in lines:
+                replica.apply('sales', 'added', sale_id, sale)
+        if not replica.is_live('products'):
+            demand = {}
+            for _, sale in lines:
+                pid = str(sale.get('product_id'))
+                demand[pid] = demand.get(pid, 0) + int(sale.get('quantity') or 0)
+            for pid, quantity in demand.items():
+                product = replica.get('products', pid)
+                if product is not None and isinstance(product.stock, int):
+                    replica.merge('products', pid, {'stock': product.stock - quantity})
+        return result
+
+    def _replica_products_imported(self, result, store_id):
+        """Tras una importación masiva se vuelve a leer el catálogo, en segundo plano."""
+        replica = self._replica
+        if (replica is not None and replica.store_id == str(store_id) and not replica.is_live('products')
+                and isinstance(result, dict) and result.get('imported')):
+            replica.load_async(self.firebase, ('products',))
+        return result
+
+    def has_permission(self, user_id: str, store_id: str, action: str) -> bool:
+        """Comprueba permisos usando el índice en memoria de la tienda."""
+        return self._permissions.has_permission(user_id, store_id, action)
+
     def create_store(self, store_info: dict, owner_id: str = None):
         """Crea una tienda; owner_id opcional usa el current_user.
         Retorna el dict result como lo devuelve FirebaseClient.
@@ -119,11 +227,13 @@ class GestorTiendasService(SalesServiceMixin, MetricsServiceMixin):
         if str(store_id) != str(self._current_store):
             return {"success": False, "error": "El ID de la tienda no coincide con la tienda activa."}
 
-        verify = self.firebase.verify_owner(user_id, store_id)
-        if not verify.get("success") or not verify.get("is_owner"):
+        if not self._permissions.is_owner(user_id, store_id):
             return {"success": False, "error": "No tiene permisos"}
 
-        return self.firebase.add_store_staff(store_id, staff_data)
+        result = self.firebase.add_store_staff(store_id, staff_data)
+        if result.get("success"):
+            self._permissions.on_staff_added(store_id, result.get("staff_id"), staff_data)
+        return self._replica_apply(result, 'staff', 'added', result.get("staff_id"), staff_data)
 
     def update_employee(self, store_id: str, staff_id: str, updates: dict):
         """Actualiza datos de un empleado (solo propietario puede hacerlo)."""
@@ -136,11 +246,13 @@ class GestorTiendasService(SalesServiceMixin, MetricsServiceMixin):
         if str(store_id) != str(self._current_store):
             return {"success": False, "error": "El ID de la tienda no coincide con la tienda activa."}
 
-        verify = self.firebase.verify_owner(user_id, store_id)
-        if not verify.get("success") or not verify.get("is_owner"):
+        if not self._permissions.is_owner(user_id, store_id):
             return {"success": False, "error": "No tiene permisos"}
 
-        return self.firebase.update_store_staff(store_id, staff_id, updates)
+        result = self.firebase.update_store_staff(store_id, staff_id, updates)
+        if result.get("success"):
+            self._permissions.on_staff_updated(store_id, staff_id, updates)
+        return self._replica_apply(result, 'staff', 'modified', staff_id, updates)
 
     def remove_employee(self, store_id: str, staff_id: str):
         """Elimina un empleado (solo propietario puede hacerlo)."""
@@ -151,11 +263,13 @@ class GestorTiendasService(SalesServiceMixin, MetricsServiceMixin):
             return {"success": False, "error": "No hay tienda activa. Seleccione la tienda antes de administrar empleados."}
         if str(store_id) != str(self._current_store):
             return {"success": False, "error": "El ID de la tienda no coincide con la tienda activa."}
-        verify = self.firebase.verify_owner(user_id, store_id)
-        if not verify.get("success") or not verify.get("is_owner"):
+        if not self._permissions.is_owner(user_id, store_id):
             return {"success": False, "error": "No tiene permisos"}
 
-        return self.firebase.delete_store_staff(store_id, staff_id)
+        result = self.firebase.delete_store_staff(store_id, staff_id)
+        if result.get("success"):
+            self._permissions.on_staff_removed(store_id, staff_id)
+        return self._replica_apply(result, 'staff', 'removed', staff_id)
 
     def create_product(self, store_id: str, product_data: dict):
         """Crea un producto en una tienda (solo propietario)."""
@@ -168,10 +282,25 @@ class GestorTiendasService(SalesServiceMixin, MetricsServiceMixin):
             return {"success": False, "error": "El ID de la tienda no coincide con la tienda activa."}
 
         # Permisos: propietario o empleado con permisos específicos
-        if not has_permission(self.firebase, user_id, store_id, 'products.create'):
+        if not self.has_permission(user_id, store_id, 'products.create'):
+            return {"success": False, "error": "No tiene permisos para crear productos"}
+
+        result = self.firebase.create_product(store_id, product_data)
+        return self._replica_apply(result, 'products', 'added', result.get('product_id'), product_data)
+
+    def import_products(self, store_id: str, rows, progress=None):
+        """Importa productos en bloque (ver `base_datos.catalog`); requiere products.create."""
+        user_id = self._current_user
+        if not user_id:
+            return {"success": False, "error": "No hay usuario autenticado"}
+        if not self._current_store:
+            return {"success": False, "error": "No hay tienda activa. Seleccione la tienda antes de administrar productos."}
+        if str(store_id) != str(self._current_store):
+            return {"success": False, "error": "El ID de la tienda no coincide con la tienda activa."}
+        if not self.has_permission(user_id, store_id, 'products.create'):
             return {"success": False, "error": "No tiene permisos para crear productos"}
 
-        return self.firebase.create_product(store_id, product_data)
+        return self._replica_products_imported(self.firebase.import_products(store_id, rows, progress), store_id)
 
     def get_store_products(self, store_id: str):
         """Lista productos de una tienda. Requiere tienda activa y que coincida."""
@@ -180,10 +309,35 @@ class GestorTiendasService(SalesServiceMixin, MetricsServiceMixin):
         if str(store_id) != str(self._current_store):
             return {"success": False, "error": "El ID de la tienda no coincide con la tienda activa."}
         # Allow viewing if has view permission
-        if not has_permission(self.firebase, self._current_user, store_id, 'products.view'):
+        if not self.has_permission(self._current_user, store_id, 'products.view'):
             return {"success": False, "error": "No tiene permisos para ver productos"}
+        replica = self._replica_for(store_id, 'products')
+        if replica is not None:
+            return {"success": True, "products": replica.list('products')}
         return self.firebase.get_store_products(store_id)
 
+    def get_products_page(self, store_id: str, page_size: int = 100, cursor: str = None,
+                          name_prefix: str = None, descending: bool = False):
+        """Lista productos por páginas, ordenados y filtrados por nombre en la base."""
+        if not self._current_store:
+            return {"success": False, "error": "No hay tienda activa. Seleccione la tienda antes de ver productos."}
+        if str(store_id) != str(self._current_store):
+            return {"success": False, "error": "El ID de la tienda no coincide con la tienda activa."}
+        if not self.has_permission(self._current_user, store_id, 'products.view'):
+            return {"success": False, "error": "No tiene permisos para ver productos"}
+        replica = self._replica_for(store_id, 'products')
+        if replica is not None:
+            predicate = None
+            if name_prefix:
+                predicate = lambda p: str(p.name or '').startswith(name_prefix)
+            try:
+                products, next_cursor = replica.page('products', 'name', int(page_size), cursor,
+                                                     descending, predicate)
+            except ValueError as e:
+                return {"success": False, "error": str(e)}
+            return {"success": True, "products": products, "next_cursor": next_cursor}
+        return self.firebase.get_products_page(store_id, page_size, cursor, name_prefix, descending)
+
     def update_product(self, store_id: str, product_id: str, updates: dict):
         """Actualiza un producto (only owner)."""
         user_id = self._current_user
@@ -194,10 +348,11 @@ class GestorTiendasService(SalesServiceMixin, MetricsServiceMixin):
         if str(store_id) != str(self._current_store):
             return {"success": False, "error": "El ID de la tienda no coincide con la tienda activa."}
 
-        if not has_permission(self.firebase, user_id, store_id, 'products.update'):
+        if not self.has_permission(user_id, store_id, 'products.update'):
             return {"success": False, "error": "No tiene permisos para actualizar productos"}
 
-        return self.firebase.update_product(store_id, product_id, updates)
+        return self._replica_apply(self.firebase.update_product(store_id, product_id, updates),
+                                   'products', 'modified', product_id, updates)
 
     def delete_product(self, store_id: str, product_id: str):
         """Elimina un producto (only owner)."""
@@ -209,17 +364,27 @@ class GestorTiendasService(SalesServiceMixin, MetricsServiceMixin):
         if str(store_id) != str(self._current_store):
             return {"success": False, "error": "El ID de la tienda no coincide con la tienda activa."}
 
-        if not has_permission(self.firebase, user_id, store_id, 'products.delete'):
+        if not self.has_permission(user_id, store_id, 'products.delete'):
             return {"success": False, "error": "No tiene permisos para eliminar productos"}
 
-        return self.firebase.delete_product(store_id, product_id)
+        return self._replica_apply(self.firebase.delete_product(store_id, product_id),
+                                   'products', 'removed', product_id)
 
     def get_user_stores(self, user_id: str = None):
         if user_id is None:
             user_id = self._current_user
         return self.firebase.get_user_stores(user_id)
 
+    async def get_user_stores_async(self, user_id: str = None):
+        """Como get_user_stores, con los lotes de tiendas pedidos a la vez."""
+        if user_id is None:
+            user_id = self._current_user
+        return await self.async_firebase.get_user_stores(user_id)
+
     def get_store_staff(self, store_id: str):
+        replica = self._replica_for(store_id, 'staff')
+        if replica is not None:
+            return {"success": True, "staff": replica.list('staff')}
         return self.firebase.get_store_staff(store_id)
     
     # Métodos delegados a Firebase para compatibilidad
@@ -1,7 +1,12 @@
 import logging
 from autenticacion.autenticacion import Autenticacion
+from autenticacion.session_backends import SQLiteSessionBackend
+from autenticacion.session_tokens import SessionTokenSigner
 from gestionar_tienda import GestorTiendasCLI, GestorTiendasService
 from base_datos.firebase_client import FirebaseClient
+from base_datos.cached_client import CachedFirebaseClient
+from base_datos.indexes import verify_indexes
+from base_datos.write_journal import JournaledFirebaseClient, WriteJournal
 from getpass import getpass
 import os
 import threading
@@ -14,17 +19,34 @@ logger = logging.getLogger(__name__)
 def inicializar_firebase_client():
     """Crea un FirebaseClient inicializado desde service account (si existe).
 
-    Retorna una instancia de FirebaseClient (puede estar en modo degradado si no hay credenciales).
+    Retorna una instancia de FirebaseClient; si no hay credenciales usa la base de datos local.
     """
     service_account_path = os.path.join(
         os.path.dirname(os.path.abspath(__file__)),
         "configuracion",
         "serviceAccountKey.json"
     )
+    # Sin credenciales de Firebase se trabaja contra la base de datos local (modo offline)
+    if not os.path.exists(service_account_path):
+        logger.info("No se encontró serviceAccountKey.json; usando almacenamiento local")
+        return FirebaseClient.from_local_db()
     # Obtener API key de variable de entorno (opcional)
     api_key = os.environ.get('FIREBASE_API_KEY')
-    # La fábrica maneja la ausencia del archivo y devuelve un cliente sin db si hace falta
-    return FirebaseClient.from_service_account(service_account_path, api_key=api_key)
+    # Las lecturas repetidas (tiendas, staff, productos) se sirven desde caché
+    # STOREFLOW_SALES_LAYOUT=partitioned guarda las ventas por tienda y mes
+    # (migrar antes las existentes con tools/migrate_sales_partitions.py)
+    partitioned = os.environ.get('STOREFLOW_SALES_LAYOUT') == 'partitioned'
+    client = CachedFirebaseClient(FirebaseClient.from_service_account(
+        service_account_path, api_key=api_key, partitioned_sales=partitioned))
+    if client.firestore_db is None:
+        return client
+    # Avisa (sin bloquear el arranque) si faltan índices compuestos del manifiesto
+    threading.Thread(target=verify_indexes, args=(client.firestore_db,),
+                     name="index-check", daemon=True).start()
+    # Ventas y productos se confirman al anotarlos en disco y se envían en segundo plano,
+    # así un corte de red no detiene la caja
+    journal = WriteJournal(os.path.join(os.path.dirname(service_account_path), "pending_writes.jsonl"))
+    return JournaledFirebaseClient(client, journal).start()
 
 def menu_principal(auth: Autenticacion, fb_client: FirebaseClient, servicio_tiendas: GestorTiendasService):
     session_id = None
@@ -81,6 +103,8 @@ def menu_principal(auth: Autenticacion, fb_client: FirebaseClient, servicio_tien
             else:
                 datos = auth.get_datos_sesion(session_id)
                 if datos["success"]:
+                    # El token puede haberse renovado
+                    session_id = datos["session_id"]
                     user_data = datos['datos_usuario']
                     logger.info("Usuario: %s | Email: %s | Rol: %s", user_data.get('nombre'), user_data.get('email'), user_data.get('rol'))
                     logger.info("User ID: %s", datos['user_id'])
@@ -107,9 +131,10 @@ def menu_principal(auth: Autenticacion, fb_client: FirebaseClient, servicio_tien
             if not session_id:
                 logger.error("Debe iniciar sesión primero para acceder a la gestión de tiendas.")
             else:
-                # Verificar la sesión primero
-                datos_sesion = auth.get_datos_sesion(session_id)
+                # Verificar la sesión primero (sin leer la base)
+                datos_sesion = auth.verificar_sesion(session_id)
                 if datos_sesion["success"]:
+                    session_id = datos_sesion["session_id"]
                     # Reusar el servicio compartido
                     try:
                         servicio_tiendas.set_current_user(datos_sesion["user_id"])
@@ -132,8 +157,14 @@ def menu_principal(auth: Autenticacion, fb_client: FirebaseClient, servicio_tien
 if __name__ == "__main__":
     # Inicializar el cliente Firebase y pasarlo a los servicios que lo necesiten
     fb_client = inicializar_firebase_client()
-    # Inyectamos el cliente en Autenticacion para que use la misma instancia
-    auth = Autenticacion(firebase_client=fb_client)
+    # Inyectamos el cliente en Autenticacion para que use la misma instancia.
+    # STOREFLOW_SESSION_DB=ruta guarda las sesiones en un archivo SQLite que
+    # comparten los procesos de StoreFlow del equipo (y sobreviven a un reinicio)
+    # Los tokens de sesión se firman con las claves de configuracion/session_keys.json
+    session_db = os.environ.get('STOREFLOW_SESSION_DB')
+    auth = Autenticacion(firebase_client=fb_client,
+                         session_backend=SQLiteSessionBackend(session_db) if session_db else None,
+                         token_signer=SessionTokenSigner.from_key_file())
     # Crear el servicio de tiendas compartido y lanzar el menú principal en un hilo separado
     servicio_tiendas = GestorTiendasService(fb_client)
     # Lanzar el menú principal en un hilo separado y la interfaz gráfica en el hilo principal.
@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from base_datos import analytics
+from base_datos.analytics import SalesColumns, summarize
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def engine(request, monkeypatch):
+    if request.param == 'numpy' and analytics.np is None:
+        pytest.skip('NumPy no instalado')
+    if request.param == 'python':
+        monkeypatch.setattr(analytics, 'np', None)
+    return request.param
+
+
+def _reference_top(sales_list, limit):
+    """Implementación original de get_top_products."""
+    product_stats = {}
+    for sale in sales_list:
+        product_id = sale.get('product_id')
+        product_name = sale.get('product_name', 'N/A')
+        if product_id:
+            if product_id not in product_stats:
+                product_stats[product_id] = {'quantity': 0, 'revenue': 0, 'product_name': product_name}
+            product_stats[product_id]['quantity'] += sale.get('quantity', 0)
+            product_stats[product_id]['revenue'] += sale.get('total', 0)
+    top = sorted(product_stats.items(), key=lambda x: x[1]['quantity'], reverse=True)[:limit]
+    return [{'product_id': p[0], **p[1]} for p in top]
+
+
+def _random_sales(n, seed=7):
+    rng = random.Random(seed)
+    sales = []
+    for _ in range(n):
+        quantity = rng.randint(1, 4)
+        price = rng.choice([0.5, 1.25, 3.0, 9.99])
+        sale = {'product_id': f'p{rng.randint(0, 40)}', 'quantity': quantity,
+                'unit_price': price, 'total': quantity * price}
+        if rng.random() < 0.5:
+            sale['product_name'] = 'Nombre'
+        sales.append(sale)
+    sales.append({'quantity': 2, 'total': 4.0})  # venta sin producto
+    return sales
+
+
+def test_summary_matches_original_functions(engine):
+    sales = _random_sales(5000)
+    result = summarize(sales, top_limit=7)
+
+    assert result['revenue'] == sum(s.get('total', 0) for s in sales)
+    assert result['count'] == len(sales)
+    assert result['average'] == sum(s.get('total', 0) for s in sales) / len(sales)
+    assert result['top_products'] == _reference_top(sales, 7)
+
+
+def test_top_products_ties_keep_first_appearance(engine):
+    sales = [{'product_id': pid, 'quantity': 1, 'total': 1.0} for pid in 'abcdab']
+    assert [p['product_id'] for p in SalesColumns.from_sales(sales).top_products(3)] == ['a', 'b', 'c']
+    assert summarize([]) == {'revenue': 0, 'count': 0, 'average': 0, 'top_products': []}
@@ -0,0 +1,137 @@
+import asyncio
+import threading
+
+from base_datos.async_client import AsyncFirebaseClient
+from base_datos.firebase_client import FirebaseClient
+from gestionar_tienda import GestorTiendasService
+from ui.async_loop import AsyncLoop
+
+
+def _service(tmp_path):
+    client = FirebaseClient.from_local_db(str(tmp_path / 'storeflow.db'))
+    owner_id = client.create_account('owner@test.com', 'Secreta1!')['user_id']
+    svc = GestorTiendasService(client)
+    svc.set_current_user(owner_id)
+    store_id = svc.create_store({'name': 'Tienda', 'address': 'Calle'}, owner_id=owner_id)['store_id']
+    svc.set_current_store(store_id)
+    return client, svc, store_id
+
+
+def test_async_facade_exposes_the_sync_surface(tmp_path):
+    client, svc, store_id = _service(tmp_path)
+    aclient = AsyncFirebaseClient(client)
+
+    async def scenario():
+        created = await aclient.create_product(store_id, {'name': 'Prod', 'price': '2', 'stock': '9'})
+        await aclient.record_sale_with_stock(store_id, {'product_id': created['product_id'],
+                                                        'quantity': 3, 'unit_price': 2})
+        stores = await aclient.get_user_stores(svc.current_user)
+        return stores, await aclient.get_metrics_data(store_id)
+
+    stores, summary = asyncio.run(scenario())
+    assert [s['id'] for s in stores['stores']] == [store_id]
+    assert summary['count'] == 1
+    assert summary['top_products'][0]['product_name'] == 'Prod'
+
+
+def test_metrics_overview_runs_on_the_shared_loop(tmp_path):
+    client, svc, store_id = _service(tmp_path)
+    pid = svc.create_product(store_id, {'name': 'Prod', 'price': '2', 'stock': '9'})['product_id']
+    svc.record_sale(store_id, {'product_id': pid, 'quantity': 2, 'unit_price': 2})
+
+    loop = AsyncLoop()
+    done = threading.Event()
+    results = []
+    loop.submit(svc.get_metrics_overview(store_id), lambda res, err: (results.append((res, err)), done.set()))
+    assert done.wait(5)
+    loop.close()
+
+    res, err = results[0]
+    assert err is None
+    assert res['summary']['revenue'] == 4
+    # El nombre sale del producto del top, sin descargar el catálogo
+    assert res['summary']['top_products'][0]['product_name'] == 'Prod'
+    assert 'products' not in res
+
+
+class _Snapshot:
+    def __init__(self, doc_id, data):
+        self.id, self._data, self.exists = doc_id, data, data is not None
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class _AsyncRef:
+    def __init__(self, db, path):
+        self.db, self.path, self.id = db, path, path.rsplit('/', 1)[-1]
+
+    def collection(self, name):
+        return _AsyncCollection(self.db, f'{self.path}/{name}')
+
+    async def get(self):
+        return _Snapshot(self.id, self.db.docs.get(self.path))
+
+
+class _AsyncCollection:
+    def __init__(self, db, path):
+        self.db, self.path = db, path
+
+    def document(self, doc_id):
+        return _AsyncRef(self.db, f'{self.path}/{doc_id}')
+
+
+class _AsyncDb:
+    """AsyncClient mínimo: documentos por ruta y `get_all` asíncrono."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.get_all_calls = 0
+
+    def collection(self, name):
+        return _AsyncCollection(self, name)
+
+    async def get_all(self, refs):
+        self.get_all_calls += 1
+        for ref in refs:
+            yield await ref.get()
+
+
+def test_native_reads_use_the_async_client():
+    docs = {'users/u1': {'owned_stores': ['s2', 'gone', 's1']},
+            'stores/s1': {'name': 'Uno'}, 'stores/s2': {'name': 'Dos'},
+            'stores/s1/products/p1': {'name': 'Prod'}}
+    db = _AsyncDb(docs)
+    aclient = AsyncFirebaseClient(client=None, async_db=db)
+
+    async def scenario():
+        return (await aclient.get_user_stores('u1'),
+                await aclient.get_products_by_ids('s1', ['p1', 'p9']))
+
+    stores, products = asyncio.run(scenario())
+    assert [s['id'] for s in stores['stores']] == ['s2', 's1']
+    assert products['products'] == [{'id': 'p1', 'name': 'Prod'}]
+    assert db.get_all_calls == 2
+
+
+def test_wrapped_clients_keep_the_views_behind_their_wrappers(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+    from base_datos import async_client
+    from base_datos.cached_client import CachedFirebaseClient
+
+    monkeypatch.setattr(async_client, 'firebase_admin', SimpleNamespace(get_app=lambda: None))
+    monkeypatch.setattr(async_client, 'firestore_async', SimpleNamespace(client=lambda: _AsyncDb({})))
+    client, svc, store_id = _service(tmp_path)
+    assert AsyncFirebaseClient.for_client(client).db is not None
+
+    cached = CachedFirebaseClient(client)
+    aclient = AsyncFirebaseClient.for_client(cached)
+    assert aclient.db is None
+
+    async def scenario():
+        return [await aclient.get_user_stores(svc.current_user) for _ in range(2)]
+
+    first, second = asyncio.run(scenario())
+    assert [s['id'] for s in second['stores']] == [store_id]
+    assert cached.cache_stats()['stores']['hits'] >= 1
+
@@ -0,0 +1,105 @@
+import pytest
+
+from base_datos.auth_http import AuthHttpSession
+from base_datos.auth_operations import AuthOperations
+from base_datos.id_tokens import IdTokenVerifier, PublicKeyCache
+from tools.auth_stub_server import StubAuthServer
+
+
+class _Doc:
+    exists = True
+
+    def to_dict(self):
+        return {'is_active': True}
+
+
+class _Collection:
+    def document(self, doc_id):
+        return self
+
+    def get(self):
+        return _Doc()
+
+
+class _Db:
+    def collection(self, name):
+        return _Collection()
+
+
+@pytest.fixture
+def stub():
+    server = StubAuthServer().start()
+    yield server
+    server.close()
+
+
+def _auth(stub, http=None):
+    keys = PublicKeyCache(f'{stub.url}/certs', http=http, refetch_seconds=0)
+    return AuthOperations(db=_Db(), api_key='test-key', token_verifier=IdTokenVerifier(stub.project_id, keys),
+                          http=http, sign_in_url=f'{stub.url}/signIn', refresh_url=f'{stub.url}/token')
+
+
+def test_every_login_checks_the_password_and_tokens_verify_locally(stub):
+    user_id = stub.add_account('dueno@test.com', 'Secreta1!')
+    auth = _auth(stub)
+
+    for _ in range(3):
+        login = auth.verify_credentials('dueno@test.com', 'Secreta1!')
+        assert login['user_id'] == user_id
+        assert auth.verify_id_token(login['id_token'])['user_id'] == user_id
+    assert stub.requests == {'/signIn': 3, '/certs': 1}
+
+    # Un cambio de contraseña en Firebase invalida la anterior en el siguiente login
+    stub.accounts['dueno@test.com'] = ('Nueva2!', user_id)
+    assert not auth.verify_credentials('dueno@test.com', 'Secreta1!')['success']
+    assert auth.verify_credentials('dueno@test.com', 'Nueva2!')['success']
+
+
+def test_expired_id_token_is_refreshed_and_rotated_keys_are_fetched(stub):
+    user_id = stub.add_account('dueno@test.com', 'Secreta1!')
+    auth = _auth(stub)
+    stub.token_lifetime = 60  # dentro del margen de renovación
+    auth.verify_credentials('dueno@test.com', 'Secreta1!')
+
+    stub.token_lifetime = 3600
+    stub.rotate_key()
+    refreshed = auth.get_id_token(user_id)
+    assert refreshed['success']
+    assert stub.requests['/token'] == 1
+    assert stub.requests['/certs'] == 2  # kid nuevo: se vuelven a pedir las claves
+    assert auth.get_id_token(user_id)['id_token'] == refreshed['id_token']
+
+    stub.refresh_tokens.clear()
+    auth._tokens[user_id]['expires_at'] = 0
+    assert not auth.get_id_token(user_id)['success']
+    assert auth.verify_credentials('dueno@test.com', 'Secreta1!')['success']
+    assert stub.requests['/signIn'] == 2
+
+
+def test_forged_or_foreign_tokens_are_rejected(stub):
+    auth = _auth(stub)
+    other = StubAuthServer(project_id='otro-proyecto')
+    try:
+        assert not auth.verify_id_token(other.issue_id_token('u1'))['success']
+    finally:
+        other.close()
+    assert not auth.verify_id_token(stub.issue_id_token('u1', lifetime=-600))['success']
+    assert not auth.verify_id_token('no-es-un-jwt')['success']
+    assert auth.verify_id_token(stub.issue_id_token('u1'))['user_id'] == 'u1'
+
+
+def test_login_storm_reuses_pooled_connections_and_retries(stub):
+    http = AuthHttpSession(backoff_factor=0)
+    auth = _auth(stub, http)
+    for i in range(10):
+        stub.add_account(f'cajero{i}@test.com', 'Secreta1!')
+    stub.fail_next['/signIn'] = 1
+
+    for i in range(10):
+        assert auth.verify_credentials(f'cajero{i}@test.com', 'Secreta1!')['success']
+    assert stub.requests['/signIn'] == 11  # 10 logins + 1 reintento tras el 503
+    stats = auth.http_stats()
+    assert stats['requests'] == 12  # + la descarga de claves
+    assert stats['connections'] == 1
+    assert stats['reused'] == 11
+    http.close()
@@ -0,0 +1,55 @@
+from tools.integration_test import FakeFirebaseClient
+from base_datos.cached_client import CachedFirebaseClient
+
+
+class CountingClient(FakeFirebaseClient):
+    def __init__(self):
+        super().__init__()
+        self.product_reads = 0
+
+    def get_store_products(self, store_id):
+        self.product_reads += 1
+        return super().get_store_products(store_id)
+
+
+def test_reads_are_cached_and_invalidated_by_writes():
+    now = [0.0]
+    inner = CountingClient()
+    client = CachedFirebaseClient(inner, clock=lambda: now[0])
+    owner_id = inner.create_account('o@test', 'pw')['user_id']
+    store_id = client.create_store({'name': 'T', 'address': 'D'}, owner_id)['store_id']
+
+    client.get_store_products(store_id)
+    client.get_store_products(store_id)
+    assert inner.product_reads == 1
+
+    client.create_product(store_id, {'name': 'Prod', 'price': '1'})
+    assert len(client.get_store_products(store_id)['products']) == 1
+    assert inner.product_reads == 2
+
+    now[0] += 3600
+    client.get_store_products(store_id)
+    assert inner.product_reads == 3
+
+    stats = client.cache_stats()['products']
+    assert stats['hits'] == 1 and stats['misses'] == 3
+
+
+def test_read_overlapping_a_write_is_not_cached():
+    inner = CountingClient()
+    client = CachedFirebaseClient(inner)
+    owner_id = inner.create_account('o@test', 'pw')['user_id']
+    store_id = client.create_store({'name': 'T', 'address': 'D'}, owner_id)['store_id']
+
+    load = inner.get_store_products
+
+    def slow_load(store):
+        # La lectura obtiene el catálogo viejo y la escritura termina antes de que vuelva
+        res = load(store)
+        client.create_product(store_id, {'name': 'Prod', 'price': '1'})
+        return res
+
+    inner.get_store_products = slow_load
+    assert client.get_store_products(store_id)['products'] == []
+    inner.get_store_products = load
+    assert len(client.get_store_products(store_id)['products']) == 1
@@ -0,0 +1,125 @@
+import threading
+import time
+
+from base_datos import product_operations
+from base_datos.catalog import export_catalog, import_catalog
+from base_datos.firebase_client import FirebaseClient
+from base_datos.product_operations import ProductOperations
+from gestionar_tienda import GestorTiendasService
+
+
+def _service(tmp_path):
+    client = FirebaseClient.from_local_db(str(tmp_path / 'storeflow.db'))
+    owner_id = client.create_account('owner@test.com', 'Secreta1!')['user_id']
+    svc = GestorTiendasService(client)
+    svc.set_current_user(owner_id)
+    store_id = svc.create_store({'name': 'Tienda', 'address': 'Calle'}, owner_id=owner_id)['store_id']
+    svc.set_current_store(store_id)
+    return svc, store_id
+
+
+def test_csv_import_reports_row_errors_and_round_trips(tmp_path):
+    svc, store_id = _service(tmp_path)
+    source = tmp_path / 'catalogo.csv'
+    source.write_text('id,name,price,stock,description\n'
+                      'a1,Pera,1.5,10,Fruta\n'
+                      ',Manzana,2,,\n'
+                      'a3,X,1,1,\n'
+                      'a4,Uva,caro,3,\n', encoding='utf-8')
+
+    res = import_catalog(svc, store_id, str(source))
+
+    assert res['imported'] == 2
+    assert res['errors'] == [
+        {'line': 4, 'error': 'El nombre del producto debe tener al menos 2 caracteres'},
+        {'line': 5, 'error': 'El precio debe ser un número válido'},
+    ]
+    exported = tmp_path / 'export.jsonl'
+    assert export_catalog(svc, store_id, str(exported)) == {'success': True, 'exported': 2}
+
+    # Reimportar la exportación (con IDs) reemplaza en lugar de duplicar
+    res = import_catalog(svc, store_id, str(exported))
+    assert (res['imported'], res['errors']) == (2, [])
+    products = sorted(svc.get_store_products(store_id)['products'], key=lambda p: p['name'])
+    assert [(p['name'], p['price'], p.get('stock')) for p in products] == [('Manzana', 2.0, None),
+                                                                        ('Pera', 1.5, 10)]
+
+
+def test_jsonl_import_skips_unreadable_lines(tmp_path):
+    svc, store_id = _service(tmp_path)
+    source = tmp_path / 'catalogo.jsonl'
+    source.write_text('{"name": "Pera", "price": 1}\n{roto\n\n[1, 2]\n', encoding='utf-8')
+
+    res = import_catalog(svc, store_id, str(source))
+
+    assert res['imported'] == 1
+    assert [e['line'] for e in res['errors']] == [2, 4]
+
+
+def test_failed_export_keeps_the_previous_file(tmp_path):
+    svc, store_id = _service(tmp_path)
+    svc.create_product(store_id, {'name': 'Pera', 'price': 1})
+    target = tmp_path / 'catalogo.csv'
+    assert export_catalog(svc, store_id, str(target))['exported'] == 1
+    previous = target.read_text(encoding='utf-8')
+
+    class _Broken:
+        def get_products_page(self, *args, **kwargs):
+            return {'success': False, 'error': 'Sin conexión'}
+
+    assert export_catalog(_Broken(), store_id, str(target)) == {'success': False, 'error': 'Sin conexión'}
+    assert target.read_text(encoding='utf-8') == previous
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith('catalogo')] == ['catalogo.csv']
+
+
+class _Collection:
+    """Colección y documento a la vez: basta para construir referencias."""
+
+    def document(self, doc_id=None):
+        return self
+
+    def collection(self, name):
+        return self
+
+
+class _Batch:
+    def __init__(self, db):
+        self.db, self.size = db, 0
+
+    def set(self, ref, data):
+        self.size += 1
+
+    def commit(self):
+        with self.db.lock:
+            self.db.in_flight += 1
+            self.db.peak = max(self.db.peak, self.db.in_flight)
+        time.sleep(0.01)
+        with self.db.lock:
+            self.db.in_flight -= 1
+            self.db.commits.append(self.size)
+
+
+class _Db:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.commits, self.in_flight, self.peak = [], 0, 0
+
+    def collection(self, name):
+        return _Collection()
+
+    def batch(self):
+        return _Batch(self)
+
+
+def test_firestore_import_commits_bounded_parallel_batches(monkeypatch):
+    monkeypatch.setattr(product_operations, 'IMPORT_MAX_PARALLEL_BATCHES', 2)
+    db = _Db()
+    rows = ((n, {'name': f'Producto {n}', 'price': n}) for n in range(1, 2204))
+    seen = []
+
+    res = ProductOperations(db).import_products('s1', rows, progress=lambda done, failed: seen.append(done))
+
+    assert res == {'success': True, 'imported': 2203, 'errors': []}
+    assert sorted(db.commits) == [203, 500, 500, 500, 500]
+    assert db.peak <= 2
+    assert max(seen) == 2203
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from base_datos.firebase_client import FirebaseClient
+from tools import export_sales
+from tools.export_sales import export_store_sales, iter_row_groups
+
+
+def _store_with_sales(tmp_path, count):
+    fc = FirebaseClient.from_local_db(str(tmp_path / 'storeflow.db'))
+    owner_id = fc.create_account('o@test.com', 'Secreta1!')['user_id']
+    store_id = fc.create_store({'name': 'Tienda', 'address': 'Calle'}, owner_id)['store_id']
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for day in range(count):
+        assert fc.record_sale(store_id, {'product_id': f'p{day % 3}', 'quantity': day + 1, 'unit_price': 2.0,
+                                         'timestamp': start + timedelta(days=day)})['success']
+    return fc, store_id, start
+
+
+def test_row_groups_are_chronological_and_resume_from_cursor(tmp_path):
+    fc, store_id, start = _store_with_sales(tmp_path, 7)
+
+    groups = list(iter_row_groups(fc, store_id, row_group_size=3, page_size=2))
+    assert [len(columns['sale_id']) for columns, _ in groups] == [3, 3, 1]
+    assert groups[0][0]['quantity'] == [1, 2, 3]
+    assert groups[0][0]['total'] == [2.0, 4.0, 6.0]
+    assert groups[-1][0]['timestamp'] == [start + timedelta(days=6)]
+
+    # Desde el cursor del primer grupo solo quedan las 4 ventas siguientes
+    rest = list(iter_row_groups(fc, store_id, cursor=groups[0][1], row_group_size=10))
+    assert rest[0][0]['quantity'] == [4, 5, 6, 7]
+
+
+def test_period_bounds_and_cursor_past_skipped_sales(tmp_path):
+    fc, store_id, start = _store_with_sales(tmp_path, 7)
+
+    groups = list(iter_row_groups(fc, store_id, since=start + timedelta(days=2),
+                                  until=start + timedelta(days=4), row_group_size=10))
+    assert groups[0][0]['quantity'] == [3, 4, 5]
+    after = list(iter_row_groups(fc, store_id, cursor=groups[0][1]))
+    assert after[0][0]['quantity'] == [6, 7]
+
+    # Sin ventas en el período el cursor igual avanza tras las saltadas
+    assert list(iter_row_groups(fc, store_id, since=start + timedelta(days=30))) == [
+        (None, after[0][1])]
+
+
+def test_rescan_window_picks_up_late_sales_without_duplicates(tmp_path):
+    fc, store_id, start = _store_with_sales(tmp_path, 5)
+    groups = list(iter_row_groups(fc, store_id))
+    ids, cursor = groups[0][0]['sale_id'], groups[0][1]
+
+    # Venta registrada sin conexión que se sincroniza después, con su hora original
+    late = fc.record_sale(store_id, {'product_id': 'p1', 'quantity': 8, 'unit_price': 1.0,
+                                     'timestamp': start + timedelta(days=3, hours=12)})['sale_id']
+    assert list(iter_row_groups(fc, store_id, cursor=cursor)) == []
+
+    again = list(iter_row_groups(fc, store_id, cursor=cursor, rescan=timedelta(days=2), seen=set(ids)))
+    assert [columns['sale_id'] for columns, _ in again] == [[late]]
+    assert again[0][1] == cursor
+
+
+def test_export_requires_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_sales, 'pa', None)
+    with pytest.raises(ImportError):
+        export_store_sales(None, 's1', str(tmp_path))
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_incremental_export_roundtrip(tmp_path, fmt):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.dataset as ds
+
+    fc, store_id, start = _store_with_sales(tmp_path, 5)
+    out = str(tmp_path / 'export')
+    first = export_store_sales(fc, store_id, out, fmt=fmt, row_group_size=2)
+    assert (first['rows'], first['row_groups']) == (5, 3)
+
+    fc.record_sale(store_id, {'product_id': 'p9', 'quantity': 9, 'unit_price': 1.0,
+                              'timestamp': start + timedelta(days=10)})
+    second = export_store_sales(fc, store_id, out, fmt=fmt)
+    assert second['rows'] == 1
+    assert export_store_sales(fc, store_id, out, fmt=fmt)['path'] is None
+
+    table = ds.dataset(out, format='ipc' if fmt == 'arrow' else fmt).to_table()
+    assert table.schema.field('timestamp').type == pa.timestamp('us', tz='UTC')
+    assert sorted(table.column('quantity').to_pylist()) == [1, 2, 3, 4, 5, 9]
+
+    # Una venta tardía dentro de la ventana se agrega una sola vez
+    fc.record_sale(store_id, {'product_id': 'p8', 'quantity': 8, 'unit_price': 1.0,
+                              'timestamp': start + timedelta(days=9)})
+    assert export_store_sales(fc, store_id, out, fmt=fmt)['rows'] == 1
+    assert export_store_sales(fc, store_id, out, fmt=fmt)['path'] is None
+
+    # --full reemplaza los archivos anteriores en lugar de duplicar las filas
+    full = export_store_sales(fc, store_id, out, fmt=fmt, incremental=False)
+    assert full['rows'] == 7
+    table = ds.dataset(out, format='ipc' if fmt == 'arrow' else fmt).to_table()
+    assert sorted(table.column('quantity').to_pylist()) == [1, 2, 3, 4, 5, 8, 9]
@@ -0,0 +1,87 @@
+import pytest
+
+from base_datos.firebase_client import FirebaseClient
+from gestionar_tienda import GestorTiendasService
+
+
+def _client(tmp_path):
+    return FirebaseClient.from_local_db(str(tmp_path / 'storeflow.db'))
+
+
+def test_local_accounts_and_stores(tmp_path):
+    fc = _client(tmp_path)
+    owner = fc.create_account('owner@test.com', 'Secreta1!')
+    assert owner['success']
+    assert fc.verify_credentials('owner@test.com', 'Secreta1!')['user_id'] == owner['user_id']
+    assert not fc.verify_credentials('owner@test.com', 'otra')['success']
+    assert not fc.create_account('owner@test.com', 'x')['success']
+
+    ids = [fc.create_store({'name': f'Tienda {i}', 'address': 'Calle'}, owner['user_id'])['store_id']
+           for i in range(3)]
+    stores = fc.get_user_stores(owner['user_id'])['stores']
+    assert [s['id'] for s in stores] == ids
+    assert fc.verify_owner(owner['user_id'], ids[0])['is_owner']
+
+
+def test_local_sales_ordered_and_persistent(tmp_path):
+    fc = _client(tmp_path)
+    owner_id = fc.create_account('o@test.com', 'Secreta1!')['user_id']
+    store_id = fc.create_store({'name': 'Tienda', 'address': 'Calle'}, owner_id)['store_id']
+    svc = GestorTiendasService(fc)
+    svc.set_current_user(owner_id)
+    svc.set_current_store(store_id)
+
+    pid = svc.create_product(store_id, {'name': 'Prod', 'price': '2.5', 'stock': '10'})['product_id']
+    for qty in (1, 2, 3):
+        assert svc.record_sale(store_id, {'product_id': pid, 'quantity': qty, 'unit_price': 2.5})['success']
+
+    sales = svc.get_store_sales(store_id, limit=2)['sales']
+    assert [s['quantity'] for s in sales] == [3, 2]
+
+    # Reabrir el archivo conserva los datos
+    reopened = _client(tmp_path)
+    products = reopened.get_store_products(store_id)['products']
+    assert products[0]['price'] == 2.5
+    assert products[0]['stock'] == 4
+    assert len(reopened.get_store_sales(store_id)['sales']) == 3
+
+
+def test_updates_are_scoped_to_the_store(tmp_path):
+    fc = _client(tmp_path)
+    owner_id = fc.create_account('o@test.com', 'Secreta1!')['user_id']
+    store_a = fc.create_store({'name': 'Tienda A', 'address': 'Calle'}, owner_id)['store_id']
+    store_b = fc.create_store({'name': 'Tienda B', 'address': 'Calle'}, owner_id)['store_id']
+    pid = fc.create_product(store_a, {'name': 'Prod', 'price': '1'})['product_id']
+
+    assert fc.update_product(store_b, pid, {'price': '9'}) == {
+        'success': False, 'error': 'Producto no encontrado', 'rejected': True}
+    assert fc.get_store_products(store_a)['products'][0]['price'] == 1.0
+    assert fc.update_product(store_a, pid, {'price': '9'})['success']
+
+
+def test_service_account_failures_fall_back_to_local(tmp_path, monkeypatch):
+    monkeypatch.setattr('base_datos.firebase_client.DEFAULT_LOCAL_DB_PATH', str(tmp_path / 'local.db'))
+    fc = FirebaseClient.from_service_account(str(tmp_path / 'no-existe.json'))
+    assert fc.create_account('o@test.com', 'Secreta1!')['success']
+
+
+def test_invalid_service_account_is_not_hidden_by_the_local_fallback(tmp_path, monkeypatch):
+    monkeypatch.setattr('base_datos.firebase_client.DEFAULT_LOCAL_DB_PATH', str(tmp_path / 'local.db'))
+    key = tmp_path / 'serviceAccountKey.json'
+    key.write_text('{"type": "service_account", "project_id": "demo"}')
+    with pytest.raises(Exception):
+        FirebaseClient.from_service_account(str(key))
+    assert not (tmp_path / 'local.db').exists()
+
+
+def test_local_delete_sale_is_scoped_to_the_store(tmp_path):
+    fc = _client(tmp_path)
+    owner_id = fc.create_account('o@test.com', 'Secreta1!')['user_id']
+    store_a, store_b = (fc.create_store({'name': f'Tienda {n}', 'address': 'Calle'}, owner_id)['store_id']
+                        for n in 'AB')
+    sale_id = fc.record_sale(store_a, {'product_id': 'p1', 'quantity': 1, 'unit_price': 5})['sale_id']
+
+    assert fc.delete_sale(sale_id, store_b)['success']
+    assert [s.id for s in fc.get_store_sales(store_a)['sales']] == [sale_id]
+    assert fc.delete_sale(sale_id, store_a)['success']
+    assert fc.get_store_sales(store_a)['sales'] == []
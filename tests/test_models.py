@@ -0,0 +1,37 @@
+import pickle
+import random
+
+import pytest
+
+from base_datos.analytics import summarize
+from base_datos.models import Product, Sale
+
+
+def test_product_parses_legacy_text_numbers():
+    product = Product.from_doc('p1', {'name': 'Pera', 'price': '2.50', 'stock': '4', 'color': 'verde'})
+
+    assert (product.price, product.stock) == (2.5, 4)
+    assert product == {'id': 'p1', 'name': 'Pera', 'price': 2.5, 'stock': 4, 'color': 'verde'}
+    assert product.get('description') is None
+    assert 'description' not in product
+
+
+def test_models_are_slotted_and_read_only():
+    sale = Sale.from_doc('s1', {'product_id': 'p1', 'total': 3})
+
+    assert not hasattr(sale, '__dict__')
+    assert sale['quantity'] == 0 and sale.total == 3.0
+    with pytest.raises(AttributeError):
+        sale.total = 5
+    assert {**sale, 'total': 5}['total'] == 5
+    assert pickle.loads(pickle.dumps(sale)) == sale
+
+
+def test_summary_over_models_matches_dicts():
+    rng = random.Random(7)
+    dicts = [{'id': str(i), 'product_id': rng.choice(['a', 'b', 'c', '']),
+              'product_name': 'n', 'quantity': rng.randint(1, 4),
+              'total': float(rng.randint(1, 90))} for i in range(300)]
+    models = [Sale.from_doc(d['id'], d) for d in dicts]
+
+    assert summarize(models, top_limit=3) == summarize(dicts, top_limit=3)
@@ -0,0 +1,154 @@
+import pytest
+from google.api_core.exceptions import FailedPrecondition, InvalidArgument
+
+from base_datos import pagination
+from base_datos.firebase_client import FirebaseClient
+from base_datos.indexes import IndexShape, MissingIndexes, load_manifest, verify_indexes
+from base_datos.pagination import firestore_page
+from tools.integration_test import FakeFirebaseClient
+
+
+@pytest.mark.parametrize('backend', ['local', 'memory'])
+def test_pages_cover_all_sales_and_resume(tmp_path, backend):
+    client = FirebaseClient.from_local_db(str(tmp_path / 'storeflow.db')) if backend == 'local' else FakeFirebaseClient()
+    for i in range(7):
+        client.record_sale('s1', {'product_id': f'p{i}', 'quantity': 1, 'unit_price': 1})
+
+    pages = list(client.iter_sales_pages('s1', page_size=3))
+    assert [len(p['sales']) for p in pages] == [3, 3, 1]
+    assert pages[-1]['next_cursor'] is None
+    streamed = [s['id'] for p in pages for s in p['sales']]
+    assert streamed == [s['id'] for s in client.get_store_sales('s1', limit=100)['sales']]
+
+    resumed = list(client.iter_sales_pages('s1', page_size=3, cursor=pages[0]['next_cursor']))
+    assert [s['id'] for p in resumed for s in p['sales']] == streamed[3:]
+
+
+def test_invalid_cursor_is_an_error(tmp_path):
+    client = FirebaseClient.from_local_db(str(tmp_path / 'storeflow.db'))
+    assert client.get_sales_page('s1', cursor='no-es-un-cursor') == {'success': False, 'error': 'Cursor inválido'}
+
+
+class _Doc:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class _Query:
+    """Consulta mínima; con `indexed=False` ordenar por timestamp falla como sin índice."""
+
+    def __init__(self, docs, indexed=True, error=None, orders=(), after=None, limit=None):
+        self.docs, self.indexed, self.error = docs, indexed, error
+        self.orders, self.after, self._limit = orders, after, limit
+
+    def _copy(self, **changes):
+        fields = dict(docs=self.docs, indexed=self.indexed, error=self.error,
+                      orders=self.orders, after=self.after, limit=self._limit)
+        fields.update(changes)
+        return _Query(**fields)
+
+    def where(self, field, op, value):
+        return self
+
+    def order_by(self, field, direction=None):
+        return self._copy(orders=self.orders + ((field, direction),))
+
+    def start_after(self, position):
+        return self._copy(after=position)
+
+    def limit(self, n):
+        return self._copy(limit=n)
+
+    def stream(self):
+        if self.error:
+            raise self.error
+        if not self.orders:
+            return iter(self.docs[:self._limit])  # sin orden: el de almacenamiento
+        if not self.indexed:
+            raise FailedPrecondition('The query requires an index')
+        descending = self.orders[0][1] == 'DESCENDING'
+        key = lambda d: (d.to_dict()['timestamp'], d.id)
+        docs = sorted(self.docs, key=key, reverse=descending)
+        if self.after:
+            after = (self.after['timestamp'], self.after['__name__'])
+            docs = [d for d in docs if (key(d) < after if descending else key(d) > after)]
+        return iter(docs[:self._limit])
+
+
+def _docs():
+    # IDs en orden distinto al de timestamp, con un empate de timestamp
+    stamps = {'b': 3, 'e': 1, 'a': 4, 'd': 3, 'c': 0}
+    return [_Doc(doc_id, {'timestamp': ts}) for doc_id, ts in stamps.items()]
+
+
+def _ids(query, page_size=2, cursor=None, **kwargs):
+    ids = []
+    while True:
+        page, cursor = firestore_page(query, page_size, cursor, **kwargs)
+        ids += [d['id'] for d in page]
+        if not cursor:
+            return ids
+
+
+def test_missing_index_keeps_timestamp_order():
+    expected = _ids(_Query(_docs()))
+    assert expected == ['a', 'd', 'b', 'e', 'c']
+    assert _ids(_Query(_docs(), indexed=False)) == expected
+    assert _ids(_Query(_docs(), indexed=False), descending=False) == expected[::-1]
+
+
+def test_cursor_resumes_across_index_modes():
+    first, cursor = firestore_page(_Query(_docs()), 2)
+    rest = _ids(_Query(_docs(), indexed=False), cursor=cursor)
+    assert [d['id'] for d in first] + rest == ['a', 'd', 'b', 'e', 'c']
+
+
+def test_query_errors_other_than_missing_index_propagate():
+    with pytest.raises(InvalidArgument):
+        firestore_page(_Query(_docs(), error=InvalidArgument('campo inválido')), 2)
+
+
+class _CountingQuery(_Query):
+    ordered_calls = 0
+
+    def _copy(self, **changes):
+        fields = dict(docs=self.docs, indexed=self.indexed, error=self.error,
+                      orders=self.orders, after=self.after, limit=self._limit)
+        fields.update(changes)
+        return _CountingQuery(**fields)
+
+    def stream(self):
+        if self.orders:
+            _CountingQuery.ordered_calls += 1
+        return super().stream()
+
+
+def test_missing_index_is_remembered_per_query_shape(monkeypatch):
+    registry = MissingIndexes()
+    monkeypatch.setattr(pagination, 'MISSING_INDEXES', registry)
+    _CountingQuery.ordered_calls = 0
+    query = _CountingQuery(_docs(), indexed=False)
+
+    assert _ids(query, index=('sales', ['store_id'])) == ['a', 'd', 'b', 'e', 'c']
+    assert _CountingQuery.ordered_calls == 1
+    assert registry.shapes() == [IndexShape.of('sales', ['store_id'], 'timestamp', True)]
+    # Otra forma (orden ascendente) sí prueba su propio índice
+    _ids(query, index=('sales', ['store_id']), descending=False)
+    assert _CountingQuery.ordered_calls == 2
+
+
+def test_verify_indexes_marks_missing_shapes():
+    class _Db:
+        def collection(self, name):
+            return _Query(_docs(), indexed=(name != 'metrics'))
+
+    registry = MissingIndexes()
+    missing = verify_indexes(_Db(), load_manifest(), registry)
+
+    assert missing and all(shape.collection == 'metrics' for shape in missing)
+    assert set(registry.shapes()) == set(missing)
+    assert IndexShape.of('metrics', ['metric_type', 'store_id'], 'timestamp') in missing
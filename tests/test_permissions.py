@@ -26,3 +26,55 @@ def test_manager_permissions():
     assert svc.has_permission(emp_id, store_id, 'products.update')
     assert svc.has_permission(emp_id, store_id, 'products.delete')
     assert svc.has_permission(emp_id, store_id, 'products.view')
+
+
+def test_permission_index_follows_staff_changes():
+    fake = FakeFirebaseClient()
+    svc = GestorTiendasService(fake)
+    owner_id = fake.create_account('owner@test', 'pw')['user_id']
+    svc.set_current_user(owner_id)
+    store_id = svc.create_store({'name': 'Tienda', 'address': 'Dir'}, owner_id=owner_id)['store_id']
+    svc.set_current_store(store_id)
+    emp_id = fake.create_account('emp@test', 'pw')['user_id']
+    staff_id = svc.add_store_staff(store_id, {'name': 'Ana', 'role': 'viewer', 'user_id': emp_id})['staff_id']
+
+    assert svc.has_permission(emp_id, store_id, 'products.view')
+    assert not svc.has_permission(emp_id, store_id, 'products.create')
+
+    # El índice ya está compilado: los cambios llegan por los mutadores del servicio
+    staff_reads = []
+    original_get_staff = fake.get_store_staff
+    fake.get_store_staff = lambda sid: staff_reads.append(sid) or original_get_staff(sid)
+
+    assert svc.update_employee(store_id, staff_id, {'role': 'seller'})['success']
+    assert svc.has_permission(emp_id, store_id, 'products.create')
+
+    assert svc.remove_employee(store_id, staff_id)['success']
+    assert not svc.has_permission(emp_id, store_id, 'products.view')
+    assert staff_reads == []
+
+
+def test_staff_read_overtaken_by_a_removal_is_not_cached():
+    from gestionar_tienda.permissions import PermissionIndex
+
+    fake = FakeFirebaseClient()
+    owner_id = fake.create_account('owner@test', 'pw')['user_id']
+    store_id = fake.create_store({'name': 'Tienda', 'address': 'Dir'}, owner_id)['store_id']
+    emp_id = fake.create_account('emp@test', 'pw')['user_id']
+    staff_id = fake.add_store_staff(store_id, {'name': 'Ana', 'role': 'manager', 'user_id': emp_id})['staff_id']
+    index = PermissionIndex(fake)
+
+    # La baja llega mientras se lee el staff (que todavía incluye al empleado)
+    original_get_staff = fake.get_store_staff
+
+    def racing_get_staff(sid):
+        res = original_get_staff(sid)
+        fake.get_store_staff = original_get_staff
+        fake.delete_store_staff(sid, staff_id)
+        index.on_staff_removed(sid, staff_id)
+        return res
+
+    fake.get_store_staff = racing_get_staff
+    assert not index.has_permission(emp_id, store_id, 'products.view')
+    assert not index.has_permission(emp_id, store_id, 'products.view')
+
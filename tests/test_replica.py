@@ -0,0 +1,134 @@
+from types import SimpleNamespace
+
+from base_datos.replica import StoreReplica
+from gestionar_tienda import GestorTiendasService
+from tools.integration_test import FakeFirebaseClient
+
+
+def _service_with_store():
+    fake = FakeFirebaseClient()
+    svc = GestorTiendasService(fake)
+    owner_id = fake.create_account('owner@test', 'pw')['user_id']
+    svc.set_current_user(owner_id)
+    store_id = svc.create_store({'name': 'Tienda', 'address': 'Dir'}, owner_id=owner_id)['store_id']
+    return fake, svc, store_id
+
+
+def test_views_are_served_from_the_replica_and_changes_are_notified():
+    fake, svc, store_id = _service_with_store()
+    for name in ('Pera', 'Manzana', 'Banana'):
+        fake.create_product(store_id, {'name': name, 'price': 1, 'stock': 10})
+    events = []
+    svc.add_listener(lambda ev: ev['type'] == 'data' and events.append(ev['value']))
+    svc.set_current_store(store_id)
+    assert svc._replica.wait_loaded(timeout=5)
+    assert {e['change'] for e in events} == {'added'}
+
+    backend_reads = []
+    fake.get_products_page = lambda *a, **kw: backend_reads.append(a)
+    # Las escrituras propias se aplican a la réplica sin releer colecciones
+    fake.get_store_products = fake.get_store_sales = lambda *a, **kw: backend_reads.append(a)
+    first = svc.get_products_page(store_id, page_size=2)
+    assert [p['name'] for p in first['products']] == ['Banana', 'Manzana']
+    second = svc.get_products_page(store_id, page_size=2, cursor=first['next_cursor'])
+    assert [p['name'] for p in second['products']] == ['Pera'] and second['next_cursor'] is None
+    assert backend_reads == []
+
+    events.clear()
+    pid = svc.create_product(store_id, {'name': 'Kiwi', 'price': 2, 'stock': 5})['product_id']
+    assert [(e['change'], e['id']) for e in events] == [('added', pid)]
+
+    events.clear()
+    assert svc.record_sale(store_id, {'product_id': pid, 'quantity': 2, 'unit_price': 2})['success']
+    changes = {(e['collection'], e['change']) for e in events}
+    assert changes == {('sales', 'added'), ('products', 'modified')}
+    assert svc.get_store_sales(store_id)['sales'][0]['product_id'] == pid
+    assert svc._replica.get('products', pid).stock == 3
+
+    basket = svc.record_basket(store_id, [{'product_id': pid, 'quantity': 1, 'unit_price': 2}] * 2)
+    assert [s['id'] for s in svc.get_store_sales(store_id)['sales'][:2]] == sorted(basket['line_ids'], reverse=True)
+    assert svc._replica.get('products', pid).stock == 1
+
+    assert svc.update_product(store_id, pid, {'price': '3.5'})['success']
+    assert svc._replica.get('products', pid).price == 3.5
+    assert svc.delete_sale(basket['line_ids'][0])['success']
+    assert svc.delete_product(store_id, pid)['success']
+    assert svc._replica.get('products', pid) is None
+    assert basket['line_ids'][0] not in {s['id'] for s in svc._replica.list('sales')}
+    assert backend_reads == []
+
+
+def test_sales_pages_beyond_the_window_go_to_the_backend():
+    fake, svc, store_id = _service_with_store()
+    pid = fake.create_product(store_id, {'name': 'Prod', 'price': 1, 'stock': 100})['product_id']
+    svc.set_current_store(store_id)
+    assert svc._replica.wait_loaded(timeout=5)
+    svc._replica.sales_limit = 3
+    for qty in range(1, 6):
+        svc.record_sale(store_id, {'product_id': pid, 'quantity': qty, 'unit_price': 1})
+
+    # La réplica solo guarda las 3 más recientes: la segunda página sale de la base
+    first = svc.get_sales_page(store_id, page_size=2)
+    assert [s['quantity'] for s in first['sales']] == [5, 4]
+    second = svc.get_sales_page(store_id, page_size=2, cursor=first['next_cursor'])
+    assert [s['quantity'] for s in second['sales']] == [3, 2]
+
+
+class _Change:
+    def __init__(self, kind, doc_id, data=None):
+        self.type = SimpleNamespace(name=kind)
+        self.document = SimpleNamespace(id=doc_id, to_dict=lambda: dict(data or {}))
+
+
+class _Source:
+    def __init__(self, db, path):
+        self.db, self.path = db, path
+
+    def collection(self, name):
+        return _Source(self.db, self.path + (name,))
+
+    def document(self, doc_id):
+        return _Source(self.db, self.path + (doc_id,))
+
+    def where(self, *args):
+        return self
+
+    def order_by(self, *args, **kwargs):
+        return self
+
+    def limit(self, n):
+        return self
+
+    def on_snapshot(self, callback):
+        self.db.callbacks[self.path[-1]] = callback
+        return SimpleNamespace(unsubscribe=lambda: self.db.unsubscribed.append(self.path[-1]))
+
+
+class _Db:
+    def __init__(self):
+        self.callbacks = {}
+        self.unsubscribed = []
+
+    def collection(self, name):
+        return _Source(self, (name,))
+
+
+def test_firestore_listeners_feed_the_replica():
+    db = _Db()
+    events = []
+    replica = StoreReplica('s1', on_change=events.append)
+    replica.attach_firestore(db)
+    assert set(db.callbacks) == {'products', 'staff', 'sales'} and replica.live
+    assert not replica.is_ready('products')
+
+    db.callbacks['products'](None, [_Change('ADDED', 'p1', {'name': 'Pera'}),
+                                    _Change('ADDED', 'p2', {'name': 'Uva'})], None)
+    db.callbacks['products'](None, [_Change('MODIFIED', 'p1', {'name': 'Pera roja'}),
+                                    _Change('REMOVED', 'p2')], None)
+    assert replica.is_ready('products')
+    assert replica.list('products') == [{'id': 'p1', 'name': 'Pera roja'}]
+    assert [(e['change'], e['id']) for e in events] == [
+        ('added', 'p1'), ('added', 'p2'), ('modified', 'p1'), ('removed', 'p2')]
+
+    replica.close()
+    assert sorted(db.unsubscribed) == ['products', 'sales', 'staff']
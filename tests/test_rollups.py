@@ -0,0 +1,175 @@
+import pytest
+
+from base_datos.firebase_client import FirebaseClient
+from base_datos.rollups import rollup_corrections
+from gestionar_tienda import GestorTiendasService
+from tools.integration_test import FakeFirebaseClient
+
+
+def _actual(summary):
+    return {
+        'revenue': pytest.approx(summary['revenue']),
+        'count': summary['count'],
+        'top_products': [(p['product_id'], p['quantity']) for p in summary['top_products']],
+    }
+
+
+@pytest.mark.parametrize('backend', ['local', 'memory'])
+def test_summary_matches_full_scan(tmp_path, backend):
+    if backend == 'local':
+        client = FirebaseClient.from_local_db(str(tmp_path / 'storeflow.db'))
+        helper = client
+    else:
+        client = FakeFirebaseClient()
+        helper = FirebaseClient()
+    owner_id = client.create_account('owner@test.com', 'Secreta1!')['user_id']
+    svc = GestorTiendasService(client)
+    svc.set_current_user(owner_id)
+    store_id = svc.create_store({'name': 'Tienda', 'address': 'Calle'}, owner_id=owner_id)['store_id']
+    svc.set_current_store(store_id)
+    a = svc.create_product(store_id, {'name': 'Prod A', 'price': '2', 'stock': '50'})['product_id']
+    b = svc.create_product(store_id, {'name': 'Prod B', 'price': '5', 'stock': '50'})['product_id']
+
+    first = svc.record_sale(store_id, {'product_id': a, 'quantity': 3, 'unit_price': 2})
+    svc.record_sale(store_id, {'product_id': b, 'quantity': 1, 'unit_price': 5})
+    svc.record_basket(store_id, [
+        {'product_id': a, 'quantity': 1, 'unit_price': 2},
+        {'product_id': b, 'quantity': 4, 'unit_price': 5},
+    ])
+    client.delete_sale(first['sale_id'])
+
+    summary = svc.get_sales_summary(store_id)
+    assert summary['success']
+    sales = client.get_store_sales(store_id, limit=1000)['sales']
+    expected = {
+        'revenue': helper.calculate_revenue(sales)['revenue'],
+        'count': helper.calculate_sales_count(sales)['count'],
+        'top_products': [(p['product_id'], p['quantity']) for p in helper.get_top_products(sales, 5)['top_products']],
+    }
+    assert _actual(summary) == expected
+    assert summary['count'] == 3
+
+
+def test_local_summary_rebuilds_from_existing_sales(tmp_path):
+    client = FirebaseClient.from_local_db(str(tmp_path / 'storeflow.db'))
+    client.record_sale('s1', {'product_id': 'p1', 'quantity': 2, 'unit_price': 4})
+    client._sales.local.execute("DELETE FROM rollups")
+
+    summary = client.get_sales_summary('s1')
+    assert (summary['revenue'], summary['count']) == (8, 1)
+    assert summary['top_products'][0]['quantity'] == 2
+
+    client.record_sale('s1', {'product_id': 'p1', 'quantity': 1, 'unit_price': 4})
+    assert client.get_sales_summary('s1')['count'] == 2
+
+
+def test_rebuild_corrections_keep_increments_after_the_cutoff():
+    # Agregados leídos en el corte T (incompletos) y recalculados desde las ventas
+    current = {'totals': {'revenue': 10.0, 'count': 2}, 'day-1': {'day': '1', 'revenue': 10.0, 'count': 2},
+               'p-old': {'quantity': 3, 'revenue': 6.0, 'count': 1}}
+    targets = {'totals': {'revenue': 15.0, 'count': 3}, 'day-1': {'revenue': 10.0, 'count': 2},
+               'p-new': {'quantity': 1, 'revenue': 5.0, 'count': 1, 'product_name': 'Nuevo'}}
+    corrections = rollup_corrections(current, targets)
+    assert corrections == {
+        'totals': {'revenue': 5.0, 'count': 1},
+        'p-old': {'quantity': -3, 'revenue': -6.0, 'count': -1},
+        'p-new': {'quantity': 1, 'revenue': 5.0, 'count': 1},
+    }
+
+    # Una venta registrada después de T ya incrementó los totales: se conserva
+    after_cutoff = {'revenue': 10.0 + 7.0, 'count': 2 + 1}
+    fixed = {field: after_cutoff[field] + corrections['totals'][field] for field in after_cutoff}
+    assert fixed == {'revenue': 15.0 + 7.0, 'count': 3 + 1}
+
+
+@pytest.mark.parametrize('backend', ['local', 'memory'])
+def test_aggregate_sales_matches_period_scan(tmp_path, backend):
+    if backend == 'local':
+        client = FirebaseClient.from_local_db(str(tmp_path / 'storeflow.db'))
+    else:
+        client = FakeFirebaseClient()
+    owner_id = client.create_account('owner@test.com', 'Secreta1!')['user_id']
+    svc = GestorTiendasService(client)
+    svc.set_current_user(owner_id)
+    store_id = svc.create_store({'name': 'Tienda', 'address': 'Calle'}, owner_id=owner_id)['store_id']
+    svc.set_current_store(store_id)
+    pid = svc.create_product(store_id, {'name': 'Prod', 'price': '2', 'stock': '50'})['product_id']
+    for quantity in (1, 2, 3):
+        svc.record_sale(store_id, {'product_id': pid, 'quantity': quantity, 'unit_price': 2})
+
+    sales = client.get_store_sales(store_id, limit=1000)['sales']
+    res = client.aggregate_sales(store_id)
+    assert (res['count'], res['revenue'], res['average']) == (3, pytest.approx(12), pytest.approx(4))
+
+    middle = sorted(s['timestamp'] for s in sales)[1]
+    res = client.aggregate_sales(store_id, start=middle)
+    assert (res['count'], res['revenue']) == (2, pytest.approx(10))
+    assert client.aggregate_sales(store_id, end=middle)['count'] == 2
+
+
+class _Result:
+    def __init__(self, alias, value):
+        self.alias, self.value = alias, value
+
+
+class _Doc:
+    def __init__(self, data):
+        self._data = data
+
+    def to_dict(self):
+        return self._data
+
+
+class _SalesQuery:
+    """Consulta mínima con agregaciones; `aggregations=False` simula un SDK sin ellas."""
+
+    def __init__(self, totals, aggregations=True):
+        self.totals = totals
+        self.aggregations = aggregations
+        self.calls = []
+
+    def where(self, *args):
+        self.calls.append(('where',) + args)
+        return self
+
+    def count(self, alias):
+        if not self.aggregations:
+            raise AttributeError('count')
+        self.calls.append(('count', alias))
+        return self
+
+    def sum(self, field, alias):
+        self.calls.append(('sum', field, alias))
+        return self
+
+    def avg(self, field, alias):
+        self.calls.append(('avg', field, alias))
+        return self
+
+    def get(self):
+        return [[_Result('count', len(self.totals)), _Result('revenue', sum(self.totals)),
+                 _Result('average', sum(self.totals) / len(self.totals))]]
+
+    def select(self, fields):
+        self.calls.append(('select', fields))
+        return self
+
+    def stream(self):
+        return [_Doc({'total': t}) for t in self.totals]
+
+
+@pytest.mark.parametrize('aggregations', [True, False])
+def test_firestore_aggregate_sales(aggregations):
+    client = FirebaseClient()
+    query = _SalesQuery([2.0, 4.0, 9.0], aggregations)
+    client._metrics.sales_ref = query
+
+    res = client.aggregate_sales('s1', start='2024-01-01')
+
+    assert res == {'success': True, 'count': 3, 'revenue': 15.0, 'average': 5.0}
+    assert ('where', 'timestamp', '>=', '2024-01-01') in query.calls
+    if aggregations:
+        assert ('sum', 'total', 'revenue') in query.calls
+        assert not any(call[0] == 'select' for call in query.calls)
+    else:
+        assert ('select', ['total']) in query.calls
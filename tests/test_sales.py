@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+from base_datos.firebase_client import FirebaseClient
+from gestionar_tienda import GestorTiendasService
+from tools.integration_test import FakeFirebaseClient
+
+
+def _local_client(tmp_path):
+    return FirebaseClient.from_local_db(str(tmp_path / 'storeflow.db'))
+
+
+def _service_with_product(client, stock):
+    owner_id = client.create_account('owner@test.com', 'Secreta1!')['user_id']
+    svc = GestorTiendasService(client)
+    svc.set_current_user(owner_id)
+    store_id = svc.create_store({'name': 'Tienda', 'address': 'Calle'}, owner_id=owner_id)['store_id']
+    svc.set_current_store(store_id)
+    pid = svc.create_product(store_id, {'name': 'Prod', 'price': '3', 'stock': stock})['product_id']
+    return svc, store_id, pid
+
+
+@pytest.mark.parametrize('backend', ['local', 'memory'])
+def test_concurrent_sales_never_oversell(tmp_path, backend):
+    client = _local_client(tmp_path) if backend == 'local' else FakeFirebaseClient()
+    svc, store_id, pid = _service_with_product(client, '10')
+
+    results = []
+
+    def till():
+        results.append(svc.record_sale(store_id, {'product_id': pid, 'quantity': 1, 'unit_price': 3}))
+
+    threads = [threading.Thread(target=till) for _ in range(25)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(1 for r in results if r['success']) == 10
+    assert all('Stock insuficiente' in r['error'] for r in results if not r['success'])
+    product = client.get_store_products(store_id)['products'][0]
+    assert product['stock'] == 0
+    assert len(client.get_store_sales(store_id)['sales']) == 10
+
+
+def test_sale_of_unknown_product_is_rejected(tmp_path):
+    svc, store_id, _ = _service_with_product(_local_client(tmp_path), '5')
+    res = svc.record_sale(store_id, {'product_id': 'nope', 'quantity': 1, 'unit_price': 1})
+    assert res == {'success': False, 'error': 'Producto no encontrado', 'rejected': True}
+
+
+@pytest.mark.parametrize('backend', ['local', 'memory'])
+def test_basket_is_all_or_nothing(tmp_path, backend):
+    client = _local_client(tmp_path) if backend == 'local' else FakeFirebaseClient()
+    svc, store_id, pid = _service_with_product(client, '5')
+    other = svc.create_product(store_id, {'name': 'Otro', 'price': '1', 'stock': '1'})['product_id']
+
+    res = svc.record_basket(store_id, [
+        {'product_id': pid, 'quantity': 2, 'unit_price': 3},
+        {'product_id': other, 'quantity': 2, 'unit_price': 1},
+    ])
+    assert not res['success'] and 'Stock insuficiente' in res['error']
+    assert client.get_store_sales(store_id)['sales'] == []
+
+    res = svc.record_basket(store_id, [
+        {'product_id': pid, 'quantity': 2, 'unit_price': 3},
+        {'product_id': other, 'quantity': 1, 'unit_price': 1},
+        {'product_id': pid, 'quantity': 1, 'unit_price': 3},
+    ])
+    assert res['success'] and res['total'] == 10
+    sales = client.get_store_sales(store_id)['sales']
+    assert sorted(s['line'] for s in sales) == [1, 2, 3]
+    assert {s['receipt_id'] for s in sales} == {res['sale_id']}
+    stock = {p['id']: p['stock'] for p in client.get_store_products(store_id)['products']}
+    assert stock == {pid: 2, other: 0}
@@ -0,0 +1,221 @@
+from datetime import datetime, timedelta, timezone
+
+from base_datos.metrics_operations import MetricsOperations
+from base_datos.sales_operations import SalesOperations
+import pytest
+
+from base_datos.sales_partitions import migrate_to_partitions, month_range, partition_month
+
+_OPS = {'==': lambda a, b: a == b, '>=': lambda a, b: a >= b, '<=': lambda a, b: a <= b}
+
+
+class _Snapshot:
+    def __init__(self, ref, data):
+        self.reference, self.id, self._data = ref, ref.id, data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class _Query:
+    """Consulta mínima sobre un dict {path: datos} compartido."""
+
+    def __init__(self, db, path, filters=(), orders=(), after=None, limit=None):
+        self.db, self.path = db, path
+        self.filters, self.orders, self.after, self._limit = filters, orders, after, limit
+
+    def _copy(self, **changes):
+        fields = dict(filters=self.filters, orders=self.orders, after=self.after, limit=self._limit)
+        fields.update(changes)
+        return _Query(self.db, self.path, **fields)
+
+    def where(self, field, op, value):
+        return self._copy(filters=self.filters + ((field, op, value),))
+
+    def order_by(self, field, direction='ASCENDING'):
+        return self._copy(orders=self.orders + ((field, direction == 'DESCENDING'),))
+
+    def start_after(self, position):
+        return self._copy(after=position)
+
+    def limit(self, n):
+        return self._copy(limit=n)
+
+    def select(self, fields):
+        return self
+
+    def stream(self, read_time=None):
+        self.db.reads.append(self.path)
+        prefix = self.path + '/'
+        docs = [_Snapshot(_DocRef(self.db, path), data) for path, data in sorted(self.db.docs.items())
+                if path.startswith(prefix) and '/' not in path[len(prefix):]]
+        docs = [d for d in docs if all(_OPS[op](d.to_dict().get(f), v) for f, op, v in self.filters)]
+        field, descending = self.orders[0] if self.orders else ('__name__', False)
+
+        def key(doc):
+            return (doc.id,) if field == '__name__' else (doc.to_dict().get(field), doc.id)
+        docs.sort(key=key, reverse=descending)
+        if self.after is not None:
+            after = ((self.after.id,) if isinstance(self.after, _Snapshot)
+                     else (self.after[field], self.after['__name__']))
+            docs = [d for d in docs if (key(d) < after if descending else key(d) > after)]
+        return iter(docs[:self._limit])
+
+
+class _Collection(_Query):
+    @property
+    def id(self):
+        return self.path.rsplit('/', 1)[-1]
+
+    def document(self, doc_id=None):
+        return _DocRef(self.db, f"{self.path}/{doc_id or self.db.new_id()}")
+
+    def list_documents(self):
+        # Como Firestore: incluye los documentos que solo tienen subcolecciones
+        self.db.listings.append(self.path)
+        prefix = self.path + '/'
+        ids = {p[len(prefix):].split('/')[0] for p in self.db.docs if p.startswith(prefix)}
+        return [self.document(doc_id) for doc_id in sorted(ids)]
+
+
+class _DocRef:
+    def __init__(self, db, path):
+        self.db, self.path, self.id = db, path, path.rsplit('/', 1)[-1]
+
+    def collection(self, name):
+        return _Collection(self.db, f"{self.path}/{name}")
+
+    def get(self, transaction=None):
+        return _Snapshot(self, self.db.docs.get(self.path))
+
+
+class _Batch:
+    def __init__(self, db):
+        self.db, self.ops = db, []
+
+    def set(self, ref, data, merge=False):
+        if not merge:
+            self.ops.append(lambda: self.db.docs.__setitem__(ref.path, dict(data)))
+
+    def delete(self, ref):
+        self.ops.append(lambda: self.db.docs.pop(ref.path, None))
+
+    def commit(self):
+        for op in self.ops:
+            op()
+
+
+class _Db:
+    def __init__(self):
+        self.docs, self.reads, self.listings, self._ids = {}, [], [], 0
+
+    def new_id(self):
+        self._ids += 1
+        return f"auto{self._ids:04d}"
+
+    def collection(self, name):
+        return _Collection(self, name)
+
+    def batch(self):
+        return _Batch(self)
+
+
+def _sale(store_id, timestamp, product_id='p1', total=1.0):
+    return {'store_id': store_id, 'product_id': product_id, 'quantity': 1,
+            'unit_price': total, 'total': total, 'timestamp': timestamp}
+
+
+def _partition(store_id, timestamp):
+    return f"stores/{store_id}/sales_months/{partition_month(timestamp)}/sales"
+
+
+def _partitioned_db():
+    db = _Db()
+    start = datetime(2024, 1, 20)
+    for i in range(12):
+        ts = start + timedelta(days=7 * i)  # enero a abril
+        db.docs[f"{_partition('s1', ts)}/v{i:02d}"] = _sale('s1', ts, product_id=f"p{i % 2}")
+    return db
+
+
+def test_month_names_follow_firestore_utc():
+    assert month_range(datetime(2023, 11, 5), datetime(2024, 2, 1)) == ['202311', '202312', '202401', '202402']
+    late = datetime(2024, 1, 31, 23, 30, tzinfo=timezone(timedelta(hours=-3)))
+    assert partition_month(late) == '202402'
+    assert partition_month(datetime(2024, 1, 31, 23, 30)) == '202401'
+
+
+def test_partitioned_pages_span_months_in_order():
+    db = _partitioned_db()
+    ops = SalesOperations(db, partitioned=True)
+    ids, cursor = [], None
+    while True:
+        page = ops.get_sales_page('s1', page_size=5, cursor=cursor)
+        ids += [s.id for s in page['sales']]
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert ids == [f"v{i:02d}" for i in range(11, -1, -1)]
+
+    odd = ops.get_sales_page('s1', page_size=50, product_id='p1', descending=False)['sales']
+    assert [s.id for s in odd] == [f"v{i:02d}" for i in range(1, 12, 2)]
+    # Los meses de la tienda se listan una vez y se reutilizan en cada página
+    assert db.listings == ['stores/s1/sales_months']
+
+
+def test_period_query_reads_only_its_months():
+    db = _partitioned_db()
+    ops = SalesOperations(db, partitioned=True)
+    res = ops.get_sales_by_period('s1', datetime(2024, 2, 1), datetime(2024, 2, 29))
+    assert sorted(s.id for s in res['sales']) == ['v02', 'v03', 'v04', 'v05']
+    assert db.reads == ['stores/s1/sales_months/202402/sales']
+    assert db.listings == []
+
+
+def test_partitioned_sale_write_and_delete():
+    db = _Db()
+    ops = SalesOperations(db, partitioned=True)
+    res = ops.record_sale('s1', {'product_id': 'p1', 'quantity': 2, 'unit_price': 3})
+    path = f"{_partition('s1', datetime.now())}/{res['sale_id']}"
+    assert db.docs[path]['total'] == 6
+    assert [s.id for s in ops.get_sales_page('s1')['sales']] == [res['sale_id']]
+
+    # Una venta propia de otro mes se ve sin esperar a que venza la lista de meses
+    old = ops.record_sale('s1', {'product_id': 'p1', 'quantity': 1, 'unit_price': 1,
+                                 'timestamp': datetime(2020, 5, 1)})
+    assert [s.id for s in ops.get_sales_page('s1')['sales']] == [res['sale_id'], old['sale_id']]
+    assert db.listings == ['stores/s1/sales_months']
+    assert ops.delete_sale(res['sale_id'])['success'] is False  # falta la tienda
+
+
+def test_partitioned_aggregation_combines_months():
+    ops = MetricsOperations(_partitioned_db(), partitioned_sales=True)
+    res = ops.aggregate_sales('s1', datetime(2024, 1, 1), datetime(2024, 3, 31))
+    assert (res['count'], res['revenue']) == (11, 11.0)
+
+
+def test_migration_copies_into_partitions():
+    db = _Db()
+    for i, ts in enumerate([datetime(2024, 1, 3), datetime(2024, 2, 9), datetime(2024, 2, 10)]):
+        db.docs[f"sales/v{i}"] = _sale('s1' if i else 's2', ts)
+    db.docs['sales/bad'] = {'total': 1}
+
+    result = migrate_to_partitions(db, delete=True, batch_size=2)
+
+    assert result == {'copied': 3, 'skipped': 1}
+    assert sorted(db.docs) == ['sales/bad', 'stores/s1/sales_months/202402/sales/v1',
+                               'stores/s1/sales_months/202402/sales/v2',
+                               'stores/s2/sales_months/202401/sales/v0']
+
+
+def test_migration_rejects_batches_over_the_write_limit():
+    with pytest.raises(ValueError):
+        migrate_to_partitions(_Db(), delete=True, batch_size=300)
+
+    from tools import migrate_sales_partitions
+    with pytest.raises(SystemExit):
+        migrate_sales_partitions.main(['--delete', '--batch-size', '300'])
@@ -0,0 +1,198 @@
+import threading
+import time
+
+import pytest
+
+from autenticacion.session_backends import MemorySessionBackend, SessionBackend, SQLiteSessionBackend
+from autenticacion.sessionmanager import SessionManager
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmp_path):
+    if request.param == 'memory':
+        return MemorySessionBackend()
+    return SQLiteSessionBackend(str(tmp_path / 'sessions.db'))
+
+
+def test_expiry_and_cleanup_only_touch_due_sessions(backend):
+    clock = _Clock()
+    sm = SessionManager(backend, ttl=100, clock=clock)
+    first = sm.crear_sesion('u1', 'owner')['session_id']
+    clock.now += 50
+    second = sm.crear_sesion('u2', 'owner', tienda_id='s1')['session_id']
+
+    assert sm.verificar_sesion(second) == {'success': True, 'user_id': 'u2', 'rol': 'owner',
+                                           'tienda_id': 's1'}
+    clock.now += 60
+    assert sm.limpiar_sesiones_expiradas() == 1
+    assert not sm.get_sesion(first)['success']
+    assert sm.get_sesion(second)['success']
+    assert sm.cerrar_sesion(second)['success']
+    assert not sm.cerrar_sesion(second)['success']
+    assert len(sm) == 0
+
+
+def test_backends_must_implement_the_whole_interface():
+    class Partial(SessionBackend):
+        def create(self, session_id, record):
+            pass
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_sliding_expiry_reschedules_instead_of_evicting(backend):
+    clock = _Clock()
+    sm = SessionManager(backend, ttl=100, sliding=True, clock=clock)
+    sid = sm.crear_sesion('u1', 'owner')['session_id']
+    for _ in range(3):
+        clock.now += 80
+        assert sm.verificar_sesion(sid)['success']
+        assert sm.limpiar_sesiones_expiradas() == 0
+    clock.now += 101
+    assert sm.limpiar_sesiones_expiradas() == 1
+    assert sm.verificar_sesion(sid)['error'] == 'Sesión no encontrada'
+
+
+def test_reaper_thread_and_concurrent_access():
+    sm = SessionManager(ttl=0.05).start_reaper(interval=0.01)
+    try:
+        def worker():
+            for _ in range(200):
+                sid = sm.crear_sesion('u', 'owner')['session_id']
+                sm.verificar_sesion(sid)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        deadline = time.time() + 2
+        while len(sm) and time.time() < deadline:
+            time.sleep(0.01)
+        assert len(sm) == 0
+    finally:
+        sm.close()
+
+
+def test_sqlite_sessions_are_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    ui, worker = SessionManager(SQLiteSessionBackend(path)), SessionManager(SQLiteSessionBackend(path))
+    try:
+        sid = ui.crear_sesion('u1', 'owner', tienda_id='s1')['session_id']
+        assert worker.verificar_sesion(sid)['tienda_id'] == 's1'
+        assert worker.cerrar_sesion(sid)['success']
+        assert ui.verificar_sesion(sid) == {'success': False, 'error': 'Sesión no encontrada'}
+    finally:
+        ui.close()
+        worker.close()
+
+
+def _counting_auth(tmp_path, **kwargs):
+    from autenticacion.autenticacion import Autenticacion
+    from base_datos.firebase_client import FirebaseClient
+
+    fc = FirebaseClient.from_local_db(str(tmp_path / 'storeflow.db'))
+    reads = []
+    get_owner_data = fc.get_owner_data
+
+    def counting(user_id):
+        reads.append(user_id)
+        return get_owner_data(user_id)
+
+    fc.get_owner_data = counting
+    return Autenticacion(firebase_client=fc, **kwargs), reads
+
+
+def test_signed_session_is_verified_without_reading_the_database(tmp_path):
+    auth, reads = _counting_auth(tmp_path)
+    reg = auth.registrar_cuenta('dueno@test.com', 'Secreta1!', 'Dueño Uno')
+    token = reg['session_id']
+
+    for _ in range(3):
+        assert auth.verificar_sesion(token)['user_id'] == reg['user_id']
+    assert auth.get_datos_sesion(token)['datos_usuario']['nombre'] == 'Dueño Uno'
+    assert reads == []
+
+    tampered = token[:-2] + ('AA' if not token.endswith('AA') else 'BB')
+    assert auth.verificar_sesion(tampered) == {'success': False, 'error': 'Sesión inválida'}
+    assert auth.logout(token)['success']
+    assert auth.verificar_sesion(token) == {'success': False, 'error': 'Sesión cerrada'}
+
+    login = auth.login('dueno@test.com', 'Secreta1!')
+    auth._profiles.clear()
+    assert auth.get_datos_sesion(login['session_id'])['datos_usuario']['email'] == 'dueno@test.com'
+    assert auth.get_datos_sesion(login['session_id'])['success']
+    assert reads == [login['user_id']] * 2  # login + un único fallo de caché
+    auth.session_manager.close()
+
+
+def test_key_rotation_keeps_recent_tokens_and_is_shared_through_the_key_file(tmp_path):
+    from autenticacion import session_tokens
+    from autenticacion.session_tokens import SessionTokenSigner
+
+    path = str(tmp_path / 'session_keys.json')
+    signer = SessionTokenSigner.from_key_file(path)
+    other_process = SessionTokenSigner.from_key_file(path)
+    old = signer.sign({'sid': 'a', 'uid': 'u', 'rol': 'owner', 'exp': time.time() + 60})
+
+    signer.rotate()
+    new = signer.sign({'sid': 'b', 'uid': 'u', 'rol': 'owner', 'exp': time.time() + 60})
+    assert signer.verify(old)[0]['sid'] == 'a'
+    other_process._last_reload -= session_tokens.KEY_RELOAD_SECONDS
+    assert other_process.verify(new)[0]['sid'] == 'b'
+
+    signer.rotate()
+    assert signer.verify(old) == (None, 'Sesión inválida')
+    assert signer.verify(new)[0]['sid'] == 'b'
+    expired = signer.sign({'sid': 'c', 'uid': 'u', 'rol': 'owner', 'exp': time.time() - 1})
+    assert signer.verify(expired) == (None, 'Sesión expirada')
+
+
+def test_tokens_are_renewed_through_the_store_as_the_session_slides(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+    from autenticacion import autenticacion
+
+    now = [time.time()]
+    monkeypatch.setattr(autenticacion, 'time', SimpleNamespace(time=lambda: now[0]))
+    auth, _ = _counting_auth(tmp_path)
+    token = auth.registrar_cuenta('dueno@test.com', 'Secreta1!', 'Dueño Uno')['session_id']
+    assert auth.verificar_sesion(token)['session_id'] == token
+
+    # Pasada la mitad de su vida (o vencido) el token se renueva si la sesión sigue viva
+    now[0] += auth.token_ttl
+    renewed = auth.verificar_sesion(token)
+    assert renewed['success'] and renewed['session_id'] != token
+    assert auth.verificar_sesion(renewed['session_id'])['session_id'] == renewed['session_id']
+
+    auth.session_manager.cerrar_sesion(renewed['sid'])
+    now[0] += auth.token_ttl
+    assert auth.verificar_sesion(renewed['session_id']) == {'success': False, 'error': 'Sesión no encontrada'}
+    auth.session_manager.close()
+
+
+def test_logout_in_one_process_is_seen_by_others_sharing_the_store(tmp_path):
+    from autenticacion.session_tokens import SessionTokenSigner
+
+    def process():
+        return _counting_auth(
+            tmp_path, session_backend=SQLiteSessionBackend(str(tmp_path / 'sessions.db')),
+            token_signer=SessionTokenSigner.from_key_file(str(tmp_path / 'keys.json')))[0]
+
+    ui, worker = process(), process()
+    try:
+        token = ui.registrar_cuenta('dueno@test.com', 'Secreta1!', 'Dueño Uno')['session_id']
+        assert worker.verificar_sesion(token)['success']
+        assert worker.logout(token)['success']
+        assert ui.verificar_sesion(token) == {'success': False, 'error': 'Sesión cerrada'}
+    finally:
+        ui.session_manager.close()
+        worker.session_manager.close()
@@ -0,0 +1,56 @@
+from base_datos.store_operations import STORES_BATCH_SIZE, StoreOperations
+
+
+class _Snapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class _Ref:
+    def __init__(self, collection, doc_id):
+        self.collection, self.id = collection, doc_id
+
+    def get(self):
+        return _Snapshot(self.id, self.collection.docs.get(self.id))
+
+
+class _Collection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def document(self, doc_id):
+        return _Ref(self, doc_id)
+
+
+class _Db:
+    """Firestore mínimo: `get_all` entrega los documentos en otro orden."""
+
+    def __init__(self, users, stores):
+        self.collections = {'users': _Collection(users), 'stores': _Collection(stores)}
+        self.batches = []
+
+    def collection(self, name):
+        return self.collections.setdefault(name, _Collection({}))
+
+    def get_all(self, refs):
+        self.batches.append(len(refs))
+        return [ref.get() for ref in reversed(refs)]
+
+
+def test_user_stores_are_read_in_batches_keeping_order():
+    owned = [f's{i:02d}' for i in range(STORES_BATCH_SIZE * 2 + 5)]
+    missing = {'s03', 's40'}
+    stores = {sid: {'name': f'Tienda {sid}'} for sid in owned if sid not in missing}
+    db = _Db({'u1': {'owned_stores': owned}}, stores)
+
+    res = StoreOperations(db=db).get_user_stores('u1')
+
+    assert res['success']
+    assert db.batches == [STORES_BATCH_SIZE, STORES_BATCH_SIZE, 5]
+    assert [s['id'] for s in res['stores']] == [sid for sid in owned if sid not in missing]
+    assert res['stores'][0] == {'name': 'Tienda s00', 'id': 's00'}
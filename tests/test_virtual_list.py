@@ -0,0 +1,55 @@
+import pytest
+
+from base_datos.firebase_client import FirebaseClient
+from tools.integration_test import FakeFirebaseClient
+from ui.virtual_list import PagedRows
+
+
+@pytest.fixture(params=['local', 'memory'])
+def catalog(request, tmp_path):
+    if request.param == 'local':
+        client = FirebaseClient.from_local_db(str(tmp_path / 'storeflow.db'))
+        owner_id = client.create_account('owner@test.com', 'Secreta1!')['user_id']
+        store_id = client.create_store({'name': 'Tienda', 'address': 'Calle'}, owner_id)['store_id']
+    else:
+        client = FakeFirebaseClient()
+        store_id = client.create_store({'name': 'Tienda'}, 'owner')['store_id']
+    for name in ['Café', 'Azúcar', 'Cacao', 'Arroz', 'Canela', 'Sal']:
+        client.create_product(store_id, {'name': name, 'price': '1'})
+    return client, store_id
+
+
+def _rows(client, store_id, page_size=2):
+    def fetch(size, cursor, prefix, descending):
+        return client.get_products_page(store_id, size, cursor, prefix or None, descending)
+    return PagedRows(fetch, 'products', lambda p: p['name'].upper(), page_size)
+
+
+def _load_all(rows):
+    while rows.needs_more(len(rows.rows)):
+        generation = rows.generation
+        assert rows.apply(generation, rows.load(rows.begin_load()))
+
+
+def test_rows_are_sorted_and_filtered_by_the_backend(catalog):
+    client, store_id = catalog
+    rows = _rows(client, store_id)
+    rows.reset(descending=False)
+    _load_all(rows)
+    assert rows.rows == ['ARROZ', 'AZÚCAR', 'CACAO', 'CAFÉ', 'CANELA', 'SAL']
+    assert rows.exhausted
+
+    rows.reset(filter_text='Ca', descending=True)
+    _load_all(rows)
+    assert [p['name'] for p in rows.items] == ['Canela', 'Café', 'Cacao']
+
+
+def test_pages_from_a_previous_query_are_discarded(catalog):
+    client, store_id = catalog
+    rows = _rows(client, store_id)
+    generation = rows.generation
+    stale = rows.load(rows.begin_load())
+    rows.reset(filter_text='Sal')
+    assert rows.apply(generation, stale) is False
+    assert rows.rows == []
+    assert rows.needs_more(0)
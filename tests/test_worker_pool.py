@@ -0,0 +1,94 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from ui.worker_pool import UIExecutor
+
+
+def _wait_for(condition, timeout=5):
+    """Los callbacks corren después de que el Future queda resuelto."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def _blocking_call():
+    """Función que espera a `release` y cuenta sus ejecuciones."""
+    release = threading.Event()
+    calls = []
+
+    def fetch(store_id):
+        calls.append(store_id)
+        release.wait(5)
+        return {'success': True, 'store_id': store_id}
+    return fetch, release, calls
+
+
+def test_identical_requests_share_one_call():
+    executor = UIExecutor(max_workers=2)
+    fetch, release, calls = _blocking_call()
+    results = []
+    first = executor.submit(fetch, 's1', on_done=lambda res, err: results.append(res))
+    second = executor.submit(fetch, 's1', on_done=lambda res, err: results.append(res))
+    other = executor.submit(fetch, 's2')
+    release.set()
+    first.result(5)
+    other.result(5)
+    _wait_for(lambda: len(results) == 2)
+
+    assert first is second
+    assert sorted(calls) == ['s1', 's2']
+    assert results == [{'success': True, 'store_id': 's1'}] * 2
+    executor.shutdown()
+
+
+def test_non_coalesced_requests_run_separately():
+    executor = UIExecutor(max_workers=2)
+    fetch, release, calls = _blocking_call()
+    release.set()
+    executor.submit(fetch, 's1', coalesce=False).result(5)
+    executor.submit(fetch, 's1', coalesce=False).result(5)
+    assert calls == ['s1', 's1']
+    executor.shutdown()
+
+
+def test_cancel_stale_drops_old_results_and_queued_calls():
+    executor = UIExecutor(max_workers=1)
+    fetch, release, calls = _blocking_call()
+    delivered = []
+    running = executor.submit(fetch, 'old', on_done=lambda res, err: delivered.append(('old', res)))
+    queued = executor.submit(fetch, 'queued', on_done=lambda res, err: delivered.append(('queued', res)))
+    kept = executor.submit(fetch, 'write', coalesce=False, cancellable=False,
+                           on_done=lambda res, err: delivered.append(('write', res)))
+    tracked = executor.track(Future())
+
+    executor.cancel_stale()
+    assert queued.cancelled()
+    assert tracked.cancelled()
+
+    # Un pedido nuevo idéntico al que ya corre no se une a él: la lectura
+    # vieja pudo empezar antes de la escritura
+    fresh = executor.submit(fetch, 'old', on_done=lambda res, err: delivered.append(('fresh', res)))
+    assert fresh is not running
+
+    release.set()
+    fresh.result(5)
+    kept.result(5)
+    _wait_for(lambda: len(delivered) == 2)
+    assert calls == ['old', 'write', 'old']
+    assert sorted(name for name, _ in delivered) == ['fresh', 'write']
+    executor.shutdown()
+
+
+def test_errors_are_delivered_to_callbacks():
+    executor = UIExecutor(max_workers=1)
+    errors = []
+
+    def fail():
+        raise RuntimeError('sin conexión')
+
+    executor.submit(fail, on_done=lambda res, err: errors.append(err)).exception(5)
+    _wait_for(lambda: errors)
+    assert [str(e) for e in errors] == ['sin conexión']
+    executor.shutdown()
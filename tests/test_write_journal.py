@@ -0,0 +1,176 @@
+from base_datos.firebase_client import FirebaseClient
+from base_datos.write_journal import JournaledFirebaseClient, WriteJournal
+
+
+class _Flaky:
+    """Cliente que falla como Firestore sin red mientras `online` es False."""
+
+    def __init__(self, client):
+        self.client = client
+        self.online = False
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        def call(*args, **kwargs):
+            if not self.online:
+                return {'success': False, 'error': '503 Service Unavailable'}
+            return method(*args, **kwargs)
+        return call
+
+
+def _setup(tmp_path, stock='5'):
+    fc = FirebaseClient.from_local_db(str(tmp_path / 'store.db'))
+    owner_id = fc.create_account('o@test.com', 'Secreta1!')['user_id']
+    store_id = fc.create_store({'name': 'Tienda', 'address': 'Calle'}, owner_id)['store_id']
+    pid = fc.create_product(store_id, {'name': 'Prod', 'price': '2', 'stock': stock})['product_id']
+    return fc, store_id, pid
+
+
+def test_sales_are_acknowledged_offline_and_replayed_in_order(tmp_path):
+    fc, store_id, pid = _setup(tmp_path)
+    backend = _Flaky(fc)
+    client = JournaledFirebaseClient(backend, WriteJournal(str(tmp_path / 'journal.jsonl')))
+
+    results = [client.record_sale_with_stock(store_id, {'product_id': pid, 'quantity': q, 'unit_price': 2})
+               for q in (1, 2)]
+    assert all(r['success'] and r['queued'] for r in results)
+    assert not client.record_sale_with_stock(store_id, {'product_id': pid, 'quantity': 0, 'unit_price': 2})['success']
+
+    assert client.sync_once() is False
+    assert client.sync_status()['pending'] == 2 and fc.get_store_sales(store_id)['sales'] == []
+
+    backend.online = True
+    assert client.flush()
+    sales = fc.get_store_sales(store_id)['sales']
+    assert sorted(s['id'] for s in sales) == sorted(r['sale_id'] for r in results)
+    assert fc.get_store_products(store_id)['products'][0]['stock'] == 2
+    assert client.sync_status() == {'pending': 0, 'conflicts': [], 'last_error': None}
+
+
+def test_replay_after_lost_done_marks_does_not_duplicate(tmp_path):
+    fc, store_id, pid = _setup(tmp_path)
+    path = tmp_path / 'journal.jsonl'
+    client = JournaledFirebaseClient(fc, WriteJournal(str(path)))
+    client.record_sale_with_stock(store_id, {'product_id': pid, 'quantity': 1, 'unit_price': 2})
+    client.record_basket(store_id, [{'product_id': pid, 'quantity': 1, 'unit_price': 2}])
+    client.create_product(store_id, {'name': 'Nuevo', 'price': '1'})
+    assert client.flush()
+    client.journal.close()
+
+    # Apagón antes de que las marcas de terminado llegaran al disco
+    lines = path.read_text(encoding='utf-8').splitlines()
+    path.write_text('\n'.join(l for l in lines if '"done"' not in l) + '\n{"key": "cort', encoding='utf-8')
+
+    reopened = JournaledFirebaseClient(fc, WriteJournal(str(path)))
+    assert len(reopened.journal.pending()) == 3
+    assert reopened.flush()
+    assert len(fc.get_store_sales(store_id)['sales']) == 2
+    assert len(fc.get_store_products(store_id)['products']) == 2
+    assert fc.get_products_by_ids(store_id, [pid])['products'][0]['stock'] == 3
+
+
+def test_rejected_writes_become_conflicts_and_the_queue_moves_on(tmp_path):
+    fc, store_id, pid = _setup(tmp_path, stock='1')
+    seen = []
+    client = JournaledFirebaseClient(fc, WriteJournal(str(tmp_path / 'journal.jsonl')), on_conflict=seen.append)
+    first = client.record_sale_with_stock(store_id, {'product_id': pid, 'quantity': 1, 'unit_price': 2})
+    second = client.record_sale_with_stock(store_id, {'product_id': pid, 'quantity': 1, 'unit_price': 2})
+    client.update_product(store_id, pid, {'price': '3'})
+
+    assert client.flush()
+    conflicts = client.sync_status()['conflicts']
+    assert [c['key'] for c in conflicts] == [second['sale_id']] == [c['key'] for c in seen]
+    assert 'Stock insuficiente' in conflicts[0]['error']
+    assert [s['id'] for s in fc.get_store_sales(store_id)['sales']] == [first['sale_id']]
+    assert fc.get_store_products(store_id)['products'][0]['price'] == 3.0
+
+    # Los conflictos sobreviven a reabrir y compactar el diario
+    client.journal.compact()
+    client.journal.close()
+    assert [c['key'] for c in WriteJournal(str(tmp_path / 'journal.jsonl')).conflicts()] == [second['sale_id']]
+
+
+def test_background_syncer_drains_the_queue(tmp_path):
+    import time
+
+    fc, store_id, pid = _setup(tmp_path)
+    client = JournaledFirebaseClient(fc, WriteJournal(str(tmp_path / 'journal.jsonl'))).start()
+    try:
+        for _ in range(3):
+            client.record_sale_with_stock(store_id, {'product_id': pid, 'quantity': 1, 'unit_price': 2})
+        deadline = time.monotonic() + 5
+        while client.sync_status()['pending'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(fc.get_store_sales(store_id)['sales']) == 3
+    finally:
+        client.close()
+
+
+def test_invalid_sale_data_returns_an_error_instead_of_raising(tmp_path):
+    fc, store_id, pid = _setup(tmp_path)
+    client = JournaledFirebaseClient(fc, WriteJournal(str(tmp_path / 'journal.jsonl')))
+
+    res = client.record_sale_with_stock(store_id, {'product_id': pid, 'quantity': 'abc', 'unit_price': 2})
+    assert res == {'success': False, 'error': 'Cantidad y precio deben ser válidos'}
+    assert not client.record_basket(store_id, [{'product_id': pid, 'quantity': 'abc', 'unit_price': 2}])['success']
+    assert not client.record_basket(store_id, ['no es una línea'])['success']
+    assert client.sync_status()['pending'] == 0
+
+
+class _Counting:
+    """Cliente que cuenta las llamadas a cada método."""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        def call(*args, **kwargs):
+            self.calls.append(name)
+            return method(*args, **kwargs)
+        return call
+
+
+def test_product_writes_are_replayed_in_write_batches(tmp_path):
+    fc, store_id, pid = _setup(tmp_path)
+    backend = _Counting(fc)
+    client = JournaledFirebaseClient(backend, WriteJournal(str(tmp_path / 'journal.jsonl')))
+    created = [client.create_product(store_id, {'name': f'P{i}', 'price': 1})['product_id'] for i in range(5)]
+    client.update_product(store_id, created[0], {'price': 2})
+    client.record_sale_with_stock(store_id, {'product_id': pid, 'quantity': 1, 'unit_price': 2})
+    client.delete_product(store_id, created[1])
+
+    assert client.flush()
+    # Las 5 altas en un lote; el cambio del mismo documento ya no entra en él
+    assert backend.calls == ['write_products', 'update_product', 'record_sale_with_stock', 'delete_product']
+    products = {p['id']: p for p in fc.get_store_products(store_id)['products']}
+    assert products[created[0]]['price'] == 2.0 and created[1] not in products
+
+    # Un lote con un producto inexistente se reenvía de uno en uno: solo ese va a conflictos
+    backend.calls.clear()
+    client.update_product(store_id, 'no-existe', {'price': 3})
+    client.update_product(store_id, created[2], {'price': 4})
+    assert client.flush()
+    assert backend.calls == ['write_products', 'update_product', 'update_product']
+    assert [c['args']['product_id'] for c in client.sync_status()['conflicts']] == ['no-existe']
+
+
+def test_permanent_firestore_errors_become_conflicts(tmp_path):
+    from google.api_core import exceptions as gcp_exceptions
+
+    fc, store_id, pid = _setup(tmp_path)
+
+    class _Denied(_Counting):
+        def delete_sale(self, sale_id, store_id=None):
+            raise gcp_exceptions.PermissionDenied('Missing or insufficient permissions.')
+
+    client = JournaledFirebaseClient(_Denied(fc), WriteJournal(str(tmp_path / 'journal.jsonl')))
+    client.delete_sale('s1', store_id)
+    sale = client.record_sale_with_stock(store_id, {'product_id': pid, 'quantity': 1, 'unit_price': 2})
+
+    assert client.flush()
+    assert [c['op'] for c in client.sync_status()['conflicts']] == ['delete_sale']
+    assert [s['id'] for s in fc.get_store_sales(store_id)['sales']] == [sale['sale_id']]
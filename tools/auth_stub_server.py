@@ -0,0 +1,205 @@
+"""Servidor local que imita los endpoints REST de Firebase Auth usados por la app.
+
+Sirve para probar el login, la renovación de tokens y la verificación local
+de ID tokens sin red:
+
+- POST /signIn?key=...    como accounts:signInWithPassword
+- POST /token?key=...     como securetoken /v1/token (grant_type=refresh_token)
+- GET  /certs             certificados x509 {kid: PEM}, con Cache-Control
+
+Los ID tokens se firman con RS256 con una clave generada al arrancar;
+`rotate_key()` añade una clave nueva (como hace Google) y firma con ella.
+
+Uso:
+    python tools/auth_stub_server.py [--port 8765] [--project demo-storeflow]
+        [--account email:contraseña ...]
+"""
+import argparse
+import datetime
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt, jwt
+
+# ensure package root is on sys.path so imports like 'base_datos' resolve
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from base_datos.id_tokens import FIREBASE_ISSUER
+
+
+def _new_key():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'storeflow-stub')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name)
+            .public_key(key.public_key()).serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .sign(key, hashes.SHA256()))
+    pem_key = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption())
+    return pem_key, cert.public_bytes(serialization.Encoding.PEM).decode('ascii')
+
+
+class StubAuthServer:
+    """Firebase Auth de mentira en un hilo, con contadores de peticiones."""
+
+    def __init__(self, project_id: str = 'demo-storeflow', port: int = 0,
+                 token_lifetime: int = 3600, certs_max_age: int = 3600):
+        self.project_id = project_id
+        self.token_lifetime = token_lifetime
+        self.certs_max_age = certs_max_age
+        self.accounts = {}        # email -> (password, user_id)
+        self.refresh_tokens = {}  # refresh token -> user_id
+        self.requests = Counter()
+        # {ruta: n} responde 503 a las próximas n peticiones (para probar reintentos)
+        self.fail_next = Counter()
+        self._signers = {}        # kid -> (signer, cert PEM)
+        self._lock = threading.Lock()
+        self.rotate_key()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='auth-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self._server.shutdown()
+        self._server.server_close()
+
+    def add_account(self, email, password, user_id=None):
+        user_id = user_id or secrets.token_hex(14)
+        self.accounts[email] = (password, user_id)
+        return user_id
+
+    def rotate_key(self) -> str:
+        """Firma en adelante con una clave nueva; las anteriores siguen publicadas."""
+        kid = secrets.token_hex(20)
+        pem_key, cert = _new_key()
+        with self._lock:
+            self._signers[kid] = (crypt.RSASigner.from_string(pem_key, key_id=kid), cert)
+            self.active_kid = kid
+        return kid
+
+    def issue_id_token(self, user_id, lifetime: int = None, kid: str = None) -> str:
+        now = int(time.time())
+        signer = self._signers[kid or self.active_kid][0]
+        payload = {
+            'iss': FIREBASE_ISSUER.format(project_id=self.project_id), 'aud': self.project_id,
+            'sub': user_id, 'user_id': user_id, 'auth_time': now, 'iat': now,
+            'exp': now + (self.token_lifetime if lifetime is None else lifetime),
+        }
+        return jwt.encode(signer, payload).decode('ascii')
+
+    def _issue(self, user_id):
+        refresh_token = secrets.token_urlsafe(24)
+        self.refresh_tokens[refresh_token] = user_id
+        return self.issue_id_token(user_id), refresh_token
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1: la conexión queda abierta entre peticiones (keep-alive)
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _failing(self, path):
+                if stub.fail_next[path] > 0:
+                    stub.fail_next[path] -= 1
+                    self._reply(503, {'error': {'message': 'UNAVAILABLE'}})
+                    return True
+                return False
+
+            def _reply(self, status, body, headers=None):
+                raw = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(raw)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                stub.requests[path] += 1
+                if self._failing(path):
+                    return
+                if path != '/certs':
+                    return self._reply(404, {})
+                with stub._lock:
+                    certs = {kid: cert for kid, (_, cert) in stub._signers.items()}
+                self._reply(200, certs, {'Cache-Control': f'public, max-age={stub.certs_max_age}'})
+
+            def do_POST(self):
+                path = urlparse(self.path).path
+                stub.requests[path] += 1
+                raw = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode('utf-8')
+                if self._failing(path):
+                    return
+                if path == '/signIn':
+                    body = json.loads(raw or '{}')
+                    password, user_id = stub.accounts.get(body.get('email'), (None, None))
+                    if password is None or password != body.get('password'):
+                        return self._reply(400, {'error': {'message': 'INVALID_PASSWORD'}})
+                    id_token, refresh_token = stub._issue(user_id)
+                    return self._reply(200, {'localId': user_id, 'idToken': id_token,
+                                             'refreshToken': refresh_token,
+                                             'expiresIn': str(stub.token_lifetime)})
+                if path == '/token':
+                    form = {k: v[0] for k, v in parse_qs(raw).items()}
+                    user_id = stub.refresh_tokens.get(form.get('refresh_token'))
+                    if user_id is None:
+                        return self._reply(400, {'error': {'message': 'INVALID_REFRESH_TOKEN'}})
+                    id_token = stub.issue_id_token(user_id)
+                    return self._reply(200, {'id_token': id_token, 'refresh_token': form['refresh_token'],
+                                             'expires_in': str(stub.token_lifetime), 'user_id': user_id})
+                self._reply(404, {})
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local de Firebase Auth para pruebas")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--project', default='demo-storeflow')
+    parser.add_argument('--account', action='append', default=[], help="Cuenta email:contraseña (repetible)")
+    args = parser.parse_args(argv)
+    stub = StubAuthServer(args.project, port=args.port)
+    for account in args.account:
+        email, _, password = account.partition(':')
+        print(f"{email}: user_id {stub.add_account(email, password)}")
+    stub.start()
+    print(f"Firebase Auth de prueba en {stub.url} (proyecto {args.project}); Ctrl+C para salir")
+    try:
+        stub._thread.join()
+    except KeyboardInterrupt:
+        stub.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
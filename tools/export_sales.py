@@ -0,0 +1,336 @@
+"""Exporta el historial de ventas a archivos columnares (Parquet o Arrow IPC).
+
+Uso:
+    python tools/export_sales.py --store ID [--store ID2] --output DIR
+        [--since AAAA-MM-DD] [--until AAAA-MM-DD] [--format parquet|arrow]
+        [--row-group-size N] [--full]
+
+Las ventas se leen por páginas en orden cronológico (la misma paginación
+por cursor que usa la app) y se escriben en grupos de filas de tamaño fijo,
+así que la memoria no depende del tamaño del historial. Cada tienda se
+guarda en DIR/store-ID/ con un archivo por ejecución; la carpeta DIR
+completa se lee como un solo dataset con `pyarrow.dataset.dataset(DIR)`.
+
+Exportación incremental: al terminar se guarda en DIR/store-ID/_cursor.json
+el cursor de la última venta exportada y la siguiente ejecución sigue desde
+ahí, agregando solo un archivo con las ventas nuevas. Las ventas que llegan
+tarde (registradas sin conexión y sincronizadas después, con su hora
+original) quedan detrás del cursor: cada ejecución vuelve a leer una
+ventana de --rescan-hours antes del cursor y salta las ventas de esa
+ventana ya exportadas, cuyos IDs se guardan junto al cursor. --full ignora
+el cursor y, al terminar, reemplaza los archivos anteriores de la tienda.
+
+Requiere pyarrow (`pip install pyarrow`).
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+# ensure package root is on sys.path so imports like 'base_datos' resolve
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from base_datos.pagination import decode_cursor, encode_cursor, iter_pages
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: solo lo necesita este exportador
+    pa = pa_ipc = pq = None
+
+EXPORT_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+EXPORT_ROW_GROUP_SIZE = 50_000
+# Ventas por página leída de la base
+EXPORT_PAGE_SIZE = 1000
+CURSOR_FILE = '_cursor.json'
+# Ventana que se vuelve a leer detrás del cursor en busca de ventas tardías
+EXPORT_RESCAN_WINDOW = timedelta(hours=48)
+
+# Columnas exportadas, en orden
+EXPORT_COLUMNS = ('sale_id', 'store_id', 'timestamp', 'product_id', 'quantity', 'unit_price', 'total')
+
+
+def export_schema():
+    """Esquema Arrow de las columnas exportadas."""
+    _require_pyarrow()
+    return pa.schema([
+        ('sale_id', pa.string()),
+        ('store_id', pa.string()),
+        ('timestamp', pa.timestamp('us', tz='UTC')),
+        ('product_id', pa.string()),
+        ('quantity', pa.int64()),
+        ('unit_price', pa.float64()),
+        ('total', pa.float64()),
+    ])
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("La exportación columnar requiere pyarrow (pip install pyarrow)")
+
+
+def _as_utc(value):
+    """Datetime con zona UTC (las fechas sin zona se toman como UTC)."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _number(value, kind):
+    try:
+        return kind(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _rewind_cursor(cursor: str, window: timedelta) -> str:
+    """Cursor `window` antes del indicado (antes de todas las ventas de ese instante)."""
+    value, _ = decode_cursor(cursor)
+    if value is None:
+        return cursor
+    if isinstance(value, str):
+        return encode_cursor((datetime.fromisoformat(value) - window).isoformat(), '')
+    return encode_cursor(value - window, '')
+
+
+def iter_row_groups(client, store_id, since=None, until=None, cursor: str = None,
+                    row_group_size: int = EXPORT_ROW_GROUP_SIZE, page_size: int = EXPORT_PAGE_SIZE,
+                    rescan: timedelta = None, seen=()):
+    """Genera las ventas de una tienda en grupos de filas columnares.
+
+    Args:
+        client: FirebaseClient (o un envoltorio) con get_sales_page
+        since, until: Período opcional (datetime o ISO); `until` es inclusivo
+        cursor: Cursor de la última venta ya exportada (None = desde el
+            principio; las ventas anteriores a `since` se leen y se saltan)
+        rescan: Volver a leer esta ventana antes del cursor (ventas tardías)
+        seen: IDs ya exportados que se saltan (los de esa ventana)
+
+    Yields:
+        Tuplas ({columna: lista de valores}, cursor de la última fila del
+        grupo). Como mucho se tienen en memoria una página y un grupo.
+
+    Raises:
+        RuntimeError: Si la base responde con error
+    """
+    since = _as_utc(since) if since is not None else None
+    until = _as_utc(until) if until is not None else None
+    columns = {name: [] for name in EXPORT_COLUMNS}
+    last = None
+    start = _rewind_cursor(cursor, rescan) if cursor and rescan else cursor
+
+    for sale in _iter_sales(client, store_id, start, page_size):
+        timestamp = sale.get('timestamp')
+        when = _as_utc(timestamp) if timestamp is not None else None
+        if until is not None and when is not None and when > until:
+            break
+        last = encode_cursor(timestamp, sale['id'])
+        if since is not None and (when is None or when < since):
+            continue
+        if str(sale['id']) in seen:
+            continue
+        columns['sale_id'].append(str(sale['id']))
+        columns['store_id'].append(str(sale.get('store_id') or store_id))
+        columns['timestamp'].append(when)
+        columns['product_id'].append(None if sale.get('product_id') is None else str(sale['product_id']))
+        columns['quantity'].append(_number(sale.get('quantity'), int))
+        columns['unit_price'].append(_number(sale.get('unit_price'), float))
+        columns['total'].append(_number(sale.get('total'), float))
+        if len(columns['sale_id']) >= row_group_size:
+            yield columns, last
+            columns = {name: [] for name in EXPORT_COLUMNS}
+    if columns['sale_id']:
+        yield columns, last
+    elif last is not None and last != cursor:
+        # Solo ventas anteriores al período: el cursor avanza sin filas
+        yield None, last
+
+
+def _iter_sales(client, store_id, cursor, page_size):
+    """Ventas de la tienda en orden cronológico, después del cursor."""
+    def fetch(page_cursor):
+        return client.get_sales_page(store_id, page_size=page_size, cursor=page_cursor, descending=False)
+
+    for page in iter_pages(fetch, cursor):
+        if not page.get('success'):
+            raise RuntimeError(f"Error leyendo ventas de {store_id}: {page.get('error')}")
+        yield from page['sales']
+
+
+class _Writer:
+    """Escritor de grupos de filas en Parquet o en un archivo Arrow IPC."""
+
+    def __init__(self, path, fmt, schema):
+        self.schema = schema
+        self._sink = None
+        if fmt == 'parquet':
+            self._writer = pq.ParquetWriter(path, schema)
+        else:
+            self._sink = pa.OSFile(path, 'wb')
+            self._writer = pa_ipc.new_file(self._sink, schema)
+
+    def write(self, columns: dict):
+        """Escribe un grupo de filas (Parquet: un row group; Arrow: un record batch)."""
+        table = pa.table({name: columns[name] for name in EXPORT_COLUMNS}, schema=self.schema)
+        if self._sink is None:
+            self._writer.write_table(table, row_group_size=len(table))
+        else:
+            self._writer.write_table(table, max_chunksize=len(table))
+
+    def close(self):
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+
+
+def read_export_state(store_dir: str) -> dict:
+    """Estado guardado por la última exportación de la tienda.
+
+    Returns:
+        Dict con `cursor` y `recent` ({sale_id: fecha ISO} de las ventas
+        exportadas dentro de la ventana de relectura); vacío si no hay
+    """
+    path = os.path.join(store_dir, CURSOR_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_export_cursor(store_dir: str):
+    """Cursor guardado por la última exportación de la tienda, o None."""
+    return read_export_state(store_dir).get('cursor')
+
+
+def _save_export_cursor(store_dir: str, cursor: str, recent: dict):
+    path = os.path.join(store_dir, CURSOR_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'cursor': cursor, 'recent': recent,
+                   'exported_at': datetime.now(timezone.utc).isoformat()}, f)
+    os.replace(tmp_path, path)
+
+
+def _recent_exports(exported: dict, cursor: str, window: timedelta) -> dict:
+    """Ventas exportadas que caen dentro de la ventana de relectura del cursor."""
+    value, _ = decode_cursor(cursor)
+    if value is None:
+        return {}
+    horizon = _as_utc(value) - window
+    return {sale_id: when for sale_id, when in exported.items() if _as_utc(when) >= horizon}
+
+
+def export_store_sales(client, store_id, output_dir: str, fmt: str = 'parquet', since=None, until=None,
+                       incremental: bool = True, row_group_size: int = EXPORT_ROW_GROUP_SIZE,
+                       page_size: int = EXPORT_PAGE_SIZE,
+                       rescan_window: timedelta = EXPORT_RESCAN_WINDOW) -> dict:
+    """Exporta las ventas de una tienda a un archivo nuevo de DIR/store-ID/.
+
+    El archivo se escribe con un nombre temporal y se renombra al cerrarlo;
+    el cursor se guarda después, así que una exportación interrumpida no
+    deja archivos a medias y se repite entera la próxima vez.
+
+    Args:
+        incremental: Seguir desde el cursor guardado; con False se exporta
+            todo y, al terminar, se borran los archivos anteriores de la tienda
+        rescan_window: Ventana que se relee detrás del cursor; las ventas
+            que lleguen con una fecha más antigua no se exportan
+
+    Returns:
+        Dict con path (None si no había ventas nuevas), rows y row_groups
+    """
+    _require_pyarrow()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt}")
+    store_dir = os.path.join(output_dir, f'store-{store_id}')
+    os.makedirs(store_dir, exist_ok=True)
+    state = read_export_state(store_dir) if incremental else {}
+    cursor = state.get('cursor')
+    # Un cursor sin `recent` (de una versión anterior) no se puede releer sin duplicar
+    recent = state.get('recent')
+    exported = dict(recent or {})
+    previous = [] if incremental else [name for name in os.listdir(store_dir) if name.startswith('part-')]
+
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+    name = f'part-{stamp}{EXPORT_FORMATS[fmt]}'
+    path = os.path.join(store_dir, name)
+    # Los nombres que empiezan por '_' los ignora pyarrow.dataset
+    tmp_path = os.path.join(store_dir, f'_{name}.tmp')
+    writer = None
+    rows = groups = 0
+    last = cursor
+    try:
+        for columns, last in iter_row_groups(client, store_id, since, until, cursor,
+                                             row_group_size, page_size,
+                                             rescan=rescan_window if recent is not None else None,
+                                             seen=recent or {}):
+            if columns is None:
+                continue
+            if writer is None:
+                writer = _Writer(tmp_path, fmt, export_schema())
+            writer.write(columns)
+            rows += len(columns['sale_id'])
+            groups += 1
+            exported.update((sale_id, when.isoformat())
+                            for sale_id, when in zip(columns['sale_id'], columns['timestamp'])
+                            if when is not None)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            os.remove(tmp_path)
+        raise
+    if writer is not None:
+        writer.close()
+        os.replace(tmp_path, path)
+    for name in previous:
+        os.remove(os.path.join(store_dir, name))
+    if last is not None and (last != cursor or rows or recent is None):
+        _save_export_cursor(store_dir, last, _recent_exports(exported, last, rescan_window))
+    elif not incremental and os.path.exists(os.path.join(store_dir, CURSOR_FILE)):
+        os.remove(os.path.join(store_dir, CURSOR_FILE))
+    return {'path': path if writer is not None else None, 'rows': rows, 'row_groups': groups}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta ventas a Parquet o Arrow")
+    parser.add_argument('--store', action='append', required=True, help="Tienda a exportar (repetible)")
+    parser.add_argument('--output', required=True, help="Carpeta de destino")
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='parquet')
+    parser.add_argument('--since', help="Desde esta fecha (AAAA-MM-DD, UTC)")
+    parser.add_argument('--until', help="Hasta esta fecha inclusive (AAAA-MM-DD, UTC)")
+    parser.add_argument('--row-group-size', type=int, default=EXPORT_ROW_GROUP_SIZE)
+    parser.add_argument('--full', action='store_true',
+                        help="Ignorar el cursor y reemplazar la exportación anterior de la tienda")
+    parser.add_argument('--rescan-hours', type=float, default=EXPORT_RESCAN_WINDOW.total_seconds() / 3600,
+                        help="Horas que se releen detrás del cursor en busca de ventas tardías")
+    args = parser.parse_args(argv)
+
+    if pa is None:
+        print("Falta pyarrow: instálalo con `pip install pyarrow`")
+        return 1
+    until = args.until
+    if until and len(until) == 10:
+        until += 'T23:59:59.999999'
+
+    from base_datos.firebase_client import FirebaseClient
+    partitioned = os.environ.get('STOREFLOW_SALES_LAYOUT') == 'partitioned'
+    client = FirebaseClient.from_service_account(partitioned_sales=partitioned)
+    for store_id in args.store:
+        result = export_store_sales(client, store_id, args.output, fmt=args.format,
+                                    since=args.since, until=until, incremental=not args.full,
+                                    row_group_size=args.row_group_size,
+                                    rescan_window=timedelta(hours=args.rescan_hours))
+        if result['path']:
+            print(f"{store_id}: {result['rows']} ventas en {result['row_groups']} grupos -> {result['path']}")
+        else:
+            print(f"{store_id}: sin ventas nuevas")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
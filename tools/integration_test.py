@@ -15,14 +15,21 @@ if root not in sys.path:
 
 from gestionar_tienda import GestorTiendasService
 from base_datos.firebase_client import FirebaseClient
+from base_datos.metrics_operations import sales_totals
+from base_datos.rollups import build_summary, compute_deltas
+from base_datos.pagination import decode_cursor, encode_cursor, iter_pages
 import uuid
 import json
+import threading
+from datetime import datetime
 
 
 class FakeFirebaseClient:
     def __init__(self):
         self.users = {}
         self.stores = {}
+        self.sales = {}
+        self._lock = threading.Lock()
 
     # --- Users ---
     def create_account(self, email, password):
@@ -81,22 +88,69 @@ class FakeFirebaseClient:
             return {'success': False, 'error': 'Tienda no encontrada'}
         return {'success': True, 'staff': list(st.get('employees', []))}
 
+    def update_store_staff(self, store_id, staff_id, updates):
+        st = self.stores.get(store_id)
+        for entry in (st or {}).get('employees', []):
+            if entry.get('id') == staff_id:
+                entry.update(updates)
+                return {'success': True}
+        return {'success': False, 'error': 'Empleado no encontrado'}
+
+    def delete_store_staff(self, store_id, staff_id):
+        st = self.stores.get(store_id)
+        if not st:
+            return {'success': False, 'error': 'Tienda no encontrada'}
+        st['employees'] = [e for e in st.get('employees', []) if e.get('id') != staff_id]
+        return {'success': True}
+
     # --- Products ---
-    def create_product(self, store_id, product_data):
+    def create_product(self, store_id, product_data, product_id=None):
         st = self.stores.get(store_id)
         if not st:
             return {'success': False, 'error': 'Tienda no encontrada'}
-        pid = 'p-' + uuid.uuid4().hex[:8]
-        st['products'][pid] = dict(product_data)
-        st['products'][pid]['id'] = pid
+        pid = product_id or 'p-' + uuid.uuid4().hex[:8]
+        # Como la base real: precio y stock se guardan como números
+        product = dict(product_data, id=pid)
+        if 'price' in product:
+            product['price'] = float(product['price'])
+        if product.get('stock') not in (None, ''):
+            product['stock'] = int(product['stock'])
+        st['products'][pid] = product
         return {'success': True, 'product_id': pid}
 
+    def import_products(self, store_id, rows, progress=None):
+        imported, errors = 0, []
+        for line, row in rows:
+            data = {k: v for k, v in row.items() if k != 'id'}
+            res = self.create_product(store_id, data, row.get('id'))
+            if res['success']:
+                imported += 1
+            else:
+                errors.append({'line': line, 'error': res['error']})
+        return {'success': True, 'imported': imported, 'errors': errors}
+
     def get_store_products(self, store_id):
         st = self.stores.get(store_id)
         if not st:
             return {'success': False, 'error': 'Tienda no encontrada'}
         return {'success': True, 'products': list(st.get('products', {}).values())}
 
+    def get_products_by_ids(self, store_id, product_ids):
+        st = self.stores.get(store_id)
+        if not st:
+            return {'success': False, 'error': 'Tienda no encontrada'}
+        products = st.get('products', {})
+        return {'success': True, 'products': [dict(products[pid]) for pid in product_ids if pid in products]}
+
+    def get_products_page(self, store_id, page_size=500, cursor=None, name_prefix=None, descending=False):
+        st = self.stores.get(store_id)
+        if not st:
+            return {'success': False, 'error': 'Tienda no encontrada'}
+        products = [dict(p) for p in st.get('products', {}).values()
+                    if not name_prefix or str(p.get('name', '')).startswith(name_prefix)]
+        page, next_cursor = self._page(products, 'name', page_size, cursor, descending)
+        return {'success': True, 'products': page, 'next_cursor': next_cursor}
+
     def update_product(self, store_id, product_id, updates):
         st = self.stores.get(store_id)
         if not st or product_id not in st.get('products', {}):
@@ -111,6 +165,115 @@ class FakeFirebaseClient:
         del st['products'][product_id]
         return {'success': True}
 
+    # --- Sales ---
+    def record_sale(self, store_id, sale_data):
+        sid = 'sale-' + uuid.uuid4().hex[:8]
+        quantity = int(sale_data['quantity'])
+        unit_price = float(sale_data['unit_price'])
+        self.sales[sid] = {
+            'id': sid, 'store_id': store_id, 'product_id': sale_data['product_id'],
+            'product_name': sale_data.get('product_name', ''), 'quantity': quantity,
+            'unit_price': unit_price, 'total': quantity * unit_price, 'timestamp': datetime.now()
+        }
+        return {'success': True, 'sale_id': sid}
+
+    def record_sale_with_stock(self, store_id, sale_data):
+        # El lock hace de transacción: comprobar y descontar stock es atómico
+        with self._lock:
+            st = self.stores.get(store_id)
+            product = (st or {}).get('products', {}).get(sale_data.get('product_id'))
+            if not product:
+                return {'success': False, 'error': 'Producto no encontrado'}
+            quantity = int(sale_data['quantity'])
+            new_stock = None
+            if product.get('stock') is not None:
+                stock = int(product['stock'])
+                if stock < quantity:
+                    return {'success': False, 'error': f'Stock insuficiente. Disponible: {stock}'}
+                new_stock = stock - quantity
+                product['stock'] = new_stock if isinstance(product['stock'], int) else str(new_stock)
+            res = self.record_sale(store_id, sale_data)
+            res['stock'] = new_stock
+            res['sale'] = dict(self.sales[res['sale_id']])
+            return res
+
+    def record_basket(self, store_id, items, staff_id=None, notes='', receipt_id=None):
+        with self._lock:
+            st = self.stores.get(store_id)
+            products = (st or {}).get('products', {})
+            demand = {}
+            for item in items:
+                demand[item['product_id']] = demand.get(item['product_id'], 0) + int(item['quantity'])
+            for pid, quantity in demand.items():
+                product = products.get(pid)
+                if not product:
+                    return {'success': False, 'error': f'Producto no encontrado: {pid}'}
+                if product.get('stock') is not None and int(product['stock']) < quantity:
+                    return {'success': False, 'error': f"{product.get('name', pid)}: Stock insuficiente. Disponible: {product['stock']}"}
+            for pid, quantity in demand.items():
+                product = products[pid]
+                if product.get('stock') is not None:
+                    new_stock = int(product['stock']) - quantity
+                    product['stock'] = new_stock if isinstance(product['stock'], int) else str(new_stock)
+            receipt_id = receipt_id or 'sale-' + uuid.uuid4().hex[:8]
+            line_ids = []
+            for line, item in enumerate(items, start=1):
+                line_id = f'{receipt_id}-{line}'
+                res = self.record_sale(store_id, {**item, 'staff_id': staff_id, 'notes': notes})
+                sale = self.sales.pop(res['sale_id'])
+                sale.update({'id': line_id, 'receipt_id': receipt_id, 'line': line})
+                self.sales[line_id] = sale
+                line_ids.append(line_id)
+            total = sum(self.sales[line_id]['total'] for line_id in line_ids)
+            return {'success': True, 'sale_id': receipt_id, 'line_ids': line_ids,
+                    'sales': [dict(self.sales[line_id]) for line_id in line_ids], 'total': total}
+
+    def get_store_sales(self, store_id, limit=100):
+        sales = [s for s in self.sales.values() if s['store_id'] == store_id]
+        sales.sort(key=lambda s: s['timestamp'], reverse=True)
+        return {'success': True, 'sales': [dict(s) for s in sales[:limit]]}
+
+    @staticmethod
+    def _page(items, key, page_size, cursor, descending):
+        items.sort(key=lambda d: (d.get(key), d['id']), reverse=descending)
+        if cursor:
+            value, after_id = decode_cursor(cursor)
+            if descending:
+                items = [d for d in items if (d.get(key), d['id']) < (value, after_id)]
+            else:
+                items = [d for d in items if (d.get(key), d['id']) > (value, after_id)]
+        page = items[:page_size]
+        next_cursor = None
+        if len(items) > page_size:
+            next_cursor = encode_cursor(page[-1].get(key), page[-1]['id'])
+        return page, next_cursor
+
+    def get_sales_page(self, store_id, page_size=500, cursor=None, product_id=None, descending=True):
+        sales = [dict(s) for s in self.sales.values()
+                 if s['store_id'] == store_id and (not product_id or s['product_id'] == product_id)]
+        page, next_cursor = self._page(sales, 'timestamp', page_size, cursor, descending)
+        return {'success': True, 'sales': page, 'next_cursor': next_cursor}
+
+    def iter_sales_pages(self, store_id, page_size=500, cursor=None, product_id=None, descending=True):
+        return iter_pages(lambda c: self.get_sales_page(store_id, page_size, c, product_id, descending), cursor)
+
+    def delete_sale(self, sale_id, store_id=None):
+        self.sales.pop(sale_id, None)
+        return {'success': True}
+
+    def aggregate_sales(self, store_id, start=None, end=None):
+        return {'success': True, **sales_totals(
+            s.get('total', 0) for s in self.sales.values()
+            if s['store_id'] == store_id
+            and (start is None or s['timestamp'] >= start) and (end is None or s['timestamp'] <= end))}
+
+    def get_sales_summary(self, store_id, top_limit=5):
+        sales = [s for s in self.sales.values() if s['store_id'] == store_id]
+        deltas = compute_deltas(sales)
+        top = sorted(deltas['products'].items(), key=lambda p: p[1]['quantity'], reverse=True)
+        top = [{'product_id': pid, **values} for pid, values in top if values['quantity'] > 0][:top_limit]
+        return {'success': True, **build_summary(deltas['totals'], top)}
+
 
 def run():
     print('Starting in-memory integration test')
@@ -154,7 +317,7 @@ def run():
 
     # List products
     lst = svc.get_store_products(store_id)
-    print('Products after create:', json.dumps(lst, ensure_ascii=False))
+    print('Products after create:', json.dumps(lst, default=dict, ensure_ascii=False))
 
     # Update product
     up = svc.update_product(store_id, pid, {'price': '12.00'})
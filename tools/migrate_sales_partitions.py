@@ -0,0 +1,53 @@
+"""Migra las ventas de la colección `sales` a stores/{id}/sales_months/{yyyymm}/sales.
+
+Uso:
+    python tools/migrate_sales_partitions.py [--store ID] [--delete] [--batch-size N]
+
+Copia cada venta a la partición de su tienda y mes conservando su ID; se
+puede interrumpir y relanzar sin duplicar nada. Sin --delete los originales
+se mantienen (la app con STOREFLOW_SALES_LAYOUT=partitioned ya no los lee);
+con --delete se borran en el mismo batch que su copia, así que cada venta
+son dos escrituras y --batch-size no puede pasar de 250.
+"""
+import argparse
+import os
+import sys
+# ensure package root is on sys.path so imports like 'base_datos' resolve
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from base_datos.firebase_client import FirebaseClient
+from base_datos.sales_partitions import MIGRATION_BATCH_SIZE, MIGRATION_MAX_WRITES, migrate_to_partitions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Particiona las ventas por tienda y mes")
+    parser.add_argument('--store', help="Migrar solo esta tienda")
+    parser.add_argument('--delete', action='store_true', help="Borrar las ventas originales")
+    parser.add_argument('--batch-size', type=int, default=MIGRATION_BATCH_SIZE,
+                        help=f"Ventas por batch (máx. {MIGRATION_MAX_WRITES}, "
+                             f"{MIGRATION_MAX_WRITES // 2} con --delete)")
+    args = parser.parse_args(argv)
+    max_batch = MIGRATION_MAX_WRITES // 2 if args.delete else MIGRATION_MAX_WRITES
+    if not 1 <= args.batch_size <= max_batch:
+        parser.error(f"--batch-size debe estar entre 1 y {max_batch}"
+                     f"{' con --delete (dos escrituras por venta)' if args.delete else ''}")
+
+    db = FirebaseClient.from_service_account().firestore_db
+    if db is None:
+        print("Firestore no disponible: revisa configuracion/serviceAccountKey.json")
+        return 1
+
+    def progress(copied, skipped):
+        print(f"  {copied} ventas copiadas, {skipped} omitidas", flush=True)
+
+    result = migrate_to_partitions(db, store_id=args.store, delete=args.delete,
+                                   batch_size=args.batch_size, progress=progress)
+    print(f"Migración terminada: {result['copied']} ventas copiadas, "
+          f"{result['skipped']} omitidas (sin tienda o sin fecha)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,7 +2,9 @@
 import tkinter as tk
 from tkinter import messagebox
 
-from ui.config import BG_COLOR, MAIN_WINDOW_WIDTH, MAIN_WINDOW_HEIGHT
+from ui.async_loop import AsyncLoop
+from ui.worker_pool import UIExecutor
+from ui.config import BG_COLOR, MAIN_WINDOW_WIDTH, MAIN_WINDOW_HEIGHT, DATA_REFRESH_DELAY_MS
 from ui.stub_service import StubService
 from ui.dialogs_auth import LoginDialog, RegisterDialog
 from ui.views import ViewManager
@@ -22,14 +24,25 @@ class MainWindow(tk.Tk):
 
         self.auth = auth
         self.service = service or self._get_service()
+        # Pool acotado para cargas en segundo plano y loop de asyncio que lo usa
+        self.ui_executor = UIExecutor()
+        self.async_loop = AsyncLoop(executor=self.ui_executor.pool)
         self.current_user_var = tk.StringVar(value="No autenticado")
         self.session_var = tk.StringVar(value="")
         self._session_id = None
         self.view_manager = None
         self.sidebar_panel = None
+        # (colecciones, callback) de la vista visible, para refrescarla ante cambios de datos
+        self.on_data_change = None
+        self._data_refresh_pending = False
 
         self._build_ui()
 
+    def destroy(self):
+        self.async_loop.close()
+        self.ui_executor.shutdown()
+        super().destroy()
+
     def _get_service(self):
         """Obtiene servicio real o stub."""
         try:
@@ -80,6 +93,8 @@ class MainWindow(tk.Tk):
                     val = ev.get('value')
                     self.current_user_var.set(str(val) if val else 'No autenticado')
                     self._update_login_ui()
+                elif ev.get('type') == 'data':
+                    self._schedule_data_refresh(ev.get('value') or {})
             except Exception:
                 pass
         try:
@@ -87,6 +102,23 @@ class MainWindow(tk.Tk):
         except Exception:
             _apply()
 
+    def _schedule_data_refresh(self, delta: dict):
+        """Refresca la vista visible si el cambio le afecta; una ráfaga de cambios
+        (p. ej. la carga inicial de la réplica) se agrupa en un solo refresco."""
+        registered = self.on_data_change
+        if registered is None or delta.get('collection') not in registered[0]:
+            return
+        if self._data_refresh_pending:
+            return
+        self._data_refresh_pending = True
+
+        def _refresh():
+            self._data_refresh_pending = False
+            current = self.on_data_change
+            if current is registered:
+                current[1]()
+        self.after(DATA_REFRESH_DELAY_MS, _refresh)
+
     def _update_login_ui(self):
         """Actualiza UI de login."""
         user = getattr(self.service, 'current_user', None)
@@ -140,6 +172,8 @@ class MainWindow(tk.Tk):
         try:
             datos = self.auth.get_datos_sesion(self._session_id)
             if datos.get("success"):
+                # El token puede haberse renovado
+                self._session_id = datos.get("session_id", self._session_id)
                 user_data = datos.get('datos_usuario', {})
                 info = f"Usuario: {user_data.get('nombre', 'N/A')}\nEmail: {user_data.get('email', 'N/A')}\nSession: {self._session_id[:16]}..."
                 messagebox.showinfo('Datos de Sesión', info)
@@ -0,0 +1,74 @@
+"""Event loop de asyncio compartido por la interfaz.
+
+Un único hilo de fondo ejecuta el loop; las vistas le envían corrutinas con
+`submit` y reciben el resultado en el hilo de Tk mediante `after`.
+"""
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncLoop:
+    """Loop de asyncio en un hilo daemon, con entrega de resultados a Tk."""
+
+    def __init__(self, executor=None):
+        """Args:
+            executor: ThreadPoolExecutor para `asyncio.to_thread`; None = el del loop
+        """
+        self._loop = asyncio.new_event_loop()
+        if executor is not None:
+            self._loop.set_default_executor(executor)
+        self._thread = threading.Thread(target=self._run, name="ui-asyncio", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    @property
+    def loop(self):
+        return self._loop
+
+    def submit(self, coro, on_done=None, widget=None):
+        """Programa `coro` en el loop.
+
+        Args:
+            on_done: Función (resultado, error) llamada al terminar; error es
+                la excepción lanzada por la corrutina, o None
+            widget: Si se indica, on_done se ejecuta en el hilo de Tk con
+                `widget.after(0, ...)`
+
+        Returns:
+            concurrent.futures.Future de la corrutina
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        if on_done is None:
+            return future
+
+        def deliver(fut):
+            if fut.cancelled():
+                return
+            error = fut.exception()
+            result = None if error else fut.result()
+            if widget is None:
+                on_done(result, error)
+                return
+            try:
+                widget.after(0, lambda: on_done(result, error))
+            except Exception:
+                pass  # el widget ya no existe
+
+        future.add_done_callback(deliver)
+        return future
+
+    def run_in_thread(self, func, *args, on_done=None, widget=None, **kwargs):
+        """Ejecuta una función bloqueante fuera del loop (asyncio.to_thread)."""
+        return self.submit(asyncio.to_thread(func, *args, **kwargs), on_done, widget)
+
+    def close(self):
+        """Detiene el loop (las tareas pendientes se descartan)."""
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=2)
@@ -33,3 +33,6 @@ DEFAULT_LOGO_PATH = r"C:\Users\Usuario\Pictures\Screenshots\logo.png"
 PADDING_SMALL = 5
 PADDING_MEDIUM = 10
 PADDING_LARGE = 20
+
+# Espera antes de refrescar una vista tras cambios de datos (agrupa ráfagas)
+DATA_REFRESH_DELAY_MS = 150
@@ -1,9 +1,8 @@
 """Diálogo para registrar ventas."""
 import tkinter as tk
 from tkinter import messagebox, ttk
-from ui.config import BG_COLOR, TEXT_COLOR, ACCENT_COLOR, FONT_FAMILY, FONT_SIZE_LABEL, FONT_SIZE_BUTTON
+from ui.config import BG_COLOR, TEXT_COLOR, ACCENT_COLOR, FONT_FAMILY, FONT_SIZE_LABEL, FONT_SIZE_BUTTON, WHITE_COLOR
 from ui.window_utils import center_window
-import threading
 
 
 class SaleDialog:
@@ -21,7 +20,10 @@ class SaleDialog:
         self.service = service
         self.store_id = store_id
         self.on_success = on_success
+        self.async_loop = parent.async_loop
         self.products = []
+        # Líneas del ticket en memoria; se envían juntas al registrar
+        self.basket = []
         
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Registrar Venta")
@@ -29,7 +31,7 @@ class SaleDialog:
         self.dialog.transient(parent)
         self.dialog.grab_set()
         
-        center_window(self.dialog, 500, 400, parent)
+        center_window(self.dialog, 500, 600, parent)
         
         self._build_ui()
         self._load_products()
@@ -78,15 +80,32 @@ class SaleDialog:
                               font=(FONT_FAMILY, FONT_SIZE_LABEL), width=20)
         price_entry.pack(anchor="w", pady=5)
         
+        # Línea actual
+        self.line_total_label = tk.Label(main_frame, text="Subtotal: $0.00", bg=BG_COLOR,
+                                        fg=TEXT_COLOR, font=(FONT_FAMILY, FONT_SIZE_LABEL))
+        self.line_total_label.pack(anchor="w", pady=(10, 5))
+        
+        # Calcular subtotal cuando cambian cantidad o precio
+        quantity_entry.bind("<KeyRelease>", self._calculate_total)
+        price_entry.bind("<KeyRelease>", self._calculate_total)
+        
+        basket_buttons = tk.Frame(main_frame, bg=BG_COLOR)
+        basket_buttons.pack(fill="x", pady=5)
+        tk.Button(basket_buttons, text="➕ Agregar al ticket", bg=WHITE_COLOR, fg=TEXT_COLOR,
+                 command=self._add_to_basket, font=(FONT_FAMILY, FONT_SIZE_BUTTON)).pack(side="left")
+        tk.Button(basket_buttons, text="Quitar línea", bg=WHITE_COLOR, fg=TEXT_COLOR,
+                 command=self._remove_from_basket, font=(FONT_FAMILY, FONT_SIZE_BUTTON)).pack(side="left", padx=5)
+        
+        # Ticket
+        self.basket_listbox = tk.Listbox(main_frame, height=6, bg=WHITE_COLOR, fg=TEXT_COLOR,
+                                         font=(FONT_FAMILY, FONT_SIZE_LABEL - 2))
+        self.basket_listbox.pack(fill="both", expand=True, pady=5)
+        
         # Total
         self.total_label = tk.Label(main_frame, text="Total: $0.00", bg=BG_COLOR,
                                    fg=ACCENT_COLOR, font=(FONT_FAMILY, FONT_SIZE_LABEL, "bold"))
         self.total_label.pack(anchor="w", pady=(10, 5))
         
-        # Calcular total cuando cambian cantidad o precio
-        quantity_entry.bind("<KeyRelease>", self._calculate_total)
-        price_entry.bind("<KeyRelease>", self._calculate_total)
-        
         # Botones
         buttons_frame = tk.Frame(main_frame, bg=BG_COLOR)
         buttons_frame.pack(fill="x", pady=20)
@@ -130,22 +149,31 @@ class SaleDialog:
             self._calculate_total()
 
     def _calculate_total(self, event=None):
-        """Calcula el total de la venta."""
+        """Calcula el subtotal de la línea actual."""
         try:
             quantity = int(self.quantity_var.get() or "0")
             price = float(self.price_var.get() or "0")
             total = quantity * price
-            self.total_label.config(text=f"Total: ${total:.2f}")
+            self.line_total_label.config(text=f"Subtotal: ${total:.2f}")
         except (ValueError, TypeError):
-            self.total_label.config(text="Total: $0.00")
+            self.line_total_label.config(text="Subtotal: $0.00")
 
-    def _submit(self):
-        """Registra la venta."""
+    def _refresh_basket(self):
+        """Redibuja las líneas del ticket y su total."""
+        self.basket_listbox.delete(0, 'end')
+        for item in self.basket:
+            self.basket_listbox.insert('end', f"{item['quantity']} x {item['product_name']} "
+                                              f"@ ${item['unit_price']:.2f} = ${item['quantity'] * item['unit_price']:.2f}")
+        total = sum(item['quantity'] * item['unit_price'] for item in self.basket)
+        self.total_label.config(text=f"Total: ${total:.2f}")
+
+    def _current_line(self):
+        """Valida el formulario y devuelve la línea a agregar (o None)."""
         try:
             selection = self.product_combo.current()
             if selection < 0:
                 messagebox.showerror('Error', 'Selecciona un producto')
-                return
+                return None
             
             product = self.products[selection]
             product_id = product.get('id')
@@ -153,68 +181,99 @@ class SaleDialog:
             quantity = int(self.quantity_var.get() or "0")
             if quantity <= 0:
                 messagebox.showerror('Error', 'La cantidad debe ser mayor a 0')
-                return
+                return None
             
             price = float(self.price_var.get() or "0")
             if price < 0:
                 messagebox.showerror('Error', 'El precio no puede ser negativo')
-                return
-            
-            # Verificar stock
-            stock = product.get('stock')
-            if stock is not None:
-                try:
-                    stock_int = int(stock)
-                    if stock_int < quantity:
-                        messagebox.showerror('Error', 
-                                           f'Stock insuficiente. Disponible: {stock_int}')
-                        return
-                except (ValueError, TypeError):
-                    pass
+                return None
+        except ValueError:
+            messagebox.showerror('Error', 'Ingresa números válidos')
+            return None
+        
+        # Verificar stock contando lo que ya está en el ticket
+        stock = product.get('stock')
+        if stock is not None:
+            try:
+                stock_int = int(stock)
+                in_basket = sum(i['quantity'] for i in self.basket if i['product_id'] == product_id)
+                if stock_int < in_basket + quantity:
+                    messagebox.showerror('Error', 
+                                       f'Stock insuficiente. Disponible: {stock_int - in_basket}')
+                    return None
+            except (ValueError, TypeError):
+                pass
+        
+        return {
+            'product_id': product_id,
+            'product_name': product.get('name', ''),
+            'quantity': quantity,
+            'unit_price': price
+        }
+
+    def _add_to_basket(self):
+        """Agrega la línea actual al ticket."""
+        line = self._current_line()
+        if line:
+            self.basket.append(line)
+            self.quantity_var.set("1")
+            self._refresh_basket()
+
+    def _remove_from_basket(self):
+        """Quita la línea seleccionada del ticket."""
+        selection = self.basket_listbox.curselection()
+        if selection:
+            self.basket.pop(selection[0])
+            self._refresh_basket()
+
+    def _submit(self):
+        """Registra el ticket completo con una sola llamada al servicio."""
+        try:
+            if not self.basket:
+                # Sin líneas agregadas: se vende lo que hay en el formulario
+                line = self._current_line()
+                if not line:
+                    return
+                self.basket.append(line)
+                self._refresh_basket()
             
-            sale_data = {
-                'product_id': product_id,
-                'product_name': product.get('name', ''),
-                'quantity': quantity,
-                'unit_price': price
-            }
+            items = list(self.basket)
             
-            # Ejecutar grabado en background para no bloquear la UI
-            def worker():
-                try:
-                    res = self.service.record_sale(self.store_id, sale_data)
-                except Exception as e:
-                    res = {"success": False, "error": str(e)}
-
-                def on_done():
-                    if res.get('success'):
-                        messagebox.showinfo('Éxito', 'Venta registrada correctamente')
+            def on_done(res, error):
+                if error is not None:
+                    res = {"success": False, "error": str(error)}
+                if res.get('success'):
+                    messagebox.showinfo('Éxito', 'Venta registrada correctamente')
+                    try:
+                        self.dialog.destroy()
+                    except Exception:
+                        pass
+                    if self.on_success:
                         try:
-                            self.dialog.destroy()
+                            self.on_success()
                         except Exception:
                             pass
-                        if self.on_success:
-                            try:
-                                self.on_success()
-                            except Exception:
-                                pass
-                    else:
-                        messagebox.showerror('Error', res.get('error', 'Error desconocido'))
-
-                # Volver al hilo principal
-                self.dialog.after(0, on_done)
+                else:
+                    messagebox.showerror('Error', res.get('error', 'Error desconocido'))
+                    self._set_buttons_state('normal')
 
             # Deshabilitar botones mientras se procesa
-            for child in self.dialog.winfo_children():
-                try:
-                    child.config(state='disabled')
-                except Exception:
-                    pass
+            self._set_buttons_state('disabled')
 
-            t = threading.Thread(target=worker, daemon=True)
-            t.start()
-        except ValueError:
-            messagebox.showerror('Error', 'Ingresa números válidos')
+            # Grabar en el loop de fondo; on_done vuelve al hilo principal
+            self.async_loop.run_in_thread(self.service.record_basket, self.store_id, items,
+                                          on_done=on_done, widget=self.dialog)
         except Exception as e:
             messagebox.showerror('Error', f'Error: {str(e)}')
 
+    def _set_buttons_state(self, state):
+        """Habilita o deshabilita los botones del diálogo."""
+        def walk(widget):
+            for child in widget.winfo_children():
+                if isinstance(child, tk.Button):
+                    try:
+                        child.config(state=state)
+                    except Exception:
+                        pass
+                walk(child)
+        walk(self.dialog)
@@ -85,6 +85,14 @@ class StubService:
         """Obtiene productos de una tienda."""
         return list(self._products.get(store_id, []))
 
+    def get_products_page(self, store_id: str, page_size: int = 100, cursor: str = None,
+                          name_prefix: str = None, descending: bool = False) -> Dict[str, Any]:
+        """Obtiene productos filtrados y ordenados por nombre en una sola página."""
+        products = [p for p in self._products.get(store_id, [])
+                    if not name_prefix or str(p.get("name", "")).startswith(name_prefix)]
+        products.sort(key=lambda p: str(p.get("name", "")), reverse=descending)
+        return {"success": True, "products": products, "next_cursor": None}
+
     def create_product(self, store_id: str, product_data: dict) -> Dict[str, Any]:
         """Crea un nuevo producto."""
         pid = f"p{len(self._products.get(store_id, [])) + 1}"
@@ -12,6 +12,10 @@ class StubService:
         """Retorna lista vacía."""
         return {"success": True, "stores": []}
 
+    async def get_user_stores_async(self):
+        """Retorna lista vacía (corrutina)."""
+        return self.get_user_stores()
+
     def get_store_staff(self, store_id):
         """Retorna lista vacía."""
         return {"success": True, "staff": []}
@@ -24,11 +28,23 @@ class StubService:
         """Retorna lista vacía."""
         return {"success": True, "sales": []}
 
+    def get_products_page(self, store_id, page_size=100, cursor=None, name_prefix=None, descending=False):
+        """Retorna página vacía."""
+        return {"success": True, "products": [], "next_cursor": None}
+
+    def get_sales_page(self, store_id, page_size=100, cursor=None, product_id=None, descending=True):
+        """Retorna página vacía."""
+        return {"success": True, "sales": [], "next_cursor": None}
+
     def record_sale(self, store_id, sale_data):
         """Registra venta simulada."""
         return {"success": True, "sale_id": "stub_001"}
 
-    def delete_sale(self, sale_id):
+    def record_basket(self, store_id, items, staff_id=None, notes=''):
+        """Registra ticket simulado."""
+        return {"success": True, "sale_id": "stub_001", "line_ids": []}
+
+    def delete_sale(self, sale_id, store_id=None):
         """Elimina venta simulada."""
         return {"success": True}
 
@@ -44,6 +60,18 @@ class StubService:
         """Obtiene productos top."""
         return {"success": True, "top_products": []}
 
+    def summarize_sales(self, sales_list, limit=5):
+        """Resume ventas."""
+        return {"success": True, "revenue": 0, "count": 0, "average": 0, "top_products": []}
+
+    def get_sales_summary(self, store_id, top_limit=5):
+        """Resumen de ventas vacío."""
+        return {"success": True, "revenue": 0, "count": 0, "average": 0, "top_products": []}
+
+    async def get_metrics_overview(self, store_id, top_limit=5):
+        """Resumen vacío (corrutina)."""
+        return {"success": True, "summary": self.get_sales_summary(store_id, top_limit)}
+
     def set_current_store(self, store_id):
         """Establece tienda actual."""
         self.current_store = store_id
@@ -1,8 +1,9 @@
 """Base para vistas."""
+import asyncio
 import tkinter as tk
 from typing import List, Dict, Any, Optional
 
-from ui.config import BG_COLOR, TEXT_COLOR
+from ui.config import BG_COLOR, TEXT_COLOR, FONT_FAMILY, FONT_SIZE_LABEL
 
 
 class ViewBase:
@@ -20,17 +21,50 @@ class ViewBase:
         self.title_label = main_window.title_label
 
     def clear_view(self):
-        """Limpia los widgets de la vista actual."""
+        """Limpia los widgets de la vista actual y descarta sus cargas pendientes."""
+        executor = getattr(self.main_window, 'ui_executor', None)
+        if executor is not None:
+            executor.cancel_stale()
+        self.main_window.on_data_change = None
         for w in self.view_frame.winfo_children():
             w.destroy()
 
+    def _refresh_on_change(self, collections, callback):
+        """Vuelve a dibujar la vista cuando cambian esas colecciones de la tienda activa."""
+        self.main_window.on_data_change = (tuple(collections), callback)
+
     def _get_stores(self) -> List[Dict[str, Any]]:
         """Obtiene la lista de tiendas."""
         try:
             res = self.service.get_user_stores()
         except Exception:
             res = []
+        return self._stores_from(res)
+
+    def _load_stores_async(self, on_loaded, text: str = "Cargando tiendas..."):
+        """Pide las tiendas en el loop de fondo y llama `on_loaded(stores)` en el hilo de Tk.
+
+        Si la vista cambia antes de que lleguen, el resultado se descarta.
+        """
+        loading = tk.Label(self.view_frame, text=text, bg=BG_COLOR, fg=TEXT_COLOR,
+                           font=(FONT_FAMILY, FONT_SIZE_LABEL))
+        loading.pack(anchor="nw")
+
+        loader = getattr(self.service, 'get_user_stores_async', None)
+        coro = loader() if loader else asyncio.to_thread(self.service.get_user_stores)
+
+        def on_done(res, error):
+            if not loading.winfo_exists():
+                return
+            loading.destroy()
+            on_loaded([] if error is not None else self._stores_from(res))
+
+        future = self.main_window.async_loop.submit(coro, on_done, widget=self.view_frame)
+        self.main_window.ui_executor.track(future)
 
+    @staticmethod
+    def _stores_from(res) -> List[Dict[str, Any]]:
+        """Lista de tiendas de una respuesta del servicio (dict o lista)."""
         if isinstance(res, dict):
             if not res.get('success'):
                 return []
@@ -2,7 +2,6 @@
 import tkinter as tk
 from tkinter import messagebox
 from typing import List, Dict, Any
-import threading
 
 from ui.config import (
     BG_COLOR, TEXT_COLOR, ACCENT_COLOR, FONT_FAMILY, FONT_SIZE_LABEL,
@@ -31,92 +30,70 @@ class MetricsView(ViewBase):
                                  font=(FONT_FAMILY, FONT_SIZE_LABEL))
         loading_label.pack(anchor='nw', pady=PADDING_SMALL)
 
-        def worker():
-            try:
-                sales_res = self.service.get_store_sales(store_id, limit=1000)
-                if not sales_res.get('success'):
-                    sales = []
-                else:
-                    sales = sales_res.get('sales', [])
-                
-                # Enriquecer ventas con nombres de productos si no están disponibles
-                if sales:
-                    try:
-                        products_res = self.service.get_store_products(store_id)
-                        if products_res.get('success'):
-                            products = products_res.get('products', [])
-                            # Crear mapa de producto_id -> nombre
-                            product_map = {p.get('id'): p.get('name', 'N/A') for p in products}
-                            # Enriquecer ventas
-                            for sale in sales:
-                                if not sale.get('product_name') or sale.get('product_name') == '':
-                                    pid = sale.get('product_id')
-                                    sale['product_name'] = product_map.get(pid, 'N/A')
-                    except Exception:
-                        pass
-            except Exception:
-                sales = []
-
-            if not sales:
+        async def load():
+            overview = await self.service.get_metrics_overview(store_id, top_limit=5)
+            summary = overview.get('summary', {}) if overview.get('success') else {}
+            if not summary.get('count'):
+                return {"demo": True}
+
+            top_products = summary.get('top_products', [])
+            return {
+                "demo": False,
+                "revenue": summary.get('revenue', 0),
+                "count": summary.get('count', 0),
+                "average": summary.get('average', 0),
+                "top_products": top_products
+            }
+
+        def on_done(result, error):
+            if error is not None or not result:
                 result = {"demo": True}
+            if not frame.winfo_exists():
+                return
+
+            for child in frame.winfo_children():
+                child.destroy()
+
+            if result.get('demo'):
+                self._show_demo_metrics(frame)
             else:
-                revenue_res = self.service.calculate_revenue(sales)
-                sales_count_res = self.service.calculate_sales_count(sales)
-                top_res = self.service.get_top_products(sales, limit=5)
-
-                result = {
-                    "demo": False,
-                    "revenue": revenue_res.get('revenue', 0) if revenue_res.get('success') else 0,
-                    "count": sales_count_res.get('count', 0) if sales_count_res.get('success') else 0,
-                    "average": sales_count_res.get('average', 0) if sales_count_res.get('success') else 0,
-                    "top_products": top_res.get('top_products', []) if top_res.get('success') else []
-                }
-
-            def on_done():
-                for child in frame.winfo_children():
-                    child.destroy()
-
-                if result.get('demo'):
-                    self._show_demo_metrics(frame)
-                else:
-                    revenue = result.get('revenue', 0)
-                    count = result.get('count', 0)
-                    avg = result.get('average', 0)
-                    top_products = result.get('top_products', [])
-
-                    metrics_frame = tk.Frame(frame, bg=WHITE_COLOR, relief="raised", bd=1)
-                    metrics_frame.pack(fill="x", pady=PADDING_SMALL)
-
-                    tk.Label(metrics_frame, text="MÉTRICAS GENERALES", bg=WHITE_COLOR, fg=TEXT_COLOR,
-                            font=(FONT_FAMILY, FONT_SIZE_LABEL, "bold")).pack(anchor="w", padx=PADDING_MEDIUM, pady=PADDING_SMALL)
+                revenue = result.get('revenue', 0)
+                count = result.get('count', 0)
+                avg = result.get('average', 0)
+                top_products = result.get('top_products', [])
 
-                    tk.Label(metrics_frame, text=f"Ingresos totales: ${revenue:.2f}", bg=WHITE_COLOR,
-                            fg=ACCENT_COLOR, font=(FONT_FAMILY, FONT_SIZE_LABEL, "bold")).pack(anchor="w", padx=PADDING_MEDIUM)
+                metrics_frame = tk.Frame(frame, bg=WHITE_COLOR, relief="raised", bd=1)
+                metrics_frame.pack(fill="x", pady=PADDING_SMALL)
 
-                    tk.Label(metrics_frame, text=f"Total de ventas: {count}", bg=WHITE_COLOR,
-                            fg=TEXT_COLOR, font=(FONT_FAMILY, FONT_SIZE_LABEL)).pack(anchor="w", padx=PADDING_MEDIUM)
+                tk.Label(metrics_frame, text="MÉTRICAS GENERALES", bg=WHITE_COLOR, fg=TEXT_COLOR,
+                        font=(FONT_FAMILY, FONT_SIZE_LABEL, "bold")).pack(anchor="w", padx=PADDING_MEDIUM, pady=PADDING_SMALL)
 
-                    tk.Label(metrics_frame, text=f"Promedio por venta: ${avg:.2f}", bg=WHITE_COLOR,
-                            fg=TEXT_COLOR, font=(FONT_FAMILY, FONT_SIZE_LABEL)).pack(anchor="w", padx=PADDING_MEDIUM, pady=(0, PADDING_SMALL))
+                tk.Label(metrics_frame, text=f"Ingresos totales: ${revenue:.2f}", bg=WHITE_COLOR,
+                        fg=ACCENT_COLOR, font=(FONT_FAMILY, FONT_SIZE_LABEL, "bold")).pack(anchor="w", padx=PADDING_MEDIUM)
 
-                    if top_products:
-                        top_frame = tk.Frame(frame, bg=WHITE_COLOR, relief="raised", bd=1)
-                        top_frame.pack(fill="x", pady=PADDING_SMALL)
+                tk.Label(metrics_frame, text=f"Total de ventas: {count}", bg=WHITE_COLOR,
+                        fg=TEXT_COLOR, font=(FONT_FAMILY, FONT_SIZE_LABEL)).pack(anchor="w", padx=PADDING_MEDIUM)
 
-                        tk.Label(top_frame, text="PRODUCTOS MÁS VENDIDOS", bg=WHITE_COLOR, fg=TEXT_COLOR,
-                                font=(FONT_FAMILY, FONT_SIZE_LABEL, "bold")).pack(anchor="w", padx=PADDING_MEDIUM, pady=PADDING_SMALL)
+                tk.Label(metrics_frame, text=f"Promedio por venta: ${avg:.2f}", bg=WHITE_COLOR,
+                        fg=TEXT_COLOR, font=(FONT_FAMILY, FONT_SIZE_LABEL)).pack(anchor="w", padx=PADDING_MEDIUM, pady=(0, PADDING_SMALL))
 
-                        for product in top_products:
-                            pid = product.get('product_id', 'N/A')
-                            pname = product.get('product_name', 'N/A')
-                            qty = product.get('quantity', 0)
-                            rev = product.get('revenue', 0)
-                            tk.Label(top_frame, text=f"  • {pname} ({pid}): {qty} unidades (${rev:.2f})", bg=WHITE_COLOR,
-                                    fg=TEXT_COLOR, font=(FONT_FAMILY, FONT_SIZE_SMALL)).pack(anchor="w", padx=PADDING_MEDIUM)
+                if top_products:
+                    top_frame = tk.Frame(frame, bg=WHITE_COLOR, relief="raised", bd=1)
+                    top_frame.pack(fill="x", pady=PADDING_SMALL)
+
+                    tk.Label(top_frame, text="PRODUCTOS MÁS VENDIDOS", bg=WHITE_COLOR, fg=TEXT_COLOR,
+                            font=(FONT_FAMILY, FONT_SIZE_LABEL, "bold")).pack(anchor="w", padx=PADDING_MEDIUM, pady=PADDING_SMALL)
 
-            self.view_frame.after(0, on_done)
+                    for product in top_products:
+                        pid = product.get('product_id', 'N/A')
+                        pname = product.get('product_name', 'N/A')
+                        qty = product.get('quantity', 0)
+                        rev = product.get('revenue', 0)
+                        tk.Label(top_frame, text=f"  • {pname} ({pid}): {qty} unidades (${rev:.2f})", bg=WHITE_COLOR,
+                                fg=TEXT_COLOR, font=(FONT_FAMILY, FONT_SIZE_SMALL)).pack(anchor="w", padx=PADDING_MEDIUM)
 
-        threading.Thread(target=worker, daemon=True).start()
+        future = self.main_window.async_loop.submit(load(), on_done, widget=self.view_frame)
+        self.main_window.ui_executor.track(future)
 
     def _show_demo_metrics(self, parent):
         demo_data = {
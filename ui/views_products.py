@@ -9,9 +9,15 @@ from ui.config import (
 )
 from ui.dialogs_product import CreateProductDialog, UpdateProductDialog
 from ui.views_base import ViewBase
+from ui.virtual_list import VirtualList
 from ui.window_utils import center_window
 
 
+def format_product_row(p: Dict[str, Any]) -> str:
+    """Texto de un producto en la lista (se llama fuera del hilo de Tk)."""
+    return f"{p.get('name')} — ${p.get('price')} (id:{p.get('id')})"
+
+
 class ProductView(ViewBase):
     """Vista de gestión de productos."""
 
@@ -26,46 +32,38 @@ class ProductView(ViewBase):
                     bg=BG_COLOR, fg=TEXT_COLOR, font=(FONT_FAMILY, FONT_SIZE_LABEL)).pack(anchor="nw")
             return
 
-        try:
-            res = self.service.get_store_products(store_id)
-        except Exception:
-            res = []
-
-        if isinstance(res, dict):
-            if not res.get('success'):
-                tk.Label(self.view_frame, text=f"Error: {res.get('error', '')}",
-                        bg=BG_COLOR, fg=TEXT_COLOR, font=(FONT_FAMILY, FONT_SIZE_LABEL)).pack(anchor="nw")
-                return
-            products = res.get('products', [])
-        else:
-            products = list(res or [])
-
         header = tk.Frame(self.view_frame, bg=BG_COLOR)
         header.pack(fill="x")
         tk.Button(header, text="Crear producto", bg=ACCENT_COLOR, fg="white",
                  command=lambda: self._create_product_dialog(store_id), font=(FONT_FAMILY, FONT_SIZE_BUTTON, "bold"),
                  bd=0).pack(side="right")
 
-        lb = tk.Listbox(self.view_frame, bg=WHITE_COLOR, fg=TEXT_COLOR,
-                       font=(FONT_FAMILY, FONT_SIZE_LABEL), bd=0, highlightthickness=0)
-        for p in products:
-            lb.insert('end', f"{p.get('name')} — ${p.get('price')} (id:{p.get('id')})")
+        # Lista virtual ordenada y filtrada por nombre en la base de datos
+        def fetch_page(page_size, cursor, name_prefix, descending):
+            return self.service.get_products_page(store_id, page_size=page_size, cursor=cursor,
+                                                  name_prefix=name_prefix or None, descending=descending)
+
+        lb = VirtualList(self.view_frame, fetch_page, 'products', format_product_row,
+                         empty_text="No hay productos", filter_label="Nombre empieza con:",
+                         sort_labels=("Z-A", "A-Z"), descending=False,
+                         executor=self.main_window.ui_executor, query_key=('products', store_id))
         lb.pack(fill='both', expand=True, pady=PADDING_MEDIUM)
+        self._refresh_on_change(('products',), lb.reload)
 
         actions = tk.Frame(self.view_frame, bg=BG_COLOR)
         actions.pack(fill='x')
         tk.Button(actions, text='Actualizar seleccionado',
-                 command=lambda: self._update_product_dialog(store_id, lb, products),
+                 command=lambda: self._update_product_dialog(store_id, lb, lb.items),
                  bg=WHITE_COLOR, fg=TEXT_COLOR).pack(side='left', padx=PADDING_SMALL)
         tk.Button(actions, text='Eliminar seleccionado',
-                 command=lambda: self._delete_product(store_id, lb, products),
+                 command=lambda: self._delete_product(store_id, lb, lb.items),
                  bg=WHITE_COLOR, fg=TEXT_COLOR).pack(side='left', padx=PADDING_SMALL)
 
     def _create_product_dialog(self, store_id: str):
         """Abre diálogo para crear producto."""
         CreateProductDialog(self.main_window, self.service, store_id)
 
-    def _update_product_dialog(self, store_id: str, listbox: tk.Listbox, products: List[Dict[str, Any]]):
+    def _update_product_dialog(self, store_id: str, listbox, products: List[Dict[str, Any]]):
         """Abre diálogo para actualizar producto."""
         selection = listbox.curselection()
         if not selection:
@@ -142,7 +140,7 @@ class ProductView(ViewBase):
                  command=submit, font=(FONT_FAMILY, FONT_SIZE_BUTTON, "bold"),
                  padx=20, pady=10).grid(row=3, column=0, columnspan=2, pady=20)
 
-    def _delete_product(self, store_id: str, listbox: tk.Listbox, products: List[Dict[str, Any]]):
+    def _delete_product(self, store_id: str, listbox, products: List[Dict[str, Any]]):
         """Elimina un producto seleccionado."""
         selection = listbox.curselection()
         if not selection:
@@ -3,7 +3,6 @@ import tkinter as tk
 from tkinter import messagebox, simpledialog
 from typing import List, Dict, Any
 from datetime import datetime
-import threading
 
 from ui.config import (
     BG_COLOR, TEXT_COLOR, ACCENT_COLOR, FONT_FAMILY, FONT_SIZE_LABEL,
@@ -11,6 +10,34 @@ from ui.config import (
 )
 from ui.views_base import ViewBase
 from ui.dialogs_sale import SaleDialog
+from ui.virtual_list import VirtualList
+
+# Ventas por página en la lista
+SALES_PAGE_SIZE = 100
+
+
+def format_sale_row(sale: Dict[str, Any]) -> str:
+    """Texto de una venta en la lista (se llama fuera del hilo de Tk)."""
+    total = sale.get('total', 0)
+    quantity = sale.get('quantity', 0)
+    product_id = sale.get('product_id', 'N/A')
+    timestamp = sale.get('timestamp')
+
+    # Formatear fecha si está disponible
+    date_str = ""
+    if timestamp:
+        try:
+            if hasattr(timestamp, 'strftime'):
+                date_str = timestamp.strftime('%Y-%m-%d %H:%M')
+            else:
+                date_str = str(timestamp)[:16]
+        except Exception:
+            date_str = ""
+
+    display_text = f"${total:.2f} | {quantity} unidades | Producto: {product_id}"
+    if date_str:
+        display_text += f" | {date_str}"
+    return display_text
 
 
 class SalesView(ViewBase):
@@ -26,7 +53,7 @@ class SalesView(ViewBase):
             tk.Label(self.view_frame, text="No hay tienda activa.",
                     bg=BG_COLOR, fg=TEXT_COLOR, font=(FONT_FAMILY, FONT_SIZE_LABEL)).pack(anchor="nw")
             return
-        # Preparar interfaz (header + lista vacía) y cargar ventas en background
+        # Preparar interfaz (header + lista); las ventas se cargan en background
         header = tk.Frame(self.view_frame, bg=BG_COLOR)
         header.pack(fill="x", padx=PADDING_MEDIUM, pady=PADDING_SMALL)
 
@@ -35,86 +62,28 @@ class SalesView(ViewBase):
                  font=(FONT_FAMILY, FONT_SIZE_BUTTON, "bold"), bd=0,
                  padx=15, pady=8).pack(side="left")
 
-        # Frame para lista de ventas
-        list_frame = tk.Frame(self.view_frame, bg=BG_COLOR)
-        list_frame.pack(fill='both', expand=True, padx=PADDING_MEDIUM, pady=PADDING_SMALL)
-
-        # Scrollbar
-        scrollbar = tk.Scrollbar(list_frame)
-        scrollbar.pack(side="right", fill="y")
-
-        # Listbox con scrollbar
-        self._sales_listbox = tk.Listbox(list_frame, bg=WHITE_COLOR, fg=TEXT_COLOR,
-                                         font=(FONT_FAMILY, FONT_SIZE_SMALL), bd=1, 
-                                         yscrollcommand=scrollbar.set, selectmode=tk.SINGLE)
-        scrollbar.config(command=self._sales_listbox.yview)
-        self._sales_listbox.insert('end', 'Cargando ventas...')
-        self._sales_listbox.pack(fill='both', expand=True)
-
-        # Acciones (se actualizarán cuando lleguen las ventas)
-        self._sales_actions_frame = tk.Frame(self.view_frame, bg=BG_COLOR)
-        self._sales_actions_frame.pack(fill='x', padx=PADDING_MEDIUM, pady=PADDING_SMALL)
-
-        # Cargar ventas en background
-        def worker():
-            try:
-                res = self.service.get_store_sales(store_id, limit=100)
-            except Exception as e:
-                res = {"success": False, "error": str(e)}
-
-            def on_complete():
-                self._populate_sales_ui(res)
-
-            self.view_frame.after(0, on_complete)
-
-        threading.Thread(target=worker, daemon=True).start()
-
-    def _populate_sales_ui(self, res):
-        """Actualiza la UI con los resultados de ventas (se ejecuta en hilo principal)."""
-        self._sales_listbox.delete(0, 'end')
-        if not res.get('success'):
-            error_msg = res.get('error', 'Error desconocido')
-            self._sales_listbox.insert('end', f"Error al cargar ventas: {error_msg}")
-            self._sales_listbox.config(state=tk.DISABLED)
-            return
-
-        sales = res.get('sales', [])
-        if not sales:
-            self._sales_listbox.insert('end', "No hay ventas registradas")
-            self._sales_listbox.config(state=tk.DISABLED)
-        else:
-            for sale in sales:
-                total = sale.get('total', 0)
-                quantity = sale.get('quantity', 0)
-                product_id = sale.get('product_id', 'N/A')
-                timestamp = sale.get('timestamp')
-
-                # Formatear fecha si está disponible
-                date_str = ""
-                if timestamp:
-                    try:
-                        if hasattr(timestamp, 'strftime'):
-                            date_str = timestamp.strftime('%Y-%m-%d %H:%M')
-                        else:
-                            date_str = str(timestamp)[:16]
-                    except:
-                        date_str = ""
-
-                display_text = f"${total:.2f} | {quantity} unidades | Producto: {product_id}"
-                if date_str:
-                    display_text += f" | {date_str}"
-
-                self._sales_listbox.insert('end', display_text)
-
-            # Añadir botón eliminar
-            for child in self._sales_actions_frame.winfo_children():
-                child.destroy()
-
-            tk.Button(self._sales_actions_frame, text='🗑️ Eliminar seleccionada',
-                     command=lambda: self._delete_sale(self._sales_listbox, sales),
-                     bg="#dc3545", fg="white",
-                     font=(FONT_FAMILY, FONT_SIZE_BUTTON),
-                     padx=15, pady=5).pack(side='left', padx=PADDING_SMALL)
+        # Lista virtual: pide páginas al servicio a medida que se desplaza
+        def fetch_page(page_size, cursor, product_id, descending):
+            return self.service.get_sales_page(store_id, page_size=page_size, cursor=cursor,
+                                               product_id=product_id or None, descending=descending)
+
+        self._sales_list = VirtualList(self.view_frame, fetch_page, 'sales', format_sale_row,
+                                       empty_text="No hay ventas registradas",
+                                       filter_label="ID de producto:",
+                                       sort_labels=("Más recientes", "Más antiguas"),
+                                       page_size=SALES_PAGE_SIZE,
+                                       executor=self.main_window.ui_executor,
+                                       query_key=('sales', store_id))
+        self._sales_list.pack(fill='both', expand=True, padx=PADDING_MEDIUM, pady=PADDING_SMALL)
+        self._refresh_on_change(('sales',), self._sales_list.reload)
+
+        actions = tk.Frame(self.view_frame, bg=BG_COLOR)
+        actions.pack(fill='x', padx=PADDING_MEDIUM, pady=PADDING_SMALL)
+        tk.Button(actions, text='🗑️ Eliminar seleccionada',
+                 command=lambda: self._delete_sale(self._sales_list, self._sales_list.items),
+                 bg="#dc3545", fg="white",
+                 font=(FONT_FAMILY, FONT_SIZE_BUTTON),
+                 padx=15, pady=5).pack(side='left', padx=PADDING_SMALL)
 
     def _register_sale(self, store_id):
         """Abre diálogo para registrar venta."""
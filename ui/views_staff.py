@@ -51,6 +51,7 @@ class StaffView(ViewBase):
         for e in staff:
             lb.insert('end', f"{e.get('name')} — {e.get('role')} (id:{e.get('id')})")
         lb.pack(fill='both', expand=True, pady=PADDING_MEDIUM)
+        self._refresh_on_change(('staff',), self.show_staff)
 
         actions = tk.Frame(self.view_frame, bg=BG_COLOR)
         actions.pack(fill='x')
@@ -18,9 +18,10 @@ class StoreView(ViewBase):
         """Muestra la vista de tiendas."""
         self.clear_view()
         self.title_label.config(text="Tiendas")
+        self._load_stores_async(self._render_stores)
 
-        stores = self._get_stores()
-
+    def _render_stores(self, stores):
+        """Dibuja la lista de tiendas con sus acciones."""
         if not stores:
             tk.Label(self.view_frame, text="No hay tiendas disponibles.",
                     bg=BG_COLOR, fg=TEXT_COLOR, font=(FONT_FAMILY, FONT_SIZE_LABEL)).pack(anchor="nw")
@@ -82,9 +83,10 @@ class StoreView(ViewBase):
         """Muestra todas las tiendas del usuario con detalles."""
         self.clear_view()
         self.title_label.config(text="Mis Tiendas")
+        self._load_stores_async(self._render_my_stores)
 
-        stores = self._get_stores()
-
+    def _render_my_stores(self, stores):
+        """Dibuja el detalle de cada tienda del usuario."""
         if not stores:
             tk.Label(self.view_frame, text="No tienes tiendas registradas.",
                     bg=BG_COLOR, fg=TEXT_COLOR, font=(FONT_FAMILY, FONT_SIZE_LABEL)).pack(anchor="nw")
@@ -0,0 +1,314 @@
+"""Lista virtual paginada para Tkinter.
+
+Solo se dibujan las filas visibles: el Listbox tiene tantas líneas como
+caben en pantalla y la barra de desplazamiento mueve una ventana sobre las
+filas ya cargadas. Las páginas se piden al servicio (que ordena y filtra en
+la base de datos) a medida que el usuario se acerca al final, y el formateo
+de cada fila se hace en el pool compartido de la interfaz, no en el de Tk.
+"""
+import tkinter as tk
+import tkinter.font as tkfont
+from typing import Any, Callable, Dict, List, Optional
+
+from ui.config import (
+    BG_COLOR, TEXT_COLOR, ACCENT_COLOR, FONT_FAMILY, FONT_SIZE_SMALL,
+    FONT_SIZE_BUTTON, PADDING_SMALL, WHITE_COLOR
+)
+
+# Filas por página pedida al servicio
+DEFAULT_PAGE_SIZE = 100
+# Se pide la página siguiente cuando quedan menos filas que esto por debajo
+PREFETCH_MARGIN = 20
+
+
+class PagedRows:
+    """Estado de la lista (filas cargadas, cursor, consulta), sin Tk.
+
+    `fetch_page(page_size, cursor, filter_text, descending)` debe devolver la
+    respuesta del servicio: {'success', items_key: [...], 'next_cursor'}.
+    """
+
+    def __init__(self, fetch_page: Callable, items_key: str, format_row: Callable,
+                 page_size: int = DEFAULT_PAGE_SIZE):
+        self.fetch_page = fetch_page
+        self.items_key = items_key
+        self.format_row = format_row
+        self.page_size = page_size
+        self.items: List[Dict[str, Any]] = []
+        self.rows: List[str] = []
+        self.filter_text = ''
+        self.descending = True
+        self.error: Optional[str] = None
+        self._cursor = None
+        self._exhausted = False
+        self._loading = False
+        self._generation = 0
+
+    def reset(self, filter_text: str = None, descending: bool = None):
+        """Descarta lo cargado; las páginas en curso de la consulta anterior se ignoran."""
+        if filter_text is not None:
+            self.filter_text = filter_text
+        if descending is not None:
+            self.descending = descending
+        self._generation += 1
+        del self.items[:]
+        del self.rows[:]
+        self.error = None
+        self._cursor = None
+        self._exhausted = False
+        self._loading = False
+
+    @property
+    def loading(self) -> bool:
+        return self._loading
+
+    @property
+    def exhausted(self) -> bool:
+        return self._exhausted
+
+    def needs_more(self, last_visible: int) -> bool:
+        """Indica si hay que pedir otra página para mostrar hasta `last_visible`."""
+        if self._loading or self._exhausted or self.error:
+            return False
+        return last_visible + PREFETCH_MARGIN >= len(self.rows)
+
+    @property
+    def generation(self) -> int:
+        """Cambia con cada `reset`; identifica la consulta actual."""
+        return self._generation
+
+    def begin_load(self):
+        """Marca una carga en curso y retorna la petición (cursor, filtro, orden).
+
+        La petición no depende de la generación, así que dos listas con la
+        misma consulta producen peticiones iguales que pueden coalescerse.
+        """
+        self._loading = True
+        return (self._cursor, self.filter_text, self.descending)
+
+    def load(self, request):
+        """Pide y formatea una página (se ejecuta fuera del hilo de Tk)."""
+        cursor, filter_text, descending = request
+        try:
+            res = self.fetch_page(self.page_size, cursor, filter_text, descending)
+        except Exception as e:
+            res = {"success": False, "error": str(e)}
+        rows = []
+        if res.get('success'):
+            rows = [self.format_row(item) for item in res.get(self.items_key, [])]
+        return res, rows
+
+    def apply(self, generation: int, result) -> bool:
+        """Agrega la página cargada. Retorna False si era de una consulta anterior."""
+        res, rows = result
+        if generation != self._generation:
+            return False
+        self._loading = False
+        if not res.get('success'):
+            self.error = res.get('error', 'Error desconocido')
+            return True
+        self.items.extend(res.get(self.items_key, []))
+        self.rows.extend(rows)
+        self._cursor = res.get('next_cursor')
+        self._exhausted = not self._cursor
+        return True
+
+    def window(self, first: int, count: int) -> List[str]:
+        return self.rows[first:first + count]
+
+
+class VirtualList(tk.Frame):
+    """Listbox virtual con carga por páginas, filtro y orden del servidor.
+
+    Expone `items` y `curselection()` con índices sobre todas las filas
+    cargadas, de modo que puede usarse en lugar de un Listbox + lista.
+    """
+
+    def __init__(self, parent, fetch_page: Callable, items_key: str, format_row: Callable,
+                 empty_text: str = "Sin resultados", filter_label: str = None,
+                 sort_labels=("Descendente", "Ascendente"), descending: bool = True,
+                 page_size: int = DEFAULT_PAGE_SIZE, executor=None, query_key=None):
+        """Crea la lista y pide la primera página.
+
+        Args:
+            fetch_page: Función (page_size, cursor, filter_text, descending) -> respuesta
+            items_key: Clave de la lista en la respuesta ('sales', 'products', ...)
+            format_row: Convierte un documento en el texto de su fila
+            filter_label: Texto del filtro; None oculta el filtro
+            sort_labels: Textos del botón de orden (descendente, ascendente)
+            executor: UIExecutor compartido donde se cargan las páginas
+            query_key: Identifica la consulta (p. ej. ('sales', store_id)) para
+                coalescer pedidos idénticos de la misma página
+        """
+        super().__init__(parent, bg=BG_COLOR)
+        self.model = PagedRows(fetch_page, items_key, format_row, page_size)
+        self.model.descending = descending
+        self._empty_text = empty_text
+        self._sort_labels = sort_labels
+        self._top = 0
+        self._visible = 10
+        self._selected = None
+        self._executor = executor
+        self._query_key = query_key
+
+        toolbar = tk.Frame(self, bg=BG_COLOR)
+        toolbar.pack(fill='x', pady=(0, PADDING_SMALL))
+        if filter_label:
+            tk.Label(toolbar, text=filter_label, bg=BG_COLOR, fg=TEXT_COLOR,
+                     font=(FONT_FAMILY, FONT_SIZE_SMALL)).pack(side='left')
+            self._filter_entry = tk.Entry(toolbar, font=(FONT_FAMILY, FONT_SIZE_SMALL), width=20)
+            self._filter_entry.pack(side='left', padx=PADDING_SMALL)
+            self._filter_entry.bind('<Return>', lambda e: self.apply_filter())
+            tk.Button(toolbar, text='Filtrar', command=self.apply_filter, bg=WHITE_COLOR, fg=TEXT_COLOR,
+                      font=(FONT_FAMILY, FONT_SIZE_SMALL)).pack(side='left')
+        self._sort_button = tk.Button(toolbar, text=self._sort_text(), command=self.toggle_sort,
+                                      bg=ACCENT_COLOR, fg='white', font=(FONT_FAMILY, FONT_SIZE_BUTTON), bd=0)
+        self._sort_button.pack(side='right')
+        self._status = tk.Label(toolbar, text='', bg=BG_COLOR, fg=TEXT_COLOR, font=(FONT_FAMILY, FONT_SIZE_SMALL))
+        self._status.pack(side='right', padx=PADDING_SMALL)
+
+        body = tk.Frame(self, bg=BG_COLOR)
+        body.pack(fill='both', expand=True)
+        self._scrollbar = tk.Scrollbar(body, command=self._on_scrollbar)
+        self._scrollbar.pack(side='right', fill='y')
+        self._listbox = tk.Listbox(body, bg=WHITE_COLOR, fg=TEXT_COLOR, font=(FONT_FAMILY, FONT_SIZE_SMALL),
+                                   bd=1, selectmode=tk.SINGLE, exportselection=False, activestyle='none')
+        self._listbox.pack(side='left', fill='both', expand=True)
+        self._line_height = tkfont.Font(font=self._listbox['font']).metrics('linespace') + 1
+
+        self._listbox.bind('<Configure>', self._on_resize)
+        self._listbox.bind('<<ListboxSelect>>', self._on_select)
+        self._listbox.bind('<MouseWheel>', self._on_wheel)
+        self._listbox.bind('<Button-4>', lambda e: self.scroll_rows(-3) or 'break')
+        self._listbox.bind('<Button-5>', lambda e: self.scroll_rows(3) or 'break')
+        self._listbox.bind('<Up>', lambda e: self._move_selection(-1))
+        self._listbox.bind('<Down>', lambda e: self._move_selection(1))
+
+        self.reload()
+
+    # === API usada por las vistas ===
+    @property
+    def items(self) -> List[Dict[str, Any]]:
+        return self.model.items
+
+    def curselection(self):
+        """Índice seleccionado sobre todas las filas cargadas (como Listbox)."""
+        return (self._selected,) if self._selected is not None else ()
+
+    def reload(self):
+        """Vuelve a pedir la lista desde la primera página."""
+        self.model.reset()
+        self._top = 0
+        self._selected = None
+        self._render()
+
+    def apply_filter(self):
+        self.model.reset(filter_text=self._filter_entry.get().strip())
+        self._top = 0
+        self._selected = None
+        self._render()
+
+    def toggle_sort(self):
+        self.model.reset(descending=not self.model.descending)
+        self._sort_button.config(text=self._sort_text())
+        self._top = 0
+        self._selected = None
+        self._render()
+
+    def scroll_rows(self, delta: int):
+        self._scroll_to(self._top + delta)
+
+    # === Dibujo ===
+    def _sort_text(self):
+        return self._sort_labels[0] if self.model.descending else self._sort_labels[1]
+
+    def _scroll_to(self, top: int):
+        max_top = max(0, len(self.model.rows) - self._visible)
+        top = max(0, min(int(top), max_top))
+        if top != self._top:
+            self._top = top
+            self._render()
+
+    def _render(self):
+        model = self.model
+        self._listbox.delete(0, 'end')
+        rows = model.window(self._top, self._visible)
+        if rows:
+            self._listbox.insert('end', *rows)
+            if self._selected is not None and self._top <= self._selected < self._top + len(rows):
+                self._listbox.selection_set(self._selected - self._top)
+        elif model.error:
+            self._listbox.insert('end', f"Error al cargar: {model.error}")
+        elif model.exhausted:
+            self._listbox.insert('end', self._empty_text)
+
+        total = len(model.rows)
+        if total:
+            self._scrollbar.set(self._top / total, min(1.0, (self._top + self._visible) / total))
+        else:
+            self._scrollbar.set(0.0, 1.0)
+
+        if model.loading:
+            self._status.config(text='Cargando...')
+        else:
+            suffix = '' if model.exhausted else '+'
+            self._status.config(text=f"{total}{suffix} filas" if total else '')
+
+        if model.needs_more(self._top + self._visible):
+            self._load_next()
+
+    def _load_next(self):
+        generation = self.model.generation
+        request = self.model.begin_load()
+        self._status.config(text='Cargando...')
+
+        def on_done(result, error):
+            if error is not None:
+                result = ({"success": False, "error": str(error)}, [])
+            if self.winfo_exists() and self.model.apply(generation, result):
+                self._render()
+
+        if self._executor is None:
+            # Sin pool compartido (uso aislado del widget): cargar en el hilo de Tk
+            on_done(self.model.load(request), None)
+            return
+        key = None
+        if self._query_key is not None:
+            key = ('page', self._query_key, self.model.page_size) + request
+        self._executor.submit(self.model.load, request, on_done=on_done, widget=self, key=key)
+
+    # === Eventos ===
+    def _on_resize(self, event):
+        visible = max(1, event.height // self._line_height)
+        if visible != self._visible:
+            self._visible = visible
+            self._render()
+
+    def _on_scrollbar(self, *args):
+        total = len(self.model.rows)
+        if args[0] == 'moveto':
+            self._scroll_to(float(args[1]) * total)
+        elif args[0] == 'scroll':
+            step = self._visible if args[2] == 'pages' else 1
+            self._scroll_to(self._top + int(args[1]) * step)
+
+    def _on_wheel(self, event):
+        self.scroll_rows(-3 if event.delta > 0 else 3)
+        return 'break'
+
+    def _on_select(self, event):
+        selection = self._listbox.curselection()
+        if selection and self._top + selection[0] < len(self.model.items):
+            self._selected = self._top + selection[0]
+
+    def _move_selection(self, delta: int):
+        if not self.model.items:
+            return 'break'
+        current = self._selected if self._selected is not None else self._top - delta
+        self._selected = max(0, min(current + delta, len(self.model.items) - 1))
+        if self._selected < self._top:
+            self._top = self._selected
+        elif self._selected >= self._top + self._visible:
+            self._top = self._selected - self._visible + 1
+        self._render()
+        return 'break'
@@ -0,0 +1,143 @@
+"""Pool de hilos compartido por la interfaz para cargas en segundo plano.
+
+- Tamaño acotado: como mucho `max_workers` llamadas al backend a la vez.
+- Single-flight: si ya hay una llamada idéntica (misma función y argumentos)
+  en curso, el nuevo pedido espera ese mismo resultado en vez de repetirla.
+- Cancelación: al cambiar de vista, `cancel_stale` descarta los pedidos de
+  la vista anterior; los que aún no empezaron no llegan a ejecutarse. Un
+  pedido de la vista nueva nunca se une a una llamada de la anterior, que
+  pudo empezar antes de una escritura (p. ej. registrar o borrar una venta).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+
+
+class _Flight:
+    """Una llamada en curso y quienes esperan su resultado."""
+
+    def __init__(self, future, generation):
+        self.future = future
+        self.generation = generation
+        # (generación, cancelable, on_done, widget)
+        self.waiters = []
+
+
+class UIExecutor:
+    """Ejecutor acotado con coalescencia de pedidos y cancelación por vista."""
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ui-worker")
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._inflight = {}
+        self._tracked = []
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        return self._pool
+
+    @staticmethod
+    def make_key(func, args, kwargs):
+        """Clave de coalescencia, o None si los argumentos no son hashables."""
+        key = (func, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def submit(self, func, *args, on_done=None, widget=None, key=None,
+               coalesce: bool = True, cancellable: bool = True, **kwargs):
+        """Ejecuta `func(*args, **kwargs)` en el pool.
+
+        Args:
+            on_done: Función (resultado, error) llamada al terminar
+            widget: Si se indica, on_done se ejecuta en el hilo de Tk
+            key: Clave de coalescencia; por defecto (func, args, kwargs)
+            coalesce: False para llamadas que no deben compartirse (escrituras)
+            cancellable: False para que un cambio de vista no descarte el resultado
+
+        Returns:
+            El Future de la llamada (compartido si se coalesció)
+        """
+        if coalesce and key is None:
+            key = self.make_key(func, args, kwargs)
+        if not coalesce:
+            key = None
+
+        with self._lock:
+            waiter = (self._generation, cancellable, on_done, widget)
+            flight = self._inflight.get(key) if key is not None else None
+            if (flight is not None and flight.generation == self._generation
+                    and not flight.future.cancelled()):
+                flight.waiters.append(waiter)
+                return flight.future
+
+            flight = _Flight(self._pool.submit(func, *args, **kwargs), self._generation)
+            flight.waiters.append(waiter)
+            if key is not None:
+                self._inflight[key] = flight
+        flight.future.add_done_callback(lambda fut: self._finish(key, flight))
+        return flight.future
+
+    def track(self, future):
+        """Registra un Future externo (p. ej. del loop de asyncio) para cancelarlo con la vista."""
+        with self._lock:
+            self._tracked = [f for f in self._tracked if not f.done()]
+            self._tracked.append(future)
+        return future
+
+    def cancel_stale(self):
+        """Descarta los pedidos cancelables hechos hasta ahora (cambio de vista)."""
+        unwanted = []
+        with self._lock:
+            self._generation += 1
+            # Las llamadas anteriores ya no se comparten: su lectura pudo
+            # empezar antes de una escritura que motivó el cambio de vista
+            flights, self._inflight = list(self._inflight.values()), {}
+            for flight in flights:
+                flight.waiters = [w for w in flight.waiters if not w[1]]
+                if not flight.waiters:
+                    unwanted.append(flight)
+            tracked, self._tracked = self._tracked, []
+        # cancel() ejecuta los callbacks en este hilo, por eso fuera del lock;
+        # solo cancela las llamadas que aún no empezaron
+        for flight in unwanted:
+            flight.future.cancel()
+        for future in tracked:
+            future.cancel()
+
+    def _finish(self, key, flight):
+        with self._lock:
+            if key is not None and self._inflight.get(key) is flight:
+                del self._inflight[key]
+            waiters = list(flight.waiters)
+            generation = self._generation
+        future = flight.future
+        if future.cancelled():
+            return
+        error = future.exception()
+        result = None if error else future.result()
+        for waiter_generation, cancellable, on_done, widget in waiters:
+            if on_done is None or (cancellable and waiter_generation != generation):
+                continue
+            self._deliver(on_done, widget, result, error)
+
+    @staticmethod
+    def _deliver(on_done, widget, result, error):
+        if widget is None:
+            on_done(result, error)
+            return
+        try:
+            widget.after(0, lambda: on_done(result, error))
+        except Exception:
+            pass  # el widget ya no existe
+
+    def shutdown(self):
+        self.cancel_stale()
+        self._pool.shutdown(wait=False, cancel_futures=True)